@@ -0,0 +1,254 @@
+"""
+Representação intermediária (IR) de uma consulta em álgebra relacional.
+
+O parser (`parser.py`) produz diretamente esta estrutura, e os construtores de árvore
+(`arvores_construcao_otimizacao.py` e `plantando_arvores/processamento_consultas.py`) a consomem
+sem precisar reinterpretar a string da álgebra relacional. A string continua disponível via `str(no)`,
+gerada sob demanda (e memorizada) no mesmo formato produzido anteriormente pelo parser:
+
+    𝝿[c.nome](𝛔[c.idcliente = p.cliente_idcliente]((cliente[c] ⨝ pedido[p])))
+
+Os nós usam `__slots__` e não devem ser alterados depois de construídos.
+"""
+
+from __future__ import annotations
+import threading
+from typing import Iterable, Optional, Union
+
+class Coluna:
+    """
+    Referência a uma coluna já validada: alias da tabela e nome da coluna (ambos normalizados).
+    """
+    __slots__ = ('alias', 'nome')
+
+    def __init__(self, alias: str, nome: str) -> None:
+        self.alias = alias
+        self.nome = nome
+
+    def __str__(self) -> str:
+        return f"{self.alias}.{self.nome}"
+
+    def __repr__(self) -> str:
+        return f"Coluna({self.alias!r}, {self.nome!r})"
+
+    def __eq__(self, outro: object) -> bool:
+        return isinstance(outro, Coluna) and self.alias == outro.alias and self.nome == outro.nome
+
+    def __hash__(self) -> int:
+        return hash((self.alias, self.nome))
+
+# O operando direito de um predicado é uma coluna ou um literal (número ou string, como escrito no SQL)
+Operando = Union[Coluna, str]
+
+class Predicado:
+    """
+    Predicado de comparação `coluna OP operando`, já validado contra o esquema.
+    """
+    __slots__ = ('esquerda', 'operador', 'direita')
+
+    def __init__(self, esquerda: Coluna, operador: str, direita: Operando) -> None:
+        self.esquerda = esquerda
+        self.operador = operador
+        self.direita = direita
+
+    def colunas(self) -> tuple[Coluna, ...]:
+        """
+        Retorna as colunas referenciadas pelo predicado.
+        """
+        return tuple(operando for operando in (self.esquerda, self.direita) if isinstance(operando, Coluna))
+
+    def aliases(self) -> set[str]:
+        """
+        Retorna os aliases das tabelas referenciadas pelo predicado.
+        """
+        return {coluna.alias for coluna in self.colunas()}
+
+    def __str__(self) -> str:
+        return f"{self.esquerda} {self.operador} {self.direita}"
+
+    def __repr__(self) -> str:
+        return f"Predicado({str(self)!r})"
+
+class IndiceAliases:
+    """
+    Posições de bit dos aliases de uma consulta, de modo que conjuntos de aliases (por exemplo, as tabelas
+    de uma subárvore) podem ser representados por inteiros e comparados com `&` e `|`.
+
+    Cada árvore tem o seu próprio índice, compartilhado por todos os seus nós: o tamanho fica limitado aos aliases
+    da consulta, e bitsets de árvores diferentes não devem ser combinados. O índice só cresce (a posição de um alias
+    nunca muda), e o registro de um alias novo é protegido por uma trava, já que uma árvore em cache pode ser usada
+    por várias threads.
+    """
+    __slots__ = ('_indices', '_aliases', '_trava')
+
+    def __init__(self, aliases: Iterable[str] = ()) -> None:
+        self._indices: dict[str, int] = {}
+        self._aliases: list[str] = []
+        self._trava = threading.Lock()
+        self.mascara(aliases)
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def __repr__(self) -> str:
+        return f"IndiceAliases({self._aliases!r})"
+
+    def __getstate__(self) -> tuple[str, ...]:
+        # A trava não pode ser serializada (`pickle`/`copy`); só os aliases, na ordem dos bits, são guardados
+        return tuple(self._aliases)
+
+    def __setstate__(self, aliases: tuple[str, ...]) -> None:
+        self.__init__(aliases)
+
+    def mascara(self, aliases: Iterable[str]) -> int:
+        """
+        Converte um conjunto de aliases em um bitset (a posição de cada alias é atribuída na primeira vez em que ele aparece).
+        """
+        mascara = 0
+        for alias in aliases:
+            indice = self._indices.get(alias)
+            if indice is None:
+                with self._trava:
+                    indice = self._indices.get(alias)
+                    if indice is None:
+                        indice = len(self._aliases)
+                        self._aliases.append(alias)
+                        self._indices[alias] = indice
+            mascara |= 1 << indice
+        return mascara
+
+    def aliases(self, mascara: int) -> set[str]:
+        """
+        Converte um bitset de aliases (ver `mascara`) de volta em um conjunto de aliases.
+        """
+        aliases = set()
+        while mascara:
+            bit = mascara & -mascara
+            aliases.add(self._aliases[bit.bit_length() - 1])
+            mascara ^= bit
+        return aliases
+
+class NoAlgebra:
+    """
+    Base dos operadores da IR. A renderização textual é calculada uma única vez, no primeiro `str()`.
+    """
+    __slots__ = ('_texto',)
+
+    def __init__(self) -> None:
+        self._texto = None
+
+    def __str__(self) -> str:
+        if self._texto is None:
+            # Renderização com pilha explícita (sem recursão), para suportar IRs muito profundas
+            partes: list[str] = []
+            pilha: list[Union[str, NoAlgebra]] = [self]
+            while pilha:
+                item = pilha.pop()
+                if isinstance(item, str):
+                    partes.append(item)
+                elif item._texto is not None:
+                    partes.append(item._texto)
+                else:
+                    pilha.extend(reversed(item._partes()))
+            self._texto = ''.join(partes)
+        return self._texto
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({str(self)!r})"
+
+    def filhos(self) -> tuple[NoAlgebra, ...]:
+        """
+        Retorna as subexpressões do operador, da esquerda para a direita.
+        """
+        return ()
+
+    def _partes(self) -> tuple[Union[str, NoAlgebra], ...]:
+        """
+        Retorna a renderização do operador como uma sequência de trechos de texto e subexpressões.
+        """
+        raise NotImplementedError
+
+class Tabela(NoAlgebra):
+    """
+    Declaração de uma tabela base, renderizada como `tabela[alias]` (ou apenas `tabela`, sem alias).
+    """
+    __slots__ = ('nome', 'alias')
+
+    def __init__(self, nome: str, alias: Optional[str]) -> None:
+        super().__init__()
+        self.nome = nome
+        self.alias = alias
+
+    def _partes(self) -> tuple[str, ...]:
+        if self.alias is None:
+            return (self.nome,)
+        return (f"{self.nome}[{self.alias}]",)
+
+class Produto(NoAlgebra):
+    """
+    Produto cartesiano entre duas subexpressões, renderizado como `(esq ⨝ dir)`.
+    """
+    __slots__ = ('esquerda', 'direita')
+
+    def __init__(self, esquerda: NoAlgebra, direita: NoAlgebra) -> None:
+        super().__init__()
+        self.esquerda = esquerda
+        self.direita = direita
+
+    def filhos(self) -> tuple[NoAlgebra, ...]:
+        return (self.esquerda, self.direita)
+
+    def _partes(self) -> tuple[Union[str, NoAlgebra], ...]:
+        return ("(", self.esquerda, " ⨝ ", self.direita, ")")
+
+class Juncao(NoAlgebra):
+    """
+    Junção com condição entre duas subexpressões, renderizada como `(esq ⨝[condição] dir)`.
+    """
+    __slots__ = ('predicados', 'esquerda', 'direita')
+
+    def __init__(self, predicados: tuple[Predicado, ...], esquerda: NoAlgebra, direita: NoAlgebra) -> None:
+        super().__init__()
+        self.predicados = tuple(predicados)
+        self.esquerda = esquerda
+        self.direita = direita
+
+    def filhos(self) -> tuple[NoAlgebra, ...]:
+        return (self.esquerda, self.direita)
+
+    def _partes(self) -> tuple[Union[str, NoAlgebra], ...]:
+        return ("(", self.esquerda, f" ⨝[{' ∧ '.join(map(str, self.predicados))}] ", self.direita, ")")
+
+class Selecao(NoAlgebra):
+    """
+    Seleção com uma conjunção de predicados, renderizada como `𝛔[p1 ∧ p2 ∧ ...](filho)`.
+    """
+    __slots__ = ('predicados', 'filho')
+
+    def __init__(self, predicados: tuple[Predicado, ...], filho: NoAlgebra) -> None:
+        super().__init__()
+        self.predicados = tuple(predicados)
+        self.filho = filho
+
+    def filhos(self) -> tuple[NoAlgebra, ...]:
+        return (self.filho,)
+
+    def _partes(self) -> tuple[Union[str, NoAlgebra], ...]:
+        return (f"𝛔[{' ∧ '.join(map(str, self.predicados))}](", self.filho, ")")
+
+class Projecao(NoAlgebra):
+    """
+    Projeção de colunas, renderizada como `𝝿[c1, c2, ...](filho)`.
+    """
+    __slots__ = ('colunas', 'filho')
+
+    def __init__(self, colunas: tuple[Coluna, ...], filho: NoAlgebra) -> None:
+        super().__init__()
+        self.colunas = tuple(colunas)
+        self.filho = filho
+
+    def filhos(self) -> tuple[NoAlgebra, ...]:
+        return (self.filho,)
+
+    def _partes(self) -> tuple[Union[str, NoAlgebra], ...]:
+        return (f"𝝿[{', '.join(map(str, self.colunas))}](", self.filho, ")")
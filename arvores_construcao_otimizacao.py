@@ -7,14 +7,18 @@ consultas e ferramentas educacionais relacionadas a banco de dados.
 
 ## Principais Funcionalidades
 
-- Conversão de expressões de álgebra relacional em árvores binárias
+- Conversão de expressões de álgebra relacional em árvores binárias, a partir de strings ou diretamente da
+  representação intermediária produzida pelo parser (`algebra_relacional.py`)
 - Otimização de árvores através do reposicionamento de operações de seleção
 - Otimização de árvores através da introdução de projeções precoces
+- Reordenação das junções pelo custo estimado a partir das estatísticas do banco de dados
 - Geração de representações visuais das árvores usando Graphviz
+- Reaproveitamento de planos otimizados entre consultas que diferem apenas nos literais (`processar_consulta_com_modelo`)
 
 ## Classes Principais
 
-- `No`: Representa um nó na árvore de álgebra relacional
+- `No`: Representa um nó na árvore de álgebra relacional (com operação, predicados, alias e colunas já analisados)
+- `Operacao`: Enumeração das operações que um nó pode representar
 - `Arvore`: Representa uma árvore completa de álgebra relacional
 
 ## Operações Suportadas
@@ -29,12 +33,24 @@ consultas e ferramentas educacionais relacionadas a banco de dados.
 
 1. **Otimização de Seleções**: Move operações de seleção para mais próximo das tabelas
    base sempre que possível, reduzindo o volume de dados a serem processados nas operações
-   subsequentes.
+   subsequentes. As seleções empilhadas sobre uma mesma entrada são ordenadas pela
+   seletividade estimada e pelo custo de avaliação (as mais seletivas e baratas primeiro).
+   Igualdades entre colunas dos dois lados de um produto viram condições da junção (`⨝[cond]`),
+   com as chaves de equi-junção identificadas (`No.chaves_equijuncao`).
 
 2. **Otimização de Projeções**: Introduz projeções logo após as operações de tabela base
    para reduzir o número de atributos transportados entre as operações, diminuindo o custo
    de processamento e transferência de dados.
 
+3. **Reordenação de Junções**: Escolhe a ordem (em profundidade à esquerda ou ramificada) das
+   junções de menor custo estimado, a partir do número de linhas e de valores distintos das
+   tabelas no banco de dados (`estatisticas.py`).
+
+4. **Planejamento Físico**: Escolhe o caminho de acesso de cada tabela (varredura completa ou
+   busca por índice, para seleções de igualdade ou intervalo sobre colunas indexadas) e o
+   algoritmo de cada junção (hash, laços aninhados ou laços aninhados com busca por índice no
+   lado interno), a partir dos índices do banco. As escolhas ficam nos nós (`No.acesso`).
+
 ## Exemplo de Uso
 
 ```python
@@ -45,8 +61,10 @@ algebra = "𝝿[cliente.nome, pedido.datapedido](𝛔[cliente.idcliente = pedido
 arvore = converter_algebra_em_arvore(algebra)
 
 # Otimizar a árvore
-arvore_otimizada = otimizar_selects(arvore)
+arvore_otimizada = reordenar_juncoes(arvore)
+arvore_otimizada = otimizar_selects(arvore_otimizada)
 arvore_otimizada = otimizar_projecoes(arvore_otimizada)
+arvore_otimizada = planejar_acesso(arvore_otimizada)
 
 # Gerar visualização
 desenhar_arvore(arvore, "arvore_original")
@@ -54,47 +72,301 @@ desenhar_arvore(arvore_otimizada, "arvore_otimizada")
 """
 
 from __future__ import annotations
-from typing import Optional, Literal
+from typing import Callable, Optional, Union, Iterable, Iterator
+from enum import Enum
 from graphviz import Digraph
-from copy import deepcopy
 from pathlib import Path
+import math
+import re
+from parser import TranslationCache, parameterize_sql_query, bind_parameters
+from algebra_relacional import NoAlgebra, Coluna, Predicado, Tabela, Produto, Juncao, Selecao, Projecao, IndiceAliases
+from estatisticas import CHAVE_PRIMARIA, EstatisticasBanco, obter_estatisticas, estimar_seletividade
+from metricas import etapa, medir_etapa
 
 ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ###
 ## DECLARAÇÃO DAS CLASSES QUE COMPÕE A ÁRVORE ##
 ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ###
 
+class Operacao(str, Enum):
+    """
+    Tipo de operação representada por um nó. Por herdar de `str`, compara igual às strings usadas
+    anteriormente (por exemplo, `Operacao.SELECT == "SELECT"`).
+    """
+    PROJECT = "PROJECT"
+    SELECT = "SELECT"
+    JOIN = "JOIN"
+    PRODUCT = "PRODUCT"
+    TABLE = "TABLE"
+    
+    def __str__(self) -> str:
+        return self.value
+
+# Um predicado de comparação no formato compacto dos nós: coluna, operador e operando (ex.: "p.idpedido>10")
+_PREDICADO_REGEX = re.compile(r"\s*([^\s<>=]+)\s*(<>|<=|>=|=|<|>)\s*(.+?)\s*")
+_COLUNA_REGEX = re.compile(r"([^\W\d]\w*)\.(\w+)")
+# Separador das partes de uma condição: ∧ fora de aspas simples (seguido de um número par de aspas), já que
+# um literal pode conter o próprio símbolo
+_SEPARADOR_CONDICAO_REGEX = re.compile(r"∧(?=(?:[^']*'[^']*')*[^']*$)")
+
+def _analisar_operando(texto: str) -> Union[Coluna, str]:
+    """
+    Converte o texto de um operando em uma Coluna (`alias.coluna`) ou o mantém como literal.
+    """
+    correspondencia = _COLUNA_REGEX.fullmatch(texto)
+    if correspondencia:
+        return Coluna(correspondencia.group(1), correspondencia.group(2))
+    return texto
+
+def analisar_condicao(condicao: str) -> tuple[Predicado, ...]:
+    """
+    Converte o texto de uma condição (um ou mais predicados ligados por ∧) em Predicados.
+    
+    Args:
+        condicao (str): A condição, como aparece dentro dos colchetes de uma seleção ou junção.
+        
+    Returns:
+        tuple[Predicado, ...]: Os predicados da condição.
+        
+    Raises:
+        ValueError: Se alguma parte da condição não estiver no formato `coluna OP operando`.
+    """
+    predicados = []
+    for parte in _SEPARADOR_CONDICAO_REGEX.split(condicao):
+        parte = remover_parenteses_externos(parte)
+        correspondencia = _PREDICADO_REGEX.fullmatch(parte)
+        if not correspondencia:
+            raise ValueError(f"Condição inválida: '{parte}'. Use o formato coluna OP operando.")
+        esquerda, operador, direita = correspondencia.groups()
+        predicados.append(Predicado(_analisar_operando(esquerda), operador, _analisar_operando(direita)))
+    return tuple(predicados)
+
+def agrupar_colunas(colunas: Iterable[Coluna]) -> dict[str, frozenset[str]]:
+    """
+    Agrupa colunas por alias de tabela.
+    
+    Args:
+        colunas (Iterable[Coluna]): As colunas a serem agrupadas.
+        
+    Returns:
+        dict[str, frozenset[str]]: Dicionário com os aliases como chaves e os nomes das colunas como valores.
+    """
+    agrupadas: dict[str, set[str]] = {}
+    for coluna in colunas:
+        agrupadas.setdefault(coluna.alias, set()).add(coluna.nome)
+    return {alias: frozenset(nomes) for alias, nomes in agrupadas.items()}
+
+class MetodoAcesso(str, Enum):
+    VARREDURA = "varredura completa"
+    INDICE = "busca por índice"
+    JUNCAO_HASH = "junção por hash"
+    LACOS = "laços aninhados"
+    LACOS_INDICE = "laços aninhados com índice"
+    SQLITE = "delegado ao SQLite"
+
+class CaminhoAcesso:
+    """
+    Caminho de acesso escolhido pelo planejamento físico (`planejar_acesso`) para um nó: como uma tabela é lida
+    ou como uma junção é executada, com o custo estimado (em linhas lidas).
+    
+    Nas tabelas lidas por índice, `predicado` é a condição usada na busca (`coluna OP literal`, ou `coluna = coluna
+    do lado externo` quando a tabela é o lado interno de laços aninhados com índice). Nas junções por laços aninhados
+    com índice, `predicado` é a chave da busca (coluna interna = coluna externa) e `interno` indica o lado interno.
+    """
+    __slots__ = ("metodo", "indice", "predicado", "interno", "custo")
+    
+    def __init__(
+        self: CaminhoAcesso,
+        metodo: MetodoAcesso,
+        custo: float,
+        indice: Optional[str] = None,
+        predicado: Optional[Predicado] = None,
+        interno: Optional[str] = None,
+    ) -> None:
+        self.metodo = metodo
+        self.custo = custo
+        self.indice = indice
+        self.predicado = predicado
+        self.interno = interno
+    
+    def com_predicado(self: CaminhoAcesso, predicado: Predicado) -> CaminhoAcesso:
+        """
+        Retorna uma cópia do caminho com outro predicado (por exemplo, com os parâmetros já vinculados).
+        """
+        return CaminhoAcesso(self.metodo, self.custo, self.indice, predicado, self.interno)
+    
+    def __str__(self: CaminhoAcesso) -> str:
+        texto = self.metodo.value
+        if self.indice:
+            texto += f" {self.indice}"
+        if self.predicado is not None:
+            texto += f" ({self.predicado})"
+        if self.interno:
+            texto += f" · interno: {'direita' if self.interno == 'dir' else 'esquerda'}"
+        return f"{texto} · custo ≈ {self.custo:.0f}"
+    
+    def __repr__(self: CaminhoAcesso) -> str:
+        return f"CaminhoAcesso({str(self)!r})"
+
 class No:
+    __slots__ = ("valor", "filho_esq", "filho_dir", "operacao", "predicados", "alias", "colunas", "tabelas", "mascara_tabelas", "mascara_subarvore", "indice_aliases", "anotacoes", "acesso")
+    
     def __init__(
         self: No, 
         conteudo: str,
-        nivel: int, 
-        pai: Optional[No], 
-        filho_esq: Optional[No], 
-        filho_dir: Optional[No]
+        filho_esq: Optional[No] = None, 
+        filho_dir: Optional[No] = None,
+        predicados: Optional[tuple[Predicado, ...]] = None,
+        atributos: Optional[tuple[Coluna, ...]] = None,
+        anotacoes: Optional[str] = None,
+        acesso: Optional[CaminhoAcesso] = None,
+        indice_aliases: Optional[IndiceAliases] = None,
     ) -> None:
         """
-        Inicializa um nó da árvore binária.
+        Inicializa um nó imutável da árvore binária.
+        
+        O conteúdo é analisado uma única vez, aqui: o tipo da operação, os predicados (seleções e junções),
+        o alias (tabelas) e as colunas referenciadas ficam guardados em campos, de modo que as otimizações
+        não precisam reinterpretar o texto do nó.
+        
+        Cada nó também guarda, como bitsets, os aliases referenciados por ele (`mascara_tabelas`) e os aliases de
+        todas as tabelas da sua subárvore (`mascara_subarvore`). Esse último é calculado de baixo para cima a partir
+        dos filhos, na construção e em `com_filhos`. As posições dos bits vêm do índice de aliases da árvore
+        (`indice_aliases`), compartilhado por todos os seus nós: um nó com filhos usa o índice deles, e uma subárvore
+        direita vinda de outra árvore é recriada com o índice da esquerda (ver `_unificar_indices`).
+        
+        Os nós não guardam o pai nem o nível: como não mudam depois de criados, uma mesma subárvore pode ser
+        compartilhada entre várias árvores (por exemplo, entre a árvore original e a otimizada). O pai e o
+        nível de um nó são obtidos pela árvore a que ele pertence (`Arvore.pai` e `Arvore.nivel`).
         
         Args:
             conteudo (str): O conteúdo do nó.
-            nivel (int): O nível do nó na árvore.
-            pai (Optional[No]): O nó pai do nó atual. Com exceção da raiz, todos os nós devem ter um nó pai.
             filho_esq (Optional[No]): O filho esquerdo do nó atual. Com exceção dos nós de declaração de tabela, todos os nós devem ter filhos esquerdos.
             filho_dir (Optional[No]): O filho direito do nó atual. Somente os nós de join e de produto devem ter filhos direitos.
+            predicados (Optional[tuple[Predicado, ...]]): Os predicados de uma seleção ou junção, se já conhecidos (evita analisar o conteúdo).
+            atributos (Optional[tuple[Coluna, ...]]): As colunas de uma projeção, se já conhecidas (evita analisar o conteúdo).
+            anotacoes (Optional[str]): Informações exibidas abaixo do conteúdo no desenho da árvore (por exemplo, as
+                estimativas usadas pelo otimizador). Não fazem parte do conteúdo e não são analisadas.
+            acesso (Optional[CaminhoAcesso]): O caminho de acesso escolhido pelo planejamento físico (`planejar_acesso`),
+                também exibido no desenho da árvore.
+            indice_aliases (Optional[IndiceAliases]): O índice de aliases da árvore, usado pelos nós sem filhos (tabelas).
+                Se omitido, um nó sem filhos começa um índice novo; nós com filhos sempre usam o índice dos filhos.
         """
+        operacao = No._classificar(conteudo)
+        alias = None
+        predicados_no: tuple[Predicado, ...] = ()
         
-        if not (pai is None or nivel == pai.nivel + 1):
-            raise ValueError(f"O nível do nó atual deve ser igual ao nível do pai + 1. Nível do pai: {pai.nivel}, nível do nó atual: {nivel}.")
+        if operacao is Operacao.TABLE:
+            alias = conteudo.split("[")[1].split("]")[0] if "[" in conteudo and "]" in conteudo else conteudo
+            colunas = {}
+        elif operacao is Operacao.PROJECT:
+            if atributos is None:
+                atributos = [_analisar_operando(coluna.strip()) for coluna in conteudo[2:-1].split(",")]
+            colunas = agrupar_colunas(a for a in atributos if isinstance(a, Coluna))
+        elif operacao is Operacao.PRODUCT:
+            colunas = {}
+        else:
+            predicados_no = tuple(predicados) if predicados is not None else analisar_condicao(conteudo[2:-1])
+            colunas = agrupar_colunas(c for predicado in predicados_no for c in predicado.colunas())
         
-        self.valor = conteudo
-        self.nivel = nivel
-        self.pai = pai
-        self.filho_esq = filho_esq
-        self.filho_dir = filho_dir
+        indice, filho_esq, filho_dir = No._unificar_indices(filho_esq, filho_dir, indice_aliases)
+        definir = object.__setattr__
+        definir(self, "valor", conteudo)
+        definir(self, "filho_esq", filho_esq)
+        definir(self, "filho_dir", filho_dir)
+        definir(self, "operacao", operacao)
+        definir(self, "predicados", predicados_no)
+        definir(self, "alias", alias)
+        definir(self, "colunas", colunas)
+        definir(self, "tabelas", frozenset(colunas))
+        definir(self, "indice_aliases", indice)
+        definir(self, "mascara_tabelas", indice.mascara(self.tabelas))
+        definir(self, "mascara_subarvore", No._mascara_filhos(filho_esq, filho_dir) | indice.mascara((alias,) if alias else ()))
+        definir(self, "anotacoes", anotacoes)
+        definir(self, "acesso", acesso)
+    
+    def __setattr__(self: No, nome: str, valor: object) -> None:
+        raise AttributeError(f"Nós da árvore são imutáveis; use `com_filhos` para criar uma versão alterada. Atributo: {nome}.")
+    
+    def __setstate__(self: No, estado: tuple) -> None:
+        # Necessário para `pickle`/`copy`, que restauram os atributos de classes com __slots__ via setattr
+        for nome, valor in estado[1].items():
+            object.__setattr__(self, nome, valor)
+    
+    def com_filhos(self: No, filho_esq: Optional[No], filho_dir: Optional[No]) -> No:
+        """
+        Retorna um nó com o mesmo conteúdo e os filhos informados, sem reanalisar o conteúdo.
+        Se os filhos forem os mesmos, retorna o próprio nó (compartilhamento estrutural).
         
-    def get_operacao(self: No) -> Literal["PROJECT","SELECT","JOIN","PRODUCT","TABLE"]:
+        Args:
+            filho_esq (Optional[No]): O novo filho esquerdo.
+            filho_dir (Optional[No]): O novo filho direito.
+            
+        Returns:
+            No: O nó com os filhos informados.
         """
-        Retorna qual operação o nó representa.
+        if filho_esq is self.filho_esq and filho_dir is self.filho_dir:
+            return self
+        indice, filho_esq, filho_dir = No._unificar_indices(filho_esq, filho_dir, self.indice_aliases)
+        novo = No.__new__(No)
+        for nome in No.__slots__:
+            object.__setattr__(novo, nome, getattr(self, nome))
+        object.__setattr__(novo, "filho_esq", filho_esq)
+        object.__setattr__(novo, "filho_dir", filho_dir)
+        if indice is not self.indice_aliases:
+            object.__setattr__(novo, "indice_aliases", indice)
+            object.__setattr__(novo, "mascara_tabelas", indice.mascara(self.tabelas))
+        object.__setattr__(novo, "mascara_subarvore", No._mascara_filhos(filho_esq, filho_dir) | indice.mascara((self.alias,) if self.alias else ()))
+        return novo
+    
+    def com_acesso(self: No, acesso: Optional[CaminhoAcesso]) -> No:
+        """
+        Retorna um nó com o mesmo conteúdo e os mesmos filhos, com o caminho de acesso informado.
+        
+        Args:
+            acesso (Optional[CaminhoAcesso]): O novo caminho de acesso.
+            
+        Returns:
+            No: O nó com o caminho de acesso informado.
+        """
+        novo = No.__new__(No)
+        for nome in No.__slots__:
+            object.__setattr__(novo, nome, getattr(self, nome))
+        object.__setattr__(novo, "acesso", acesso)
+        return novo
+    
+    @staticmethod
+    def _unificar_indices(filho_esq: Optional[No], filho_dir: Optional[No], indice: Optional[IndiceAliases]) -> tuple[IndiceAliases, Optional[No], Optional[No]]:
+        """
+        Escolhe o índice de aliases de um nó: o do filho esquerdo, se houver, ou o informado (ou um novo, para tabelas).
+        Se o filho direito vier de outra árvore (com outro índice), a sua subárvore é recriada com o índice escolhido,
+        para que os bitsets dos dois lados sejam comparáveis.
+        """
+        if filho_esq is not None:
+            indice = filho_esq.indice_aliases
+        elif filho_dir is not None:
+            indice = filho_dir.indice_aliases
+        elif indice is None:
+            indice = IndiceAliases()
+        if filho_dir is not None and filho_dir.indice_aliases is not indice:
+            filho_dir = _reindexar_subarvore(filho_dir, indice)
+        return indice, filho_esq, filho_dir
+    
+    @staticmethod
+    def _mascara_filhos(filho_esq: Optional[No], filho_dir: Optional[No]) -> int:
+        """
+        Retorna a união dos bitsets de aliases das subárvores dos filhos.
+        """
+        mascara = 0
+        if filho_esq is not None:
+            mascara |= filho_esq.mascara_subarvore
+        if filho_dir is not None:
+            mascara |= filho_dir.mascara_subarvore
+        return mascara
+    
+    @staticmethod
+    def _classificar(conteudo: str) -> Operacao:
+        """
+        Identifica a operação representada por um conteúdo.
         
         Possíveis operações:
         - PROJECT: Representada por '𝝿'
@@ -103,210 +375,532 @@ class No:
         - PRODUCT: Um produto cartesiano, representada por '⨝' sem colchetes.
         - TABLE: A declaração de uma tabela.
         """
-        if sum(['𝝿' in self.valor, '𝛔' in self.valor, '⨝' in self.valor]) > 1:
-            raise ValueError(f"Um nó não pode representar mais de uma operação ao mesmo tempo. Conteúdo do nó: {self.valor}.")
+        if sum(['𝝿' in conteudo, '𝛔' in conteudo, '⨝' in conteudo]) > 1:
+            raise ValueError(f"Um nó não pode representar mais de uma operação ao mesmo tempo. Conteúdo do nó: {conteudo}.")
 
-        if '𝝿' in self.valor:
-            return "PROJECT"
+        if '𝝿' in conteudo:
+            return Operacao.PROJECT
         
-        if '𝛔' in self.valor:
-            return "SELECT"
+        if '𝛔' in conteudo:
+            return Operacao.SELECT
         
-        if '⨝' in self.valor:
+        if '⨝' in conteudo:
             
-            if '[' in self.valor and ']' in self.valor:
-                return "JOIN"
+            if '[' in conteudo and ']' in conteudo:
+                return Operacao.JOIN
             
-            return "PRODUCT"
+            return Operacao.PRODUCT
+        
+        return Operacao.TABLE
         
-        return "TABLE"
+    def chaves_equijuncao(self: No) -> tuple[tuple[Coluna, Coluna], ...]:
+        """
+        Retorna as chaves de equi-junção do nó: os pares (coluna do lado esquerdo, coluna do lado direito) das
+        condições de igualdade entre colunas dos dois lados da junção. São elas que permitem executar a junção
+        por hash ou por intercalação (merge), em vez de filtrar o produto cartesiano.
+        
+        Returns:
+            tuple[tuple[Coluna, Coluna], ...]: As chaves, na ordem das condições (vazio se o nó não for uma junção).
+        """
+        if self.operacao is not Operacao.JOIN:
+            return ()
+        return tuple(
+            chave for predicado in self.predicados
+            if (chave := _chave_equijuncao(predicado, self.filho_esq.mascara_subarvore, self.filho_dir.mascara_subarvore, self.indice_aliases))
+        )
+        
+    def get_operacao(self: No) -> Operacao:
+        """
+        Retorna qual operação o nó representa (calculada na construção do nó).
+        """
+        return self.operacao
         
     def __str__(self):
         return self.valor
     
     def __repr__(self):
-        return f"No(valor={self.valor}, nivel={self.nivel}, pai={self.pai.valor if self.pai else None})"
+        return f"No(valor={self.valor}, operacao={self.operacao})"
         
+def _chave_equijuncao(predicado: Predicado, mascara_esq: int, mascara_dir: int, indice: IndiceAliases) -> Optional[tuple[Coluna, Coluna]]:
+    """
+    Se o predicado for uma igualdade entre uma coluna de cada lado (dados os bitsets de aliases dos lados,
+    no índice de aliases da árvore), retorna o par (coluna do lado esquerdo, coluna do lado direito).
+    """
+    if predicado.operador != "=" or not isinstance(predicado.esquerda, Coluna) or not isinstance(predicado.direita, Coluna):
+        return None
+    mascara_a = indice.mascara((predicado.esquerda.alias,))
+    mascara_b = indice.mascara((predicado.direita.alias,))
+    if not mascara_a & ~mascara_esq and not mascara_b & ~mascara_dir:
+        return predicado.esquerda, predicado.direita
+    if not mascara_a & ~mascara_dir and not mascara_b & ~mascara_esq:
+        return predicado.direita, predicado.esquerda
+    return None
+
 class Arvore:
-    def __init__(self: Arvore) -> None:
-        self.raiz = None
+    def __init__(self: Arvore, raiz: Optional[No] = None) -> None:
+        """
+        Inicializa uma árvore a partir de sua raiz.
+        
+        O pai e o nível de cada nó são derivados da estrutura da árvore, calculados em uma única passada
+        na primeira consulta a `pai` ou `nivel` (os nós são imutáveis e podem ser compartilhados entre árvores).
+        
+        Args:
+            raiz (Optional[No]): A raiz da árvore. Padrão é None (árvore vazia).
+        """
+        self._raiz = raiz
+        self._pais: Optional[dict[int, Optional[No]]] = None
+        self._niveis: Optional[dict[int, int]] = None
+        if VALIDAR_ARVORES:
+            validar_arvore(self)
+        
+    @property
+    def raiz(self: Arvore) -> Optional[No]:
+        return self._raiz
+    
+    @raiz.setter
+    def raiz(self: Arvore, raiz: Optional[No]) -> None:
+        self._raiz = raiz
+        self._pais = self._niveis = None
+        if VALIDAR_ARVORES:
+            validar_arvore(self)
+    
+    @property
+    def indice_aliases(self: Arvore) -> Optional[IndiceAliases]:
+        """
+        O índice de aliases compartilhado pelos nós da árvore (None se a árvore estiver vazia).
+        """
+        return self._raiz.indice_aliases if self._raiz is not None else None
+        
+    def _indexar(self: Arvore) -> None:
+        """
+        Percorre a árvore uma vez, registrando o pai e o nível de cada nó.
+        """
+        self._pais = {}
+        self._niveis = {}
+        if self._raiz is None:
+            return
+        pilha = [(self._raiz, None, 0)]
+        while pilha:
+            no, pai, nivel = pilha.pop()
+            self._pais[id(no)] = pai
+            self._niveis[id(no)] = nivel
+            for filho in (no.filho_dir, no.filho_esq):
+                if filho is not None:
+                    pilha.append((filho, no, nivel + 1))
+        
+    def pai(self: Arvore, no: No) -> Optional[No]:
+        """
+        Retorna o pai de um nó nesta árvore (None para a raiz).
+        """
+        if self._pais is None:
+            self._indexar()
+        return self._pais[id(no)]
+    
+    def nivel(self: Arvore, no: No) -> int:
+        """
+        Retorna o nível de um nó nesta árvore (0 para a raiz).
+        """
+        if self._niveis is None:
+            self._indexar()
+        return self._niveis[id(no)]
+    
+    def nos(self: Arvore) -> Iterator[No]:
+        """
+        Percorre os nós da árvore em pré-ordem (raiz, subárvore esquerda, subárvore direita).
+        """
+        return percorrer_pre_ordem(self._raiz)
+
+## ## ## ## ## ## ## ## ## ## ## ## ###
+## VALIDAÇÃO (APENAS PARA DEPURAÇÃO) ##
+## ## ## ## ## ## ## ## ## ## ## ## ###
+
+# Se True, toda árvore criada (inclusive as produzidas por cada passo de otimização) é validada por `validar_arvore`.
+# Desligado por padrão: a validação percorre a árvore inteira e serve apenas para depurar as otimizações.
+VALIDAR_ARVORES: bool = False
+
+def validar_arvore(arvore: Arvore) -> None:
+    """
+    Verifica os invariantes estruturais de uma árvore, em uma única passada sem recursão:
+    - nenhum nó aparece mais de uma vez na árvore (o pai e o nível de cada nó são únicos);
+    - nós de tabela não têm filhos; projeções e seleções têm apenas o filho esquerdo;
+      junções e produtos têm os dois filhos;
+    - todos os nós usam o índice de aliases da raiz;
+    - o bitset de tabelas de cada nó (`mascara_subarvore`) corresponde ao de seus filhos.
+    
+    Args:
+        arvore (Arvore): A árvore a ser validada.
+        
+    Raises:
+        ValueError: Se algum invariante for violado.
+    """
+    vistos: set[int] = set()
+    for no in percorrer_pre_ordem(arvore.raiz):
+        if id(no) in vistos:
+            raise ValueError(f"O nó {no!r} aparece mais de uma vez na árvore.")
+        vistos.add(id(no))
+        
+        if no.operacao is Operacao.TABLE:
+            filhos_esperados = (False, False)
+        elif no.operacao in (Operacao.JOIN, Operacao.PRODUCT):
+            filhos_esperados = (True, True)
+        else:
+            filhos_esperados = (True, False)
+        if (no.filho_esq is not None, no.filho_dir is not None) != filhos_esperados:
+            raise ValueError(f"O nó {no!r} tem filhos incompatíveis com a operação {no.operacao}.")
+        
+        if no.indice_aliases is not arvore.raiz.indice_aliases:
+            raise ValueError(f"O nó {no!r} usa um índice de aliases diferente do da raiz.")
+        mascara = No._mascara_filhos(no.filho_esq, no.filho_dir) | no.indice_aliases.mascara((no.alias,) if no.alias else ())
+        if no.mascara_subarvore != mascara:
+            raise ValueError(f"O conjunto de tabelas do nó {no!r} não corresponde ao de seus filhos.")
+
+## ## ## ## ## ## ## ## ## ## ## ## ##
+## PERCURSOS SEM RECURSÃO NA ÁRVORE ##
+## ## ## ## ## ## ## ## ## ## ## ## ##
+
+# Todos os passes sobre a árvore usam pilhas explícitas, de modo que a profundidade da árvore (por exemplo,
+# uma cadeia com milhares de seleções ou de junções) não é limitada pelo limite de recursão do Python.
+
+def percorrer_pre_ordem(raiz: Optional[No]) -> Iterator[No]:
+    """
+    Percorre uma (sub)árvore em pré-ordem (nó, subárvore esquerda, subárvore direita), sem recursão.
+    
+    Args:
+        raiz (Optional[No]): A raiz da subárvore.
+        
+    Yields:
+        No: Os nós da subárvore.
+    """
+    pilha = [raiz] if raiz is not None else []
+    while pilha:
+        no = pilha.pop()
+        yield no
+        if no.filho_dir is not None:
+            pilha.append(no.filho_dir)
+        if no.filho_esq is not None:
+            pilha.append(no.filho_esq)
+
+def transformar_arvore(raiz: Optional[No], funcao: Callable[[No], Optional[No]]) -> Optional[No]:
+    """
+    Reescreve uma (sub)árvore de baixo para cima, sem recursão.
+    
+    Os nós são visitados em pós-ordem (subárvore esquerda, subárvore direita, nó). Cada nó recebe os filhos
+    já reescritos (via `com_filhos`, que o reaproveita se os filhos não mudaram) e é passado a `funcao`,
+    cujo retorno o substitui na árvore resultante.
+    
+    Args:
+        raiz (Optional[No]): A raiz da subárvore.
+        funcao (Callable[[No], Optional[No]]): A reescrita aplicada a cada nó.
+        
+    Returns:
+        Optional[No]: A raiz da subárvore reescrita.
+    """
+    if raiz is None:
+        return None
+    
+    # Resultados por id do nó original; os nós originais continuam vivos durante todo o percurso
+    resultados: dict[int, Optional[No]] = {}
+    pilha: list[tuple[No, bool]] = [(raiz, False)]
+    while pilha:
+        no, filhos_prontos = pilha.pop()
+        if filhos_prontos:
+            filho_esq = resultados[id(no.filho_esq)] if no.filho_esq is not None else None
+            filho_dir = resultados[id(no.filho_dir)] if no.filho_dir is not None else None
+            resultados[id(no)] = funcao(no.com_filhos(filho_esq, filho_dir))
+        elif id(no) not in resultados:
+            pilha.append((no, True))
+            if no.filho_dir is not None:
+                pilha.append((no.filho_dir, False))
+            if no.filho_esq is not None:
+                pilha.append((no.filho_esq, False))
+    return resultados[id(raiz)]
+
+def _reindexar_subarvore(raiz: No, indice: IndiceAliases) -> No:
+    """
+    Recria uma subárvore vinda de outra árvore com o índice de aliases informado, recalculando os bitsets
+    de cada nó (em pós-ordem, sem recursão). Usado apenas quando nós de árvores diferentes são combinados.
+    """
+    novos: dict[int, No] = {}
+    pilha: list[tuple[No, bool]] = [(raiz, False)]
+    while pilha:
+        no, filhos_prontos = pilha.pop()
+        if filhos_prontos:
+            novo = No.__new__(No)
+            for nome in No.__slots__:
+                object.__setattr__(novo, nome, getattr(no, nome))
+            filho_esq = novos[id(no.filho_esq)] if no.filho_esq is not None else None
+            filho_dir = novos[id(no.filho_dir)] if no.filho_dir is not None else None
+            object.__setattr__(novo, "filho_esq", filho_esq)
+            object.__setattr__(novo, "filho_dir", filho_dir)
+            object.__setattr__(novo, "indice_aliases", indice)
+            object.__setattr__(novo, "mascara_tabelas", indice.mascara(no.tabelas))
+            object.__setattr__(novo, "mascara_subarvore", No._mascara_filhos(filho_esq, filho_dir) | indice.mascara((no.alias,) if no.alias else ()))
+            novos[id(no)] = novo
+        elif id(no) not in novos:
+            pilha.append((no, True))
+            if no.filho_dir is not None:
+                pilha.append((no.filho_dir, False))
+            if no.filho_esq is not None:
+                pilha.append((no.filho_esq, False))
+    return novos[id(raiz)]
         
 ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ####
 ## PROCESSAMENTO DE UMA ÁLGEBRA RELACIONAL PARA UMA ÁRVORE BINÁRIA DE CONSULTAS ##
 ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ####
         
-def remover_espacamentos_e_quebras_de_linhas(
-    expressao: str,
-) -> str:
+# Tokens da álgebra relacional. Colchetes são lidos como um único token (respeitando aspas), de modo que
+# os símbolos e parênteses dentro de condições e listas de colunas não interferem na estrutura.
+_TOKEN_ALGEBRA_REGEX = re.compile(r"""
+    (?P<espaco>\s+)
+  | (?P<projecao>𝝿)
+  | (?P<selecao>𝛔)
+  | (?P<juncao>⨝)
+  | (?P<abre>\()
+  | (?P<fecha>\))
+  | (?P<colchetes>\[(?:'[^']*'|"[^"]*"|[^\]'"])*\])
+  | (?P<nome>[^\s()\[\]⨝𝝿𝛔]+)
+  | (?P<invalido>.)
+""", re.VERBOSE)
+
+def tokenizar_algebra(expr: str) -> list[tuple[str, str, int]]:
     """
-    Remove espaços e quebras de linha de uma expressão algébrica.
+    Quebra uma expressão de álgebra relacional em tokens, em uma única passada linear.
     
     Args:
-        expressao (str): A expressão algébrica a ser limpa.
+        expr (str): A expressão algébrica.
         
     Returns:
-        str: A expressão limpa.
+        list[tuple[str, str, int]]: Tokens no formato (tipo, texto, posição), terminados por um token 'fim'.
+        
+    Raises:
+        ValueError: Se a expressão contiver colchetes não fechados.
     """
-    return expressao.replace(" ", "").replace("\n", "").replace("\t", "")
+    tokens = []
+    pos = 0
+    tamanho = len(expr)
+    while pos < tamanho:
+        correspondencia = _TOKEN_ALGEBRA_REGEX.match(expr, pos)
+        tipo = correspondencia.lastgroup
+        if tipo == "invalido":
+            raise ValueError(f"Caractere inesperado '{correspondencia.group()}' na posição {pos} da expressão algébrica.")
+        if tipo != "espaco":
+            tokens.append((tipo, correspondencia.group(), pos))
+        pos = correspondencia.end()
+    tokens.append(("fim", "", tamanho))
+    return tokens
 
-def encontrar_divisao_join(expr: str) -> tuple[str, str]:
+class _ParserAlgebra:
     """
-    Encontra o ponto correto para dividir uma expressão de join.
+    Parser para expressões de álgebra relacional, operando sobre índices da lista de tokens (sem copiar trechos
+    da expressão). Produz a representação intermediária (`algebra_relacional.py`).
+    
+    Gramática:
+        expressao := primario ('⨝' [COLCHETES] primario)*          (associativa à esquerda)
+        primario  := '𝝿' COLCHETES primario
+                   | '𝛔' COLCHETES primario
+                   | '⨝' [COLCHETES] primario primario             (forma prefixada)
+                   | '(' expressao ')'
+                   | NOME [COLCHETES]                              (tabela[alias])
+    
+    A gramática é reconhecida com uma pilha explícita de continuações, em vez de descida recursiva, para que o
+    aninhamento da expressão (parênteses, cadeias de seleções) não seja limitado pelo limite de recursão do Python.
+    Cada continuação indica o que fazer quando o próximo `primario` terminar de ser lido:
+        ("projecao", colunas) / ("selecao", predicados): envolver o resultado no operador;
+        ("prefixo", condicao, esquerda): junção prefixada, à espera do operando esquerdo (None) ou do direito;
+        ("infixo", condicao, esquerda): junção infixa, à espera do operando direito;
+        ("parenteses",) / ("topo",): fim de um `primario` dentro de uma `expressao`.
+    """
+    def __init__(self: _ParserAlgebra, expr: str) -> None:
+        self.expr = expr
+        self.tokens = tokenizar_algebra(expr)
+        self.pos = 0
+        
+    def _consumir(self: _ParserAlgebra, tipo: str) -> str:
+        token_tipo, texto, posicao = self.tokens[self.pos]
+        if token_tipo != tipo:
+            encontrado = texto or "fim da expressão"
+            raise ValueError(f"Expressão algébrica inválida: esperado '{tipo}' na posição {posicao}, encontrado '{encontrado}'. Expressão: {self.expr}")
+        self.pos += 1
+        return texto
+    
+    def _opcional(self: _ParserAlgebra, tipo: str) -> Optional[str]:
+        if self.tokens[self.pos][0] == tipo:
+            self.pos += 1
+            return self.tokens[self.pos - 1][1]
+        return None
+        
+    def analisar(self: _ParserAlgebra) -> NoAlgebra:
+        continuacoes: list[tuple] = [("topo",)]
+        while True:
+            # Descida: lê os operadores prefixados até chegar a uma tabela
+            tipo = self.tokens[self.pos][0]
+            if tipo == "projecao":
+                self.pos += 1
+                colunas = self._consumir("colchetes")[1:-1]
+                continuacoes.append(("projecao", tuple(_analisar_operando(coluna.strip()) for coluna in colunas.split(","))))
+                continue
+            if tipo == "selecao":
+                self.pos += 1
+                continuacoes.append(("selecao", analisar_condicao(self._consumir("colchetes")[1:-1])))
+                continue
+            if tipo == "juncao":
+                self.pos += 1
+                continuacoes.append(("prefixo", self._opcional("colchetes"), None))
+                continue
+            if tipo == "abre":
+                self.pos += 1
+                continuacoes.append(("parenteses",))
+                continue
+            
+            nome = self._consumir("nome")
+            alias = self._opcional("colchetes")
+            resultado: NoAlgebra = Tabela(nome, alias[1:-1] if alias is not None else None)
+            
+            # Subida: aplica as continuações enquanto houver operadores completos
+            while True:
+                continuacao = continuacoes[-1]
+                tipo = continuacao[0]
+                if tipo == "projecao":
+                    continuacoes.pop()
+                    resultado = Projecao(continuacao[1], resultado)
+                elif tipo == "selecao":
+                    continuacoes.pop()
+                    resultado = Selecao(continuacao[1], resultado)
+                elif tipo == "prefixo" and continuacao[2] is None:
+                    # Operando esquerdo lido; falta o direito
+                    continuacoes[-1] = ("prefixo", continuacao[1], resultado)
+                    break
+                elif tipo == "prefixo":
+                    continuacoes.pop()
+                    resultado = self._juncao(continuacao[1], continuacao[2], resultado)
+                elif tipo == "infixo":
+                    continuacoes.pop()
+                    resultado = self._juncao(continuacao[1], continuacao[2], resultado)
+                elif self._opcional("juncao") is not None:
+                    # Dentro de uma expressão: junções infixas associam à esquerda
+                    continuacoes.append(("infixo", self._opcional("colchetes"), resultado))
+                    break
+                elif tipo == "parenteses":
+                    self._consumir("fecha")
+                    continuacoes.pop()
+                else:
+                    self._consumir("fim")
+                    return resultado
+    
+    @staticmethod
+    def _juncao(condicao: Optional[str], esquerda: NoAlgebra, direita: NoAlgebra) -> NoAlgebra:
+        if condicao is None:
+            return Produto(esquerda, direita)
+        return Juncao(analisar_condicao(condicao[1:-1]), esquerda, direita)
+
+def analisar_algebra(expr: str) -> NoAlgebra:
+    """
+    Converte uma expressão de álgebra relacional (string) na representação intermediária, em tempo linear.
     
     Args:
-        expr (str): A expressão de join a ser dividida.
+        expr (str): A expressão algébrica.
         
     Returns:
-        tuple[str, str]: As subexpressões esquerda e direita.
-    """
-    # Se não começar com parênteses, é uma expressão simples
-    if not expr.startswith("("):
-        partes = expr.split("⨝", 1)
-        if len(partes) < 2:
-            raise ValueError(f"Expressão de join inválida: {expr}")
-        return partes[0], partes[1]
-    
-    # Encontrar o ponto de divisão considerando parênteses aninhados
-    contador_parenteses = 0
-    for i, char in enumerate(expr):
-        if char == '(':
-            contador_parenteses += 1
-        elif char == ')':
-            contador_parenteses -= 1
-        
-        # Encontramos o fim do primeiro operando quando fechamos o conjunto de parênteses inicial
-        if contador_parenteses == 0 and i > 0:
-            # Verificar se o próximo caractere é um operador de join
-            if i + 1 < len(expr) and expr[i+1] == '⨝':
-                return expr[:i+1], expr[i+2:]
-    
-    raise ValueError(f"Não foi possível dividir a expressão de join: {expr}")
+        NoAlgebra: A raiz da representação intermediária.
+        
+    Raises:
+        ValueError: Se a expressão for inválida.
+    """
+    return _ParserAlgebra(expr).analisar()
 
+@medir_etapa()
 def converter_algebra_em_arvore(
-    algebra_relacional: str,
+    algebra_relacional: Union[str, NoAlgebra],
 ) -> Arvore:
     """
     Converte uma expressão algébrica em uma árvore binária.
     
     Args:
-        algebra_relacional (str): A expressão algébrica a ser convertida.
+        algebra_relacional (Union[str, NoAlgebra]): A expressão algébrica a ser convertida, como string ou
+            como a representação intermediária produzida pelo parser (`process_sql_query_ir`). Neste último
+            caso, a árvore é montada diretamente, sem reinterpretar texto.
         
     Returns:
         Arvore: A árvore binária resultante da conversão.
     """
-    algebra_relacional = remover_espacamentos_e_quebras_de_linhas(algebra_relacional)
-    
-    arvore = Arvore()
-    arvore.raiz = parse(algebra_relacional)
+    if isinstance(algebra_relacional, NoAlgebra):
+        return Arvore(converter_ir_em_no(algebra_relacional))
     
-    return arvore
+    return Arvore(parse(algebra_relacional))
 
-def parse(expr: str, nivel: int = 0, pai: Optional[No] = None) -> No:
+def formatar_predicado(predicado: Predicado) -> str:
     """
-    Analisa uma expressão algébrica e constrói uma árvore binária a partir dela.
+    Formata um predicado no mesmo formato compacto (sem espaços) usado pelos nós construídos a partir de strings.
+    Literais são mantidos como escritos.
     
     Args:
-        expr (str): A expressão algébrica a ser analisada.
-        nivel (int): O nível atual na árvore. Padrão é 0.
-        pai (Optional[No]): O nó pai do nó atual. Padrão é None.
-    """
-    # Remover parênteses externos desnecessários
-    expr = remover_parenteses_externos(expr)
-    
-    if expr.startswith("𝝿"):  # Projeção
-        fim_param = expr.find("]")  # Encontra o fim dos atributos
-        conteudo = expr[:fim_param + 1]
-        subexpr = expr[fim_param + 1:].strip("()")
-        no = No(conteudo, nivel, pai, None, None)
-        no.filho_esq = parse(subexpr, nivel + 1, no)
-        return no
-    
-    elif expr.startswith("𝛔"):  # Seleção
-        fim_param = expr.find("]")
-        conteudo = expr[:fim_param + 1]
-        subexpr = expr[fim_param + 1:].strip("()")
-        
-        # Verifica se há múltiplas condições separadas por "∧"
-        if "∧" in conteudo[1:-1]:  # Verifica se o AND está dentro dos colchetes da seleção
-            condicoes = conteudo[2:-1].split("∧")  # Remove os colchetes e separa as condições
-            no_atual = No(f"𝛔[{condicoes[-1].strip()}]", nivel, pai, None, None)
-            nivel_atual = nivel + 1
-            subexpr_atual = subexpr
-            
-            # Processa cada condição de baixo para cima (exceto a última que já foi processada)
-            for condicao in reversed(condicoes[:-1]):
-                subno = No(f"𝛔[{condicao.strip()}]", nivel_atual, no_atual, None, None)
-                subno.filho_esq = parse(subexpr_atual, nivel_atual + 1, subno)
-                no_atual.filho_esq = subno
-                no_atual = subno
-                nivel_atual += 1
-            
-            # O último nó (mais interno) recebe a subexpressão original
-            if no_atual.filho_esq is None:
-                no_atual.filho_esq = parse(subexpr, nivel_atual, no_atual)
-            
-            return no_atual.pai if no_atual.pai else no_atual
-        else:
-            no = No(conteudo, nivel, pai, None, None)
-            no.filho_esq = parse(subexpr, nivel + 1, no)
-            return no
-
-    elif "⨝" in expr:  # Join ou Produto
-        # Limpar parênteses externos
-        expr = remover_parenteses_externos(expr)
+        predicado (Predicado): O predicado a ser formatado.
         
-        # Verifica se é um JOIN com condição
-        if expr.startswith("⨝["):
-            fim_param = expr.find("]")
-            conteudo = expr[:fim_param + 1]
-            restante = expr[fim_param + 1:]
-            
-            # Procura pelo ponto de divisão entre os operandos
-            try:
-                # Identifica os dois operandos do join
-                if '⨝' in restante:
-                    # Caso complexo, precisa analisar parênteses para encontrar a divisão correta
-                    esq, dir = identificar_operandos_complexos(restante)
-                else:
-                    # Caso simples onde há apenas um operando após o join com condição
-                    esq, dir = restante, ""
-            except Exception as e:
-                raise ValueError(f"Erro ao identificar os operandos do join: {e}")
-        else:
-            # É um produto simples ou join sem condição explícita
-            conteudo = "⨝"
-            
-            try:
-                # Tenta dividir a expressão nas duas subexpressões do produto/join
-                if expr.count("⨝") == 1:
-                    # Caso simples: único operador de join
-                    partes = expr.split("⨝", 1)
-                    esq, dir = partes[0], partes[1]
-                else:
-                    # Caso complexo: múltiplos joins
-                    try:
-                        esq, dir = encontrar_divisao_join(expr)
-                    except:
-                        # Tentativa alternativa para expressões muito complexas
-                        esq, dir = identificar_operandos_complexos(expr)
-            except Exception as e:
-                raise ValueError(f"Erro ao identificar os operandos do produto/join: {e}")
-        
-        # Remove parênteses externos dos operandos
-        esq = remover_parenteses_externos(esq)
-        dir = remover_parenteses_externos(dir)
-        
-        # Cria o nó para o join/produto
-        no = No(conteudo, nivel, pai, None, None)
-        
-        # Processa os operandos como subárvores
-        no.filho_esq = parse(esq, nivel + 1, no)
-        no.filho_dir = parse(dir, nivel + 1, no)
+    Returns:
+        str: O predicado formatado.
+    """
+    return f"{predicado.esquerda}{predicado.operador}{predicado.direita}"
+
+def converter_ir_em_no(operador: NoAlgebra) -> No:
+    """
+    Constrói a (sub)árvore binária correspondente a um nó da representação intermediária.
+    Seleções com múltiplos predicados viram uma cadeia de nós de seleção, com o último predicado no topo,
+    como na conversão a partir de strings. A representação é percorrida em pós-ordem com uma pilha explícita.
+    Todos os nós da subárvore compartilham um índice de aliases novo, limitado aos aliases da consulta.
+    
+    Args:
+        operador (NoAlgebra): O nó da representação intermediária.
         
+    Returns:
+        No: A raiz da subárvore construída.
+    """
+    indice = IndiceAliases()
+    construidos: dict[int, No] = {}
+    pilha: list[tuple[NoAlgebra, bool]] = [(operador, False)]
+    while pilha:
+        atual, filhos_prontos = pilha.pop()
+        if not filhos_prontos:
+            pilha.append((atual, True))
+            pilha.extend((filho, False) for filho in reversed(atual.filhos()))
+            continue
+        filhos = [construidos[id(filho)] for filho in atual.filhos()]
+        construidos[id(atual)] = _converter_operador(atual, filhos, indice)
+    return construidos[id(operador)]
+
+def _converter_operador(operador: NoAlgebra, filhos: list[No], indice: IndiceAliases) -> No:
+    """
+    Constrói o(s) nó(s) de um único operador da representação intermediária, dados os nós já construídos dos filhos.
+    """
+    if isinstance(operador, Projecao):
+        return No(f"𝝿[{','.join(map(str, operador.colunas))}]", filhos[0], atributos=operador.colunas)
+    
+    if isinstance(operador, Selecao):
+        no = filhos[0]
+        for predicado in operador.predicados:
+            no = No(f"𝛔[{formatar_predicado(predicado)}]", no, predicados=(predicado,))
         return no
+    
+    if isinstance(operador, Juncao):
+        conteudo = f"⨝[{'∧'.join(map(formatar_predicado, operador.predicados))}]"
+        return No(conteudo, filhos[0], filhos[1], predicados=operador.predicados)
+    
+    if isinstance(operador, Produto):
+        return No("⨝", filhos[0], filhos[1])
+    
+    if isinstance(operador, Tabela):
+        return No(str(operador), indice_aliases=indice)
+    
+    raise ValueError(f"Operador desconhecido na representação intermediária: {operador!r}")
 
-    else:  # Tabela (base case)
-        return No(expr, nivel, pai, None, None)
+def parse(expr: str) -> No:
+    """
+    Analisa uma expressão algébrica e constrói uma árvore binária a partir dela.
+    A expressão é lida uma única vez (`analisar_algebra`) e a árvore é montada a partir da representação intermediária.
+    
+    Args:
+        expr (str): A expressão algébrica a ser analisada.
+    """
+    return converter_ir_em_no(analisar_algebra(expr))
 
 def remover_parenteses_externos(expr: str) -> str:
     """
@@ -320,67 +914,36 @@ def remover_parenteses_externos(expr: str) -> str:
     """
     expr = expr.strip()
     
-    # Se não começar e terminar com parênteses, retorna como está
-    if not (expr.startswith("(") and expr.endswith(")")):
-        return expr
-    
-    # Verifica se os parênteses externos são necessários
-    contador = 0
-    for i, char in enumerate(expr):
-        if char == '(':
-            contador += 1
-        elif char == ')':
-            contador -= 1
+    # Remove um par de parênteses externos por iteração, enquanto forem desnecessários
+    while expr.startswith("(") and expr.endswith(")"):
+        # Verifica se os parênteses externos são necessários
+        contador = 0
+        for i, char in enumerate(expr):
+            if char == '(':
+                contador += 1
+            elif char == ')':
+                contador -= 1
+            
+            # Se o contador chegar a zero antes do final, os parênteses externos não podem ser removidos
+            if contador == 0 and i < len(expr) - 1:
+                return expr
         
-        # Se o contador chegar a zero antes do final, os parênteses externos não podem ser removidos
-        if contador == 0 and i < len(expr) - 1:
-            return expr
-    
-    # Recursivamente remove parênteses externos
-    return remover_parenteses_externos(expr[1:-1])
-
-def identificar_operandos_complexos(expr: str) -> tuple[str, str]:
-    """
-    Identifica os dois operandos em uma expressão de join complexa.
+        expr = expr[1:-1].strip()
     
-    Args:
-        expr (str): A expressão complexa a ser analisada.
-        
-    Returns:
-        tuple[str, str]: Os operandos esquerdo e direito.
-    """
-    # Remove parênteses externos
-    expr = remover_parenteses_externos(expr)
-    
-    if "⨝" not in expr:
-        # Se não houver join, a expressão completa é um único operando
-        return expr, ""
-    
-    # Encontrar a posição correta do operador de join, respeitando parênteses aninhados
-    contador_parenteses = 0
-    for i, char in enumerate(expr):
-        if char == '(':
-            contador_parenteses += 1
-        elif char == ')':
-            contador_parenteses -= 1
-        elif char == '⨝' and contador_parenteses == 0:
-            # Encontrou o operador de join principal
-            return expr[:i], expr[i+1:]
-    
-    # Se não encontrou um ponto de divisão adequado
-    # Para expressões como ((a ⨝ b) ⨝ c)
-    if expr.startswith("(") and ")" in expr:
-        idx = expr.find(")")
-        if idx + 1 < len(expr) and expr[idx+1] == '⨝':
-            return expr[:idx+1], expr[idx+2:]
-    
-    raise ValueError(f"Não foi possível identificar os operandos em: {expr}")
+    return expr
 
 ## ## ## ## ## ## ## ## ## ## ## ## ## ## ###
 ## GERANDO A IMAGEM DA ÁRVORE DE CONSULTAS ##
 ## ## ## ## ## ## ## ## ## ## ## ## ## ## ###
 
-def desenhar_arvore(arvore: Arvore, nome_arquivo: str, nome_subpasta: Optional[str] = None) -> None:
+@medir_etapa()
+def desenhar_arvore(
+    arvore: Arvore, nome_arquivo: str, nome_subpasta: Optional[str] = None, sobreposicao: Optional[dict[int, str]] = None
+) -> None:
+    """
+    Desenha a árvore em `img/[nome_subpasta/]nome_arquivo.png`. `sobreposicao` acrescenta um texto ao rótulo dos nós,
+    pelo id de cada nó (por exemplo, as medições da execução de `Instrumentacao.sobreposicao`).
+    """
     if arvore.raiz is None:
         raise ValueError("A árvore está vazia. Não é possível desenhar.")
     
@@ -397,58 +960,68 @@ def desenhar_arvore(arvore: Arvore, nome_arquivo: str, nome_subpasta: Optional[s
 
     dot = Digraph(comment="Árvore de Álgebra Relacional", format="png")
     
-    def adicionar_nos(dot: Digraph, no: No):
-        dot.attr('graph',fontname='Cambria Math')
-        dot.attr('node',fontname='Cambria Math')
-
-        dot.node(str(id(no)), label=no.valor.replace("𝝿", "π").replace("𝛔", "σ").replace("⨝", "⨝"))
-        
-        if no.filho_esq:
-            dot.edge(str(id(no)), str(id(no.filho_esq)))
-            adicionar_nos(dot, no.filho_esq)
-        
+    dot.attr('graph',fontname='Cambria Math')
+    dot.attr('node',fontname='Cambria Math')
+    
+    # Percorre a árvore em pré-ordem com uma pilha de (nó, pai), ligando cada nó ao pai antes de desenhá-lo
+    pilha: list[tuple[No, Optional[No]]] = [(arvore.raiz, None)]
+    while pilha:
+        no, pai = pilha.pop()
+        if pai is not None:
+            dot.edge(str(id(pai)), str(id(no)))
+        rotulo = no.valor.replace("𝝿", "π").replace("𝛔", "σ").replace("⨝", "⨝")
+        if no.anotacoes:
+            rotulo = f"{rotulo}\n{no.anotacoes}"
+        if no.acesso is not None:
+            rotulo = f"{rotulo}\n{no.acesso}"
+        if sobreposicao and id(no) in sobreposicao:
+            rotulo = f"{rotulo}\n{sobreposicao[id(no)]}"
+        dot.node(str(id(no)), label=rotulo)
         if no.filho_dir:
-            dot.edge(str(id(no)), str(id(no.filho_dir)))
-            adicionar_nos(dot, no.filho_dir)
-
-    adicionar_nos(dot, arvore.raiz)
-    dot.render(filename=str(caminho_arquivo), cleanup=True)
+            pilha.append((no.filho_dir, no))
+        if no.filho_esq:
+            pilha.append((no.filho_esq, no))
+    with etapa("render"):
+        dot.render(filename=str(caminho_arquivo), cleanup=True)
     print(f"Árvore salva como {caminho_arquivo.with_suffix('.png')}")
     
 ## ## ## ## ## ## ## ## ## ## ## ## ####
 ## OTIMIZAÇÃO DAS OPERAÇÕES DE SELECT ##
 ## ## ## ## ## ## ## ## ## ## ## ## ####
 
-def otimizar_selects(arvore_nao_otimizada: Arvore) -> Arvore:
+@medir_etapa()
+def otimizar_selects(arvore_nao_otimizada: Arvore, estatisticas: Optional[EstatisticasBanco] = None) -> Arvore:
     """
     Otimiza a árvore de álgebra relacional movendo seleções para mais perto das tabelas
     quando possível, respeitando as dependências entre tabelas.
     
+    As seleções empilhadas sobre uma mesma entrada são ordenadas pela seletividade estimada e pelo custo
+    de avaliação dos seus predicados: as mais seletivas e baratas ficam mais perto da entrada (são avaliadas
+    primeiro). A posição de cada seleção e as estimativas usadas ficam nas anotações dos nós (`No.anotacoes`).
+    
+    A árvore original não é modificada: como os nós são imutáveis, a árvore otimizada compartilha
+    com ela todas as subárvores que não foram alteradas, e apenas os caminhos reescritos são recriados.
+    
     Args:
         arvore_nao_otimizada (Arvore): A árvore a ser otimizada.
+        estatisticas (Optional[EstatisticasBanco]): As estatísticas usadas nas estimativas. Padrão é as do banco `db_vendas.db`.
         
     Returns:
         Arvore: A árvore otimizada.
     """
-    # Cria uma cópia profunda para não modificar a árvore original
-    arvore_otimizada = Arvore()
-    if arvore_nao_otimizada.raiz is None:
-        return arvore_otimizada
+    raiz = arvore_nao_otimizada.raiz
+    if raiz is None:
+        return Arvore()
     
-    # Copia a raiz
-    arvore_otimizada.raiz = deepcopy(arvore_nao_otimizada.raiz)
-    
-    # Coleta todas as seleções na árvore
+    # Coleta todas as seleções na árvore e estima a seletividade e o custo de cada uma
     selecoes = []
-    coletar_selecoes(arvore_otimizada.raiz, selecoes)
+    coletar_selecoes(raiz, selecoes)
+    estimar_selecoes(selecoes, _tabelas_por_alias(raiz), estatisticas or obter_estatisticas())
     
     # Remove todas as seleções da árvore
-    nova_raiz = remover_selecoes(arvore_otimizada.raiz)
+    nova_raiz = remover_selecoes(raiz)
     if nova_raiz:
-        arvore_otimizada.raiz = nova_raiz
-        arvore_otimizada.raiz.nivel = 0
-        atualizar_niveis_recursivamente(arvore_otimizada.raiz.filho_esq, 1)
-        atualizar_niveis_recursivamente(arvore_otimizada.raiz.filho_dir, 1)
+        raiz = nova_raiz
     
     # Classifica as seleções em dois grupos: 
     # 1. Seleções que envolvem apenas uma tabela
@@ -464,23 +1037,79 @@ def otimizar_selects(arvore_nao_otimizada: Arvore) -> Arvore:
     
     # Primeiro, insere as seleções de uma única tabela
     if selecoes_unica_tabela:
-        nova_raiz = inserir_selecoes_unica_tabela(arvore_otimizada.raiz, selecoes_unica_tabela)
-        if nova_raiz:
-            arvore_otimizada.raiz = nova_raiz
-            arvore_otimizada.raiz.nivel = 0
-            atualizar_niveis_recursivamente(arvore_otimizada.raiz.filho_esq, 1)
-            atualizar_niveis_recursivamente(arvore_otimizada.raiz.filho_dir, 1)
+        raiz = inserir_selecoes_unica_tabela(raiz, selecoes_unica_tabela) or raiz
     
     # Depois, insere as seleções que envolvem múltiplas tabelas
     if selecoes_multiplas_tabelas:
-        nova_raiz = inserir_selecoes_multiplas_tabelas(arvore_otimizada.raiz, selecoes_multiplas_tabelas)
-        if nova_raiz:
-            arvore_otimizada.raiz = nova_raiz
-            arvore_otimizada.raiz.nivel = 0
-            atualizar_niveis_recursivamente(arvore_otimizada.raiz.filho_esq, 1)
-            atualizar_niveis_recursivamente(arvore_otimizada.raiz.filho_dir, 1)
+        raiz = inserir_selecoes_multiplas_tabelas(raiz, selecoes_multiplas_tabelas) or raiz
+    
+    return Arvore(raiz)
+
+def empilhar_selecoes(no: No, selecoes: list[dict]) -> No:
+    """
+    Cria uma cadeia de nós de seleção acima de um nó (a primeira seleção fica mais próxima do nó).
+    
+    Se as seleções tiverem estimativas (`estimar_selecoes`), elas são ordenadas de forma estável por
+    (seletividade - 1) / custo, que coloca primeiro as mais seletivas e, entre elas, as mais baratas; a
+    posição e as estimativas de cada seleção são registradas nas anotações do nó. Caso contrário, a
+    ordem da lista é mantida.
     
-    return arvore_otimizada
+    Args:
+        no (No): O nó que receberá as seleções.
+        selecoes (list[dict]): As seleções a serem aplicadas.
+        
+    Returns:
+        No: O topo da cadeia (o próprio nó, se a lista for vazia).
+    """
+    estimadas = all("seletividade" in selecao for selecao in selecoes)
+    if estimadas:
+        selecoes = sorted(selecoes, key=lambda selecao: (selecao["seletividade"] - 1) / selecao["custo"])
+    
+    for ordem, selecao in enumerate(selecoes, start=1):
+        anotacoes = None
+        if estimadas:
+            anotacoes = f"{ordem}ª · seletividade ≈ {selecao['seletividade']:.2g} · custo {selecao['custo']:g}"
+        no = No(selecao["rotulo"], no, predicados=selecao["predicados"], anotacoes=anotacoes)
+    return no
+
+# Custo relativo de avaliar um predicado em uma linha
+CUSTO_COMPARACAO_NUMERICA: float = 1.0
+CUSTO_COMPARACAO_TEXTO: float = 4.0
+
+def custo_predicado(predicado: Predicado, parametros: tuple[str, ...] = ()) -> float:
+    """
+    Estima o custo relativo de avaliar um predicado: comparações com textos (literais entre aspas simples)
+    são mais caras que as comparações numéricas e entre colunas.
+    
+    Args:
+        predicado (Predicado): O predicado.
+        parametros (tuple[str, ...]): Os literais dos marcadores `$i` de um modelo de plano, se houver.
+        
+    Returns:
+        float: O custo relativo.
+    """
+    direita = predicado.direita
+    if isinstance(direita, str) and parametros:
+        direita = bind_parameters(direita, parametros)
+    if isinstance(direita, str) and direita.strip().startswith("'"):
+        return CUSTO_COMPARACAO_TEXTO
+    return CUSTO_COMPARACAO_NUMERICA
+
+def estimar_selecoes(selecoes: list[dict], tabelas_por_alias: dict[str, str], estatisticas: EstatisticasBanco) -> None:
+    """
+    Acrescenta a cada seleção a seletividade estimada (`seletividade`) e o custo de avaliação (`custo`) dos seus predicados.
+    
+    Args:
+        selecoes (list[dict]): As seleções coletadas por `coletar_selecoes`.
+        tabelas_por_alias (dict[str, str]): Tabela (nome normalizado) de cada alias da consulta.
+        estatisticas (EstatisticasBanco): As estatísticas do banco.
+    """
+    for selecao in selecoes:
+        seletividade = 1.0
+        for predicado in selecao["predicados"]:
+            seletividade *= estimar_seletividade(predicado, tabelas_por_alias, estatisticas)
+        selecao["seletividade"] = seletividade
+        selecao["custo"] = sum(custo_predicado(predicado, estatisticas.parametros) for predicado in selecao["predicados"]) or CUSTO_COMPARACAO_NUMERICA
 
 def inserir_selecoes_unica_tabela(no: No, selecoes: list[dict]) -> No:
     """
@@ -493,55 +1122,17 @@ def inserir_selecoes_unica_tabela(no: No, selecoes: list[dict]) -> No:
     Returns:
         No: O nó após a inserção das seleções.
     """
-    if no is None:
-        return None
-    
-    # Processa os filhos recursivamente
-    no.filho_esq = inserir_selecoes_unica_tabela(no.filho_esq, selecoes)
-    if no.filho_esq:
-        no.filho_esq.pai = no
-        no.filho_esq.nivel = no.nivel + 1
-        
-    no.filho_dir = inserir_selecoes_unica_tabela(no.filho_dir, selecoes)
-    if no.filho_dir:
-        no.filho_dir.pai = no
-        no.filho_dir.nivel = no.nivel + 1
-    
-    # Se é uma tabela, verifica se há seleções aplicáveis
-    if no.get_operacao() == "TABLE":
-        # Extrai o nome/alias da tabela
-        nome_tabela = no.valor
-        alias = nome_tabela
-        if "[" in nome_tabela and "]" in nome_tabela:
-            alias = nome_tabela.split("[")[1].split("]")[0]
-        
-        # Filtra as seleções aplicáveis a esta tabela
-        selecoes_aplicaveis = [s for s in selecoes if len(s["tabelas"]) == 1 and next(iter(s["tabelas"])) == alias]
-        
-        # Aplica as seleções em ordem
-        novo_no = no
-        for selecao in selecoes_aplicaveis:
-            nivel = novo_no.nivel
-            pai = novo_no.pai
+    def inserir(no: No) -> No:
+        # Se é uma tabela, verifica se há seleções aplicáveis
+        if no.operacao is Operacao.TABLE:
+            alias = no.alias
             
-            # Cria o nó de seleção
-            novo_selecao = No(f"𝛔[{selecao['condicao']}]", nivel, pai, novo_no, None)
-            novo_no.pai = novo_selecao
-            novo_no.nivel = novo_selecao.nivel + 1
-            
-            # Conecta ao pai original
-            if pai:
-                if pai.filho_esq == novo_no:
-                    pai.filho_esq = novo_selecao
-                elif pai.filho_dir == novo_no:
-                    pai.filho_dir = novo_selecao
-            
-            # Atualiza o nó atual
-            novo_no = novo_selecao
-        
-        return novo_no
+            # Filtra as seleções aplicáveis a esta tabela e as aplica em ordem
+            selecoes_aplicaveis = [s for s in selecoes if len(s["tabelas"]) == 1 and next(iter(s["tabelas"])) == alias]
+            return empilhar_selecoes(no, selecoes_aplicaveis)
+        return no
     
-    return no
+    return transformar_arvore(no, inserir)
 
 def inserir_selecoes_multiplas_tabelas(no: No, selecoes: list[dict]) -> No:
     """
@@ -555,77 +1146,75 @@ def inserir_selecoes_multiplas_tabelas(no: No, selecoes: list[dict]) -> No:
     Returns:
         No: O nó após a inserção das seleções.
     """
-    if no is None:
-        return None
-    
-    # Primeiro, processa os filhos recursivamente
-    no.filho_esq = inserir_selecoes_multiplas_tabelas(no.filho_esq, selecoes)
-    if no.filho_esq:
-        no.filho_esq.pai = no
-        no.filho_esq.nivel = no.nivel + 1
-        
-    no.filho_dir = inserir_selecoes_multiplas_tabelas(no.filho_dir, selecoes)
-    if no.filho_dir:
-        no.filho_dir.pai = no
-        no.filho_dir.nivel = no.nivel + 1
-    
-    # Se é um JOIN ou PRODUCT, verifica quais seleções podem ser aplicadas aqui
-    if no.get_operacao() in ["JOIN", "PRODUCT"]:
-        # Identifica tabelas disponíveis nesta subárvore
-        tabelas_disponiveis = obter_tabelas_da_subarvore(no)
-        
-        # Filtra as seleções aplicáveis - aquelas cujas tabelas estão todas disponíveis
-        selecoes_aplicaveis = []
-        selecoes_nao_aplicaveis = []
-        
-        for selecao in selecoes:
-            if all(tabela in tabelas_disponiveis for tabela in selecao["tabelas"]):
-                # Verifica se a seleção envolve tabelas de ambos os lados do JOIN/PRODUCT
-                tabelas_esq = obter_tabelas_da_subarvore(no.filho_esq)
-                tabelas_dir = obter_tabelas_da_subarvore(no.filho_dir)
-                
-                # Se há tabelas de ambos os lados, a seleção deve ser aplicada neste nível
-                if (any(t in tabelas_esq for t in selecao["tabelas"]) and 
-                    any(t in tabelas_dir for t in selecao["tabelas"])):
-                    selecoes_aplicaveis.append(selecao)
-                # Se todas as tabelas estão em apenas um dos lados, a seleção não é aplicável neste nível
-                elif all(t in tabelas_esq for t in selecao["tabelas"]):
-                    selecoes_nao_aplicaveis.append(selecao)
-                elif all(t in tabelas_dir for t in selecao["tabelas"]):
-                    selecoes_nao_aplicaveis.append(selecao)
-                # Se não se encaixa em nenhum dos casos acima, aplica neste nível
-                else:
-                    selecoes_aplicaveis.append(selecao)
-            else:
-                selecoes_nao_aplicaveis.append(selecao)
+    # Os filhos são processados antes do nó (pós-ordem), como na versão recursiva original
+    def inserir(no: No) -> No:
+        # Se é um JOIN ou PRODUCT, verifica quais seleções podem ser aplicadas aqui
+        if no.operacao in (Operacao.JOIN, Operacao.PRODUCT):
+            # Tabelas disponíveis nesta subárvore e em cada lado, já calculadas como bitsets nos nós
+            tabelas_disponiveis = no.mascara_subarvore
+            tabelas_esq = no.filho_esq.mascara_subarvore if no.filho_esq else 0
+            tabelas_dir = no.filho_dir.mascara_subarvore if no.filho_dir else 0
         
-        # Atualiza a lista de seleções
-        selecoes[:] = selecoes_nao_aplicaveis
+            # Filtra as seleções aplicáveis - aquelas cujas tabelas estão todas disponíveis
+            selecoes_aplicaveis = []
+            selecoes_nao_aplicaveis = []
         
-        # Aplica as seleções aplicáveis
-        novo_no = no
-        for selecao in selecoes_aplicaveis:
-            nivel = novo_no.nivel
-            pai = novo_no.pai
-            
-            # Cria o nó de seleção
-            novo_selecao = No(f"𝛔[{selecao['condicao']}]", nivel, pai, novo_no, None)
-            novo_no.pai = novo_selecao
-            novo_no.nivel = novo_selecao.nivel + 1
-            
-            # Conecta ao pai original
-            if pai:
-                if pai.filho_esq == novo_no:
-                    pai.filho_esq = novo_selecao
-                elif pai.filho_dir == novo_no:
-                    pai.filho_dir = novo_selecao
+            for selecao in selecoes:
+                mascara = selecao["mascara"]
+                if not mascara & ~tabelas_disponiveis:
+                    # Se há tabelas de ambos os lados, a seleção deve ser aplicada neste nível
+                    if mascara & tabelas_esq and mascara & tabelas_dir:
+                        selecoes_aplicaveis.append(selecao)
+                    # Se todas as tabelas estão em apenas um dos lados, a seleção não é aplicável neste nível
+                    elif not mascara & ~tabelas_esq:
+                        selecoes_nao_aplicaveis.append(selecao)
+                    elif not mascara & ~tabelas_dir:
+                        selecoes_nao_aplicaveis.append(selecao)
+                    # Se não se encaixa em nenhum dos casos acima, aplica neste nível
+                    else:
+                        selecoes_aplicaveis.append(selecao)
+                else:
+                    selecoes_nao_aplicaveis.append(selecao)
+        
+            # Atualiza a lista de seleções
+            selecoes[:] = selecoes_nao_aplicaveis
             
-            # Atualiza o nó atual
-            novo_no = novo_selecao
+            # Igualdades entre colunas dos dois lados viram condições da própria junção; as demais ficam acima dela
+            chaves = [
+                selecao for selecao in selecoes_aplicaveis
+                if all(_chave_equijuncao(predicado, tabelas_esq, tabelas_dir, no.indice_aliases) for predicado in selecao["predicados"])
+            ]
+            if chaves:
+                no = incorporar_condicoes_juncao(no, [predicado for selecao in chaves for predicado in selecao["predicados"]])
+                selecoes_aplicaveis = [selecao for selecao in selecoes_aplicaveis if selecao not in chaves]
+        
+            # Aplica as seleções aplicáveis
+            return empilhar_selecoes(no, selecoes_aplicaveis)
+        
+        return no
         
-        return novo_no
+    return transformar_arvore(no, inserir)
+
+def incorporar_condicoes_juncao(no: No, predicados: list[Predicado]) -> No:
+    """
+    Transforma um produto (ou junção) com seleções acima dele em uma junção com condição (`⨝[cond]`), acrescentando
+    os predicados às condições já existentes. As chaves de equi-junção do novo nó (`No.chaves_equijuncao`) são
+    registradas nas suas anotações.
     
-    return no
+    Args:
+        no (No): O nó de junção ou produto.
+        predicados (list[Predicado]): Os predicados a serem incorporados.
+        
+    Returns:
+        No: O novo nó de junção, com os mesmos filhos.
+    """
+    condicoes = no.predicados + tuple(predicados)
+    mascara_esq, mascara_dir = no.filho_esq.mascara_subarvore, no.filho_dir.mascara_subarvore
+    chaves = [chave for predicado in condicoes if (chave := _chave_equijuncao(predicado, mascara_esq, mascara_dir, no.indice_aliases))]
+    return No(
+        f"⨝[{'∧'.join(map(formatar_predicado, condicoes))}]", no.filho_esq, no.filho_dir, predicados=condicoes,
+        anotacoes=f"equi-junção: {', '.join(f'{esq} = {dir}' for esq, dir in chaves)}",
+    )
 
 def extrair_tabelas_da_condicao(condicao: str) -> set[str]:
     """
@@ -650,24 +1239,15 @@ def coletar_selecoes(no: No, selecoes: list[dict]):
         no (No): O nó atual sendo visitado.
         selecoes (list[dict]): lista onde as seleções serão coletadas.
     """
-    if no is None:
-        return
-    
-    if no.get_operacao() == "SELECT":
-        # Extrai a condição da seleção
-        condicao = no.valor[2:-1]  # Remove "𝛔[" e "]"
-        
-        # Identifica as tabelas envolvidas na condição
-        tabelas_envolvidas = extrair_tabelas_da_condicao(condicao)
-        
-        selecoes.append({
-            "condicao": condicao,
-            "tabelas": tabelas_envolvidas
-        })
-    
-    # Continua a busca nos filhos
-    coletar_selecoes(no.filho_esq, selecoes)
-    coletar_selecoes(no.filho_dir, selecoes)
+    for no in percorrer_pre_ordem(no):
+        if no.operacao is Operacao.SELECT:
+            # Os predicados e as tabelas envolvidas já foram identificados na construção do nó
+            selecoes.append({
+                "rotulo": no.valor,
+                "predicados": no.predicados,
+                "tabelas": no.tabelas,
+                "mascara": no.mascara_tabelas
+            })
 
 def remover_selecoes(no: No) -> Optional[No]:
     """
@@ -679,42 +1259,12 @@ def remover_selecoes(no: No) -> Optional[No]:
     Returns:
         Optional[No]: O nó resultante após a remoção das seleções.
     """
-    if no is None:
-        return None
-    
-    if no.get_operacao() == "SELECT":
-        # Substitui o nó de seleção pelo seu filho
-        if no.filho_esq:
-            filho = remover_selecoes(no.filho_esq)
-            if filho:
-                filho.pai = no.pai
-                # Ajuste o nível do filho para manter a consistência com o novo pai
-                if filho.pai:
-                    filho.nivel = filho.pai.nivel + 1
-                else:
-                    filho.nivel = 0  # Se é a nova raiz
-                # Atualiza os níveis dos descendentes
-                atualizar_niveis_recursivamente(filho.filho_esq, filho.nivel + 1)
-                atualizar_niveis_recursivamente(filho.filho_dir, filho.nivel + 1)
-            return filho
-        return None
-    
-    # Processa os filhos
-    no.filho_esq = remover_selecoes(no.filho_esq)
-    if no.filho_esq:
-        no.filho_esq.pai = no
-        no.filho_esq.nivel = no.nivel + 1  # Garante nível consistente
-        
-    no.filho_dir = remover_selecoes(no.filho_dir)
-    if no.filho_dir:
-        no.filho_dir.pai = no
-        no.filho_dir.nivel = no.nivel + 1  # Garante nível consistente
-    
-    return no
+    # Substitui cada nó de seleção pelo seu filho (já sem seleções, pois os filhos são processados antes)
+    return transformar_arvore(no, lambda atual: atual.filho_esq if atual.operacao is Operacao.SELECT else atual)
 
 def obter_tabelas_da_subarvore(no: No) -> set[str]:
     """
-    Identifica todas as tabelas presentes em uma subárvore.
+    Identifica todas as tabelas presentes em uma subárvore, a partir do bitset guardado no nó (sem percorrer a subárvore).
     
     Args:
         no (No): A raiz da subárvore.
@@ -725,50 +1275,20 @@ def obter_tabelas_da_subarvore(no: No) -> set[str]:
     if no is None:
         return set()
     
-    tabelas = set()
-    
-    if no.get_operacao() == "TABLE":
-        # O valor pode ser algo como "tabela[alias]"
-        nome_completo = no.valor
-        if "[" in nome_completo and "]" in nome_completo:
-            alias = nome_completo.split("[")[1].split("]")[0]
-            tabelas.add(alias)
-        else:
-            tabelas.add(nome_completo)
-    
-    # Adiciona tabelas dos filhos
-    tabelas.update(obter_tabelas_da_subarvore(no.filho_esq))
-    tabelas.update(obter_tabelas_da_subarvore(no.filho_dir))
-    
-    return tabelas
-
-def atualizar_niveis_recursivamente(no: No, nivel: int) -> None:
-    """
-    Atualiza os níveis de um nó e de todos os seus descendentes.
-    
-    Args:
-        no (No): O nó a ter seu nível atualizado.
-        nivel (int): O novo nível do nó.
-    """
-    if no is None:
-        return
-    
-    no.nivel = nivel
-    
-    # Atualiza os filhos recursivamente
-    atualizar_niveis_recursivamente(no.filho_esq, nivel + 1)
-    atualizar_niveis_recursivamente(no.filho_dir, nivel + 1)
+    return no.indice_aliases.aliases(no.mascara_subarvore)
 
 ## ## ## ## ## ## ## ## ## ## ## ## ## ##
 ## OTIMIZAÇÃO DAS OPERAÇÕES DE PROJECT ##
 ## ## ## ## ## ## ## ## ## ## ## ## ## ##
 
+@medir_etapa()
 def otimizar_projecoes(arvore_nao_otimizada: Arvore) -> Arvore:
     """
     Otimiza a árvore de álgebra relacional adicionando uma projeção logo imediatamente 
     após as tabelas para filtrar somente as colunas necessárias para a consulta.
     
     Esta técnica reduz a quantidade de dados movidos entre operações, melhorando o desempenho.
+    A árvore original não é modificada; as subárvores não alteradas são compartilhadas.
     
     Args:
         arvore_nao_otimizada (Arvore): A árvore a ser otimizada.
@@ -776,28 +1296,15 @@ def otimizar_projecoes(arvore_nao_otimizada: Arvore) -> Arvore:
     Returns:
         Arvore: A árvore otimizada.
     """
-    # Cria uma cópia profunda para não modificar a árvore original
-    arvore_otimizada = Arvore()
-    if arvore_nao_otimizada.raiz is None:
-        return arvore_otimizada
-    
-    # Copia a raiz
-    arvore_otimizada.raiz = deepcopy(arvore_nao_otimizada.raiz)
+    raiz = arvore_nao_otimizada.raiz
+    if raiz is None:
+        return Arvore()
     
     # Identifica todas as colunas necessárias para a consulta
-    colunas_necessarias = identificar_colunas_necessarias(arvore_otimizada.raiz)
+    colunas_necessarias = identificar_colunas_necessarias(raiz)
     
     # Insere projeções em cada tabela base para limitar as colunas
-    novo_raiz = inserir_projecoes_precoces(arvore_otimizada.raiz, colunas_necessarias)
-    if novo_raiz:
-        arvore_otimizada.raiz = novo_raiz
-        # Garantir que a raiz está no nível 0
-        arvore_otimizada.raiz.nivel = 0
-        # Atualizar os níveis da árvore inteira para garantir consistência
-        atualizar_niveis_recursivamente(arvore_otimizada.raiz.filho_esq, 1)
-        atualizar_niveis_recursivamente(arvore_otimizada.raiz.filho_dir, 1)
-    
-    return arvore_otimizada
+    return Arvore(inserir_projecoes_precoces(raiz, colunas_necessarias) or raiz)
 
 def identificar_colunas_necessarias(no: No) -> dict[str, set[str]]:
     """
@@ -812,49 +1319,9 @@ def identificar_colunas_necessarias(no: No) -> dict[str, set[str]]:
     """
     colunas = {}
     
-    # Analisa o nó atual
-    if no.get_operacao() == "PROJECT":
-        # Extrai as colunas da projeção
-        projecao = no.valor[2:-1]  # Remove "𝝿[" e "]"
-        for coluna in projecao.split(","):
-            coluna = coluna.strip()
-            if "." in coluna:
-                tabela, nome_coluna = coluna.split(".")
-                if tabela not in colunas:
-                    colunas[tabela] = set()
-                colunas[tabela].add(nome_coluna)
-    
-    elif no.get_operacao() == "SELECT":
-        # Extrai colunas da condição de seleção
-        condicao = no.valor[2:-1]  # Remove "𝛔[" e "]"
-        # Extrai todas as colunas mencionadas na condição
-        colunas_select = extrair_colunas_da_condicao(condicao)
-        for tabela, cols in colunas_select.items():
-            if tabela not in colunas:
-                colunas[tabela] = set()
-            colunas[tabela].update(cols)
-    
-    elif no.get_operacao() == "JOIN":
-        # Extrai colunas da condição de join
-        if "[" in no.valor and "]" in no.valor:
-            condicao = no.valor[2:-1]  # Remove "⨝[" e "]"
-            colunas_join = extrair_colunas_da_condicao(condicao)
-            for tabela, cols in colunas_join.items():
-                if tabela not in colunas:
-                    colunas[tabela] = set()
-                colunas[tabela].update(cols)
-    
-    # Processa os filhos recursivamente e combina os resultados
-    if no.filho_esq:
-        colunas_filho = identificar_colunas_necessarias(no.filho_esq)
-        for tabela, cols in colunas_filho.items():
-            if tabela not in colunas:
-                colunas[tabela] = set()
-            colunas[tabela].update(cols)
-    
-    if no.filho_dir:
-        colunas_filho = identificar_colunas_necessarias(no.filho_dir)
-        for tabela, cols in colunas_filho.items():
+    # Colunas das projeções e das condições de seleção/junção da subárvore, identificadas na construção dos nós
+    for atual in percorrer_pre_ordem(no):
+        for tabela, cols in atual.colunas.items():
             if tabela not in colunas:
                 colunas[tabela] = set()
             colunas[tabela].update(cols)
@@ -878,8 +1345,10 @@ def extrair_colunas_da_condicao(condicao: str) -> dict[str, set[str]]:
     # Lista de operadores comuns em condições
     operadores = ["∧", "AND", "OR", "=", ">", "<", ">=", "<=", "<>"]
     
+    # Remove literais de string, que podem conter pontos (ex: 'teste@mail.com') e seriam confundidos com colunas
+    condicao_norm = re.sub(r"'[^']*'|\"[^\"]*\"", " ", condicao)
+    
     # Substituir operadores por espaços para facilitar a tokenização
-    condicao_norm = condicao
     for op in operadores:
         condicao_norm = condicao_norm.replace(op, " ")
     
@@ -892,7 +1361,8 @@ def extrair_colunas_da_condicao(condicao: str) -> dict[str, set[str]]:
     for token in tokens:
         if "." in token:
             partes = token.split(".")
-            if len(partes) == 2:
+            # Literais numéricos (ex: 50.00, .5) não são colunas
+            if len(partes) == 2 and not partes[0].lstrip("+-").isdigit() and partes[0] != "":
                 tabela, coluna = partes
                 if tabela not in colunas:
                     colunas[tabela] = set()
@@ -912,53 +1382,640 @@ def inserir_projecoes_precoces(no: No, colunas_necessarias: dict[str, set[str]])
     Returns:
         No: O nó raiz da subárvore (possivelmente modificado)
     """
-    if no is None:
-        return None
-    
-    # Processa os filhos primeiro
-    no.filho_esq = inserir_projecoes_precoces(no.filho_esq, colunas_necessarias)
-    if no.filho_esq:
-        no.filho_esq.pai = no
-        no.filho_esq.nivel = no.nivel + 1
-    
-    no.filho_dir = inserir_projecoes_precoces(no.filho_dir, colunas_necessarias)
-    if no.filho_dir:
-        no.filho_dir.pai = no
-        no.filho_dir.nivel = no.nivel + 1
-    
-    # Se é uma tabela, insere uma projeção
-    if no.get_operacao() == "TABLE":
-        nome_tabela = no.valor
-        alias = nome_tabela
-        
-        # Extrai o alias se existir
-        if "[" in nome_tabela and "]" in nome_tabela:
-            alias = nome_tabela.split("[")[1].split("]")[0]
-        
-        # Verifica se há colunas específicas para esta tabela
-        if alias in colunas_necessarias and colunas_necessarias[alias]:
-            # Cria a lista de colunas para a projeção
-            cols = [f"{alias}.{col}" for col in colunas_necessarias[alias]]
-            cols_str = ", ".join(cols)
-            
-            # Cria o nó de projeção
-            projecao = No(f"𝝿[{cols_str}]", no.nivel, no.pai, no, None)
+    def inserir(no: No) -> No:
+        # Se é uma tabela, insere uma projeção
+        if no.operacao is Operacao.TABLE:
+            alias = no.alias
             
-            # Ajusta o pai do nó de tabela
-            no.pai = projecao
-            no.nivel = projecao.nivel + 1
+            # Verifica se há colunas específicas para esta tabela
+            if alias in colunas_necessarias and colunas_necessarias[alias]:
+                # Cria a lista de colunas para a projeção (ordenada, para que o plano não dependa da ordem do conjunto)
+                cols = tuple(Coluna(alias, col) for col in sorted(colunas_necessarias[alias]))
+                cols_str = ", ".join(map(str, cols))
+                
+                # Cria o nó de projeção acima da tabela
+                return No(f"𝝿[{cols_str}]", no, atributos=cols)
+        
+        # Se não houve modificação, retorna o nó original
+        return no
+    
+    return transformar_arvore(no, inserir)
+
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ###
+## REORDENAÇÃO DAS JUNÇÕES (BASEADA EM CUSTO) ##
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ###
+
+# Regiões com mais relações do que isso usam a heurística gulosa em vez da programação dinâmica
+LIMITE_PROGRAMACAO_DINAMICA: int = 12
+
+class _Plano:
+    """
+    Plano de junção de um subconjunto de relações de uma região (bitset `mascara` sobre os índices das relações):
+    uma única relação (`indice`) ou a junção de dois planos (`esq` e `dir`). O custo é a soma das cardinalidades
+    estimadas de todas as junções do plano.
+    """
+    __slots__ = ("mascara", "custo", "esq", "dir", "indice")
+    
+    def __init__(self: _Plano, mascara: int, custo: float, esq: Optional[_Plano] = None, dir: Optional[_Plano] = None, indice: Optional[int] = None) -> None:
+        self.mascara = mascara
+        self.custo = custo
+        self.esq = esq
+        self.dir = dir
+        self.indice = indice
+
+@medir_etapa()
+def reordenar_juncoes(arvore: Arvore, estatisticas: Optional[EstatisticasBanco] = None) -> Arvore:
+    """
+    Reordena as junções da árvore pelo custo estimado, a partir das estatísticas do banco (`estatisticas.py`).
+    
+    Cada região de junções (junções e produtos consecutivos, com as seleções logo acima deles) é tratada como um
+    conjunto de relações ligadas pelos predicados da região. Até `LIMITE_PROGRAMACAO_DINAMICA` relações, o melhor
+    plano (em profundidade à esquerda ou ramificado) é encontrado por programação dinâmica sobre os subconjuntos
+    conectados; acima disso, os pares de menor cardinalidade são juntados de forma gulosa. Produtos cartesianos só
+    são usados quando não há predicado ligando as partes.
+    
+    O custo de um plano é a soma das cardinalidades estimadas dos resultados das junções. A região só é reescrita
+    se o novo plano for mais barato que o original; caso contrário (por exemplo, sem estatísticas no banco), ela é
+    mantida e compartilhada com a árvore original. Na região reescrita, cada predicado fica na junção mais baixa que
+    contém todas as suas tabelas (como condição da junção, se veio de uma junção, ou como seleção logo acima dela).
+    
+    Args:
+        arvore (Arvore): A árvore a ser otimizada.
+        estatisticas (Optional[EstatisticasBanco]): As estatísticas a serem usadas. Padrão é as do banco `db_vendas.db`.
+        
+    Returns:
+        Arvore: A árvore com as junções reordenadas.
+    """
+    raiz = arvore.raiz
+    if raiz is None:
+        return Arvore()
+    estatisticas = estatisticas or obter_estatisticas()
+    
+    tabelas_por_alias = _tabelas_por_alias(raiz)
+    
+    # Raízes das regiões de junções (a busca não entra nas regiões, que portanto não se sobrepõem)
+    raizes_regioes = set()
+    pilha = [raiz]
+    while pilha:
+        no = pilha.pop()
+        if _inicia_regiao_juncoes(no):
+            raizes_regioes.add(id(no))
+            continue
+        pilha.extend(filho for filho in (no.filho_dir, no.filho_esq) if filho is not None)
+    
+    def reordenar(no: No) -> No:
+        if id(no) in raizes_regioes:
+            return _reordenar_regiao(no, tabelas_por_alias, estatisticas)
+        return no
+    
+    return Arvore(transformar_arvore(raiz, reordenar))
+
+def _tabelas_por_alias(raiz: No) -> dict[str, str]:
+    """
+    Retorna a tabela (nome normalizado) de cada alias declarado na subárvore.
+    """
+    return {
+        no.alias: no.valor.split("[")[0].strip().lower()
+        for no in percorrer_pre_ordem(raiz) if no.operacao is Operacao.TABLE
+    }
+
+def estimar_cardinalidade(no: No, estatisticas: Optional[EstatisticasBanco] = None) -> float:
+    """
+    Estima o número de linhas produzidas por uma subárvore, a partir das estatísticas do banco.
+    
+    Tabelas têm o número de linhas coletado; seleções e junções multiplicam a cardinalidade das entradas pela
+    seletividade estimada de cada predicado (`estimar_seletividade`), supondo predicados independentes; produtos
+    multiplicam as cardinalidades das entradas e projeções as mantêm (não eliminam duplicatas).
+    
+    Args:
+        no (No): A raiz da subárvore.
+        estatisticas (Optional[EstatisticasBanco]): As estatísticas a serem usadas. Padrão é as do banco `db_vendas.db`.
+        
+    Returns:
+        float: A cardinalidade estimada.
+    """
+    estatisticas = estatisticas or obter_estatisticas()
+    tabelas_por_alias = _tabelas_por_alias(no)
+    
+    # Na pré-ordem invertida, cada nó aparece depois de todos os seus descendentes
+    cardinalidades: dict[int, float] = {}
+    for atual in reversed(list(percorrer_pre_ordem(no))):
+        if atual.operacao is Operacao.TABLE:
+            cardinalidade = float(estatisticas.linhas(tabelas_por_alias[atual.alias]))
+        else:
+            cardinalidade = cardinalidades[id(atual.filho_esq)]
+            if atual.filho_dir is not None:
+                cardinalidade *= cardinalidades[id(atual.filho_dir)]
+            for predicado in atual.predicados:
+                cardinalidade *= estimar_seletividade(predicado, tabelas_por_alias, estatisticas)
+        cardinalidades[id(atual)] = cardinalidade
+    return cardinalidades[id(no)]
+
+def _inicia_regiao_juncoes(no: No) -> bool:
+    """
+    Verifica se um nó é uma junção, um produto ou uma cadeia de seleções logo acima de uma junção ou produto.
+    """
+    while no.operacao is Operacao.SELECT:
+        no = no.filho_esq
+    return no.operacao in (Operacao.JOIN, Operacao.PRODUCT)
+
+def _reordenar_regiao(no: No, tabelas_por_alias: dict[str, str], estatisticas: EstatisticasBanco) -> No:
+    """
+    Reordena uma região de junções, retornando o próprio nó se o plano original já for o mais barato.
+    """
+    # Relações (subárvores abaixo da região, mantidas intactas), predicados da região e junções originais
+    relacoes: list[No] = []
+    predicados: list[tuple[Predicado, bool]] = []  # (predicado, se veio de uma junção)
+    juncoes_originais: list[No] = []
+    pilha: list[tuple[No, bool]] = [(no, True)]
+    while pilha:
+        atual, na_regiao = pilha.pop()
+        if atual.operacao is Operacao.SELECT and (na_regiao or _inicia_regiao_juncoes(atual)):
+            predicados.extend((predicado, False) for predicado in atual.predicados)
+            pilha.append((atual.filho_esq, True))
+        elif atual.operacao in (Operacao.JOIN, Operacao.PRODUCT):
+            juncoes_originais.append(atual)
+            predicados.extend((predicado, True) for predicado in atual.predicados)
+            pilha.append((atual.filho_dir, False))
+            pilha.append((atual.filho_esq, False))
+        else:
+            relacoes.append(atual)
+    # Os predicados foram coletados de cima para baixo; na reconstrução, os primeiros ficam mais abaixo
+    predicados.reverse()
+    
+    quantidade = len(relacoes)
+    if quantidade < 3:
+        # Com duas relações há uma única junção possível
+        return no
+    
+    indice_do_alias = {}
+    for indice, relacao in enumerate(relacoes):
+        for alias in relacao.indice_aliases.aliases(relacao.mascara_subarvore):
+            indice_do_alias[alias] = indice
+    
+    def mascara_relacoes(aliases: Iterable[str]) -> Optional[int]:
+        mascara = 0
+        for alias in aliases:
+            if alias not in indice_do_alias:
+                return None
+            mascara |= 1 << indice_do_alias[alias]
+        return mascara
+    
+    mascaras = []
+    for predicado, _ in predicados:
+        mascara = mascara_relacoes(coluna.alias for coluna in predicado.colunas())
+        if mascara is None:
+            # Predicado com alias de fora da região: a região é mantida como está
+            return no
+        mascaras.append(mascara)
+    
+    # Cardinalidade de cada relação, já com as seleções que envolvem apenas ela
+    cardinalidades = [estimar_cardinalidade(relacao, estatisticas) for relacao in relacoes]
+    juncoes: list[tuple[int, float]] = []
+    vizinhos = [0] * quantidade
+    for (predicado, _), mascara in zip(predicados, mascaras):
+        seletividade = estimar_seletividade(predicado, tabelas_por_alias, estatisticas)
+        if mascara & (mascara - 1):
+            juncoes.append((mascara, seletividade))
+            for indice in range(quantidade):
+                if mascara >> indice & 1:
+                    vizinhos[indice] |= mascara & ~(1 << indice)
+        elif mascara:
+            cardinalidades[mascara.bit_length() - 1] *= seletividade
+    
+    cache_cardinalidades: dict[int, float] = {}
+    def cardinalidade(conjunto: int) -> float:
+        if conjunto not in cache_cardinalidades:
+            estimativa = 1.0
+            for indice in range(quantidade):
+                if conjunto >> indice & 1:
+                    estimativa *= cardinalidades[indice]
+            for mascara, seletividade in juncoes:
+                if not mascara & ~conjunto:
+                    estimativa *= seletividade
+            cache_cardinalidades[conjunto] = estimativa
+        return cache_cardinalidades[conjunto]
+    
+    custo_original = sum(cardinalidade(mascara_relacoes(juncao.indice_aliases.aliases(juncao.mascara_subarvore))) for juncao in juncoes_originais)
+    
+    if quantidade <= LIMITE_PROGRAMACAO_DINAMICA:
+        plano = _enumerar_programacao_dinamica(quantidade, vizinhos, cardinalidade)
+    else:
+        plano = _enumerar_guloso(quantidade, vizinhos, cardinalidade)
+    
+    # Tolerância para erros de arredondamento entre planos de mesmo custo
+    if plano.custo >= custo_original * (1 - 1e-9):
+        return no
+    return _construir_regiao(plano, relacoes, predicados, mascaras)
+
+def _enumerar_programacao_dinamica(quantidade: int, vizinhos: list[int], cardinalidade: Callable[[int], float]) -> _Plano:
+    """
+    Encontra o plano mais barato por programação dinâmica sobre os subconjuntos de relações, em ordem crescente de bitset.
+    Cada divisão de um subconjunto é considerada uma vez, com a relação de menor índice à esquerda.
+    """
+    melhores: dict[int, _Plano] = {1 << indice: _Plano(1 << indice, 0.0, indice=indice) for indice in range(quantidade)}
+    # Vizinhos de cada subconjunto, calculados a partir do subconjunto sem o bit mais baixo
+    vizinhos_conjunto = [0] * (1 << quantidade)
+    for conjunto in range(1, 1 << quantidade):
+        menor = conjunto & -conjunto
+        vizinhos_conjunto[conjunto] = vizinhos_conjunto[conjunto ^ menor] | vizinhos[menor.bit_length() - 1]
+        if conjunto == menor:
+            continue
+        
+        melhor_conectado = melhor_produto = None
+        parte = (conjunto - 1) & conjunto
+        while parte:
+            if parte & menor:
+                resto = conjunto ^ parte
+                esq, dir = melhores[parte], melhores[resto]
+                custo = esq.custo + dir.custo
+                if vizinhos_conjunto[parte] & resto:
+                    if melhor_conectado is None or custo < melhor_conectado[0]:
+                        melhor_conectado = (custo, esq, dir)
+                elif melhor_conectado is None and (melhor_produto is None or custo < melhor_produto[0]):
+                    melhor_produto = (custo, esq, dir)
+            parte = (parte - 1) & conjunto
+        
+        custo, esq, dir = melhor_conectado or melhor_produto
+        melhores[conjunto] = _Plano(conjunto, custo + cardinalidade(conjunto), esq, dir)
+    
+    return melhores[(1 << quantidade) - 1]
+
+def _enumerar_guloso(quantidade: int, vizinhos: list[int], cardinalidade: Callable[[int], float]) -> _Plano:
+    """
+    Junta, a cada passo, o par de planos ligados por algum predicado cujo resultado tem a menor cardinalidade
+    estimada (um produto cartesiano só é escolhido se nenhum par estiver ligado).
+    """
+    planos = [_Plano(1 << indice, 0.0, indice=indice) for indice in range(quantidade)]
+    vizinhos_planos = list(vizinhos)
+    while len(planos) > 1:
+        melhor = None
+        for i in range(len(planos)):
+            for j in range(i + 1, len(planos)):
+                chave = (not vizinhos_planos[i] & planos[j].mascara, cardinalidade(planos[i].mascara | planos[j].mascara))
+                if melhor is None or chave < melhor[0]:
+                    melhor = (chave, i, j)
+        _, i, j = melhor
+        esq, dir = planos[i], planos[j]
+        planos[i] = _Plano(esq.mascara | dir.mascara, esq.custo + dir.custo + cardinalidade(esq.mascara | dir.mascara), esq, dir)
+        vizinhos_planos[i] |= vizinhos_planos[j]
+        del planos[j], vizinhos_planos[j]
+    return planos[0]
+
+def _construir_regiao(plano: _Plano, relacoes: list[No], predicados: list[tuple[Predicado, bool]], mascaras: list[int]) -> No:
+    """
+    Constrói os nós de um plano de junção. Cada predicado é aplicado no nó mais baixo que contém todas as suas
+    relações: predicados de junção viram a condição da junção e os demais, seleções logo acima do nó.
+    """
+    construidos: dict[int, No] = {}
+    pilha: list[tuple[_Plano, bool]] = [(plano, False)]
+    while pilha:
+        atual, filhos_prontos = pilha.pop()
+        if atual.indice is None and not filhos_prontos:
+            pilha.append((atual, True))
+            pilha.append((atual.dir, False))
+            pilha.append((atual.esq, False))
+            continue
+        
+        if atual.indice is not None:
+            aplicaveis = [k for k, mascara in enumerate(mascaras) if mascara == atual.mascara]
+            no = relacoes[atual.indice]
+            selecoes = [predicados[k][0] for k in aplicaveis]
+        else:
+            aplicaveis = [
+                k for k, mascara in enumerate(mascaras)
+                if not mascara & ~atual.mascara and mascara & ~atual.esq.mascara and mascara & ~atual.dir.mascara
+            ]
+            condicoes = tuple(predicados[k][0] for k in aplicaveis if predicados[k][1])
+            esq, dir = construidos[id(atual.esq)], construidos[id(atual.dir)]
+            if condicoes:
+                no = No(f"⨝[{'∧'.join(map(formatar_predicado, condicoes))}]", esq, dir, predicados=condicoes)
+            else:
+                no = No("⨝", esq, dir)
+            selecoes = [predicados[k][0] for k in aplicaveis if not predicados[k][1]]
+        
+        if atual is plano:
+            # Predicados sem colunas não dependem de nenhuma relação e ficam no topo da região
+            selecoes += [predicados[k][0] for k, mascara in enumerate(mascaras) if not mascara]
+        for predicado in selecoes:
+            no = No(f"𝛔[{formatar_predicado(predicado)}]", no, predicados=(predicado,))
+        construidos[id(atual)] = no
+    
+    return construidos[id(plano)]
+
+## ## ## ## ## ## ## ####
+## PLANEJAMENTO FÍSICO ##
+## ## ## ## ## ## ## ####
+
+# Custo de ler uma linha por um índice secundário (busca no índice e depois na tabela, em posições espalhadas),
+# relativo ao de ler uma linha na varredura completa ou pela chave primária
+CUSTO_LINHA_INDICE: float = 4.0
+
+# Operadores de comparação que podem ser atendidos por um índice (igualdade e intervalos)
+OPERADORES_INDEXAVEIS: frozenset[str] = frozenset({"=", "<", "<=", ">", ">="})
+
+@medir_etapa()
+def planejar_acesso(arvore: Arvore, estatisticas: Optional[EstatisticasBanco] = None) -> Arvore:
+    """
+    Escolhe, a partir dos índices do banco (`EstatisticasBanco.indices`), como cada tabela é lida e como cada junção
+    é executada, guardando a escolha nos nós (`No.acesso`).
+    
+    - Tabelas: varredura completa ou busca por um índice cuja primeira coluna aparece em uma seleção de igualdade ou
+      de intervalo com um literal logo acima da tabela (passando apenas por seleções e projeções), o que for mais
+      barato. A varredura lê todas as linhas; a busca desce o índice (log₂ das linhas) e lê as linhas selecionadas,
+      cada uma com custo `CUSTO_LINHA_INDICE` (ou 1, pela chave primária). As seleções continuam na árvore.
+    - Junções com chaves de equi-junção: por hash ou, quando um dos lados é uma tabela (com seleções e projeções
+      acima dela) com índice na sua coluna da chave e o outro lado é pequeno, por laços aninhados com índice: para
+      cada linha do lado externo, as linhas correspondentes do lado interno são buscadas pelo índice, em vez de o
+      lado interno ser lido inteiro. A tabela do lado interno passa a ser lida pela busca, com a chave da junção.
+    - Junções sem chaves e produtos: laços aninhados.
+    
+    Deve ser o último passo do otimizador, já que as demais otimizações reconstroem os nós sem os caminhos de acesso.
+    
+    Args:
+        arvore (Arvore): A árvore (em geral, já otimizada).
+        estatisticas (Optional[EstatisticasBanco]): As estatísticas e os índices a serem usados. Padrão é os do banco `db_vendas.db`.
+        
+    Returns:
+        Arvore: A árvore com os caminhos de acesso nas tabelas, junções e produtos.
+    """
+    raiz = arvore.raiz
+    if raiz is None:
+        return Arvore()
+    estatisticas = estatisticas or obter_estatisticas()
+    tabelas_por_alias = _tabelas_por_alias(raiz)
+    
+    # Predicados das seleções logo acima de cada tabela (passando apenas por seleções e projeções), por id da tabela
+    selecoes_acima: dict[int, tuple[Predicado, ...]] = {}
+    pilha: list[tuple[No, tuple[Predicado, ...]]] = [(raiz, ())]
+    while pilha:
+        no, predicados = pilha.pop()
+        if no.operacao is Operacao.TABLE:
+            selecoes_acima[id(no)] = predicados
+        elif no.operacao is Operacao.SELECT:
+            pilha.append((no.filho_esq, predicados + no.predicados))
+        elif no.operacao is Operacao.PROJECT:
+            pilha.append((no.filho_esq, predicados))
+        else:
+            pilha.extend((filho, ()) for filho in (no.filho_dir, no.filho_esq) if filho is not None)
+    
+    # Cardinalidades estimadas dos nós já planejados (como em `estimar_cardinalidade`)
+    cardinalidades: dict[int, float] = {}
+    
+    def planejar(no: No) -> No:
+        if no.operacao is Operacao.TABLE:
+            # As tabelas não têm filhos, então `transformar_arvore` as passa sem copiar (o id é o da árvore original)
+            no = no.com_acesso(_acesso_tabela(no, selecoes_acima.get(id(no), ()), tabelas_por_alias, estatisticas))
+            cardinalidade = float(estatisticas.linhas(tabelas_por_alias[no.alias]))
+        else:
+            cardinalidade = cardinalidades[id(no.filho_esq)]
+            if no.filho_dir is not None:
+                cardinalidade *= cardinalidades[id(no.filho_dir)]
+            for predicado in no.predicados:
+                cardinalidade *= estimar_seletividade(predicado, tabelas_por_alias, estatisticas)
+            if no.operacao in (Operacao.JOIN, Operacao.PRODUCT):
+                no = _planejar_juncao(no, cardinalidades, tabelas_por_alias, estatisticas)
+        cardinalidades[id(no)] = cardinalidade
+        return no
+    
+    return Arvore(transformar_arvore(raiz, planejar))
+
+def custo_busca_indice(linhas_tabela: float, linhas_lidas: float, indice: str) -> float:
+    """
+    Custo estimado de uma busca por índice: a descida no índice mais a leitura das linhas encontradas.
+    """
+    return math.log2(linhas_tabela + 1) + linhas_lidas * (1.0 if indice == CHAVE_PRIMARIA else CUSTO_LINHA_INDICE)
+
+def _acesso_tabela(no: No, predicados: tuple[Predicado, ...], tabelas_por_alias: dict[str, str], estatisticas: EstatisticasBanco) -> CaminhoAcesso:
+    """
+    Escolhe entre a varredura completa e a busca por índice por um dos predicados das seleções acima da tabela.
+    """
+    tabela = tabelas_por_alias[no.alias]
+    linhas = float(estatisticas.linhas(tabela))
+    melhor = CaminhoAcesso(MetodoAcesso.VARREDURA, linhas)
+    for predicado in predicados:
+        coluna = predicado.esquerda
+        if (
+            predicado.operador not in OPERADORES_INDEXAVEIS
+            or not isinstance(coluna, Coluna) or coluna.alias != no.alias
+            or isinstance(predicado.direita, Coluna)
+        ):
+            continue
+        indice = estatisticas.indice(tabela, coluna.nome)
+        if indice is None:
+            continue
+        custo = custo_busca_indice(linhas, linhas * estimar_seletividade(predicado, tabelas_por_alias, estatisticas), indice)
+        if custo < melhor.custo:
+            melhor = CaminhoAcesso(MetodoAcesso.INDICE, custo, indice, predicado)
+    return melhor
+
+def tabela_da_cadeia(no: No) -> Optional[No]:
+    """
+    Se o nó for uma tabela ou uma cadeia de seleções e projeções sobre uma tabela, retorna a tabela.
+    """
+    while no.operacao in (Operacao.SELECT, Operacao.PROJECT):
+        no = no.filho_esq
+    return no if no.operacao is Operacao.TABLE else None
+
+def _planejar_juncao(no: No, cardinalidades: dict[int, float], tabelas_por_alias: dict[str, str], estatisticas: EstatisticasBanco) -> No:
+    """
+    Escolhe o algoritmo de uma junção ou produto (cujos filhos já foram planejados).
+    """
+    cardinalidade_esq, cardinalidade_dir = cardinalidades[id(no.filho_esq)], cardinalidades[id(no.filho_dir)]
+    chaves = no.chaves_equijuncao()
+    if not chaves:
+        return no.com_acesso(CaminhoAcesso(MetodoAcesso.LACOS, cardinalidade_esq * cardinalidade_dir))
+    
+    melhor = CaminhoAcesso(MetodoAcesso.JUNCAO_HASH, cardinalidade_esq + cardinalidade_dir)
+    busca: Optional[CaminhoAcesso] = None
+    for coluna_esq, coluna_dir in chaves:
+        for interno, interna, externa, cardinalidade_externo in (
+            ("dir", coluna_dir, coluna_esq, cardinalidade_esq),
+            ("esq", coluna_esq, coluna_dir, cardinalidade_dir),
+        ):
+            tabela_no = tabela_da_cadeia(no.filho_dir if interno == "dir" else no.filho_esq)
+            if tabela_no is None or tabela_no.alias != interna.alias:
+                continue
+            tabela = tabelas_por_alias[tabela_no.alias]
+            indice = estatisticas.indice(tabela, interna.nome)
+            if indice is None:
+                continue
+            linhas = float(estatisticas.linhas(tabela))
+            custo_busca = custo_busca_indice(linhas, linhas / max(1, estatisticas.distintos(tabela, interna.nome)), indice)
+            custo = cardinalidade_externo * custo_busca
+            # A junção por hash precisa ler o lado interno inteiro, pelo caminho de acesso da tabela
+            if custo < cardinalidade_esq + cardinalidade_dir + tabela_no.acesso.custo and (busca is None or custo < melhor.custo):
+                predicado = Predicado(interna, "=", externa)
+                melhor = CaminhoAcesso(MetodoAcesso.LACOS_INDICE, custo, indice, predicado, interno)
+                busca = CaminhoAcesso(MetodoAcesso.INDICE, custo_busca, indice, predicado)
+    
+    if busca is None:
+        return no.com_acesso(melhor)
+    # A tabela do lado interno passa a ser lida pela busca, com a chave vinda do lado externo
+    ler_pela_busca = lambda atual: atual.com_acesso(busca) if atual.operacao is Operacao.TABLE else atual
+    if melhor.interno == "dir":
+        return no.com_filhos(no.filho_esq, transformar_arvore(no.filho_dir, ler_pela_busca)).com_acesso(melhor)
+    return no.com_filhos(transformar_arvore(no.filho_esq, ler_pela_busca), no.filho_dir).com_acesso(melhor)
+
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+## MODELOS DE PLANO PARA CONSULTAS PARAMETRIZADAS (PREPARED) ##
+## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ## ##
+
+# Número máximo de planos otimizados guardados por modelo (um por combinação de baldes dos parâmetros)
+LIMITE_PLANOS_POR_MODELO: int = 32
+
+_MARCADOR_REGEX = re.compile(r"\$(\d+)")
+
+class ModeloPlano:
+    def __init__(self: ModeloPlano, impressao_digital: str, algebra_modelo: Union[str, NoAlgebra]) -> None:
+        """
+        Plano construído uma única vez para uma forma de consulta. Os literais aparecem como marcadores `$1`, `$2`,
+        ... e são substituídos a cada uso por `instanciar`.
+        
+        O plano otimizado depende dos valores quando um parâmetro é comparado por intervalo (`<`, `<=`, `>`, `>=`) a
+        uma coluna: `preco > 1` e `preco > 98` podem pedir caminhos de acesso diferentes. Por isso o modelo guarda um
+        plano por combinação dos baldes do histograma em que caem esses parâmetros (ver `EstatisticasBanco.balde`),
+        otimizado com os valores da primeira consulta da combinação (`EstatisticasBanco.com_parametros`). Igualdades
+        não entram na chave, pois a estimativa delas não depende do valor.
+        
+        Args:
+            impressao_digital (str): A impressão digital da consulta (literais trocados por '?').
+            algebra_modelo (Union[str, NoAlgebra]): A álgebra relacional da consulta (string ou representação
+                intermediária) com marcadores no lugar dos literais.
+        """
+        self.impressao_digital = impressao_digital
+        self.algebra_modelo = str(algebra_modelo)
+        self.arvore_modelo = converter_algebra_em_arvore(algebra_modelo)
+        self.parametros_intervalo = _parametros_intervalo(self.arvore_modelo)
+        self.planos: dict[tuple[Optional[int], ...], Arvore] = {}
+        self._estatisticas: Optional[EstatisticasBanco] = None
+    
+    def baldes(self: ModeloPlano, parametros: tuple[str, ...], estatisticas: EstatisticasBanco) -> tuple[Optional[int], ...]:
+        """
+        Retorna a chave do plano para os literais: o balde de cada parâmetro comparado por intervalo.
+        """
+        return tuple(estatisticas.balde(tabela, coluna, parametros[posicao]) for posicao, tabela, coluna in self.parametros_intervalo)
+    
+    def plano(self: ModeloPlano, parametros: tuple[str, ...], estatisticas: Optional[EstatisticasBanco] = None) -> Arvore:
+        """
+        Retorna o plano otimizado (com marcadores) adequado aos literais, otimizando-o se a combinação de baldes
+        ainda não tiver um. Se as estatísticas mudarem (por exemplo, depois de alterações no banco), os planos
+        guardados são descartados.
+        
+        Args:
+            parametros (tuple[str, ...]): Os literais da consulta, na ordem em que aparecem no SQL.
+            estatisticas (Optional[EstatisticasBanco]): As estatísticas do banco. Padrão é `obter_estatisticas()`.
             
-            # Conecta a projeção ao pai original
-            if projecao.pai:
-                if projecao.pai.filho_esq == no:
-                    projecao.pai.filho_esq = projecao
-                elif projecao.pai.filho_dir == no:
-                    projecao.pai.filho_dir = projecao
+        Returns:
+            Arvore: A árvore otimizada, com marcadores.
+        """
+        estatisticas = estatisticas or obter_estatisticas()
+        if estatisticas is not self._estatisticas:
+            self.planos.clear()
+            self._estatisticas = estatisticas
+        chave = self.baldes(parametros, estatisticas)
+        plano = self.planos.get(chave)
+        if plano is None:
+            com_valores = estatisticas.com_parametros(parametros)
+            plano = planejar_acesso(otimizar_projecoes(otimizar_selects(reordenar_juncoes(self.arvore_modelo, com_valores), com_valores)), com_valores)
+            if len(self.planos) >= LIMITE_PLANOS_POR_MODELO:
+                # Descarta o plano mais antigo
+                del self.planos[next(iter(self.planos))]
+            self.planos[chave] = plano
+        return plano
+        
+    def instanciar(self: ModeloPlano, parametros: tuple[str, ...], estatisticas: Optional[EstatisticasBanco] = None) -> tuple[str, Arvore, Arvore]:
+        """
+        Vincula os literais de uma consulta ao modelo.
+        
+        Args:
+            parametros (tuple[str, ...]): Os literais da consulta, na ordem em que aparecem no SQL.
+            estatisticas (Optional[EstatisticasBanco]): As estatísticas usadas para escolher e otimizar o plano.
             
-            return projecao
+        Returns:
+            tuple[str, Arvore, Arvore]: A álgebra relacional, a árvore não otimizada e a árvore otimizada.
+        """
+        algebra = bind_parameters(self.algebra_modelo, parametros)
+        return algebra, vincular_parametros(self.arvore_modelo, parametros), vincular_parametros(self.plano(parametros, estatisticas), parametros)
+
+def _parametros_intervalo(arvore: Arvore) -> list[tuple[int, str, str]]:
+    """
+    Lista os parâmetros comparados por intervalo a uma coluna, como (posição do parâmetro, tabela, coluna).
+    """
+    tabelas_por_alias = _tabelas_por_alias(arvore.raiz)
+    parametros = []
+    for no in arvore.nos():
+        for predicado in no.predicados:
+            coluna, direita = predicado.esquerda, predicado.direita
+            if predicado.operador in ("<", "<=", ">", ">=") and isinstance(coluna, Coluna) and isinstance(direita, str):
+                marcador = _MARCADOR_REGEX.fullmatch(direita.strip())
+                if marcador is not None and coluna.alias in tabelas_por_alias:
+                    parametros.append((int(marcador.group(1)) - 1, tabelas_por_alias[coluna.alias], coluna.nome))
+    return parametros
+
+def vincular_parametros(arvore_modelo: Arvore, parametros: tuple[str, ...]) -> Arvore:
+    """
+    Cria uma versão da árvore substituindo os marcadores `$i` dos nós pelos literais correspondentes.
+    Apenas os nós com marcadores (e seus ancestrais) são recriados; o restante é compartilhado com o modelo.
     
-    # Se não houve modificação, retorna o nó original
-    return no
+    Args:
+        arvore_modelo (Arvore): A árvore com marcadores.
+        parametros (tuple[str, ...]): Os literais a serem vinculados.
+        
+    Returns:
+        Arvore: A nova árvore com os literais.
+    """
+    def vincular(no: No) -> No:
+        acesso = no.acesso
+        # O predicado da busca por índice também pode ter marcadores (por exemplo, `p.cliente_idcliente = $1`)
+        if acesso is not None and acesso.predicado is not None and "$" in str(acesso.predicado.direita):
+            predicado = acesso.predicado
+            acesso = acesso.com_predicado(Predicado(predicado.esquerda, predicado.operador, bind_parameters(predicado.direita, parametros)))
+        if "$" not in no.valor:
+            # Nó sem marcadores: é reaproveitado (compartilhado com o modelo) se os filhos também forem
+            return no if acesso is no.acesso else no.com_acesso(acesso)
+        # Os predicados são vinculados diretamente: o texto do nó não é analisado de novo, já que um literal pode
+        # conter `∧`. As anotações são descartadas, pois as estimativas valem para os literais que geraram o plano
+        predicados = [
+            Predicado(predicado.esquerda, predicado.operador, bind_parameters(predicado.direita, parametros))
+            if isinstance(predicado.direita, str) else predicado
+            for predicado in no.predicados
+        ]
+        return No(bind_parameters(no.valor, parametros), no.filho_esq, no.filho_dir, predicados=predicados, acesso=acesso, indice_aliases=no.indice_aliases)
+    
+    return Arvore(transformar_arvore(arvore_modelo.raiz, vincular))
+
+# Cache LRU de modelos, indexado pela impressão digital (também guarda os erros de validação)
+cache_modelos_plano = TranslationCache(maxsize=256)
+
+def processar_consulta_com_modelo(consulta_sql: str, estatisticas: Optional[EstatisticasBanco] = None) -> tuple[str, Arvore, Arvore]:
+    """
+    Processa uma consulta SQL reaproveitando o plano otimizado de consultas com a mesma forma.
+    Apenas na primeira ocorrência de uma impressão digital são feitos o parsing, a validação e a construção
+    da árvore; as otimizações são refeitas só quando os literais caem em outros baldes dos histogramas
+    (ver `ModeloPlano`). Nas demais, os literais são apenas vinculados ao modelo.
+    
+    Args:
+        consulta_sql (str): A consulta SQL.
+        estatisticas (Optional[EstatisticasBanco]): As estatísticas do banco. Padrão é `obter_estatisticas()`.
+        
+    Returns:
+        tuple[str, Arvore, Arvore]: A álgebra relacional, a árvore não otimizada e a árvore otimizada.
+        
+    Raises:
+        ValueError: Se a consulta for inválida.
+    """
+    consulta = parameterize_sql_query(consulta_sql)
+    encontrado, modelo = cache_modelos_plano.lookup(consulta.fingerprint)
+    if not encontrado:
+        try:
+            modelo = ModeloPlano(consulta.fingerprint, consulta.relational_algebra_ir_template())
+        except ValueError as e:
+            modelo = e.with_traceback(None)
+        cache_modelos_plano.store(consulta.fingerprint, modelo)
+    if isinstance(modelo, ValueError):
+        raise modelo
+    return modelo.instanciar(consulta.parameters, estatisticas)
 
 ## ## ## ## ## ## ##
 ## CASOS DE TESTE ##
@@ -1008,32 +2065,54 @@ def gerar_imagens(algebra: str, nome_arquivo: str) -> None:
         arvore_projecoes_otimizadas = otimizar_projecoes(arvore_nao_otimizada)
         desenhar_arvore(arvore_projecoes_otimizadas, nome_arquivo, nome_subpasta="projecoes_otimizadas")
         
-        arvore_final = otimizar_projecoes(arvore_selects_otimizadas)
+        arvore_final = planejar_acesso(otimizar_projecoes(otimizar_selects(reordenar_juncoes(arvore_nao_otimizada))))
         desenhar_arvore(arvore_final, nome_arquivo, nome_subpasta="otimizadas")
     except Exception as e:
         print(f"❌ Falha ao processar {descricao}: {e}")
     else:
         print(f"✅ Árvore gerada para {descricao} e salva como '{nome_arquivo}.png'")
 
-def gerar_imagem_arvore_processada(algebra_relacional: str):
+def obter_arvore(algebra_relacional: Union[str, NoAlgebra, Arvore]) -> Arvore:
+    """
+    Retorna a árvore de uma consulta, construindo-a apenas se ainda não for uma árvore.
+    
+    Permite que uma mesma árvore canônica, construída uma única vez por consulta, seja passada para todas as
+    visualizações (processada e otimizada): como os nós são imutáveis, as otimizações não a alteram.
+    
+    Args:
+        algebra_relacional (Union[str, NoAlgebra, Arvore]): A álgebra relacional (string ou representação intermediária) ou a árvore já construída.
+        
+    Returns:
+        Arvore: A árvore da consulta.
+    """
+    if isinstance(algebra_relacional, Arvore):
+        return algebra_relacional
+    return converter_algebra_em_arvore(algebra_relacional)
+
+def gerar_imagem_arvore_processada(algebra_relacional: Union[str, NoAlgebra, Arvore]):
     """
     Gera a imagem da árvore não-otimizada e salva em 'img/arvore_consulta_processada.png'.
+    Aceita a álgebra relacional como string ou como representação intermediária, ou a árvore já construída.
     """
     from pathlib import Path
     Path("img").mkdir(exist_ok=True)
-    arvore = converter_algebra_em_arvore(algebra_relacional)
+    arvore = obter_arvore(algebra_relacional)
     # Salva como 'img/arvore_consulta_processada.png'
     desenhar_arvore(arvore, "arvore_consulta_processada", nome_subpasta=None)
 
-def gerar_grafo_otimizado(algebra_relacional: str):
+def gerar_grafo_otimizado(algebra_relacional: Union[str, NoAlgebra, Arvore]):
     """
-    Gera a imagem da árvore otimizada (selects + projeções) e salva em 'img/arvore_consulta_otimizada.png'.
+    Gera a imagem da árvore otimizada (junções + selects + projeções + caminhos de acesso) e salva em 'img/arvore_consulta_otimizada.png'.
+    Aceita a álgebra relacional como string ou como representação intermediária, ou a árvore já construída
+    (que não é alterada: a árvore otimizada compartilha com ela as subárvores não reescritas).
     """
     from pathlib import Path
     Path("img").mkdir(exist_ok=True)
-    arvore = converter_algebra_em_arvore(algebra_relacional)
-    arvore_otimizada = otimizar_selects(arvore)
+    arvore = obter_arvore(algebra_relacional)
+    arvore_otimizada = reordenar_juncoes(arvore)
+    arvore_otimizada = otimizar_selects(arvore_otimizada)
     arvore_otimizada = otimizar_projecoes(arvore_otimizada)
+    arvore_otimizada = planejar_acesso(arvore_otimizada)
     # Salva como 'img/arvore_consulta_otimizada.png'
     desenhar_arvore(arvore_otimizada, "arvore_consulta_otimizada", nome_subpasta=None)
 
@@ -0,0 +1,616 @@
+"""
+Estatísticas das tabelas do banco de dados (`banco_de_dados/db_vendas.db`) usadas pelo otimizador baseado em custo.
+
+Para cada tabela são coletados o número de linhas e, para cada coluna, o número de valores distintos, a fração de
+nulos, o mínimo, o máximo e um histograma de mesma altura (equi-depth). Exceto o número de linhas, tudo é calculado
+sobre uma amostra de `TAMANHO_AMOSTRA` linhas (ou a tabela inteira, se menor), sorteadas pelo `rowid`, de modo que a
+coleta continua barata nas configurações com milhões de linhas. O número de valores distintos é extrapolado da
+amostra (estimador Duj1).
+
+As estatísticas são guardadas em um arquivo ao lado do banco (`db_vendas.estatisticas.json`) e a coleta é
+incremental: uma tabela só é amostrada de novo se o banco foi alterado desde a última coleta (a assinatura é a data
+de modificação e o tamanho do arquivo do banco e do seu diário WAL), e apenas quando é usada pela primeira vez. Se o
+banco não existir, estiver vazio ou não tiver a tabela, são usados valores padrão (`LINHAS_PADRAO` e `FRACAO_DISTINTOS_PADRAO`), de
+modo que o otimizador continua funcionando sem dados; uma tabela existente e vazia tem 0 linhas.
+
+A partir das estatísticas, `estimar_seletividade` estima a fração das linhas que satisfaz um predicado:
+    coluna = literal      (1 - nulos) / distintos(coluna)
+    coluna <> literal     (1 - nulos) * (1 - 1 / distintos(coluna))
+    coluna < literal      (1 - nulos) * fração do histograma abaixo do literal (idem para <=, >, >=)
+    coluna = coluna       (1 - nulos1) * (1 - nulos2) / max(distintos(coluna1), distintos(coluna2))
+    demais comparações    SELETIVIDADE_INTERVALO
+
+Os índices do banco (`EstatisticasBanco.indices`) também ficam disponíveis para o planejamento físico: são lidos do
+`sqlite_master` e, se o banco não existir ou estiver vazio, dos scripts de criação (`criacao/tabelas.sql` e
+`criacao/indexes.sql`).
+
+Uso (coleta de todas as tabelas do esquema):
+    python estatisticas.py [caminho do banco]
+"""
+
+from __future__ import annotations
+import copy
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from parser import bind_parameters, get_schema_catalog
+from algebra_relacional import Coluna, Predicado
+
+CAMINHO_BANCO: Path = Path(__file__).parent / "banco_de_dados" / "db_vendas.db"
+CAMINHO_CRIACAO: Path = Path(__file__).parent / "banco_de_dados" / "definicao_banco" / "criacao"
+
+# Nome dado à chave primária INTEGER, que é o próprio rowid da tabela e funciona como um índice
+CHAVE_PRIMARIA: str = "PRIMARY KEY"
+
+# Valores usados quando o banco não tem dados para uma tabela
+LINHAS_PADRAO: int = 1000
+FRACAO_DISTINTOS_PADRAO: float = 0.1
+
+# Seletividade das comparações de intervalo sem histograma e de comparações entre colunas que não são igualdades
+SELETIVIDADE_INTERVALO: float = 1 / 3
+
+# Parâmetros da coleta
+TAMANHO_AMOSTRA: int = 10_000
+NUMERO_BALDES: int = 16
+# Amostragem pelo `rowid`: abaixo desta fração de `rowid`s ocupados (ou depois destas rodadas de sorteio), os `rowid`s
+# existentes são listados
+DENSIDADE_MINIMA_AMOSTRA: float = 0.05
+RODADAS_AMOSTRA: int = 4
+VERSAO_ARQUIVO: int = 2
+
+Valor = Union[int, float, str]
+
+class EstatisticasColuna:
+    """
+    Estatísticas de uma coluna. O histograma é a lista dos `NUMERO_BALDES + 1` limites dos baldes (cada balde tem
+    a mesma fração dos valores não nulos); só existe se todos os valores forem números ou todos forem textos.
+    """
+    __slots__ = ("distintos", "fracao_nulos", "minimo", "maximo", "histograma")
+
+    def __init__(
+        self: EstatisticasColuna,
+        distintos: int,
+        fracao_nulos: float = 0.0,
+        minimo: Optional[Valor] = None,
+        maximo: Optional[Valor] = None,
+        histograma: Optional[list[Valor]] = None,
+    ) -> None:
+        self.distintos = distintos
+        self.fracao_nulos = fracao_nulos
+        self.minimo = minimo
+        self.maximo = maximo
+        self.histograma = histograma
+
+    def fracao_menor(self: EstatisticasColuna, valor: Valor) -> Optional[float]:
+        """
+        Estima a fração dos valores não nulos estritamente menores que `valor` a partir do histograma.
+        Dentro de um balde, a fração é interpolada linearmente (números) ou considerada a metade do balde (textos).
+        Retorna None se não houver histograma ou se o valor não for comparável com os da coluna.
+        """
+        limites = self.histograma
+        if not limites or isinstance(valor, str) != isinstance(limites[0], str):
+            return None
+        if valor <= limites[0]:
+            return 0.0
+        if valor > limites[-1]:
+            return 1.0
+        balde = bisect_left(limites, valor) - 1
+        inicio, fim = limites[balde], limites[balde + 1]
+        parcial = (valor - inicio) / (fim - inicio) if not isinstance(valor, str) else 0.5
+        return (balde + parcial) / (len(limites) - 1)
+
+    def balde(self: EstatisticasColuna, valor: Valor) -> Optional[int]:
+        """
+        Retorna o balde do histograma em que o valor cai: de 0 (até o mínimo) ao número de baldes (acima do máximo).
+        Valores no mesmo balde têm estimativas de intervalo parecidas. Retorna None nos casos de `fracao_menor`.
+        """
+        fracao = self.fracao_menor(valor)
+        return int(fracao * (len(self.histograma) - 1)) if fracao is not None else None
+
+    def para_dict(self: EstatisticasColuna) -> dict:
+        return {nome: getattr(self, nome) for nome in EstatisticasColuna.__slots__}
+
+    @staticmethod
+    def de_dict(dados: dict) -> EstatisticasColuna:
+        return EstatisticasColuna(**{nome: dados.get(nome) for nome in EstatisticasColuna.__slots__ if nome in dados})
+
+class EstatisticasTabela:
+    """
+    Estatísticas de uma tabela: número de linhas, estatísticas por coluna (nomes normalizados) e a assinatura
+    do banco no momento da coleta (ver `_assinatura`), usada para decidir se a tabela precisa ser coletada de novo.
+    """
+    __slots__ = ("linhas", "colunas", "assinatura")
+
+    def __init__(self: EstatisticasTabela, linhas: int, colunas: Optional[dict[str, EstatisticasColuna]] = None, assinatura: Optional[list[int]] = None) -> None:
+        self.linhas = linhas
+        self.colunas = colunas or {}
+        self.assinatura = assinatura
+
+    def para_dict(self: EstatisticasTabela) -> dict:
+        return {
+            "linhas": self.linhas,
+            "assinatura": self.assinatura,
+            "colunas": {nome: coluna.para_dict() for nome, coluna in self.colunas.items()},
+        }
+
+    @staticmethod
+    def de_dict(dados: dict) -> EstatisticasTabela:
+        colunas = {nome: EstatisticasColuna.de_dict(coluna) for nome, coluna in dados.get("colunas", {}).items()}
+        return EstatisticasTabela(dados["linhas"], colunas, dados.get("assinatura"))
+
+class EstatisticasBanco:
+    """
+    Estatísticas das tabelas de um banco, coletadas sob demanda e guardadas no arquivo ao lado do banco.
+    """
+    def __init__(
+        self: EstatisticasBanco,
+        caminho: Optional[Union[str, Path]] = None,
+        linhas: Optional[dict[str, int]] = None,
+        distintos: Optional[dict[str, dict[str, int]]] = None,
+        tamanho_amostra: int = TAMANHO_AMOSTRA,
+        indices: Optional[dict[str, dict[str, str]]] = None,
+    ) -> None:
+        """
+        Args:
+            caminho (Optional[Union[str, Path]]): Caminho do banco SQLite. Se None, nenhuma estatística é lida do banco.
+            linhas (Optional[dict[str, int]]): Contagens de linhas já conhecidas, por tabela (nomes normalizados).
+            distintos (Optional[dict[str, dict[str, int]]]): Contagens de valores distintos já conhecidas, por tabela e coluna.
+            tamanho_amostra (int): Número máximo de linhas amostradas por tabela na coleta.
+            indices (Optional[dict[str, dict[str, str]]]): Índices já conhecidos (ver `indices`). Se None, são lidos
+                do banco quando usados pela primeira vez.
+        """
+        self.caminho = Path(caminho) if caminho is not None else None
+        self.tamanho_amostra = tamanho_amostra
+        self._indices = indices
+        self.tabelas: dict[str, EstatisticasTabela] = {}
+        # Tabelas cujas estatísticas já foram conferidas com o banco neste processo
+        self._verificadas: set[str] = set()
+        # Literais dos marcadores `$i` de uma consulta parametrizada, usados nas estimativas (ver `com_parametros`)
+        self.parametros: tuple[str, ...] = ()
+
+        for tabela in set(linhas or {}) | set(distintos or {}):
+            colunas = {coluna: EstatisticasColuna(contagem) for coluna, contagem in (distintos or {}).get(tabela, {}).items()}
+            self.tabelas[tabela] = EstatisticasTabela((linhas or {}).get(tabela, LINHAS_PADRAO), colunas)
+            self._verificadas.add(tabela)
+
+        if self.caminho is not None:
+            self._carregar_arquivo()
+
+    @property
+    def caminho_arquivo(self: EstatisticasBanco) -> Optional[Path]:
+        """
+        Caminho do arquivo em que as estatísticas são guardadas (`<banco>.estatisticas.json`).
+        """
+        return self.caminho.with_suffix(".estatisticas.json") if self.caminho is not None else None
+
+    def _carregar_arquivo(self: EstatisticasBanco) -> None:
+        """
+        Carrega as estatísticas guardadas. Um arquivo ausente, ilegível ou de outra versão é ignorado.
+        """
+        try:
+            dados = json.loads(self.caminho_arquivo.read_text(encoding="utf-8"))
+            if dados.get("versao") != VERSAO_ARQUIVO:
+                return
+            for tabela, estatisticas in dados["tabelas"].items():
+                self.tabelas.setdefault(tabela, EstatisticasTabela.de_dict(estatisticas))
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+
+    def _salvar_arquivo(self: EstatisticasBanco) -> None:
+        """
+        Grava as estatísticas de forma atômica (arquivo temporário + renomeação), para que processos
+        concorrentes nunca leiam um arquivo pela metade.
+        """
+        dados = {"versao": VERSAO_ARQUIVO, "tabelas": {tabela: estatisticas.para_dict() for tabela, estatisticas in sorted(self.tabelas.items())}}
+        temporario = self.caminho_arquivo.with_name(f"{self.caminho_arquivo.name}.{os.getpid()}.tmp")
+        try:
+            temporario.write_text(json.dumps(dados, ensure_ascii=False, indent=1), encoding="utf-8")
+            os.replace(temporario, self.caminho_arquivo)
+        except OSError:
+            temporario.unlink(missing_ok=True)
+
+    def _conectar(self: EstatisticasBanco) -> Optional[sqlite3.Connection]:
+        """
+        Abre o banco somente para leitura (sem criá-lo, se não existir). Retorna None se não for possível.
+        """
+        if self.caminho is None or not self.caminho.is_file() or self.caminho.stat().st_size == 0:
+            return None
+        try:
+            return sqlite3.connect(f"{self.caminho.resolve().as_uri()}?mode=ro", uri=True)
+        except sqlite3.Error:
+            return None
+
+    def coletar(self: EstatisticasBanco, tabelas: Optional[Iterable[str]] = None, forcar: bool = False) -> EstatisticasBanco:
+        """
+        Coleta as estatísticas das tabelas (todas as do esquema, se None) e grava o arquivo.
+        As tabelas cuja assinatura não mudou desde a última coleta são mantidas, a menos que `forcar` seja True.
+
+        Args:
+            tabelas (Optional[Iterable[str]]): As tabelas a serem coletadas (nomes normalizados).
+            forcar (bool): Se True, coleta as tabelas mesmo que não tenham mudado.
+
+        Returns:
+            EstatisticasBanco: As próprias estatísticas.
+        """
+        tabelas = list(tabelas) if tabelas is not None else list(get_schema_catalog().columns)
+        self._verificadas.update(tabelas)
+        self._atualizar(tabelas, forcar)
+        return self
+
+    def _atualizar(self: EstatisticasBanco, tabelas: Iterable[str], forcar: bool = False) -> None:
+        """
+        Coleta as tabelas que mudaram (ou ainda não foram coletadas) e grava o arquivo se alguma foi coletada.
+        """
+        conexao = self._conectar()
+        if conexao is None:
+            return
+        alteradas = False
+        try:
+            existentes = {nome.lower() for nome, in conexao.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for tabela in tabelas:
+                # O nome só é usado no SQL se for uma tabela do esquema
+                if tabela not in get_schema_catalog().columns or tabela not in existentes:
+                    continue
+                atual = self.tabelas.get(tabela)
+                if not forcar and atual is not None and atual.assinatura == _assinatura(conexao):
+                    continue
+                self.tabelas[tabela] = coletar_tabela(conexao, tabela, self.tamanho_amostra)
+                alteradas = True
+        except sqlite3.Error:
+            pass
+        finally:
+            conexao.close()
+        if alteradas:
+            self._salvar_arquivo()
+
+    def tabela(self: EstatisticasBanco, tabela: str) -> Optional[EstatisticasTabela]:
+        """
+        Retorna as estatísticas de uma tabela, coletando-as na primeira consulta se tiverem mudado no banco.
+        """
+        if tabela not in self._verificadas:
+            self._verificadas.add(tabela)
+            self._atualizar((tabela,))
+        return self.tabelas.get(tabela)
+
+    def com_parametros(self: EstatisticasBanco, parametros: tuple[str, ...]) -> EstatisticasBanco:
+        """
+        Retorna uma visão das estatísticas (que compartilha as tabelas já coletadas) em que os marcadores `$i` dos
+        predicados são estimados com os literais informados, em vez de com as seletividades padrão. Usada para
+        otimizar um modelo de plano sem vincular os literais à árvore.
+        """
+        visao = copy.copy(self)
+        visao.parametros = tuple(parametros)
+        return visao
+
+    def balde(self: EstatisticasBanco, tabela: str, coluna: str, literal: str) -> Optional[int]:
+        """
+        Retorna o balde do histograma da coluna em que o literal (como escrito no SQL) cai, ou None se não houver
+        histograma ou se o literal não for comparável com os valores da coluna.
+        """
+        estatisticas = self.coluna(tabela, coluna)
+        valor = _valor_literal(literal)
+        return estatisticas.balde(valor) if estatisticas is not None and valor is not None else None
+
+    def coluna(self: EstatisticasBanco, tabela: str, coluna: str) -> Optional[EstatisticasColuna]:
+        """
+        Retorna as estatísticas de uma coluna, se conhecidas.
+        """
+        estatisticas = self.tabela(tabela)
+        return estatisticas.colunas.get(coluna) if estatisticas is not None else None
+
+    def linhas(self: EstatisticasBanco, tabela: str) -> int:
+        """
+        Retorna o número de linhas de uma tabela: 0 se ela estiver vazia e `LINHAS_PADRAO` se o banco não tiver
+        estatísticas para ela. Quem divide pelo resultado deve limitá-lo a 1.
+        """
+        estatisticas = self.tabela(tabela)
+        return estatisticas.linhas if estatisticas is not None else LINHAS_PADRAO
+
+    def distintos(self: EstatisticasBanco, tabela: str, coluna: str) -> int:
+        """
+        Retorna o número de valores distintos de uma coluna (ao menos 1, já que é usado como divisor). Sem dados no
+        banco, a chave primária INTEGER (ver `indices`) é considerada única e as demais colunas têm
+        `FRACAO_DISTINTOS_PADRAO` das linhas como valores distintos.
+        """
+        estatisticas = self.coluna(tabela, coluna)
+        if estatisticas is not None and estatisticas.distintos:
+            return estatisticas.distintos
+        linhas = self.linhas(tabela)
+        if self.indice(tabela, coluna) == CHAVE_PRIMARIA:
+            return max(1, linhas)
+        return max(1, int(linhas * FRACAO_DISTINTOS_PADRAO))
+
+    def indices(self: EstatisticasBanco) -> dict[str, dict[str, str]]:
+        """
+        Retorna os índices do banco: para cada tabela, as colunas que iniciam algum índice e o nome do índice
+        (`CHAVE_PRIMARIA` para a chave primária INTEGER). Como só a primeira coluna de um índice permite buscas por
+        ela sozinha, as demais colunas de índices compostos não são incluídas.
+
+        São lidos do banco na primeira chamada. Se o banco não existir ou não tiver tabelas, são usados os índices
+        definidos nos scripts de criação, que são os que o banco terá depois de populado.
+        """
+        if self._indices is None:
+            conexao = self._conectar()
+            try:
+                self._indices = ler_indices(conexao) if conexao is not None else {}
+            except sqlite3.Error:
+                self._indices = {}
+            finally:
+                if conexao is not None:
+                    conexao.close()
+            if not self._indices:
+                self._indices = indices_dos_scripts()
+        return self._indices
+
+    def indice(self: EstatisticasBanco, tabela: str, coluna: str) -> Optional[str]:
+        """
+        Retorna o nome de um índice que começa pela coluna (None se não houver).
+        """
+        return self.indices().get(tabela, {}).get(coluna)
+
+# --- Índices ---
+
+def ler_indices(conexao: sqlite3.Connection) -> dict[str, dict[str, str]]:
+    """
+    Lê, do `sqlite_master`, as colunas que iniciam algum índice em cada tabela do esquema (ver
+    `EstatisticasBanco.indices`).
+    """
+    indices: dict[str, dict[str, str]] = {}
+    for tabela, in conexao.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+        # O nome só é usado no SQL se for uma tabela do esquema
+        if tabela.lower() not in get_schema_catalog().columns:
+            continue
+        colunas = indices.setdefault(tabela.lower(), {})
+        chaves = [(coluna, tipo) for _, coluna, tipo, _, _, posicao_chave in conexao.execute(f"PRAGMA table_info({tabela})") if posicao_chave]
+        if len(chaves) == 1 and chaves[0][1].upper() == "INTEGER":
+            colunas[chaves[0][0].lower()] = CHAVE_PRIMARIA
+        for _, indice, *_ in conexao.execute(f"PRAGMA index_list({tabela})").fetchall():
+            primeira = min(conexao.execute(f'PRAGMA index_info("{indice}")').fetchall(), default=None)
+            if primeira is not None and primeira[2] is not None:
+                colunas.setdefault(primeira[2].lower(), indice)
+    return indices
+
+def indices_dos_scripts() -> dict[str, dict[str, str]]:
+    """
+    Índices definidos nos scripts de criação do banco, lidos de um banco em memória criado com eles.
+    """
+    conexao = sqlite3.connect(":memory:")
+    try:
+        for script in ("tabelas.sql", "indexes.sql"):
+            conexao.executescript((CAMINHO_CRIACAO / script).read_text(encoding="utf-8"))
+        return ler_indices(conexao)
+    except (OSError, sqlite3.Error):
+        return {}
+    finally:
+        conexao.close()
+
+# --- Coleta ---
+
+def _assinatura(conexao: sqlite3.Connection) -> list[int]:
+    """
+    Data de modificação (em nanossegundos) e tamanho do arquivo do banco e do seu diário WAL (zeros se não houver).
+    Qualquer escrita muda a assinatura, inclusive UPDATEs e exclusões seguidas de inserções que mantêm o número de
+    linhas e os `rowid`s. Como o SQLite não diz qual tabela foi escrita, a assinatura é a mesma para todas as tabelas:
+    depois de uma alteração, cada tabela é coletada de novo na primeira vez em que for usada.
+    """
+    arquivo = conexao.execute("PRAGMA database_list").fetchone()[2]
+    assinatura = []
+    for caminho in (arquivo, f"{arquivo}-wal") if arquivo else ():
+        try:
+            situacao = os.stat(caminho)
+            assinatura += [situacao.st_mtime_ns, situacao.st_size]
+        except OSError:
+            assinatura += [0, 0]
+    return assinatura
+
+def _ler_por_rowid(conexao: sqlite3.Connection, tabela: str, selecao: str, rowids: list[int]) -> dict[int, tuple]:
+    """
+    Lê as linhas dos `rowid`s informados que existem na tabela, indexadas pelo `rowid`.
+    """
+    linhas: dict[int, tuple] = {}
+    # Em blocos, para respeitar o limite de parâmetros por comando do SQLite
+    for inicio in range(0, len(rowids), 500):
+        bloco = rowids[inicio:inicio + 500]
+        for rowid, *valores in conexao.execute(f"SELECT rowid, {selecao} FROM {tabela} WHERE rowid IN ({', '.join('?' * len(bloco))})", bloco):
+            linhas[rowid] = tuple(valores)
+    return linhas
+
+def _amostrar(conexao: sqlite3.Connection, tabela: str, colunas: list[str], linhas: int, tamanho_amostra: int, aleatorio: random.Random) -> list[tuple]:
+    """
+    Lê a tabela inteira, se couber na amostra, ou exatamente `tamanho_amostra` linhas sorteadas de modo uniforme.
+
+    Os `rowid`s são sorteados entre o menor e o maior, em rodadas: como a tabela pode ter lacunas (linhas
+    excluídas), cada rodada sorteia mais `rowid`s que os que faltam, na proporção de linhas por `rowid` da faixa, e
+    completa a amostra na ordem do sorteio. Se a faixa for esparsa demais (ou as rodadas se esgotarem), os `rowid`s
+    existentes são listados e os que faltam são sorteados entre eles.
+    """
+    selecao = ", ".join(f'"{coluna}"' for coluna in colunas)
+    if linhas <= tamanho_amostra:
+        return conexao.execute(f"SELECT {selecao} FROM {tabela}").fetchall()
+
+    menor, maior = conexao.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {tabela}").fetchone()
+    faixa = maior - menor + 1
+    densidade = linhas / faixa
+    amostra: list[tuple] = []
+    sorteados: set[int] = set()
+    rodadas = RODADAS_AMOSTRA if densidade >= DENSIDADE_MINIMA_AMOSTRA else 0
+    while len(amostra) < tamanho_amostra and rodadas:
+        rodadas -= 1
+        faltam = tamanho_amostra - len(amostra)
+        quantidade = min(faixa, math.ceil(faltam / densidade * 1.2) + 10)
+        rowids = [rowid for rowid in aleatorio.sample(range(menor, maior + 1), quantidade) if rowid not in sorteados]
+        sorteados.update(rowids)
+        encontradas = _ler_por_rowid(conexao, tabela, selecao, rowids)
+        amostra += [encontradas[rowid] for rowid in rowids if rowid in encontradas][:faltam]
+
+    if len(amostra) < tamanho_amostra:
+        # Os rowids já sorteados que existem estão na amostra; os demais são sorteados entre os existentes ainda não lidos
+        existentes = [rowid for rowid, in conexao.execute(f"SELECT rowid FROM {tabela}") if rowid not in sorteados]
+        rowids = aleatorio.sample(existentes, min(tamanho_amostra - len(amostra), len(existentes)))
+        amostra += _ler_por_rowid(conexao, tabela, selecao, rowids).values()
+    return amostra
+
+def _estimar_distintos(valores: list[Valor], linhas_nao_nulas: float) -> int:
+    """
+    Estima o número de valores distintos da coluna a partir dos valores não nulos da amostra (estimador Duj1 de
+    Haas e Stokes): quanto mais valores aparecem uma única vez na amostra, mais a contagem é extrapolada, até o
+    número de linhas quando todos os valores da amostra são diferentes.
+    """
+    frequencias = Counter(valores)
+    distintos_amostra = len(frequencias)
+    if len(valores) >= linhas_nao_nulas:
+        return distintos_amostra
+    unicos = sum(1 for frequencia in frequencias.values() if frequencia == 1)
+    fracao_amostrada = len(valores) / linhas_nao_nulas
+    denominador = 1 - (1 - fracao_amostrada) * unicos / len(valores)
+    estimativa = distintos_amostra / denominador if denominador > 0 else linhas_nao_nulas
+    return int(min(max(estimativa, distintos_amostra), linhas_nao_nulas))
+
+def _resumir_coluna(valores: list[Optional[Valor]], linhas: int) -> EstatisticasColuna:
+    """
+    Calcula as estatísticas de uma coluna a partir dos seus valores na amostra.
+    """
+    nao_nulos = [valor for valor in valores if valor is not None]
+    if not nao_nulos:
+        return EstatisticasColuna(0, 1.0 if valores else 0.0)
+    fracao_nulos = 1 - len(nao_nulos) / len(valores)
+    distintos = _estimar_distintos(nao_nulos, linhas * (1 - fracao_nulos))
+
+    numeros = all(isinstance(valor, (int, float)) and not isinstance(valor, bool) for valor in nao_nulos)
+    textos = all(isinstance(valor, str) for valor in nao_nulos)
+    if not (numeros or textos):
+        return EstatisticasColuna(distintos, fracao_nulos)
+
+    ordenados = sorted(nao_nulos)
+    baldes = min(NUMERO_BALDES, len(ordenados))
+    histograma = [ordenados[i * len(ordenados) // baldes] for i in range(baldes)] + [ordenados[-1]]
+    return EstatisticasColuna(distintos, fracao_nulos, ordenados[0], ordenados[-1], histograma)
+
+def coletar_tabela(conexao: sqlite3.Connection, tabela: str, tamanho_amostra: int = TAMANHO_AMOSTRA, semente: int = 0) -> EstatisticasTabela:
+    """
+    Coleta as estatísticas de uma tabela: o número exato de linhas e as estatísticas das colunas sobre uma amostra.
+
+    Args:
+        conexao (sqlite3.Connection): A conexão com o banco.
+        tabela (str): O nome (normalizado) da tabela.
+        tamanho_amostra (int): Número máximo de linhas amostradas.
+        semente (int): Semente do sorteio da amostra (a coleta é reprodutível).
+
+    Returns:
+        EstatisticasTabela: As estatísticas da tabela.
+    """
+    # A assinatura é lida antes dos dados: uma escrita durante a coleta faz a tabela ser coletada de novo
+    assinatura = _assinatura(conexao)
+    linhas = conexao.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+    colunas = [nome for _, nome, *_ in conexao.execute(f"PRAGMA table_info({tabela})")]
+    amostra = _amostrar(conexao, tabela, colunas, linhas, tamanho_amostra, random.Random(semente))
+    estatisticas = {
+        coluna.lower(): _resumir_coluna([linha[i] for linha in amostra], linhas)
+        for i, coluna in enumerate(colunas)
+    }
+    return EstatisticasTabela(linhas, estatisticas, assinatura)
+
+_cache_estatisticas: dict[Path, tuple[tuple[float, int], EstatisticasBanco]] = {}
+
+def obter_estatisticas(caminho: Union[str, Path] = CAMINHO_BANCO) -> EstatisticasBanco:
+    """
+    Retorna as estatísticas do banco, reaproveitando as já carregadas enquanto o arquivo do banco não for alterado.
+
+    Args:
+        caminho (Union[str, Path]): Caminho do banco SQLite. Padrão é `banco_de_dados/db_vendas.db`.
+
+    Returns:
+        EstatisticasBanco: As estatísticas do banco.
+    """
+    caminho = Path(caminho)
+    try:
+        situacao = os.stat(caminho)
+        assinatura = (situacao.st_mtime, situacao.st_size)
+    except OSError:
+        assinatura = (0.0, 0)
+    em_cache = _cache_estatisticas.get(caminho)
+    if em_cache is None or em_cache[0] != assinatura:
+        em_cache = _cache_estatisticas[caminho] = (assinatura, EstatisticasBanco(caminho))
+    return em_cache[1]
+
+# --- Estimativas ---
+
+def _valor_literal(texto: str) -> Optional[Valor]:
+    """
+    Converte o literal de um predicado (número ou texto entre aspas simples) em valor. Retorna None se não for possível.
+    """
+    texto = texto.strip()
+    if len(texto) >= 2 and texto[0] == texto[-1] == "'":
+        return texto[1:-1]
+    try:
+        return float(texto)
+    except ValueError:
+        return None
+
+def estimar_seletividade(predicado: Predicado, tabelas_por_alias: dict[str, str], estatisticas: EstatisticasBanco) -> float:
+    """
+    Estima a fração das linhas que satisfaz um predicado.
+
+    Args:
+        predicado (Predicado): O predicado.
+        tabelas_por_alias (dict[str, str]): Tabela (nome normalizado) de cada alias da consulta.
+        estatisticas (EstatisticasBanco): As estatísticas do banco. Se tiverem literais (`com_parametros`), os
+            marcadores `$i` são estimados com eles.
+
+    Returns:
+        float: A seletividade estimada, entre 0 e 1.
+    """
+    def distintos(coluna: Coluna) -> int:
+        tabela = tabelas_por_alias.get(coluna.alias)
+        if tabela is None:
+            return max(1, int(LINHAS_PADRAO * FRACAO_DISTINTOS_PADRAO))
+        return estatisticas.distintos(tabela, coluna.nome)
+
+    def nao_nulos(coluna: Coluna) -> float:
+        tabela = tabelas_por_alias.get(coluna.alias)
+        dados = estatisticas.coluna(tabela, coluna.nome) if tabela is not None else None
+        return 1 - dados.fracao_nulos if dados is not None and dados.fracao_nulos else 1.0
+
+    esquerda, direita, operador = predicado.esquerda, predicado.direita, predicado.operador
+    if not isinstance(esquerda, Coluna):
+        return SELETIVIDADE_INTERVALO
+
+    if isinstance(direita, Coluna):
+        if operador == "=":
+            return nao_nulos(esquerda) * nao_nulos(direita) / max(distintos(esquerda), distintos(direita))
+        return SELETIVIDADE_INTERVALO
+
+    igual = 1 / distintos(esquerda)
+    if operador == "=":
+        return nao_nulos(esquerda) * igual
+    if operador == "<>":
+        return nao_nulos(esquerda) * (1 - igual)
+
+    tabela = tabelas_por_alias.get(esquerda.alias)
+    dados = estatisticas.coluna(tabela, esquerda.nome) if tabela is not None else None
+    valor = _valor_literal(bind_parameters(direita, estatisticas.parametros) if estatisticas.parametros else direita)
+    menor = dados.fracao_menor(valor) if dados is not None and valor is not None else None
+    if menor is None:
+        return SELETIVIDADE_INTERVALO
+
+    fracao = {
+        "<": menor,
+        "<=": menor + igual,
+        ">": 1 - menor - igual,
+        ">=": 1 - menor,
+    }.get(operador, SELETIVIDADE_INTERVALO)
+    return nao_nulos(esquerda) * min(1.0, max(0.0, fracao))
+
+if __name__ == "__main__":
+    banco = EstatisticasBanco(sys.argv[1] if len(sys.argv) > 1 else CAMINHO_BANCO).coletar()
+    for nome, tabela in sorted(banco.tabelas.items()):
+        print(f"{nome}: {tabela.linhas} linhas")
+    print(f"Estatísticas salvas em {banco.caminho_arquivo}")
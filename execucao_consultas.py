@@ -0,0 +1,661 @@
+"""
+Execução das árvores de consulta sobre o banco de dados SQLite (`banco_de_dados/db_vendas.db`), no modelo Volcano.
+
+Cada nó da árvore (`arvores_construcao_otimizacao.No`) vira um operador que produz as linhas do seu resultado sob
+demanda, puxando as linhas dos operadores filhos apenas quando precisa delas:
+
+- TABLE: varredura da tabela no SQLite (`OperadorVarredura`), lida aos poucos pelo cursor; se o planejamento físico
+  (`planejar_acesso`) escolheu uma busca por índice, a condição da busca vai para o SQL (`WHERE coluna OP ?`);
+- SELECT: filtro das linhas pelos predicados (`OperadorFiltro`);
+- PROJECT: projeção das colunas (`OperadorProjecao`), sem eliminar duplicatas;
+- JOIN com chaves de equi-junção (`No.chaves_equijuncao`): junção por hash (`OperadorJuncaoHash`), que constrói a
+  tabela hash com o lado direito e percorre o esquerdo;
+- JOIN sem chaves e PRODUCT: junção por laços aninhados (`OperadorLacoAninhado`), com o lado direito guardado em
+  memória na primeira linha do lado esquerdo;
+- JOIN planejado como laços aninhados com índice: para cada linha do lado externo, o lado interno é percorrido de
+  novo, com a tabela lida apenas nas linhas com a chave da junção (`OperadorLacoIndice` e `OperadorBuscaIndice`).
+
+Subárvores inteiras também podem ser delegadas ao próprio SQLite (`delegar_ao_sqlite`): cada uma é convertida de
+volta em uma consulta SQL (`decompilar`) e vira um único operador (`OperadorConsultaSQL`).
+
+As linhas são tuplas; o esquema de cada operador (`Operador.esquema`) dá o nome qualificado (`alias.coluna`) de cada
+posição. Como o resultado é um gerador, as primeiras linhas de uma consulta ficam disponíveis sem que os resultados
+intermediários sejam materializados (exceto o lado direito das junções).
+
+Exemplo:
+    arvore = otimizar_projecoes(otimizar_selects(converter_algebra_em_arvore(process_sql_query_ir(sql))))
+    for linha in executar(arvore):
+        print(linha)
+"""
+
+from __future__ import annotations
+import operator
+import sqlite3
+from enum import Enum
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+
+from parser import get_schema_catalog
+from algebra_relacional import Coluna, Predicado
+from arvores_construcao_otimizacao import (
+    Arvore,
+    CaminhoAcesso,
+    MetodoAcesso,
+    No,
+    Operacao,
+    percorrer_pre_ordem,
+    tabela_da_cadeia,
+    transformar_arvore,
+)
+from estatisticas import CAMINHO_BANCO
+
+COMPARADORES: dict[str, Callable[[Any, Any], bool]] = {
+    "=": operator.eq,
+    "<>": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+def classe_sqlite(valor: Any) -> int:
+    """
+    Ordem entre valores de tipos diferentes no SQLite: números < textos < blobs.
+    """
+    if isinstance(valor, (int, float)):
+        return 0
+    if isinstance(valor, str):
+        return 1
+    return 2
+
+def valor_literal(texto: str) -> Union[int, float, str]:
+    """
+    Converte o literal de um predicado (número ou texto entre aspas simples) no valor usado na comparação.
+    """
+    texto = texto.strip()
+    if len(texto) >= 2 and texto[0] == texto[-1] == "'":
+        return texto[1:-1]
+    try:
+        return int(texto)
+    except ValueError:
+        pass
+    try:
+        return float(texto)
+    except ValueError:
+        raise ValueError(f"Literal não suportado na execução: {texto}.") from None
+
+def compilar_predicado(predicado: Predicado, esquema: tuple[str, ...]) -> Callable[[tuple], bool]:
+    """
+    Transforma um predicado em uma função sobre as linhas de um esquema. Como no SQL, comparações com NULL são falsas;
+    valores de tipos diferentes são comparados pela ordem dos tipos do SQLite.
+
+    Args:
+        predicado (Predicado): O predicado.
+        esquema (tuple[str, ...]): O esquema (`alias.coluna` de cada posição) das linhas.
+
+    Returns:
+        Callable[[tuple], bool]: A função que avalia o predicado em uma linha.
+    """
+    comparador = COMPARADORES[predicado.operador]
+
+    def operando(valor: Union[Coluna, str]) -> Callable[[tuple], Any]:
+        if isinstance(valor, Coluna):
+            return itemgetter(posicao_coluna(esquema, valor))
+        literal = valor_literal(valor)
+        return lambda linha: literal
+
+    esquerda, direita = operando(predicado.esquerda), operando(predicado.direita)
+
+    def avaliar(linha: tuple) -> bool:
+        a, b = esquerda(linha), direita(linha)
+        if a is None or b is None:
+            return False
+        try:
+            return comparador(a, b)
+        except TypeError:
+            return comparador(classe_sqlite(a), classe_sqlite(b))
+
+    return avaliar
+
+def _conjuncao(predicados: tuple[Predicado, ...], esquema: tuple[str, ...]) -> Optional[Callable[[tuple], bool]]:
+    """
+    Compila a conjunção dos predicados (None se não houver predicados).
+    """
+    funcoes = [compilar_predicado(predicado, esquema) for predicado in predicados]
+    if not funcoes:
+        return None
+    if len(funcoes) == 1:
+        return funcoes[0]
+    return lambda linha: all(funcao(linha) for funcao in funcoes)
+
+def posicao_coluna(esquema: tuple[str, ...], coluna: Coluna) -> int:
+    """
+    Retorna a posição de uma coluna no esquema.
+
+    Raises:
+        ValueError: Se a coluna não fizer parte do esquema.
+    """
+    try:
+        return esquema.index(str(coluna))
+    except ValueError:
+        raise ValueError(f"A coluna {coluna} não está disponível na entrada do operador.") from None
+
+# --- Operadores ---
+
+class Operador:
+    """
+    Operador de execução: produz as linhas (tuplas) do seu resultado sob demanda, ao ser iterado.
+    """
+    esquema: tuple[str, ...] = ()
+
+    def __iter__(self: Operador) -> Iterator[tuple]:
+        raise NotImplementedError
+
+class OperadorVarredura(Operador):
+    """
+    Lê todas as linhas de uma tabela do banco, aos poucos, pelo cursor do SQLite. Se `colunas` for informado, apenas
+    essas colunas (nomes em minúsculas) são lidas. Se `filtro` for informado (`coluna OP literal`), apenas as linhas
+    que o satisfazem são lidas, o que permite ao SQLite usar o índice da coluna.
+    """
+    def __init__(
+        self: OperadorVarredura,
+        conexao: sqlite3.Connection,
+        tabela: str,
+        alias: str,
+        colunas: Optional[Iterable[str]] = None,
+        filtro: Optional[Predicado] = None,
+    ) -> None:
+        # O nome só é usado no SQL se for uma tabela do esquema
+        if tabela not in get_schema_catalog().columns:
+            raise ValueError(f"A tabela {tabela} não existe no esquema.")
+        todas = [nome for _, nome, *_ in conexao.execute(f"PRAGMA table_info({tabela})")]
+        if not todas:
+            raise ValueError(f"A tabela {tabela} não existe no banco de dados.")
+        nomes = {nome.lower(): nome for nome in todas}
+        if colunas is not None:
+            lidas = set(colunas)
+            # Ao menos uma coluna é lida, para que as linhas da tabela continuem sendo produzidas
+            todas = [nome for nome in todas if nome.lower() in lidas] or todas[:1]
+        self.conexao = conexao
+        self.esquema = tuple(f"{alias}.{coluna.lower()}" for coluna in todas)
+        selecao = ", ".join(f'"{coluna}"' for coluna in todas)
+        self.sql = f"SELECT {selecao} FROM {tabela}"
+        self.parametros: tuple = ()
+        if filtro is not None:
+            # O nome e o operador só são usados no SQL se forem uma coluna da tabela e uma comparação conhecida
+            if filtro.esquerda.nome not in nomes or filtro.operador not in COMPARADORES:
+                raise ValueError(f"Condição de busca inválida para a tabela {tabela}: {filtro}.")
+            self.sql += f' WHERE "{nomes[filtro.esquerda.nome]}" {filtro.operador} ?'
+            if not isinstance(filtro.direita, Coluna):
+                self.parametros = (valor_literal(filtro.direita),)
+
+    def __iter__(self: OperadorVarredura) -> Iterator[tuple]:
+        yield from self.conexao.execute(self.sql, self.parametros)
+
+class OperadorBuscaIndice(OperadorVarredura):
+    """
+    Lê as linhas de uma tabela cuja coluna do `filtro` (`coluna = coluna do lado externo`) é igual a `chave`, pelo
+    índice da coluna. A chave é definida pela junção (`OperadorLacoIndice`) antes de cada leitura.
+    """
+    def __init__(
+        self: OperadorBuscaIndice,
+        conexao: sqlite3.Connection,
+        tabela: str,
+        alias: str,
+        filtro: Predicado,
+        colunas: Optional[Iterable[str]] = None,
+    ) -> None:
+        super().__init__(conexao, tabela, alias, colunas, filtro)
+        self.chave: Any = None
+
+    def __iter__(self: OperadorBuscaIndice) -> Iterator[tuple]:
+        yield from self.conexao.execute(self.sql, (self.chave,))
+
+class OperadorFiltro(Operador):
+    """
+    Repassa apenas as linhas da entrada que satisfazem todos os predicados.
+    """
+    def __init__(self: OperadorFiltro, entrada: Operador, predicados: tuple[Predicado, ...]) -> None:
+        self.entrada = entrada
+        self.esquema = entrada.esquema
+        self._condicao = _conjuncao(predicados, entrada.esquema)
+
+    def __iter__(self: OperadorFiltro) -> Iterator[tuple]:
+        if self._condicao is None:
+            yield from self.entrada
+            return
+        yield from filter(self._condicao, self.entrada)
+
+class OperadorProjecao(Operador):
+    """
+    Mantém apenas as colunas informadas, na ordem informada (sem eliminar linhas duplicadas).
+    """
+    def __init__(self: OperadorProjecao, entrada: Operador, colunas: list[Coluna]) -> None:
+        self.entrada = entrada
+        self.esquema = tuple(str(coluna) for coluna in colunas)
+        posicoes = [posicao_coluna(entrada.esquema, coluna) for coluna in colunas]
+        self._extrair = (lambda linha: (linha[posicoes[0]],)) if len(posicoes) == 1 else itemgetter(*posicoes)
+
+    def __iter__(self: OperadorProjecao) -> Iterator[tuple]:
+        yield from map(self._extrair, self.entrada)
+
+class OperadorLacoAninhado(Operador):
+    """
+    Junção por laços aninhados: combina cada linha da esquerda com cada linha da direita que satisfaz a condição.
+    O lado direito é lido uma única vez, quando chega a primeira linha da esquerda, e guardado em memória.
+    """
+    def __init__(self: OperadorLacoAninhado, esquerda: Operador, direita: Operador, predicados: tuple[Predicado, ...] = ()) -> None:
+        self.esquerda = esquerda
+        self.direita = direita
+        self.esquema = esquerda.esquema + direita.esquema
+        self._condicao = _conjuncao(predicados, self.esquema)
+
+    def __iter__(self: OperadorLacoAninhado) -> Iterator[tuple]:
+        interna: Optional[list[tuple]] = None
+        condicao = self._condicao
+        for linha in self.esquerda:
+            if interna is None:
+                interna = list(self.direita)
+            for outra in interna:
+                combinada = linha + outra
+                if condicao is None or condicao(combinada):
+                    yield combinada
+
+class OperadorJuncaoHash(Operador):
+    """
+    Junção por hash: constrói uma tabela hash com as linhas da direita, indexada pelas chaves de equi-junção, e
+    percorre a esquerda procurando as linhas correspondentes. Os demais predicados são avaliados nas linhas combinadas.
+    """
+    def __init__(
+        self: OperadorJuncaoHash,
+        esquerda: Operador,
+        direita: Operador,
+        chaves: tuple[tuple[Coluna, Coluna], ...],
+        residuais: tuple[Predicado, ...] = (),
+    ) -> None:
+        self.esquerda = esquerda
+        self.direita = direita
+        self.esquema = esquerda.esquema + direita.esquema
+        self._chave_esquerda = itemgetter(*(posicao_coluna(esquerda.esquema, coluna) for coluna, _ in chaves))
+        self._chave_direita = itemgetter(*(posicao_coluna(direita.esquema, coluna) for _, coluna in chaves))
+        # Com uma única chave, o itemgetter devolve o próprio valor (e não uma tupla)
+        self._chave_nula = (lambda chave: chave is None) if len(chaves) == 1 else (lambda chave: None in chave)
+        self._condicao = _conjuncao(residuais, self.esquema)
+
+    def __iter__(self: OperadorJuncaoHash) -> Iterator[tuple]:
+        tabela: dict[Any, list[tuple]] = {}
+        chave_nula = self._chave_nula
+        for linha in self.direita:
+            chave = self._chave_direita(linha)
+            if not chave_nula(chave):
+                tabela.setdefault(chave, []).append(linha)
+
+        chave_esquerda, condicao = self._chave_esquerda, self._condicao
+        for linha in self.esquerda:
+            for outra in tabela.get(chave_esquerda(linha), ()):
+                combinada = linha + outra
+                if condicao is None or condicao(combinada):
+                    yield combinada
+
+class OperadorLacoIndice(Operador):
+    """
+    Junção por laços aninhados com índice: para cada linha do lado externo, define a chave da busca por índice
+    (`OperadorBuscaIndice`) da tabela do lado interno e percorre o lado interno de novo, lendo apenas as linhas com
+    essa chave. Os demais predicados são avaliados nas linhas combinadas.
+    """
+    def __init__(
+        self: OperadorLacoIndice,
+        esquerda: Operador,
+        direita: Operador,
+        busca: OperadorBuscaIndice,
+        coluna_externa: Coluna,
+        interno_direita: bool = True,
+        residuais: tuple[Predicado, ...] = (),
+    ) -> None:
+        self.esquerda = esquerda
+        self.direita = direita
+        self.busca = busca
+        self.interno_direita = interno_direita
+        self.esquema = esquerda.esquema + direita.esquema
+        externo = esquerda if interno_direita else direita
+        self._chave = itemgetter(posicao_coluna(externo.esquema, coluna_externa))
+        self._condicao = _conjuncao(residuais, self.esquema)
+
+    def __iter__(self: OperadorLacoIndice) -> Iterator[tuple]:
+        externo, interno = (self.esquerda, self.direita) if self.interno_direita else (self.direita, self.esquerda)
+        busca, chave, condicao = self.busca, self._chave, self._condicao
+        for linha in externo:
+            busca.chave = chave(linha)
+            # Como no SQL, chaves nulas não correspondem a nenhuma linha
+            if busca.chave is None:
+                continue
+            for outra in interno:
+                combinada = linha + outra if self.interno_direita else outra + linha
+                if condicao is None or condicao(combinada):
+                    yield combinada
+
+class OperadorConsultaSQL(Operador):
+    """
+    Executa no SQLite a consulta equivalente a uma subárvore delegada (`decompilar`), lendo as linhas aos poucos.
+    """
+    def __init__(self: OperadorConsultaSQL, conexao: sqlite3.Connection, consulta: ConsultaSQL) -> None:
+        self.conexao = conexao
+        self.consulta = consulta
+        self.esquema = consulta.esquema
+
+    def __iter__(self: OperadorConsultaSQL) -> Iterator[tuple]:
+        yield from self.conexao.execute(self.consulta.sql, self.consulta.parametros)
+
+# --- Delegação ao SQLite ---
+
+class Delegacao(str, Enum):
+    NENHUMA = "nenhuma"
+    HIBRIDA = "híbrida"
+    TOTAL = "total"
+
+class ConsultaSQL:
+    """
+    Consulta SQL equivalente a uma subárvore: o texto (com `?` no lugar dos literais), os valores dos literais e o
+    esquema das linhas devolvidas, o mesmo do operador que executaria a subárvore.
+    """
+    __slots__ = ("sql", "parametros", "esquema")
+
+    def __init__(self: ConsultaSQL, sql: str, parametros: tuple, esquema: tuple[str, ...]) -> None:
+        self.sql = sql
+        self.parametros = parametros
+        self.esquema = esquema
+
+    def __str__(self: ConsultaSQL) -> str:
+        return self.sql
+
+def _sql_predicado(predicado: Predicado, parametros: list) -> str:
+    """
+    Escreve um predicado em SQL, acrescentando os valores dos literais aos parâmetros.
+    """
+    # O operador só é usado no SQL se for uma comparação conhecida
+    if predicado.operador not in COMPARADORES:
+        raise ValueError(f"Operador não suportado na execução: {predicado.operador}.")
+    operandos = []
+    for operando in (predicado.esquerda, predicado.direita):
+        if isinstance(operando, Coluna):
+            operandos.append(f'"{operando.alias}"."{operando.nome}"')
+        else:
+            parametros.append(valor_literal(operando))
+            operandos.append("?")
+    return f"{operandos[0]} {predicado.operador} {operandos[1]}"
+
+def decompilar(no: No, conexao: sqlite3.Connection) -> ConsultaSQL:
+    """
+    Converte uma subárvore (seleções, projeções, junções e produtos sobre tabelas) de volta em uma consulta SQL.
+
+    As tabelas e junções da subárvore formam a cláusula FROM, na mesma forma da árvore (as junções do lado direito
+    ficam entre parênteses), com as condições das junções no ON. As condições das seleções vão todas para o WHERE,
+    o que é equivalente nas junções internas, e as colunas devolvidas são as da raiz da subárvore.
+
+    Args:
+        no (No): A raiz da subárvore.
+        conexao (sqlite3.Connection): A conexão com o banco, usada para obter as colunas das tabelas.
+
+    Returns:
+        ConsultaSQL: A consulta, seus parâmetros e o esquema das linhas.
+
+    Raises:
+        ValueError: Se a subárvore referenciar tabelas, colunas, operadores ou literais inválidos.
+    """
+    # Cláusula FROM (com seus parâmetros) e esquema de cada nó, dos filhos para os pais
+    fontes: dict[int, tuple[str, list]] = {}
+    esquemas: dict[int, tuple[str, ...]] = {}
+    juncoes: set[int] = set()
+    condicoes: list[str] = []
+    parametros_condicoes: list = []
+    for atual in reversed(list(percorrer_pre_ordem(no))):
+        if atual.operacao is Operacao.TABLE:
+            tabela = atual.valor.split("[")[0].strip().lower()
+            # A validação da tabela e as colunas são as mesmas da varredura
+            esquemas[id(atual)] = OperadorVarredura(conexao, tabela, atual.alias).esquema
+            fontes[id(atual)] = (f'{tabela} AS "{atual.alias}"', [])
+            continue
+        fonte, esquema = fontes[id(atual.filho_esq)], esquemas[id(atual.filho_esq)]
+        if atual.operacao is Operacao.SELECT:
+            condicoes.extend(_sql_predicado(predicado, parametros_condicoes) for predicado in atual.predicados)
+        elif atual.operacao is Operacao.PROJECT:
+            esquema = tuple(str(coluna) for coluna in colunas_projecao(atual))
+        else:
+            texto_direita, parametros_direita = fontes[id(atual.filho_dir)]
+            if id(atual.filho_dir) in juncoes:
+                texto_direita = f"({texto_direita})"
+            parametros = fonte[1] + parametros_direita
+            texto = f"{fonte[0]} JOIN {texto_direita}"
+            if atual.predicados:
+                texto += " ON " + " AND ".join(_sql_predicado(predicado, parametros) for predicado in atual.predicados)
+            fonte, esquema = (texto, parametros), esquema + esquemas[id(atual.filho_dir)]
+            juncoes.add(id(atual))
+        if id(atual.filho_esq) in juncoes:
+            juncoes.add(id(atual))
+        fontes[id(atual)], esquemas[id(atual)] = fonte, esquema
+
+    esquema = esquemas[id(no)]
+    selecao = ", ".join('"{}"."{}"'.format(*coluna.split(".", 1)) for coluna in esquema)
+    fonte, parametros = fontes[id(no)]
+    sql = f"SELECT {selecao} FROM {fonte}"
+    if condicoes:
+        sql += " WHERE " + " AND ".join(condicoes)
+    return ConsultaSQL(sql, tuple(parametros + parametros_condicoes), esquema)
+
+def _juncao_por_hash(no: No) -> bool:
+    """
+    Verifica se o planejamento físico escolheu (ou escolheria, sem planejamento) a junção por hash para o nó.
+    """
+    if no.acesso is not None:
+        return no.acesso.metodo is MetodoAcesso.JUNCAO_HASH
+    return no.operacao is Operacao.JOIN and bool(no.chaves_equijuncao())
+
+def delegar_ao_sqlite(arvore: Arvore, modo: Delegacao = Delegacao.HIBRIDA) -> Arvore:
+    """
+    Marca as subárvores que serão executadas pelo próprio SQLite, como uma única consulta (`decompilar`), com o
+    caminho de acesso `MetodoAcesso.SQLITE` na raiz de cada uma. Os demais nós continuam executados pelos operadores.
+
+    - `Delegacao.TOTAL`: a árvore inteira vira uma consulta.
+    - `Delegacao.HIBRIDA`: são delegadas as maiores subárvores sem junções por hash (as varreduras, seleções e
+      projeções, as junções por índice e os produtos), e as junções por hash ficam com os operadores. O SQLite não
+      tem junção por hash: ele faz as junções por laços aninhados, buscando cada linha em um índice (temporário, se
+      a chave não tiver um). Na execução vetorizada, as junções de entradas grandes costumam ser mais rápidas por
+      lotes; na execução por linhas, a delegação total costuma ser a mais rápida.
+    - `Delegacao.NENHUMA`: nada é delegado (a árvore é devolvida sem alterações).
+
+    Args:
+        arvore (Arvore): A árvore da consulta (em geral, já com o planejamento físico de `planejar_acesso`).
+        modo (Delegacao): Quanto da árvore é delegado.
+
+    Returns:
+        Arvore: A árvore com as subárvores delegadas marcadas.
+    """
+    if modo is Delegacao.NENHUMA or arvore.raiz is None:
+        return arvore
+
+    delegaveis: dict[int, bool] = {}
+    # Na pré-ordem invertida, cada nó aparece depois de todos os seus descendentes
+    for no in reversed(list(percorrer_pre_ordem(arvore.raiz))):
+        if no.operacao is Operacao.TABLE:
+            delegavel = True
+        elif no.operacao in (Operacao.SELECT, Operacao.PROJECT):
+            delegavel = delegaveis[id(no.filho_esq)]
+        else:
+            delegavel = delegaveis[id(no.filho_esq)] and delegaveis[id(no.filho_dir)]
+            if modo is Delegacao.HIBRIDA and _juncao_por_hash(no):
+                delegavel = False
+        delegaveis[id(no)] = delegavel
+
+    # Raízes dos fragmentos delegados: os nós delegáveis mais altos (a busca não entra neles)
+    raizes: set[int] = set()
+    pilha = [arvore.raiz]
+    while pilha:
+        no = pilha.pop()
+        if delegaveis[id(no)]:
+            raizes.add(id(no))
+            continue
+        filhos = (no.filho_dir, no.filho_esq)
+        if no.acesso is not None and no.acesso.metodo is MetodoAcesso.LACOS_INDICE:
+            # O lado interno de uma junção por índice que não foi delegada continua sendo lido pela busca no índice
+            filhos = (no.filho_esq,) if no.acesso.interno == "dir" else (no.filho_dir,)
+        pilha.extend(filho for filho in filhos if filho is not None)
+
+    def marcar(no: No) -> No:
+        # Os fragmentos não são alterados, então as suas raízes chegam aqui sem ser copiadas (com o mesmo id)
+        if id(no) not in raizes:
+            return no
+        custo = sum(atual.acesso.custo for atual in percorrer_pre_ordem(no) if atual.acesso is not None)
+        return no.com_acesso(CaminhoAcesso(MetodoAcesso.SQLITE, custo))
+
+    return Arvore(transformar_arvore(arvore.raiz, marcar))
+
+def delegado(no: No) -> bool:
+    """
+    Verifica se o nó é a raiz de uma subárvore delegada ao SQLite.
+    """
+    return no.acesso is not None and no.acesso.metodo is MetodoAcesso.SQLITE
+
+def nos_executados(raiz: No) -> list[No]:
+    """
+    Nós da árvore que viram operadores, em pré-ordem: todos, exceto os descendentes das subárvores delegadas.
+    """
+    nos = []
+    pilha = [raiz]
+    while pilha:
+        no = pilha.pop()
+        nos.append(no)
+        if not delegado(no):
+            pilha.extend(filho for filho in (no.filho_dir, no.filho_esq) if filho is not None)
+    return nos
+
+# --- Construção e execução dos planos ---
+
+def colunas_projecao(no: No) -> list[Coluna]:
+    """
+    Colunas de um nó de projeção, na ordem em que aparecem no conteúdo.
+    """
+    colunas = []
+    for texto in no.valor[2:-1].split(","):
+        alias, _, nome = texto.strip().partition(".")
+        if not nome:
+            raise ValueError(f"Coluna não qualificada na projeção: {texto.strip()}.")
+        colunas.append(Coluna(alias, nome))
+    return colunas
+
+def predicados_residuais(no: No, chaves: tuple[tuple[Coluna, Coluna], ...]) -> tuple[Predicado, ...]:
+    """
+    Predicados de uma junção que não são atendidos pelas chaves de equi-junção e precisam ser avaliados nas linhas
+    combinadas.
+    """
+    # Comparação por valor (`Coluna.__eq__`), sem depender da ordem das colunas no predicado nem de as chaves terem
+    # sido formadas pelos mesmos objetos (por exemplo, depois de copiar a árvore ou de vincular parâmetros)
+    pares_chave = {frozenset(par) for par in chaves}
+    return tuple(
+        predicado for predicado in no.predicados
+        if predicado.operador != "=" or frozenset((predicado.esquerda, predicado.direita)) not in pares_chave
+    )
+
+def filtro_indice(no: No) -> Optional[Predicado]:
+    """
+    Condição da busca por índice escolhida para um nó de tabela (None se a tabela for lida por varredura completa).
+    """
+    if no.acesso is None or no.acesso.metodo is not MetodoAcesso.INDICE:
+        return None
+    return no.acesso.predicado
+
+def chave_laco_indice(no: No) -> tuple[Coluna, Coluna]:
+    """
+    Chave de equi-junção (coluna da esquerda, coluna da direita) usada na busca de uma junção por laços aninhados
+    com índice, entre as chaves do nó (cujas colunas são as dos predicados da junção).
+    """
+    busca = {no.acesso.predicado.esquerda, no.acesso.predicado.direita}
+    for chave in no.chaves_equijuncao():
+        if set(chave) == busca:
+            return chave
+    raise ValueError(f"A chave da busca por índice não é uma chave da junção: {no.acesso.predicado}.")
+
+def construir_plano_execucao(arvore: Arvore, conexao: sqlite3.Connection, instrumentacao: Optional[Any] = None) -> Operador:
+    """
+    Constrói o operador de execução de cada nó da árvore, dos filhos para os pais (sem recursão).
+
+    Args:
+        arvore (Arvore): A árvore da consulta.
+        conexao (sqlite3.Connection): A conexão com o banco, usada pelas varreduras.
+        instrumentacao (Optional[Instrumentacao]): Se informada, cada operador é envolvido por um operador que mede a
+            sua execução (`instrumentacao.py`).
+
+    Returns:
+        Operador: O operador da raiz, cujo esquema descreve as colunas do resultado.
+
+    Raises:
+        ValueError: Se a árvore estiver vazia ou referenciar tabelas, colunas ou literais inválidos.
+    """
+    if arvore.raiz is None:
+        raise ValueError("A árvore está vazia. Não é possível executá-la.")
+
+    operadores: dict[int, Operador] = {}
+    # As buscas por índice, sem a instrumentação, para que as junções com índice definam a chave de cada busca
+    buscas: dict[int, OperadorBuscaIndice] = {}
+    # Na pré-ordem invertida, cada nó aparece depois de todos os seus descendentes
+    for no in reversed(nos_executados(arvore.raiz)):
+        if delegado(no):
+            operador = OperadorConsultaSQL(conexao, decompilar(no, conexao))
+        elif no.operacao is Operacao.TABLE:
+            tabela, filtro = no.valor.split("[")[0].strip().lower(), filtro_indice(no)
+            if filtro is not None and isinstance(filtro.direita, Coluna):
+                operador = buscas[id(no)] = OperadorBuscaIndice(conexao, tabela, no.alias, filtro)
+            else:
+                operador = OperadorVarredura(conexao, tabela, no.alias, filtro=filtro)
+        elif no.operacao is Operacao.SELECT:
+            operador = OperadorFiltro(operadores[id(no.filho_esq)], no.predicados)
+        elif no.operacao is Operacao.PROJECT:
+            operador = OperadorProjecao(operadores[id(no.filho_esq)], colunas_projecao(no))
+        else:
+            esquerda, direita = operadores[id(no.filho_esq)], operadores[id(no.filho_dir)]
+            chaves = no.chaves_equijuncao()
+            if no.acesso is not None and no.acesso.metodo is MetodoAcesso.LACOS_INDICE:
+                chave = chave_laco_indice(no)
+                interno_direita = no.acesso.interno == "dir"
+                busca = buscas.get(id(tabela_da_cadeia(no.filho_dir if interno_direita else no.filho_esq)))
+                if busca is None:
+                    raise ValueError(f"O lado interno da junção não é lido por busca no índice: {no.valor}.")
+                operador = OperadorLacoIndice(
+                    esquerda, direita, busca, chave[0] if interno_direita else chave[1], interno_direita, predicados_residuais(no, (chave,))
+                )
+            elif chaves:
+                operador = OperadorJuncaoHash(esquerda, direita, chaves, predicados_residuais(no, chaves))
+            else:
+                operador = OperadorLacoAninhado(esquerda, direita, no.predicados)
+        operadores[id(no)] = operador if instrumentacao is None else instrumentacao.medir(no, operador)
+    return operadores[id(arvore.raiz)]
+
+def conectar_banco(caminho: Union[str, Path] = CAMINHO_BANCO) -> sqlite3.Connection:
+    """
+    Abre o banco somente para leitura.
+
+    Raises:
+        ValueError: Se o banco não existir.
+    """
+    caminho = Path(caminho)
+    if not caminho.is_file():
+        raise ValueError(f"Banco de dados não encontrado: {caminho}.")
+    return sqlite3.connect(f"{caminho.resolve().as_uri()}?mode=ro", uri=True)
+
+def executar(arvore: Arvore, caminho: Union[str, Path] = CAMINHO_BANCO) -> Iterator[tuple]:
+    """
+    Executa a árvore de uma consulta sobre o banco, produzindo as linhas do resultado sob demanda.
+    A conexão é aberta na primeira linha pedida e fechada quando o gerador termina ou é descartado.
+
+    Args:
+        arvore (Arvore): A árvore da consulta (otimizada ou não).
+        caminho (Union[str, Path]): Caminho do banco SQLite. Padrão é `banco_de_dados/db_vendas.db`.
+
+    Returns:
+        Iterator[tuple]: As linhas do resultado.
+    """
+    conexao = conectar_banco(caminho)
+    try:
+        yield from construir_plano_execucao(arvore, conexao)
+    finally:
+        conexao.close()
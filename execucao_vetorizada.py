@@ -0,0 +1,956 @@
+"""
+Execução vetorizada (por colunas) das árvores de consulta sobre o banco de dados SQLite, com NumPy.
+
+É um segundo modo de execução, com o mesmo resultado de `execucao_consultas.executar`: em vez de uma linha por vez,
+cada operador produz lotes (`Lote`) de até `TAMANHO_LOTE` linhas, guardados como um vetor NumPy por coluna:
+
+- TABLE: varredura da tabela no SQLite (`VarreduraColunar`), lida em blocos pelo cursor e convertida em colunas
+  (com a condição da busca por índice no SQL, se o planejamento físico a escolheu);
+- SELECT: os predicados são avaliados sobre as colunas inteiras, gerando máscaras booleanas (`FiltroColunar`);
+- PROJECT: seleção das colunas do lote, sem cópia dos dados (`ProjecaoColunar`);
+- JOIN com chaves de equi-junção: as chaves do lado direito são ordenadas uma vez e as do lado esquerdo são
+  localizadas por busca binária vetorizada (`JuncaoOrdenadaColunar`); chaves de texto ou compostas são antes
+  convertidas em códigos inteiros por uma tabela hash;
+- JOIN sem chaves e PRODUCT: produto dos lotes por repetição de índices, seguido do filtro (`LacoAninhadoColunar`).
+
+As junções planejadas como laços aninhados com índice (`planejar_acesso`) são feitas como as demais equi-junções,
+já que buscar as linhas de uma chave por vez anularia o ganho dos lotes.
+
+Colunas só com inteiros ou números reais viram vetores `int64`/`float64`; as demais (textos, colunas com NULL)
+ficam como vetores de objetos Python, comparados com a mesma semântica da execução por linhas (NULL nunca satisfaz
+uma comparação e tipos diferentes seguem a ordem do SQLite).
+
+As equi-junções também podem ser feitas em paralelo (`JuncaoParalelaColunar`, com `processos` > 1): os dois lados
+são particionados pelo hash das chaves e cada par de partições é juntado em um processo, com as chaves passadas por
+memória compartilhada.
+
+Ao ser executado diretamente, compara o tempo dos dois modos de execução nas consultas de
+`docs/exemplos_consultas.txt` (ou, com `--processos`, o das junções paralelas com cada número de processos). Com
+números de configuração (1 a 4) como argumentos, o banco `db_vendas.db` é antes populado com cada configuração (os
+dados atuais são substituídos). Com `--delegacao`, compara a execução por linhas sem delegação, com delegação híbrida
+e com delegação total ao SQLite (`delegar_ao_sqlite`):
+    python execucao_vetorizada.py 1 2 3 4
+    python execucao_vetorizada.py 2 3 --processos 1 2 4 8
+    python execucao_vetorizada.py 1 2 3 4 --delegacao
+"""
+
+from __future__ import annotations
+import argparse
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence, Union
+
+import numpy as np
+
+from parser import process_sql_query_ir
+from algebra_relacional import Coluna, Predicado
+from arvores_construcao_otimizacao import (
+    Arvore,
+    Operacao,
+    converter_algebra_em_arvore,
+    otimizar_projecoes,
+    otimizar_selects,
+    percorrer_pre_ordem,
+    planejar_acesso,
+    reordenar_juncoes,
+)
+from estatisticas import CAMINHO_BANCO, EstatisticasBanco, obter_estatisticas
+from execucao_consultas import (
+    COMPARADORES,
+    OperadorVarredura,
+    classe_sqlite,
+    colunas_projecao,
+    ConsultaSQL,
+    Delegacao,
+    conectar_banco,
+    decompilar,
+    delegado,
+    delegar_ao_sqlite,
+    executar,
+    filtro_indice,
+    nos_executados,
+    posicao_coluna,
+    predicados_residuais,
+    valor_literal,
+)
+
+TAMANHO_LOTE = 65_536
+CAMINHO_EXEMPLOS = Path(__file__).parent / "docs" / "exemplos_consultas.txt"
+
+# --- Lotes ---
+
+class Lote:
+    """
+    Conjunto de linhas guardado por colunas: um vetor NumPy (todos com o mesmo tamanho) por coluna do esquema.
+    """
+    __slots__ = ("colunas",)
+
+    def __init__(self: Lote, colunas: tuple[np.ndarray, ...]) -> None:
+        self.colunas = colunas
+
+    def __len__(self: Lote) -> int:
+        return len(self.colunas[0]) if self.colunas else 0
+
+    def selecionar(self: Lote, indices: np.ndarray) -> Lote:
+        """
+        Novo lote com as linhas indicadas (máscara booleana ou vetor de posições).
+        """
+        return Lote(tuple(coluna[indices] for coluna in self.colunas))
+
+    def linhas(self: Lote) -> Iterator[tuple]:
+        """
+        As linhas do lote, como tuplas de valores Python.
+        """
+        return zip(*(coluna.tolist() for coluna in self.colunas))
+
+def vetor_coluna(valores: Sequence[Any]) -> np.ndarray:
+    """
+    Converte os valores de uma coluna em um vetor NumPy: `int64` se forem todos inteiros, `float64` se forem todos
+    números e de objetos Python nos demais casos (textos, NULL, tipos misturados).
+    """
+    tipos = set(map(type, valores))
+    if tipos == {int}:
+        try:
+            return np.array(valores, dtype=np.int64)
+        except OverflowError:
+            pass
+    elif tipos and tipos <= {int, float}:
+        return np.array(valores, dtype=np.float64)
+    vetor = np.empty(len(valores), dtype=object)
+    vetor[:] = valores
+    return vetor
+
+def _concatenar(lotes: list[Lote], largura: int) -> Lote:
+    """
+    Junta os lotes em um só (um lote vazio de objetos, se não houver lotes).
+    """
+    if not lotes:
+        return Lote(tuple(np.empty(0, dtype=object) for _ in range(largura)))
+    if len(lotes) == 1:
+        return lotes[0]
+    return Lote(tuple(np.concatenate(colunas) for colunas in zip(*(lote.colunas for lote in lotes))))
+
+def _numerico(operando: Any) -> bool:
+    if isinstance(operando, np.ndarray):
+        return operando.dtype.kind in "iuf"
+    return isinstance(operando, (int, float))
+
+def _comparar_elementos(comparador: Callable[[Any, Any], bool]) -> Callable[[Any, Any], np.ndarray]:
+    """
+    Comparação elemento a elemento com a semântica da execução por linhas, para os casos que o NumPy não resolve
+    (tipos misturados).
+    """
+    def comparar(a: Any, b: Any) -> bool:
+        if a is None or b is None:
+            return False
+        try:
+            return comparador(a, b)
+        except TypeError:
+            return comparador(classe_sqlite(a), classe_sqlite(b))
+
+    funcao = np.frompyfunc(comparar, 2, 1)
+    return lambda a, b: funcao(a, b).astype(bool)
+
+def compilar_mascara(predicado: Predicado, esquema: tuple[str, ...]) -> Callable[[Lote], np.ndarray]:
+    """
+    Transforma um predicado em uma função que calcula, de uma vez, a máscara booleana das linhas de um lote que
+    satisfazem o predicado.
+
+    Args:
+        predicado (Predicado): O predicado.
+        esquema (tuple[str, ...]): O esquema (`alias.coluna` de cada posição) dos lotes.
+
+    Returns:
+        Callable[[Lote], np.ndarray]: A função que avalia o predicado em um lote.
+    """
+    comparador = COMPARADORES[predicado.operador]
+    elemento_a_elemento = _comparar_elementos(comparador)
+
+    def operando(valor: Union[Coluna, str]) -> Callable[[Lote], Any]:
+        if isinstance(valor, Coluna):
+            posicao = posicao_coluna(esquema, valor)
+            return lambda lote: lote.colunas[posicao]
+        literal = valor_literal(valor)
+        return lambda lote: literal
+
+    esquerda, direita = operando(predicado.esquerda), operando(predicado.direita)
+
+    def avaliar(lote: Lote) -> np.ndarray:
+        a, b = esquerda(lote), direita(lote)
+        if _numerico(a) and _numerico(b):
+            return np.broadcast_to(comparador(a, b), len(lote))
+
+        # Vetores de objetos podem ter NULL, que nunca satisfaz a comparação
+        validos = np.ones(len(lote), dtype=bool)
+        for vetor in (a, b):
+            if isinstance(vetor, np.ndarray) and vetor.dtype == object:
+                validos &= np.not_equal(vetor, None)
+        a = a[validos] if isinstance(a, np.ndarray) else a
+        b = b[validos] if isinstance(b, np.ndarray) else b
+        mascara = np.zeros(len(lote), dtype=bool)
+        try:
+            mascara[validos] = comparador(a, b)
+        except TypeError:
+            mascara[validos] = elemento_a_elemento(a, b)
+        return mascara
+
+    return avaliar
+
+def _conjuncao(predicados: tuple[Predicado, ...], esquema: tuple[str, ...]) -> Optional[Callable[[Lote], np.ndarray]]:
+    """
+    Compila a conjunção dos predicados (None se não houver predicados).
+    """
+    funcoes = [compilar_mascara(predicado, esquema) for predicado in predicados]
+    if not funcoes:
+        return None
+
+    def avaliar(lote: Lote) -> np.ndarray:
+        mascara = funcoes[0](lote)
+        for funcao in funcoes[1:]:
+            mascara = mascara & funcao(lote)
+        return mascara
+
+    return avaliar
+
+def _filtrar(lote: Lote, condicao: Optional[Callable[[Lote], np.ndarray]]) -> Optional[Lote]:
+    """
+    Aplica a condição ao lote; devolve None se nenhuma linha a satisfizer.
+    """
+    if condicao is None:
+        return lote if len(lote) else None
+    mascara = condicao(lote)
+    if mascara.all():
+        return lote if len(lote) else None
+    if not mascara.any():
+        return None
+    return lote.selecionar(mascara)
+
+# --- Operadores ---
+
+class OperadorColunar:
+    """
+    Operador de execução vetorizada: produz os lotes do seu resultado sob demanda, ao ser iterado.
+    """
+    esquema: tuple[str, ...] = ()
+
+    def __iter__(self: OperadorColunar) -> Iterator[Lote]:
+        raise NotImplementedError
+
+    def materializar(self: OperadorColunar) -> Lote:
+        """
+        Lê todo o resultado do operador em um único lote.
+        """
+        return _concatenar(list(self), len(self.esquema))
+
+class VarreduraColunar(OperadorColunar):
+    """
+    Lê a tabela do banco em blocos de `tamanho_lote` linhas, convertidos em colunas. Se `colunas` for informado,
+    apenas essas colunas são lidas; se `filtro` for informado (`coluna OP literal`), apenas as linhas que o satisfazem.
+    """
+    def __init__(
+        self: VarreduraColunar,
+        conexao: sqlite3.Connection,
+        tabela: str,
+        alias: str,
+        colunas: Optional[Iterable[str]] = None,
+        tamanho_lote: int = TAMANHO_LOTE,
+        filtro: Optional[Predicado] = None,
+    ) -> None:
+        # A validação da tabela e o SQL são os mesmos da varredura por linhas
+        varredura = OperadorVarredura(conexao, tabela, alias, colunas, filtro)
+        self.conexao = conexao
+        self.esquema = varredura.esquema
+        self.sql = varredura.sql
+        self.parametros = varredura.parametros
+        self.tamanho_lote = tamanho_lote
+
+    def __iter__(self: VarreduraColunar) -> Iterator[Lote]:
+        cursor = self.conexao.execute(self.sql, self.parametros)
+        while linhas := cursor.fetchmany(self.tamanho_lote):
+            yield Lote(tuple(vetor_coluna(valores) for valores in zip(*linhas)))
+
+class ConsultaColunar(VarreduraColunar):
+    """
+    Executa no SQLite a consulta equivalente a uma subárvore delegada (`decompilar`), lida em blocos de `tamanho_lote`
+    linhas, convertidos em colunas.
+    """
+    def __init__(self: ConsultaColunar, conexao: sqlite3.Connection, consulta: ConsultaSQL, tamanho_lote: int = TAMANHO_LOTE) -> None:
+        self.conexao = conexao
+        self.esquema = consulta.esquema
+        self.sql = consulta.sql
+        self.parametros = consulta.parametros
+        self.tamanho_lote = tamanho_lote
+
+class FiltroColunar(OperadorColunar):
+    """
+    Mantém, em cada lote da entrada, apenas as linhas que satisfazem todos os predicados.
+    """
+    def __init__(self: FiltroColunar, entrada: OperadorColunar, predicados: tuple[Predicado, ...]) -> None:
+        self.entrada = entrada
+        self.esquema = entrada.esquema
+        self._condicao = _conjuncao(predicados, entrada.esquema)
+
+    def __iter__(self: FiltroColunar) -> Iterator[Lote]:
+        for lote in self.entrada:
+            filtrado = _filtrar(lote, self._condicao)
+            if filtrado is not None:
+                yield filtrado
+
+class ProjecaoColunar(OperadorColunar):
+    """
+    Mantém apenas as colunas informadas, na ordem informada. Os vetores da entrada são reaproveitados, sem cópia.
+    """
+    def __init__(self: ProjecaoColunar, entrada: OperadorColunar, colunas: list[Coluna]) -> None:
+        self.entrada = entrada
+        self.esquema = tuple(str(coluna) for coluna in colunas)
+        self._posicoes = [posicao_coluna(entrada.esquema, coluna) for coluna in colunas]
+
+    def __iter__(self: ProjecaoColunar) -> Iterator[Lote]:
+        posicoes = self._posicoes
+        for lote in self.entrada:
+            yield Lote(tuple(lote.colunas[posicao] for posicao in posicoes))
+
+class LacoAninhadoColunar(OperadorColunar):
+    """
+    Junção por laços aninhados: o lado direito é materializado no primeiro lote da esquerda e combinado com cada lote
+    da esquerda em blocos de até `tamanho_lote` pares, filtrados pela condição.
+    """
+    def __init__(
+        self: LacoAninhadoColunar,
+        esquerda: OperadorColunar,
+        direita: OperadorColunar,
+        predicados: tuple[Predicado, ...] = (),
+        tamanho_lote: int = TAMANHO_LOTE,
+    ) -> None:
+        self.esquerda = esquerda
+        self.direita = direita
+        self.esquema = esquerda.esquema + direita.esquema
+        self.tamanho_lote = tamanho_lote
+        self._condicao = _conjuncao(predicados, self.esquema)
+
+    def __iter__(self: LacoAninhadoColunar) -> Iterator[Lote]:
+        interna: Optional[Lote] = None
+        for lote in self.esquerda:
+            if interna is None:
+                interna = self.direita.materializar()
+            if not len(interna):
+                return
+            # Linhas da esquerda por bloco, para que cada bloco tenha no máximo `tamanho_lote` pares
+            passo = max(1, self.tamanho_lote // len(interna))
+            for inicio in range(0, len(lote), passo):
+                fim = min(inicio + passo, len(lote))
+                indices_esquerda = np.repeat(np.arange(inicio, fim), len(interna))
+                indices_direita = np.tile(np.arange(len(interna)), fim - inicio)
+                combinado = Lote(lote.selecionar(indices_esquerda).colunas + interna.selecionar(indices_direita).colunas)
+                filtrado = _filtrar(combinado, self._condicao)
+                if filtrado is not None:
+                    yield filtrado
+
+class JuncaoOrdenadaColunar(OperadorColunar):
+    """
+    Equi-junção vetorizada: as chaves do lado direito são ordenadas uma única vez e, para cada lote da esquerda, o
+    intervalo de linhas correspondentes de cada chave é encontrado por busca binária (`np.searchsorted`). Com uma
+    única chave numérica nos dois lados, as chaves são usadas diretamente; nos demais casos (textos, NULL, chaves
+    compostas) elas são antes convertidas em códigos inteiros por uma tabela hash construída com o lado direito.
+    Os demais predicados são avaliados nos lotes combinados.
+    """
+    def __init__(
+        self: JuncaoOrdenadaColunar,
+        esquerda: OperadorColunar,
+        direita: OperadorColunar,
+        chaves: tuple[tuple[Coluna, Coluna], ...],
+        residuais: tuple[Predicado, ...] = (),
+    ) -> None:
+        self.esquerda = esquerda
+        self.direita = direita
+        self.esquema = esquerda.esquema + direita.esquema
+        self._posicoes_esquerda = [posicao_coluna(esquerda.esquema, coluna) for coluna, _ in chaves]
+        self._posicoes_direita = [posicao_coluna(direita.esquema, coluna) for _, coluna in chaves]
+        self._condicao = _conjuncao(residuais, self.esquema)
+
+    def __iter__(self: JuncaoOrdenadaColunar) -> Iterator[Lote]:
+        interna: Optional[Lote] = None
+        for lote in self.esquerda:
+            if interna is None:
+                interna = self.direita.materializar()
+                chaves_direita = [interna.colunas[posicao] for posicao in self._posicoes_direita]
+                codigos: Optional[dict[Any, int]] = None
+                if len(chaves_direita) == 1 and _numerico(chaves_direita[0]):
+                    valores = chaves_direita[0]
+                else:
+                    codigos = {}
+                    valores = _codificar(chaves_direita, codigos, inserir=True)
+                ordem, ordenadas = _ordenar_chaves(valores)
+            if not len(ordenadas):
+                return
+
+            chaves_esquerda = [lote.colunas[posicao] for posicao in self._posicoes_esquerda]
+            if codigos is None and _numerico(chaves_esquerda[0]):
+                procuradas = chaves_esquerda[0]
+            else:
+                if codigos is None:
+                    # Chave numérica na direita, mas não na esquerda (textos ou NULL): usa os próprios valores
+                    codigos = {valor: valor for valor in ordenadas.tolist()}
+                procuradas = _codificar(chaves_esquerda, codigos, inserir=False)
+
+            indices_esquerda, indices_direita = _pares_correspondentes(ordenadas, ordem, procuradas)
+            if not len(indices_esquerda):
+                continue
+            combinado = Lote(lote.selecionar(indices_esquerda).colunas + interna.selecionar(indices_direita).colunas)
+            filtrado = _filtrar(combinado, self._condicao)
+            if filtrado is not None:
+                yield filtrado
+
+def _ordenar_chaves(valores: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Ordena as chaves do lado de construção de uma equi-junção. Devolve as posições das linhas em ordem de chave e as
+    chaves ordenadas; linhas com chave NULL (NaN) são descartadas, pois nunca participam da junção. A ordenação é
+    estável, mantendo para cada chave a ordem original das linhas.
+    """
+    validas = np.flatnonzero(~np.isnan(valores)) if valores.dtype.kind == "f" else np.arange(len(valores))
+    ordem = validas[np.argsort(valores[validas], kind="stable")]
+    return ordem, valores[ordem]
+
+def _pares_correspondentes(ordenadas: np.ndarray, ordem: np.ndarray, procuradas: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Localiza, por busca binária, as linhas do lado de construção (`ordenadas`/`ordem`, de `_ordenar_chaves`) com a
+    mesma chave de cada valor procurado. Devolve as posições dos pares (procurado, construção), na ordem das linhas
+    procuradas.
+    """
+    inicios = np.searchsorted(ordenadas, procuradas, side="left")
+    contagens = np.searchsorted(ordenadas, procuradas, side="right") - inicios
+    total = int(contagens.sum())
+    indices_procurados = np.repeat(np.arange(len(procuradas)), contagens)
+    deslocamentos = np.arange(total) - np.repeat(np.cumsum(contagens) - contagens, contagens)
+    return indices_procurados, ordem[np.repeat(inicios, contagens) + deslocamentos]
+
+def _codificar(colunas: list[np.ndarray], codigos: dict[Any, Any], inserir: bool) -> np.ndarray:
+    """
+    Converte as chaves (uma ou mais colunas) nos seus códigos. Chaves com NULL, e chaves ausentes quando `inserir` é
+    False, recebem um código que não corresponde a nenhuma chave (NaN).
+    """
+    chaves = colunas[0].tolist() if len(colunas) == 1 else list(zip(*(coluna.tolist() for coluna in colunas)))
+    nulas = (lambda chave: chave is None) if len(colunas) == 1 else (lambda chave: None in chave)
+    resultado = np.empty(len(chaves), dtype=np.float64)
+    for posicao, chave in enumerate(chaves):
+        if nulas(chave):
+            resultado[posicao] = np.nan
+        elif inserir:
+            resultado[posicao] = codigos.setdefault(chave, len(codigos))
+        else:
+            codigo = codigos.get(chave)
+            resultado[posicao] = np.nan if codigo is None else codigo
+    return resultado
+
+# --- Junção paralela ---
+
+# Abaixo deste total de linhas (somando os dois lados), a junção paralela é feita no próprio processo
+LIMITE_JUNCAO_PARALELA = 50_000
+# Constante de Fibonacci (2^64 / razão áurea), usada para espalhar as chaves entre as partições
+_MULTIPLICADOR_HASH = np.uint64(0x9E3779B97F4A7C15)
+
+def _codificar_lados(chaves_esquerda: list[np.ndarray], chaves_direita: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Converte as chaves dos dois lados de uma equi-junção em vetores do mesmo tipo, comparáveis entre si: `int64` se
+    forem inteiras nos dois lados, `float64` se forem numéricas e códigos de uma tabela hash nos demais casos
+    (NULL e chaves sem correspondente viram NaN).
+    """
+    if len(chaves_esquerda) == 1 and _numerico(chaves_esquerda[0]) and _numerico(chaves_direita[0]):
+        esquerda, direita = chaves_esquerda[0], chaves_direita[0]
+        if esquerda.dtype.kind in "iu" and direita.dtype.kind in "iu":
+            return esquerda.astype(np.int64, copy=False), direita.astype(np.int64, copy=False)
+        # Somar 0.0 normaliza -0.0, para que valores iguais tenham a mesma representação binária
+        return esquerda.astype(np.float64) + 0.0, direita.astype(np.float64) + 0.0
+    codigos: dict[Any, Any] = {}
+    direita = _codificar(chaves_direita, codigos, inserir=True)
+    return _codificar(chaves_esquerda, codigos, inserir=False), direita
+
+def particionar_radix(valores: np.ndarray, bits: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Distribui as linhas entre 2^bits partições pelos bits mais altos do hash multiplicativo da chave, de forma que
+    chaves iguais (nos dois lados da junção) caiam sempre na mesma partição. Linhas com chave NULL (NaN) são
+    descartadas.
+
+    Args:
+        valores (np.ndarray): As chaves (`int64` ou `float64`, de `_codificar_lados`).
+        bits (int): Número de bits do identificador da partição.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: As posições das linhas agrupadas por partição (mantendo a ordem original dentro
+        de cada partição) e os limites das partições nesse vetor (2^bits + 1 posições).
+    """
+    validas = np.flatnonzero(~np.isnan(valores)) if valores.dtype.kind == "f" else np.arange(len(valores))
+    particoes = ((valores[validas].view(np.uint64) * _MULTIPLICADOR_HASH) >> np.uint64(64 - bits)).astype(np.intp)
+    posicoes = validas[np.argsort(particoes, kind="stable")]
+    limites = np.zeros((1 << bits) + 1, dtype=np.intp)
+    np.cumsum(np.bincount(particoes, minlength=1 << bits), out=limites[1:])
+    return posicoes, limites
+
+def _compartilhar(vetor: np.ndarray) -> tuple[shared_memory.SharedMemory, tuple[str, str, int]]:
+    """
+    Copia um vetor para um bloco novo de memória compartilhada. Devolve o bloco e o descritor (nome, tipo, tamanho)
+    usado pelos outros processos para acessá-lo.
+    """
+    memoria = shared_memory.SharedMemory(create=True, size=max(vetor.nbytes, 1))
+    np.ndarray(vetor.shape, dtype=vetor.dtype, buffer=memoria.buf)[:] = vetor
+    return memoria, (memoria.name, vetor.dtype.str, vetor.size)
+
+def _parear_particao(memorias: list[shared_memory.SharedMemory], descritores: list[tuple[str, str, int]], intervalos: tuple[int, int, int, int]) -> np.ndarray:
+    """
+    Junta um par de partições lido da memória compartilhada. Devolve os pares (posição na esquerda, posição na
+    direita) como um vetor 2 x n, já fora da memória compartilhada.
+    """
+    chaves_esquerda, posicoes_esquerda, chaves_direita, posicoes_direita = (
+        np.ndarray((tamanho,), dtype=tipo, buffer=memoria.buf) for memoria, (_, tipo, tamanho) in zip(memorias, descritores)
+    )
+    inicio_esquerda, fim_esquerda, inicio_direita, fim_direita = intervalos
+    ordem, ordenadas = _ordenar_chaves(chaves_direita[inicio_direita:fim_direita])
+    indices_esquerda, indices_direita = _pares_correspondentes(ordenadas, ordem, chaves_esquerda[inicio_esquerda:fim_esquerda])
+    return np.stack((
+        posicoes_esquerda[inicio_esquerda:fim_esquerda][indices_esquerda],
+        posicoes_direita[inicio_direita:fim_direita][indices_direita],
+    ))
+
+def _juntar_particao(descritores: list[tuple[str, str, int]], intervalos: tuple[int, int, int, int]) -> tuple[Optional[str], int]:
+    """
+    Tarefa executada pelos processos do pool: junta um par de partições e grava os pares encontrados em um bloco novo
+    de memória compartilhada, cujo nome é devolvido (None se não houver pares) junto com o número de pares. Assim,
+    nem as chaves nem os resultados são serializados entre os processos.
+    """
+    memorias = [shared_memory.SharedMemory(name=nome) for nome, _, _ in descritores]
+    try:
+        pares = _parear_particao(memorias, descritores, intervalos)
+    finally:
+        for memoria in memorias:
+            memoria.close()
+    if not pares.shape[1]:
+        return None, 0
+    saida, _ = _compartilhar(pares)
+    saida.close()
+    return saida.name, pares.shape[1]
+
+def _ler_pares(nome: str, total: int) -> np.ndarray:
+    """
+    Copia os pares gravados por `_juntar_particao` e libera o bloco de memória compartilhada.
+    """
+    memoria = shared_memory.SharedMemory(name=nome)
+    try:
+        return np.ndarray((2, total), dtype=np.intp, buffer=memoria.buf).copy()
+    finally:
+        memoria.close()
+        memoria.unlink()
+
+class JuncaoParalelaColunar(OperadorColunar):
+    """
+    Equi-junção paralela: os dois lados são materializados e particionados pelo hash das chaves (`particionar_radix`),
+    e cada par de partições é juntado em um processo de um pool. As chaves e as posições das linhas são passadas aos
+    processos por memória compartilhada; as linhas em si ficam no processo principal, que monta os lotes do
+    resultado a partir dos pares de posições devolvidos. Os demais predicados são avaliados nos lotes combinados.
+
+    Com `ordem_deterministica`, o resultado sai na mesma ordem da junção sequencial (`JuncaoOrdenadaColunar`);
+    sem ela, os pares de cada partição são repassados assim que ficam prontos.
+    """
+    def __init__(
+        self: JuncaoParalelaColunar,
+        esquerda: OperadorColunar,
+        direita: OperadorColunar,
+        chaves: tuple[tuple[Coluna, Coluna], ...],
+        residuais: tuple[Predicado, ...] = (),
+        processos: int = 2,
+        ordem_deterministica: bool = True,
+        tamanho_lote: int = TAMANHO_LOTE,
+    ) -> None:
+        if processos < 1:
+            raise ValueError(f"O número de processos deve ser positivo. Valor passado como argumento: {processos = }")
+        self.esquerda = esquerda
+        self.direita = direita
+        self.esquema = esquerda.esquema + direita.esquema
+        self.processos = processos
+        self.ordem_deterministica = ordem_deterministica
+        self.tamanho_lote = tamanho_lote
+        self._posicoes_esquerda = [posicao_coluna(esquerda.esquema, coluna) for coluna, _ in chaves]
+        self._posicoes_direita = [posicao_coluna(direita.esquema, coluna) for _, coluna in chaves]
+        self._condicao = _conjuncao(residuais, self.esquema)
+
+    def _pares(self: JuncaoParalelaColunar, chaves_esquerda: np.ndarray, chaves_direita: np.ndarray) -> Iterator[np.ndarray]:
+        """
+        Produz os pares (posição na esquerda, posição na direita) das linhas com chaves iguais, em blocos.
+        """
+        if self.processos == 1 or len(chaves_esquerda) + len(chaves_direita) < LIMITE_JUNCAO_PARALELA:
+            ordem, ordenadas = _ordenar_chaves(chaves_direita)
+            yield np.stack(_pares_correspondentes(ordenadas, ordem, chaves_esquerda))
+            return
+
+        # Algumas partições por processo, para equilibrar a carga quando as chaves se concentram
+        bits = (4 * self.processos - 1).bit_length()
+        posicoes_esquerda, limites_esquerda = particionar_radix(chaves_esquerda, bits)
+        posicoes_direita, limites_direita = particionar_radix(chaves_direita, bits)
+        memorias, descritores = [], []
+        try:
+            for vetor in (chaves_esquerda[posicoes_esquerda], posicoes_esquerda, chaves_direita[posicoes_direita], posicoes_direita):
+                memoria, descritor = _compartilhar(vetor)
+                memorias.append(memoria)
+                descritores.append(descritor)
+            with ProcessPoolExecutor(max_workers=self.processos) as pool:
+                tarefas = [
+                    pool.submit(_juntar_particao, descritores, (
+                        limites_esquerda[particao], limites_esquerda[particao + 1],
+                        limites_direita[particao], limites_direita[particao + 1],
+                    ))
+                    for particao in range(1 << bits)
+                    if limites_esquerda[particao] < limites_esquerda[particao + 1] and limites_direita[particao] < limites_direita[particao + 1]
+                ]
+                blocos, lidas = [], set()
+                try:
+                    for tarefa in tarefas if self.ordem_deterministica else as_completed(tarefas):
+                        lidas.add(tarefa)
+                        nome, total = tarefa.result()
+                        if nome is None:
+                            continue
+                        if self.ordem_deterministica:
+                            blocos.append(_ler_pares(nome, total))
+                        else:
+                            yield _ler_pares(nome, total)
+                finally:
+                    # Se o gerador for descartado antes do fim, os resultados ainda não lidos também são liberados
+                    for tarefa in tarefas:
+                        if tarefa not in lidas and not tarefa.cancel():
+                            nome, total = tarefa.result()
+                            if nome is not None:
+                                _ler_pares(nome, total)
+            if self.ordem_deterministica:
+                pares = np.concatenate(blocos, axis=1) if blocos else np.empty((2, 0), dtype=np.intp)
+                # Mesma ordem da junção sequencial: pela linha da esquerda e, em seguida, pela da direita
+                yield pares[:, np.lexsort((pares[1], pares[0]))]
+        finally:
+            for memoria in memorias:
+                memoria.close()
+                memoria.unlink()
+
+    def __iter__(self: JuncaoParalelaColunar) -> Iterator[Lote]:
+        externa = self.esquerda.materializar()
+        interna = self.direita.materializar()
+        if not len(externa) or not len(interna):
+            return
+        chaves_esquerda, chaves_direita = _codificar_lados(
+            [externa.colunas[posicao] for posicao in self._posicoes_esquerda],
+            [interna.colunas[posicao] for posicao in self._posicoes_direita],
+        )
+        for pares in self._pares(chaves_esquerda, chaves_direita):
+            for inicio in range(0, pares.shape[1], self.tamanho_lote):
+                bloco = pares[:, inicio:inicio + self.tamanho_lote]
+                combinado = Lote(externa.selecionar(bloco[0]).colunas + interna.selecionar(bloco[1]).colunas)
+                filtrado = _filtrar(combinado, self._condicao)
+                if filtrado is not None:
+                    yield filtrado
+
+# --- Construção e execução dos planos ---
+
+def colunas_usadas(arvore: Arvore) -> Optional[dict[str, set[str]]]:
+    """
+    Colunas (nomes em minúsculas) de cada alias que a consulta realmente usa, nas projeções e nos predicados, para que
+    as varreduras leiam apenas essas colunas. Devolve None se a raiz não for uma projeção (todas as colunas fazem
+    parte do resultado).
+    """
+    if arvore.raiz is None or arvore.raiz.operacao is not Operacao.PROJECT:
+        return None
+    usadas: dict[str, set[str]] = {}
+    for no in percorrer_pre_ordem(arvore.raiz):
+        if no.operacao is Operacao.PROJECT:
+            colunas = colunas_projecao(no)
+        else:
+            colunas = [coluna for predicado in no.predicados for coluna in predicado.colunas()]
+        for coluna in colunas:
+            usadas.setdefault(coluna.alias, set()).add(coluna.nome)
+    return usadas
+
+def construir_plano_vetorizado(
+    arvore: Arvore,
+    conexao: sqlite3.Connection,
+    tamanho_lote: int = TAMANHO_LOTE,
+    processos: int = 1,
+    ordem_deterministica: bool = True,
+    instrumentacao: Optional[Any] = None,
+) -> OperadorColunar:
+    """
+    Constrói o operador de execução vetorizada de cada nó da árvore, dos filhos para os pais (sem recursão).
+
+    Args:
+        arvore (Arvore): A árvore da consulta.
+        conexao (sqlite3.Connection): A conexão com o banco, usada pelas varreduras.
+        tamanho_lote (int): Número máximo de linhas lidas por lote nas varreduras.
+        processos (int): Com mais de um processo, as equi-junções são feitas em paralelo (`JuncaoParalelaColunar`).
+        ordem_deterministica (bool): Se False, as junções paralelas devolvem os pares de cada partição assim que
+            ficam prontos, sem garantir a ordem das linhas.
+        instrumentacao (Optional[Instrumentacao]): Se informada, cada operador é envolvido por um operador que mede a
+            sua execução (`instrumentacao.py`).
+
+    Returns:
+        OperadorColunar: O operador da raiz, cujo esquema descreve as colunas do resultado.
+
+    Raises:
+        ValueError: Se a árvore estiver vazia ou referenciar tabelas, colunas ou literais inválidos.
+    """
+    if arvore.raiz is None:
+        raise ValueError("A árvore está vazia. Não é possível executá-la.")
+
+    usadas = colunas_usadas(arvore)
+    operadores: dict[int, OperadorColunar] = {}
+    # Na pré-ordem invertida, cada nó aparece depois de todos os seus descendentes
+    for no in reversed(nos_executados(arvore.raiz)):
+        if delegado(no):
+            operador = ConsultaColunar(conexao, decompilar(no, conexao), tamanho_lote)
+        elif no.operacao is Operacao.TABLE:
+            colunas = None if usadas is None else usadas.get(no.alias, set())
+            # Só as buscas por literal são usadas: as junções por laços aninhados com índice viram junções por lotes,
+            # em que o lado interno é lido de uma vez
+            filtro = filtro_indice(no)
+            if filtro is not None and isinstance(filtro.direita, Coluna):
+                filtro = None
+            operador = VarreduraColunar(conexao, no.valor.split("[")[0].strip().lower(), no.alias, colunas, tamanho_lote, filtro)
+        elif no.operacao is Operacao.SELECT:
+            operador = FiltroColunar(operadores[id(no.filho_esq)], no.predicados)
+        elif no.operacao is Operacao.PROJECT:
+            operador = ProjecaoColunar(operadores[id(no.filho_esq)], colunas_projecao(no))
+        else:
+            esquerda, direita = operadores[id(no.filho_esq)], operadores[id(no.filho_dir)]
+            chaves = no.chaves_equijuncao()
+            if chaves and processos > 1:
+                operador = JuncaoParalelaColunar(
+                    esquerda, direita, chaves, predicados_residuais(no, chaves), processos, ordem_deterministica, tamanho_lote
+                )
+            elif chaves:
+                operador = JuncaoOrdenadaColunar(esquerda, direita, chaves, predicados_residuais(no, chaves))
+            else:
+                operador = LacoAninhadoColunar(esquerda, direita, no.predicados, tamanho_lote)
+        operadores[id(no)] = operador if instrumentacao is None else instrumentacao.medir(no, operador)
+    return operadores[id(arvore.raiz)]
+
+def executar_lotes(
+    arvore: Arvore,
+    caminho: Union[str, Path] = CAMINHO_BANCO,
+    tamanho_lote: int = TAMANHO_LOTE,
+    processos: int = 1,
+) -> Iterator[Lote]:
+    """
+    Executa a árvore de uma consulta sobre o banco, produzindo os lotes do resultado sob demanda.
+    A conexão é fechada quando o gerador termina ou é descartado.
+
+    Args:
+        arvore (Arvore): A árvore da consulta (otimizada ou não).
+        caminho (Union[str, Path]): Caminho do banco SQLite. Padrão é `banco_de_dados/db_vendas.db`.
+        tamanho_lote (int): Número máximo de linhas lidas por lote nas varreduras.
+        processos (int): Número de processos das equi-junções paralelas (1 para não usar paralelismo).
+
+    Returns:
+        Iterator[Lote]: Os lotes do resultado (nenhum deles vazio).
+    """
+    conexao = conectar_banco(caminho)
+    try:
+        yield from construir_plano_vetorizado(arvore, conexao, tamanho_lote, processos)
+    finally:
+        conexao.close()
+
+def executar_vetorizado(
+    arvore: Arvore,
+    caminho: Union[str, Path] = CAMINHO_BANCO,
+    tamanho_lote: int = TAMANHO_LOTE,
+    processos: int = 1,
+) -> Iterator[tuple]:
+    """
+    Executa a árvore no modo vetorizado, produzindo as mesmas linhas (tuplas) que `execucao_consultas.executar`.
+    """
+    for lote in executar_lotes(arvore, caminho, tamanho_lote, processos):
+        yield from lote.linhas()
+
+# --- Comparação dos modos de execução ---
+
+def consultas_de_exemplo(caminho: Union[str, Path] = CAMINHO_EXEMPLOS) -> list[str]:
+    """
+    Consultas válidas (seção "SEM ERRO") de `docs/exemplos_consultas.txt`.
+    """
+    consultas = []
+    for linha in Path(caminho).read_text(encoding="utf-8").splitlines():
+        linha = linha.strip()
+        if linha.startswith("---------"):
+            if consultas:
+                break
+            continue
+        if linha:
+            consultas.append(linha)
+    return consultas
+
+def _medir(funcao: Callable[[], int], repeticoes: int) -> tuple[float, int]:
+    """
+    Menor tempo de `repeticoes` execuções da função e o valor que ela devolve.
+    """
+    melhor, resultado = float("inf"), 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def _arvore_otimizada(sql: str, estatisticas: EstatisticasBanco) -> Arvore:
+    arvore = converter_algebra_em_arvore(process_sql_query_ir(sql))
+    return otimizar_projecoes(otimizar_selects(reordenar_juncoes(arvore, estatisticas), estatisticas))
+
+def comparar_motores(
+    consultas: Iterable[str],
+    caminho: Union[str, Path] = CAMINHO_BANCO,
+    repeticoes: int = 3,
+    tamanho_lote: int = TAMANHO_LOTE,
+) -> list[dict[str, Any]]:
+    """
+    Mede o tempo das execuções por linhas e vetorizada das árvores otimizadas das consultas.
+
+    Args:
+        consultas (Iterable[str]): As consultas SQL.
+        caminho (Union[str, Path]): Caminho do banco SQLite.
+        repeticoes (int): Número de execuções de cada consulta; é considerado o menor tempo.
+        tamanho_lote (int): Tamanho dos lotes da execução vetorizada.
+
+    Returns:
+        list[dict[str, Any]]: Para cada consulta, as chaves `sql`, `linhas`, `tempo_linhas` e `tempo_vetorizado`
+        (em segundos).
+
+    Raises:
+        ValueError: Se os dois modos devolverem números de linhas diferentes.
+    """
+    estatisticas = obter_estatisticas(caminho)
+    resultados = []
+    for sql in consultas:
+        arvore = _arvore_otimizada(sql, estatisticas)
+        tempo_linhas, linhas = _medir(lambda: sum(1 for _ in executar(arvore, caminho)), repeticoes)
+        tempo_vetorizado, linhas_vetorizado = _medir(
+            lambda: sum(1 for _ in executar_vetorizado(arvore, caminho, tamanho_lote)), repeticoes
+        )
+        if linhas != linhas_vetorizado:
+            raise ValueError(f"Resultados diferentes nos dois modos de execução ({linhas} e {linhas_vetorizado} linhas): {sql}")
+        resultados.append({"sql": sql, "linhas": linhas, "tempo_linhas": tempo_linhas, "tempo_vetorizado": tempo_vetorizado})
+    return resultados
+
+def comparar_processos(
+    consultas: Iterable[str],
+    caminho: Union[str, Path] = CAMINHO_BANCO,
+    processos: Sequence[int] = (1, 2, 4, 8),
+    repeticoes: int = 3,
+) -> list[dict[str, Any]]:
+    """
+    Mede o tempo da execução vetorizada das árvores otimizadas com diferentes números de processos nas junções.
+    Apenas as consultas com junções são medidas.
+
+    Args:
+        consultas (Iterable[str]): As consultas SQL.
+        caminho (Union[str, Path]): Caminho do banco SQLite.
+        processos (Sequence[int]): Os números de processos comparados.
+        repeticoes (int): Número de execuções de cada consulta; é considerado o menor tempo.
+
+    Returns:
+        list[dict[str, Any]]: Para cada consulta, as chaves `sql`, `linhas` e `tempos` (segundos por número de processos).
+    """
+    estatisticas = obter_estatisticas(caminho)
+    resultados = []
+    for sql in consultas:
+        arvore = _arvore_otimizada(sql, estatisticas)
+        if not any(no.operacao is Operacao.JOIN for no in percorrer_pre_ordem(arvore.raiz)):
+            continue
+        tempos, linhas = {}, 0
+        for numero in processos:
+            tempos[numero], linhas = _medir(
+                lambda: sum(map(len, executar_lotes(arvore, caminho, processos=numero))), repeticoes
+            )
+        resultados.append({"sql": sql, "linhas": linhas, "tempos": tempos})
+    return resultados
+
+def comparar_delegacao(
+    consultas: Iterable[str],
+    caminho: Union[str, Path] = CAMINHO_BANCO,
+    repeticoes: int = 3,
+) -> list[dict[str, Any]]:
+    """
+    Mede o tempo das execuções por linhas e vetorizada das árvores otimizadas (com o planejamento físico) das
+    consultas em cada modo de delegação ao SQLite (`Delegacao`).
+
+    Args:
+        consultas (Iterable[str]): As consultas SQL.
+        caminho (Union[str, Path]): Caminho do banco SQLite.
+        repeticoes (int): Número de execuções de cada consulta; é considerado o menor tempo.
+
+    Returns:
+        list[dict[str, Any]]: Para cada consulta, as chaves `sql`, `linhas`, `fragmentos` (número de subárvores
+        delegadas no modo híbrido), `tempos_linhas` e `tempos_vetorizada` (segundos por modo).
+
+    Raises:
+        ValueError: Se os modos devolverem números de linhas diferentes.
+    """
+    estatisticas = obter_estatisticas(caminho)
+    resultados = []
+    for sql in consultas:
+        arvore = planejar_acesso(_arvore_otimizada(sql, estatisticas), estatisticas)
+        tempos_linhas, tempos_vetorizada, linhas = {}, {}, set()
+        for modo in Delegacao:
+            delegada = delegar_ao_sqlite(arvore, modo)
+            tempos_linhas[modo], total = _medir(lambda: sum(1 for _ in executar(delegada, caminho)), repeticoes)
+            linhas.add(total)
+            tempos_vetorizada[modo], total = _medir(lambda: sum(map(len, executar_lotes(delegada, caminho))), repeticoes)
+            linhas.add(total)
+        if len(linhas) > 1:
+            raise ValueError(f"Resultados diferentes nos modos de delegação ({sorted(linhas)} linhas): {sql}")
+        fragmentos = sum(map(delegado, percorrer_pre_ordem(delegar_ao_sqlite(arvore).raiz)))
+        resultados.append({
+            "sql": sql, "linhas": linhas.pop(), "fragmentos": fragmentos,
+            "tempos_linhas": tempos_linhas, "tempos_vetorizada": tempos_vetorizada,
+        })
+    return resultados
+
+def _imprimir_comparacao(resultados: list[dict[str, Any]]) -> None:
+    print(f"{'linhas':>10} {'por linhas (s)':>15} {'vetorizada (s)':>15} {'ganho':>7}  consulta")
+    for resultado in resultados:
+        ganho = resultado["tempo_linhas"] / max(resultado["tempo_vetorizado"], 1e-9)
+        print(
+            f"{resultado['linhas']:>10} {resultado['tempo_linhas']:>15.4f} {resultado['tempo_vetorizado']:>15.4f} "
+            f"{ganho:>6.1f}x  {resultado['sql']}"
+        )
+
+def _imprimir_processos(resultados: list[dict[str, Any]]) -> None:
+    for resultado in resultados:
+        base = next(iter(resultado["tempos"].values()))
+        tempos = "  ".join(f"{numero}p: {tempo:.3f}s ({base / max(tempo, 1e-9):.1f}x)" for numero, tempo in resultado["tempos"].items())
+        print(f"{resultado['linhas']:>10}  {tempos}  {resultado['sql']}")
+
+def _imprimir_delegacao(resultados: list[dict[str, Any]]) -> None:
+    modos = "/".join(modo.value for modo in Delegacao)
+    print(f"{'linhas':>10} {'por linhas, ' + modos + ' (s)':>38} {'vetorizada, ' + modos + ' (s)':>38} {'fragmentos':>10}  consulta")
+    for resultado in resultados:
+        linhas = " ".join(f"{tempo:>8.4f}" for tempo in resultado["tempos_linhas"].values())
+        vetorizada = " ".join(f"{tempo:>8.4f}" for tempo in resultado["tempos_vetorizada"].values())
+        print(f"{resultado['linhas']:>10} {linhas:>38} {vetorizada:>38} {resultado['fragmentos']:>10}  {resultado['sql']}")
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Compara os modos de execução nas consultas de exemplo.")
+    argumentos.add_argument("configuracoes", nargs="*", type=int, help="configurações de dados (1 a 4) com que o banco é populado")
+    argumentos.add_argument("--processos", nargs="+", type=int, help="compara as junções paralelas com estes números de processos")
+    argumentos.add_argument("--delegacao", action="store_true", help="compara os modos de delegação das subárvores ao SQLite")
+    argumentos = argumentos.parse_args()
+
+    def comparar() -> None:
+        if argumentos.delegacao:
+            _imprimir_delegacao(comparar_delegacao(consultas_de_exemplo()))
+        elif argumentos.processos:
+            _imprimir_processos(comparar_processos(consultas_de_exemplo(), processos=argumentos.processos))
+        else:
+            _imprimir_comparacao(comparar_motores(consultas_de_exemplo()))
+
+    if not argumentos.configuracoes:
+        comparar()
+    else:
+        from banco_de_dados.definicao_banco.definicao_banco import popular_db
+
+        for configuracao in argumentos.configuracoes:
+            popular_db(configuracao, ver_progresso=False)
+            print(f"\nconfiguracao{configuracao}")
+            comparar()
@@ -0,0 +1,353 @@
+"""
+Execução instrumentada das árvores de consulta (equivalente ao EXPLAIN ANALYZE): mede, para cada nó executado, as
+linhas recebidas e produzidas, os lotes, o tempo de relógio e de CPU, o pico de memória e a cardinalidade estimada
+pelo otimizador, para comparar com a real.
+
+A medição é feita por operadores intermediários (`OperadorMedido` e `OperadorColunarMedido`) colocados entre cada
+operador e o seu pai apenas quando a execução é instrumentada (`construir_plano_execucao` e
+`construir_plano_vetorizado` com `instrumentacao`). Sem instrumentação, o plano é exatamente o mesmo de antes, sem
+nenhum custo adicional.
+
+Os tempos e a memória de um nó incluem os dos seus descendentes (o trabalho feito para produzir as suas linhas); o
+tempo próprio de cada nó desconta o dos filhos. A memória é medida com `tracemalloc` (as alocações do Python e dos
+vetores do NumPy) e o pico de um nó é o maior volume alocado, além do existente no início da execução, enquanto ele
+trabalhava.
+
+Exemplo:
+    instrumentacao = executar_instrumentado(arvore_otimizada)
+    print(instrumentacao.relatorio())
+    instrumentacao.salvar_json("medicoes.json")
+    desenhar_arvore(arvore_otimizada, "arvore_medida", sobreposicao=instrumentacao.sobreposicao())
+
+Uso:
+    python instrumentacao.py "SELECT ..." [--vetorizada] [--memoria] [--json arquivo.json] [--imagem nome]
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+
+from parser import process_sql_query_ir
+from arvores_construcao_otimizacao import (
+    Arvore,
+    No,
+    converter_algebra_em_arvore,
+    desenhar_arvore,
+    estimar_cardinalidade,
+    otimizar_projecoes,
+    otimizar_selects,
+    percorrer_pre_ordem,
+    planejar_acesso,
+    reordenar_juncoes,
+)
+from estatisticas import CAMINHO_BANCO, EstatisticasBanco, obter_estatisticas
+from execucao_consultas import Operador, conectar_banco, construir_plano_execucao
+from execucao_vetorizada import TAMANHO_LOTE, OperadorColunar, construir_plano_vetorizado
+
+# --- Medições ---
+
+class MedicaoOperador:
+    """
+    Medições da execução de um nó. Os tempos (em segundos) e o pico de memória (em bytes) incluem os descendentes.
+    `lotes` e `tempo_cpu` só são medidos na execução vetorizada.
+    """
+    __slots__ = ("no", "execucoes", "linhas", "lotes", "tempo", "tempo_cpu", "memoria_pico")
+
+    def __init__(self: MedicaoOperador, no: No) -> None:
+        self.no = no
+        self.execucoes = 0
+        self.linhas = 0
+        self.lotes = 0
+        self.tempo = 0.0
+        self.tempo_cpu = 0.0
+        self.memoria_pico = 0
+
+class Instrumentacao:
+    """
+    Coleta as medições dos operadores de uma execução. É passada à construção do plano, que envolve cada operador
+    com `medir`, e depois consultada (`para_dict`, `relatorio`, `sobreposicao`).
+    """
+    def __init__(self: Instrumentacao, arvore: Arvore, vetorizada: bool = False, memoria: bool = False) -> None:
+        """
+        Args:
+            arvore (Arvore): A árvore executada.
+            vetorizada (bool): Se a execução é vetorizada (as linhas são contadas por lote).
+            memoria (bool): Se o pico de memória é medido. O `tracemalloc` deixa a execução de 5 a 20 vezes mais
+                lenta, e os tempos medidos junto com a memória não são comparáveis aos de uma execução normal.
+        """
+        self.arvore = arvore
+        self.vetorizada = vetorizada
+        self.memoria = memoria
+        self.medicoes: dict[int, MedicaoOperador] = {}
+        self.linhas = 0
+        self.tempo = 0.0
+        self.tempo_cpu = 0.0
+        self.memoria_pico = 0
+        # Memória alocada no início da execução e picos parciais dos nós em andamento (do mais externo ao atual)
+        self._base = 0
+        self._picos: list[int] = []
+
+    def medir(self: Instrumentacao, no: No, operador: Union[Operador, OperadorColunar]) -> Union[Operador, OperadorColunar]:
+        """
+        Envolve o operador de um nó com um operador que mede a sua execução.
+        """
+        medicao = self.medicoes[id(no)] = MedicaoOperador(no)
+        if isinstance(operador, OperadorColunar):
+            return OperadorColunarMedido(self, medicao, operador)
+        return OperadorMedido(self, medicao, operador)
+
+    def iterar(self: Instrumentacao, medicao: MedicaoOperador, operador: Iterable, contar: Optional[Callable[[Any], int]]) -> Iterator:
+        """
+        Repassa os itens (linhas, ou lotes contados por `contar`) do operador, medindo o trabalho feito para produzir
+        cada um. O tempo de CPU de cada nó só é medido por lote: por linha, a medição custaria mais que o próprio
+        trabalho dos operadores, e apenas o total da execução é medido.
+        """
+        medicao.execucoes += 1
+        iterador = iter(operador)
+        relogio, cpu, memoria = time.perf_counter, time.process_time if contar is not None else None, self.memoria
+        while True:
+            if memoria:
+                self._entrar()
+            inicio, inicio_cpu = relogio(), cpu() if cpu else 0.0
+            try:
+                item = next(iterador)
+            except StopIteration:
+                return
+            finally:
+                medicao.tempo += relogio() - inicio
+                if cpu:
+                    medicao.tempo_cpu += cpu() - inicio_cpu
+                if memoria:
+                    self._sair(medicao)
+            medicao.linhas += 1 if contar is None else contar(item)
+            medicao.lotes += 1
+            yield item
+
+    def _entrar(self: Instrumentacao) -> None:
+        # O pico até aqui pertence ao nó em andamento (o pai); a contagem recomeça para o nó que começa a trabalhar
+        if self._picos:
+            self._picos[-1] = max(self._picos[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._picos.append(0)
+
+    def _sair(self: Instrumentacao, medicao: MedicaoOperador) -> None:
+        pico = max(self._picos.pop(), tracemalloc.get_traced_memory()[1])
+        if self._picos:
+            self._picos[-1] = max(self._picos[-1], pico)
+        medicao.memoria_pico = max(medicao.memoria_pico, pico - self._base)
+
+    # --- Execução ---
+
+    def executar(self: Instrumentacao, operador: Union[Operador, OperadorColunar]) -> None:
+        """
+        Executa o plano até o fim, descartando o resultado e registrando os totais.
+        """
+        contar = len if self.vetorizada else (lambda linha: 1)
+        if self.memoria:
+            iniciado = tracemalloc.is_tracing()
+            if not iniciado:
+                tracemalloc.start()
+            self._base = tracemalloc.get_traced_memory()[0]
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        try:
+            self.linhas = sum(map(contar, operador))
+        finally:
+            self.tempo = time.perf_counter() - inicio
+            self.tempo_cpu = time.process_time() - inicio_cpu
+            if self.memoria:
+                self.memoria_pico = max((medicao.memoria_pico for medicao in self.medicoes.values()), default=0)
+                if not iniciado:
+                    tracemalloc.stop()
+
+    # --- Exportação ---
+
+    def para_dict(self: Instrumentacao, estatisticas: Optional[EstatisticasBanco] = None) -> dict[str, Any]:
+        """
+        Medições de todos os nós da árvore, em pré-ordem, prontas para serem exportadas em JSON.
+
+        Os nós não executados (dentro de subárvores delegadas ao SQLite) aparecem com `executado` falso. `linhas_entrada`
+        é a soma das linhas produzidas pelos filhos (None nas tabelas e subárvores delegadas, lidas do banco) e
+        `erro_estimativa` é a razão entre a maior e a menor das cardinalidades real e estimada (1 é uma estimativa exata).
+        Os nós percorridos mais de uma vez (o lado interno das junções por laços aninhados) somam as linhas e os tempos
+        de todas as `execucoes`.
+
+        Args:
+            estatisticas (Optional[EstatisticasBanco]): As estatísticas usadas nas estimativas. Padrão é as do banco `db_vendas.db`.
+
+        Returns:
+            dict[str, Any]: Os totais da execução e a lista `nos`.
+        """
+        estatisticas = estatisticas or obter_estatisticas()
+        # Na pré-ordem, cada nó aparece depois do seu pai, que já registrou a própria posição
+        pais: dict[int, int] = {}
+        nos = []
+        for posicao, no in enumerate(percorrer_pre_ordem(self.arvore.raiz)):
+            nos.append({"id": posicao, "pai": pais.get(id(no)), **self._dados_no(no, estatisticas)})
+            for filho in (no.filho_esq, no.filho_dir):
+                if filho is not None:
+                    pais[id(filho)] = posicao
+        return {
+            "motor": "vetorizada" if self.vetorizada else "linhas",
+            "linhas": self.linhas,
+            "tempo": self.tempo,
+            "tempo_cpu": self.tempo_cpu,
+            "memoria_pico": self.memoria_pico if self.memoria else None,
+            "nos": nos,
+        }
+
+    def _dados_no(self: Instrumentacao, no: No, estatisticas: EstatisticasBanco) -> dict[str, Any]:
+        estimada = estimar_cardinalidade(no, estatisticas)
+        dados: dict[str, Any] = {
+            "operacao": no.operacao.value,
+            "no": no.valor,
+            "acesso": str(no.acesso) if no.acesso is not None else None,
+            "cardinalidade_estimada": estimada,
+            "executado": id(no) in self.medicoes,
+        }
+        medicao = self.medicoes.get(id(no))
+        if medicao is None:
+            return dados
+        filhos = [self.medicoes.get(id(filho)) for filho in (no.filho_esq, no.filho_dir) if filho is not None]
+        medidos = [filho for filho in filhos if filho is not None]
+        real, prevista = max(medicao.linhas, 1), max(estimada, 1.0)
+        dados.update({
+            "execucoes": medicao.execucoes,
+            "linhas_entrada": sum(filho.linhas for filho in medidos) if medidos else None,
+            "linhas_saida": medicao.linhas,
+            "lotes": medicao.lotes if self.vetorizada else None,
+            "tempo": medicao.tempo,
+            "tempo_proprio": max(0.0, medicao.tempo - sum(filho.tempo for filho in medidos)),
+            "tempo_cpu": medicao.tempo_cpu if self.vetorizada else None,
+            "memoria_pico": medicao.memoria_pico if self.memoria else None,
+            "erro_estimativa": max(real / prevista, prevista / real),
+        })
+        return dados
+
+    def para_json(self: Instrumentacao, estatisticas: Optional[EstatisticasBanco] = None) -> str:
+        return json.dumps(self.para_dict(estatisticas), ensure_ascii=False, indent=2)
+
+    def salvar_json(self: Instrumentacao, caminho: Union[str, Path], estatisticas: Optional[EstatisticasBanco] = None) -> None:
+        Path(caminho).write_text(self.para_json(estatisticas), encoding="utf-8")
+
+    def sobreposicao(self: Instrumentacao, estatisticas: Optional[EstatisticasBanco] = None) -> dict[int, str]:
+        """
+        Texto das medições de cada nó executado, por id do nó, para `desenhar_arvore`.
+        """
+        estatisticas = estatisticas or obter_estatisticas()
+        textos = {}
+        for no in percorrer_pre_ordem(self.arvore.raiz):
+            if id(no) in self.medicoes:
+                textos[id(no)] = _texto_medicao(self._dados_no(no, estatisticas))
+        return textos
+
+    def relatorio(self: Instrumentacao, estatisticas: Optional[EstatisticasBanco] = None) -> str:
+        """
+        As medições em texto, um nó por linha, indentado pela profundidade na árvore.
+        """
+        dados = self.para_dict(estatisticas)
+        profundidades: list[int] = []
+        linhas = [f"{dados['linhas']} linhas em {dados['tempo'] * 1000:.1f} ms, CPU {dados['tempo_cpu'] * 1000:.1f} ms ({dados['motor']})"]
+        for no in dados["nos"]:
+            profundidades.append(0 if no["pai"] is None else profundidades[no["pai"]] + 1)
+            medido = _texto_medicao(no) if no["executado"] else "delegado ao SQLite"
+            linhas.append(f"{'  ' * profundidades[-1]}{no['no']}  [{medido}]")
+        return "\n".join(linhas)
+
+def _texto_medicao(dados: dict[str, Any]) -> str:
+    texto = f"linhas: {dados['linhas_saida']} (est. {dados['cardinalidade_estimada']:.0f})"
+    if dados["lotes"] is not None:
+        texto += f" · lotes: {dados['lotes']}"
+    if dados["execucoes"] > 1:
+        texto += f" · execuções: {dados['execucoes']}"
+    texto += f" · {dados['tempo'] * 1000:.1f} ms (próprio {dados['tempo_proprio'] * 1000:.1f} ms"
+    if dados["tempo_cpu"] is not None:
+        texto += f", CPU {dados['tempo_cpu'] * 1000:.1f} ms"
+    texto += ")"
+    if dados["memoria_pico"] is not None:
+        texto += f" · pico {dados['memoria_pico'] / 1024:.0f} KiB"
+    return texto
+
+# --- Operadores medidos ---
+
+class OperadorMedido(Operador):
+    """
+    Repassa as linhas de um operador, medindo a sua execução.
+    """
+    def __init__(self: OperadorMedido, instrumentacao: Instrumentacao, medicao: MedicaoOperador, operador: Operador) -> None:
+        self.instrumentacao = instrumentacao
+        self.medicao = medicao
+        self.operador = operador
+        self.esquema = operador.esquema
+
+    def __iter__(self: OperadorMedido) -> Iterator[tuple]:
+        return self.instrumentacao.iterar(self.medicao, self.operador, None)
+
+class OperadorColunarMedido(OperadorColunar):
+    """
+    Repassa os lotes de um operador vetorizado, medindo a sua execução.
+    """
+    def __init__(self: OperadorColunarMedido, instrumentacao: Instrumentacao, medicao: MedicaoOperador, operador: OperadorColunar) -> None:
+        self.instrumentacao = instrumentacao
+        self.medicao = medicao
+        self.operador = operador
+        self.esquema = operador.esquema
+
+    def __iter__(self: OperadorColunarMedido) -> Iterator:
+        return self.instrumentacao.iterar(self.medicao, self.operador, len)
+
+# --- Execução instrumentada ---
+
+def executar_instrumentado(
+    arvore: Arvore,
+    caminho: Union[str, Path] = CAMINHO_BANCO,
+    vetorizada: bool = False,
+    memoria: bool = False,
+    tamanho_lote: int = TAMANHO_LOTE,
+) -> Instrumentacao:
+    """
+    Executa a árvore de uma consulta até o fim, medindo cada operador. As linhas do resultado são descartadas.
+
+    Args:
+        arvore (Arvore): A árvore da consulta (otimizada ou não, delegada ou não ao SQLite).
+        caminho (Union[str, Path]): Caminho do banco SQLite. Padrão é `banco_de_dados/db_vendas.db`.
+        vetorizada (bool): Se a execução é vetorizada (`execucao_vetorizada.py`) em vez de por linhas.
+        memoria (bool): Se o pico de memória é medido (deixa a execução bem mais lenta).
+        tamanho_lote (int): Tamanho dos lotes da execução vetorizada.
+
+    Returns:
+        Instrumentacao: As medições da execução.
+    """
+    instrumentacao = Instrumentacao(arvore, vetorizada, memoria)
+    conexao = conectar_banco(caminho)
+    try:
+        if vetorizada:
+            plano = construir_plano_vetorizado(arvore, conexao, tamanho_lote, instrumentacao=instrumentacao)
+        else:
+            plano = construir_plano_execucao(arvore, conexao, instrumentacao=instrumentacao)
+        instrumentacao.executar(plano)
+    finally:
+        conexao.close()
+    return instrumentacao
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Executa uma consulta medindo cada operador da árvore otimizada.")
+    argumentos.add_argument("sql", help="a consulta SQL")
+    argumentos.add_argument("--vetorizada", action="store_true", help="usa a execução vetorizada")
+    argumentos.add_argument("--memoria", action="store_true", help="mede também o pico de memória (mais lento)")
+    argumentos.add_argument("--json", help="arquivo em que as medições são salvas")
+    argumentos.add_argument("--imagem", help="nome da imagem da árvore com as medições (na pasta img)")
+    argumentos = argumentos.parse_args()
+
+    estatisticas = obter_estatisticas()
+    arvore = converter_algebra_em_arvore(process_sql_query_ir(argumentos.sql))
+    arvore = planejar_acesso(otimizar_projecoes(otimizar_selects(reordenar_juncoes(arvore, estatisticas), estatisticas)), estatisticas)
+    instrumentacao = executar_instrumentado(arvore, vetorizada=argumentos.vetorizada, memoria=argumentos.memoria)
+    print(instrumentacao.relatorio(estatisticas))
+    if argumentos.json:
+        instrumentacao.salvar_json(argumentos.json, estatisticas)
+    if argumentos.imagem:
+        desenhar_arvore(arvore, argumentos.imagem, sobreposicao=instrumentacao.sobreposicao(estatisticas))
@@ -1,12 +1,39 @@
 """
 Interface gráfica para o processador de consultas SQL do projeto de Banco de Dados.
 Permite inserir comandos SQL, visualizar a álgebra relacional correspondente e as árvores de operadores (antes e depois da otimização).
+
+A medição das etapas do processamento (`metricas.py`) é ligada e desligada na própria interface. Além do registro exibido
+na interface, as medições podem ir para um arquivo no formato do Prometheus (variável de ambiente `METRICAS_PROMETHEUS`)
+e para um arquivo de linhas JSON (`METRICAS_JSONL`).
 """
+import os
 import gradio as gr
 import graphviz as gv
-from arvores_construcao_otimizacao import gerar_imagem_arvore_processada, gerar_grafo_otimizado
-from parser import process_sql_query
+from arvores_construcao_otimizacao import converter_algebra_em_arvore, gerar_imagem_arvore_processada, gerar_grafo_otimizado
+from metricas import ArquivoJsonLinhas, ArquivoPrometheus, RegistroMetricas, ativar_metricas, desativar_metricas, exportar_metricas, medir_etapa
+from parser import process_sql_query_ir
+
+#destinos das medições das etapas, usados enquanto a medição estiver ligada
+registro_metricas = ArquivoPrometheus(os.environ["METRICAS_PROMETHEUS"]) if os.environ.get("METRICAS_PROMETHEUS") else RegistroMetricas()
+destinos_metricas = [registro_metricas] + ([ArquivoJsonLinhas(os.environ["METRICAS_JSONL"])] if os.environ.get("METRICAS_JSONL") else [])
+
+def alternar_metricas(ligada):
+    """
+    Liga ou desliga a medição das etapas.
+    """
+    if ligada:
+        ativar_metricas(*destinos_metricas)
+    else:
+        desativar_metricas()
+
+def relatorio_metricas():
+    """
+    Latências (p50/p95/p99, em ms), chamadas e erros de cada etapa medida.
+    """
+    exportar_metricas()
+    return registro_metricas.relatorio()
 
+@medir_etapa()
 def funcao_btn(comando):
     """
     Função chamada ao submeter um comando SQL na interface.
@@ -14,29 +41,43 @@ def funcao_btn(comando):
     """
     #CHECAGEM DA VALIDADE DO COMANDO SQL
     try:
-        algebra_relacional = process_sql_query(comando)
+        consulta = process_sql_query_ir(comando)
 
         #se o resultado for um erro:
-        if type(algebra_relacional) in [ValueError,KeyError]:
+        if type(consulta) in [ValueError,KeyError]:
             raise gr.Error()
     except Exception as e:
-        raise gr.Error(f'Comando SQL inválido: {str(algebra_relacional)}')
+        raise gr.Error(f'Comando SQL inválido: {str(consulta)}')
+    algebra_relacional = str(consulta)
+
+    #árvore canônica da consulta: construída uma única vez e usada pelas duas visualizações
+    arvore = converter_algebra_em_arvore(consulta)
 
     ### GRAFOS
     #não-otimizado
     try:
-        gerar_imagem_arvore_processada(algebra_relacional)#prepara grafos
+        gerar_imagem_arvore_processada(arvore)
     except Exception as e:
         raise gr.Error('Erro na geração do grafo não-otimizado.\nCertifique-se que os executáveis do Graphviz estão instalados e no seu PATH') from e
     #otimizado
     try:
-        gerar_grafo_otimizado(algebra_relacional)
+        gerar_grafo_otimizado(arvore)#deriva a árvore otimizada da mesma árvore, sem reconstruí-la
     except Exception as e:
         raise gr.Error('Erro na geração do grafo otimizado.\nCertifique-se que os executáveis do Graphviz estão instalados e no seu PATH') from e
 
     # return algebra_relacional, 'img/arvore_processada.png', 'img/arvore_otimizada.png'
     return algebra_relacional, 'img/arvore_consulta_processada.png', 'img/arvore_consulta_otimizada.png'
 
+def responder_comando(comando):
+    """
+    Trata o clique no botão: processa o comando e exporta as métricas também quando o processamento falha.
+    A exportação fica fora de `funcao_btn` para que o erro da própria chamada já tenha sido registrado pela medição.
+    """
+    try:
+        return funcao_btn(comando)
+    finally:
+        exportar_metricas()
+
 with gr.Blocks() as demo:
     """
     Monta a interface gráfica do sistema, com campos para entrada de SQL, exibição da álgebra relacional e das imagens das árvores.
@@ -60,7 +101,14 @@ with gr.Blocks() as demo:
                     gr.Markdown("Grafo otimizado")
                     grafo_otim = gr.Image(label="Otimizado")
 
+    with gr.Accordion("Métricas das etapas", open=False):
+        medir = gr.Checkbox(label="Medir as etapas do processamento", value=False)
+        metricas = gr.Textbox(label="Latências por etapa (ms)", lines=10, interactive=False)
+        btn_metricas = gr.Button("Atualizar métricas")
+
         #comando do botao
-        btn.click(funcao_btn, inputs=[cmd_sql], outputs=[algeb_relac, grafo, grafo_otim])
+        btn.click(responder_comando, inputs=[cmd_sql], outputs=[algeb_relac, grafo, grafo_otim])
+        medir.change(alternar_metricas, inputs=[medir])
+        btn_metricas.click(relatorio_metricas, outputs=[metricas])
 
 demo.launch()
\ No newline at end of file
@@ -0,0 +1,306 @@
+"""
+Métricas das etapas do processamento de consultas: latência (histograma com p50/p95/p99), número de chamadas e de
+erros de cada etapa do pipeline da interface (`process_sql_query_ir` -> `converter_algebra_em_arvore` ->
+`reordenar_juncoes` -> `otimizar_selects` -> `otimizar_projecoes` -> `planejar_acesso` -> `desenhar_arvore`, com o
+`render` do Graphviz medido à parte).
+
+As etapas são marcadas com o decorador `medir_etapa` ou com o gerenciador de contexto `etapa`. A medição fica
+desativada por padrão e é ligada e desligada em tempo de execução (`ativar_metricas` e `desativar_metricas`); desativada,
+cada etapa custa apenas a verificação de uma variável.
+
+Cada medição é entregue a todos os destinos ativos:
+- `RegistroMetricas`: agrega as medições no próprio processo (`resumo`, `texto_prometheus`);
+- `ArquivoPrometheus`: um registro que grava o formato texto do Prometheus em um arquivo (`exportar`), para ser lido
+  pelo coletor de arquivos de texto do node_exporter;
+- `ArquivoJsonLinhas`: acrescenta cada medição, como uma linha JSON, a um arquivo.
+Outros destinos só precisam implementar `Destino.registrar`.
+
+Exemplo:
+    registro = ativar_metricas()
+    processar_consultas(...)
+    print(registro.resumo()["otimizar_selects"]["p95"])
+    desativar_metricas()
+"""
+
+from __future__ import annotations
+import bisect
+import functools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Union
+
+# Limites dos intervalos do histograma, em segundos: de 10 µs a cerca de 2 min, crescendo pela raiz de 2 (assim, os
+# quantis estimados erram no máximo por um fator de cerca de 1,4)
+LIMITES_LATENCIA = tuple(1e-5 * 2 ** (k / 2) for k in range(48))
+QUANTIS = (0.5, 0.95, 0.99)
+
+# --- Histograma ---
+
+class HistogramaLatencia:
+    """
+    Histograma de latências com intervalos fixos: usa memória constante, qualquer que seja o número de medições, e
+    estima os quantis por interpolação dentro do intervalo, como a função `histogram_quantile` do Prometheus.
+    """
+    __slots__ = ("limites", "contagens", "total", "soma", "minimo", "maximo")
+
+    def __init__(self: HistogramaLatencia, limites: tuple[float, ...] = LIMITES_LATENCIA) -> None:
+        self.limites = limites
+        # Um intervalo a mais para as latências acima do último limite
+        self.contagens = [0] * (len(limites) + 1)
+        self.total = 0
+        self.soma = 0.0
+        self.minimo = math.inf
+        self.maximo = 0.0
+
+    def registrar(self: HistogramaLatencia, duracao: float) -> None:
+        self.contagens[bisect.bisect_left(self.limites, duracao)] += 1
+        self.total += 1
+        self.soma += duracao
+        self.minimo = min(self.minimo, duracao)
+        self.maximo = max(self.maximo, duracao)
+
+    def quantil(self: HistogramaLatencia, q: float) -> Optional[float]:
+        """
+        Estima o quantil `q` (entre 0 e 1) das latências registradas, ou None se não houver nenhuma.
+
+        Raises:
+            ValueError: Se `q` estiver fora do intervalo [0, 1].
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(f"O quantil deve estar entre 0 e 1. Recebido: {q}")
+        if self.total == 0:
+            return None
+        posicao = q * self.total
+        acumulado = 0
+        for indice, contagem in enumerate(self.contagens):
+            if contagem and acumulado + contagem >= posicao:
+                # Os extremos do intervalo são limitados pela menor e pela maior latência de fato registradas
+                inferior = max(self.limites[indice - 1] if indice > 0 else 0.0, self.minimo)
+                superior = min(self.limites[indice] if indice < len(self.limites) else math.inf, self.maximo)
+                return inferior + (superior - inferior) * max(posicao - acumulado, 0) / contagem
+            acumulado += contagem
+        return self.maximo
+
+# --- Destinos ---
+
+class Destino:
+    """
+    Destino das medições. Cada medição é entregue com o nome da etapa, a duração em segundos e o nome da exceção que
+    interrompeu a etapa (None se ela terminou normalmente).
+    """
+    def registrar(self: Destino, etapa: str, duracao: float, erro: Optional[str]) -> None:
+        raise NotImplementedError
+
+    def exportar(self: Destino) -> None:
+        """
+        Grava as medições acumuladas, nos destinos que não gravam a cada medição.
+        """
+
+class MetricasEtapa:
+    __slots__ = ("chamadas", "erros", "latencia")
+
+    def __init__(self: MetricasEtapa) -> None:
+        self.chamadas = 0
+        self.erros = 0
+        self.latencia = HistogramaLatencia()
+
+class RegistroMetricas(Destino):
+    """
+    Agrega as medições de cada etapa no próprio processo. Pode ser usado por várias threads ao mesmo tempo.
+    """
+    def __init__(self: RegistroMetricas) -> None:
+        self.etapas: dict[str, MetricasEtapa] = {}
+        self._trava = threading.Lock()
+
+    def registrar(self: RegistroMetricas, etapa: str, duracao: float, erro: Optional[str]) -> None:
+        with self._trava:
+            metricas = self.etapas.get(etapa)
+            if metricas is None:
+                metricas = self.etapas[etapa] = MetricasEtapa()
+            metricas.chamadas += 1
+            metricas.erros += erro is not None
+            metricas.latencia.registrar(duracao)
+
+    def limpar(self: RegistroMetricas) -> None:
+        with self._trava:
+            self.etapas.clear()
+
+    def resumo(self: RegistroMetricas) -> dict[str, dict[str, Any]]:
+        """
+        Chamadas, erros e latências (em segundos: média, mínima, máxima, p50, p95 e p99) de cada etapa.
+        """
+        with self._trava:
+            resumo = {}
+            for etapa, metricas in self.etapas.items():
+                latencia = metricas.latencia
+                resumo[etapa] = {
+                    "chamadas": metricas.chamadas,
+                    "erros": metricas.erros,
+                    "media": latencia.soma / latencia.total,
+                    "minimo": latencia.minimo,
+                    "maximo": latencia.maximo,
+                    **{f"p{round(q * 100)}": latencia.quantil(q) for q in QUANTIS},
+                }
+            return resumo
+
+    def relatorio(self: RegistroMetricas) -> str:
+        """
+        O resumo em uma tabela de texto, com as latências em milissegundos.
+        """
+        linhas = [f"{'etapa':<30} {'chamadas':>9} {'erros':>6} {'p50':>9} {'p95':>9} {'p99':>9}"]
+        for etapa, dados in self.resumo().items():
+            linhas.append(
+                f"{etapa:<30} {dados['chamadas']:>9} {dados['erros']:>6} "
+                f"{dados['p50'] * 1000:>9.2f} {dados['p95'] * 1000:>9.2f} {dados['p99'] * 1000:>9.2f}"
+            )
+        return "\n".join(linhas)
+
+    def texto_prometheus(self: RegistroMetricas, prefixo: str = "consulta_etapa") -> str:
+        """
+        As métricas no formato texto do Prometheus: a latência como histograma (com a contagem de chamadas) e os
+        erros como contador, ambos com o rótulo `etapa`.
+        """
+        linhas = [
+            f"# HELP {prefixo}_duracao_segundos Duração das etapas do processamento de consultas.",
+            f"# TYPE {prefixo}_duracao_segundos histogram",
+        ]
+        with self._trava:
+            etapas = sorted(self.etapas.items())
+            for etapa, metricas in etapas:
+                rotulo = _rotulo_prometheus(etapa)
+                latencia = metricas.latencia
+                acumulado = 0
+                for limite, contagem in zip(latencia.limites, latencia.contagens):
+                    acumulado += contagem
+                    linhas.append(f'{prefixo}_duracao_segundos_bucket{{etapa="{rotulo}",le="{limite:.6g}"}} {acumulado}')
+                linhas.append(f'{prefixo}_duracao_segundos_bucket{{etapa="{rotulo}",le="+Inf"}} {latencia.total}')
+                linhas.append(f'{prefixo}_duracao_segundos_sum{{etapa="{rotulo}"}} {latencia.soma!r}')
+                linhas.append(f'{prefixo}_duracao_segundos_count{{etapa="{rotulo}"}} {latencia.total}')
+            linhas.append(f"# HELP {prefixo}_erros_total Etapas interrompidas por exceções.")
+            linhas.append(f"# TYPE {prefixo}_erros_total counter")
+            for etapa, metricas in etapas:
+                linhas.append(f'{prefixo}_erros_total{{etapa="{_rotulo_prometheus(etapa)}"}} {metricas.erros}')
+        return "\n".join(linhas) + "\n"
+
+def _rotulo_prometheus(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class ArquivoPrometheus(RegistroMetricas):
+    """
+    Registro que grava as métricas no formato texto do Prometheus em um arquivo, a cada `exportar`. O arquivo é
+    substituído de uma vez, para que o coletor nunca leia um arquivo pela metade.
+    """
+    def __init__(self: ArquivoPrometheus, caminho: Union[str, Path]) -> None:
+        super().__init__()
+        self.caminho = Path(caminho)
+
+    def exportar(self: ArquivoPrometheus) -> None:
+        temporario = self.caminho.with_name(f".{self.caminho.name}.{os.getpid()}.tmp")
+        temporario.write_text(self.texto_prometheus(), encoding="utf-8")
+        os.replace(temporario, self.caminho)
+
+class ArquivoJsonLinhas(Destino):
+    """
+    Acrescenta cada medição a um arquivo, como uma linha JSON com `etapa`, `inicio` (horário Unix), `duracao` e `erro`.
+    """
+    def __init__(self: ArquivoJsonLinhas, caminho: Union[str, Path]) -> None:
+        self.caminho = Path(caminho)
+        self._trava = threading.Lock()
+
+    def registrar(self: ArquivoJsonLinhas, etapa: str, duracao: float, erro: Optional[str]) -> None:
+        linha = json.dumps({"etapa": etapa, "inicio": time.time() - duracao, "duracao": duracao, "erro": erro}, ensure_ascii=False)
+        with self._trava, open(self.caminho, "a", encoding="utf-8") as arquivo:
+            arquivo.write(linha + "\n")
+
+# --- Ativação ---
+
+# Destinos das medições; vazio, a medição está desativada
+_destinos: tuple[Destino, ...] = ()
+
+def ativar_metricas(*destinos: Destino) -> RegistroMetricas:
+    """
+    Ativa a medição das etapas, entregando as medições aos destinos informados (substituindo os anteriores). Sem
+    destinos, as medições vão para um novo `RegistroMetricas`.
+
+    Returns:
+        RegistroMetricas: O primeiro registro entre os destinos (criado, se não houver nenhum).
+    """
+    global _destinos
+    registros = [destino for destino in destinos if isinstance(destino, RegistroMetricas)]
+    registro = registros[0] if registros else RegistroMetricas()
+    _destinos = destinos if registros else (registro, *destinos)
+    return registro
+
+def desativar_metricas() -> None:
+    """
+    Desativa a medição das etapas. Os destinos guardam o que já foi medido.
+    """
+    global _destinos
+    _destinos = ()
+
+def metricas_ativas() -> bool:
+    return bool(_destinos)
+
+def exportar_metricas() -> None:
+    """
+    Grava as medições acumuladas em todos os destinos ativos (ver `Destino.exportar`).
+    """
+    for destino in _destinos:
+        destino.exportar()
+
+def _registrar(nome: str, duracao: float, erro: Optional[str], destinos: tuple[Destino, ...]) -> None:
+    for destino in destinos:
+        destino.registrar(nome, duracao, erro)
+
+# --- Marcação das etapas ---
+
+@contextmanager
+def etapa(nome: str) -> Iterator[None]:
+    """
+    Mede o bloco como uma execução da etapa `nome`. Uma exceção que saia do bloco conta como erro (e é repassada).
+    """
+    destinos = _destinos
+    if not destinos:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        _registrar(nome, time.perf_counter() - inicio, type(e).__name__, destinos)
+        raise
+    _registrar(nome, time.perf_counter() - inicio, None, destinos)
+
+def medir_etapa(nome: Optional[str] = None, erro_no_retorno: bool = False) -> Callable[[Callable], Callable]:
+    """
+    Decorador que mede cada chamada da função como uma execução da etapa `nome` (por padrão, o nome da função).
+
+    Args:
+        nome (Optional[str]): O nome da etapa.
+        erro_no_retorno (bool): Se a função sinaliza erros devolvendo a exceção em vez de levantá-la (como
+            `process_sql_query_ir`), caso em que o retorno de uma exceção também conta como erro.
+    """
+    def decorador(funcao: Callable) -> Callable:
+        etapa_funcao = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def medida(*args: Any, **kwargs: Any) -> Any:
+            destinos = _destinos
+            if not destinos:
+                return funcao(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                resultado = funcao(*args, **kwargs)
+            except BaseException as e:
+                _registrar(etapa_funcao, time.perf_counter() - inicio, type(e).__name__, destinos)
+                raise
+            erro = type(resultado).__name__ if erro_no_retorno and isinstance(resultado, BaseException) else None
+            _registrar(etapa_funcao, time.perf_counter() - inicio, erro, destinos)
+            return resultado
+        return medida
+    return decorador
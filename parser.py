@@ -24,8 +24,11 @@ Implementa as regras do projeto de processador de consultas, incluindo validaç
 
 # -*- coding: utf-8 -*-
 import re
+from collections import OrderedDict
 import io # Para silenciar prints durante testes
 import sys # Para silenciar prints durante testes
+from algebra_relacional import Coluna, Predicado, Tabela, Produto, Selecao, Projecao
+from metricas import medir_etapa
 
 # --- Definição do Esquema do Banco de Dados (Minúsculas para validação interna, Lista/Tupla para preservar case) ---
 DATABASE_SCHEMA = {
@@ -53,208 +56,377 @@ def _normalize_name(name):
     if not isinstance(name, str): return ""
     return name.lower().strip()
 
+# --- Catálogo do Esquema ---
+class SchemaCatalog:
+    """
+    Índice do esquema construído uma única vez: conjunto de colunas normalizadas por tabela e
+    índice invertido coluna -> tabelas que a possuem. Só é reconstruído quando DATABASE_SCHEMA muda.
+    """
+    def __init__(self, schema):
+        self.signature = _schema_signature(schema)
+        self.original_columns = {_normalize_name(t): tuple(cols) for t, cols in schema.items()}
+        self.ordered_columns = {t: tuple(_normalize_name(c) for c in cols) for t, cols in self.original_columns.items()}
+        self.columns = {t: frozenset(cols) for t, cols in self.ordered_columns.items()}
+        self.tables_by_column = {}
+        for table_norm, cols in self.ordered_columns.items():
+            for col_norm in cols: self.tables_by_column.setdefault(col_norm, []).append(table_norm)
+
+    def has_table(self, table_norm):
+        return table_norm in self.columns
+
+    def scope(self, involved_aliases_map):
+        """
+        Cria o escopo de resolução de colunas de uma consulta a partir do mapa alias -> tabela.
+        """
+        return AliasScope(self, involved_aliases_map)
+
+class AliasScope:
+    """
+    Escopo de uma consulta: mapa alias -> tabela e índice coluna -> aliases que a possuem,
+    montado uma vez por consulta a partir do SchemaCatalog. Cada busca de coluna custa O(1).
+    """
+    def __init__(self, catalog, involved_aliases_map):
+        self.catalog = catalog
+        self.aliases = involved_aliases_map
+        self.aliases_by_column = {}
+        for alias_norm, table_norm in involved_aliases_map.items():
+            for col_norm in catalog.ordered_columns[table_norm]:
+                self.aliases_by_column.setdefault(col_norm, []).append(alias_norm)
+
+def _schema_signature(schema):
+    """
+    Assinatura de DATABASE_SCHEMA guardada no catálogo: os nomes das tabelas e as tuplas de colunas, em ordem.
+    Depende do conteúdo do esquema, então qualquer alteração (inclusive renomear uma coluna) reconstrói o catálogo.
+    """
+    return tuple((table, tuple(cols)) for table, cols in schema.items())
+
+_schema_catalog = None
+
+def get_schema_catalog():
+    """
+    Retorna o catálogo do esquema atual, reconstruindo-o apenas se o conteúdo de DATABASE_SCHEMA tiver mudado.
+    """
+    global _schema_catalog
+    if _schema_catalog is None or _schema_catalog.signature != _schema_signature(DATABASE_SCHEMA):
+        _schema_catalog = SchemaCatalog(DATABASE_SCHEMA)
+    return _schema_catalog
+
 # --- Funções de Validação e Reescrita ---
-def _validate_and_get_table_alias(table_name, alias, used_aliases, table_to_alias_map):
+def _validate_and_get_table_alias(table_name, alias, used_aliases, table_to_alias_map, catalog=None):
     """
     Valida o nome da tabela e do alias, garantindo unicidade e existência no esquema.
     """
+    catalog = catalog or get_schema_catalog()
     norm_name = _normalize_name(table_name)
-    if norm_name not in DATABASE_SCHEMA: raise ValueError(f"Erro de validação: Tabela '{table_name}' não encontrada no esquema.")
+    if not catalog.has_table(norm_name): raise ValueError(f"Erro de validação: Tabela '{table_name}' não encontrada no esquema.")
     alias_to_use = _normalize_name(alias) if alias else norm_name
     if alias_to_use in used_aliases: raise ValueError(f"Erro de validação: Alias ou nome de tabela '{alias_to_use}' (normalizado de '{alias or table_name}') usado mais de uma vez.")
     used_aliases.add(alias_to_use)
     table_to_alias_map[norm_name] = {'alias': alias_to_use} # Simplificado: só guarda alias
     return norm_name, alias_to_use
 
-def _validate_column_name(col_name, involved_aliases_map):
+def _validate_column_name(col_name, scope):
     """
     Valida o nome da coluna, considerando alias e ambiguidades, conforme as tabelas envolvidas.
+    `scope` é um AliasScope (ou um mapa alias -> tabela, que é convertido em escopo).
     """
+    if not isinstance(scope, AliasScope): scope = get_schema_catalog().scope(scope)
+    involved_aliases_map = scope.aliases
     col_name = col_name.strip()
     norm_col_name_full = _normalize_name(col_name)
-    possible_matches = []
     if '.' in norm_col_name_full:
         alias_part, col_part = norm_col_name_full.split('.', 1)
         if alias_part not in involved_aliases_map:
             aliases_involved_str = ', '.join(involved_aliases_map.keys())
             raise ValueError(f"Alias ou Tabela '{alias_part}' referenciado na coluna '{col_name}' não está entre os aliases/tabelas envolvidos: {aliases_involved_str}.")
         table_norm = involved_aliases_map[alias_part]
-        normalized_schema_cols = [_normalize_name(c) for c in DATABASE_SCHEMA[table_norm]]
-        if col_part not in normalized_schema_cols:
-            schema_cols_str = ", ".join(DATABASE_SCHEMA.get(table_norm, ['???']))
+        if col_part not in scope.catalog.columns[table_norm]:
+            schema_cols_str = ", ".join(scope.catalog.original_columns.get(table_norm, ('???',)))
             raise ValueError(f"Coluna '{col_part}' não encontrada na tabela '{table_norm}' (alias '{alias_part}'). Colunas disponíveis: [{schema_cols_str}]")
         return table_norm, col_part, alias_part
     else:
         col_part = norm_col_name_full
-        for alias_norm, table_norm in involved_aliases_map.items():
-            normalized_schema_cols = [_normalize_name(c) for c in DATABASE_SCHEMA[table_norm]]
-            if col_part in normalized_schema_cols: possible_matches.append((table_norm, col_part, alias_norm))
-        if not possible_matches:
+        possible_aliases = scope.aliases_by_column.get(col_part)
+        if not possible_aliases:
             aliases_involved_str = ', '.join(involved_aliases_map.keys())
             raise ValueError(f"Coluna '{col_name}' não encontrada em nenhuma das tabelas/aliases envolvidos: {aliases_involved_str}.")
-        if len(possible_matches) > 1:
-            aliases_found_str = ', '.join([m[2] for m in possible_matches])
+        if len(possible_aliases) > 1:
+            aliases_found_str = ', '.join(possible_aliases)
             raise ValueError(f"Coluna '{col_name}' é ambígua. Ela existe nos aliases/tabelas: {aliases_found_str}. Use qualificação (Alias.Coluna).")
-        return possible_matches[0]
-
-def _rewrite_condition_part(part, involved_aliases_map, table_alias_details):
-    """
-    Reescreve uma parte de condição para o formato da álgebra relacional, validando colunas e operadores.
-    """
-    part = part.strip()
-    if not part: return ""
-
-    # Tenta Coluna OP Valor (Número ou String) - Regex mais explícita
-    match_col_op_val = re.match(r"""
-        \s*([\w\.]+)              # Grupo 1: Coluna (com ou sem alias)
-        \s*(=|>|<|<=|>=|<>)      # Grupo 2: Operador
-        \s*(                     # Grupo 3: Valor (Número ou String)
-            (?:                  #   Inicio: Grupo não capturante para OU
-                [+-]?\d+\.?\d* |  #     Opção 1: Número (int/float, opcionalmente assinado)
-                [+-]?\.\d+    |  #     Opção 1b: Número começando com . (ex: .5)
-                '.*?'         |  #     Opção 2: String com aspas simples
-                \".*?\"          #     Opção 3: String com aspas duplas
-            )                    #   Fim: Grupo não capturante para OU
-        )\s*$                    # Fim do Valor e da string
-    """, part, re.IGNORECASE | re.VERBOSE)
-
-    # Tenta Coluna OP Coluna
-    match_col_op_col = re.match(r"""
-        \s*([\w\.]+)              # Grupo 1: Coluna 1
-        \s*(=|>|<|<=|>=|<>)      # Grupo 2: Operador
-        \s*([\w\.]+)              # Grupo 3: Coluna 2
-        \s*$
-    """, part, re.IGNORECASE | re.VERBOSE)
-
-    match = None
-    is_col_op_col = False
-
-    if match_col_op_val:
-        match = match_col_op_val
-    elif match_col_op_col:
-        match = match_col_op_col
-        is_col_op_col = True
-    else:
-        # Tentativa final com regex genérica (pode pegar casos não previstos acima)
-        # Ou tratar Valor OP Coluna aqui explicitamente se necessário
-        match_generic = re.match(r'\s*([\w\.]+)\s*(=|>|<|<=|>=|<>)\s*(.*?)?\s*$', part, re.IGNORECASE)
-        if match_generic:
-             match = match_generic
-             # Assume que o lado direito é literal se não casou como coluna antes
-             # Precisaria validar o literal aqui também
-        else:
-            raise ValueError(f"Formato inválido ou operador não reconhecido na condição: '{part}'. Use Coluna OP Valor ou Alias1.Coluna1 OP Alias2.Coluna2.")
+        alias_norm = possible_aliases[0]
+        return involved_aliases_map[alias_norm], col_part, alias_norm
+
+# --- Analisador Léxico ---
+# Uma única regex com alternativas nomeadas, aplicada com `match(pos)` em sequência:
+# cada caractere da consulta é examinado uma única vez, sem retrocesso entre cláusulas.
+_TOKEN_REGEX = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")   # Strings com aspas simples ou duplas ('' escapa a aspa)
+  | (?P<number>[+-]?(?:\d+\.?\d*|\.\d+))          # Números (int/float, opcionalmente assinados)
+  | (?P<op><>|<=|>=|=|<|>)                       # Operadores de comparação
+  | (?P<punct>[,()*])                            # Vírgula, parênteses e '*'
+  | (?P<ident>[\w.]+)                            # Identificadores (tabela, alias, coluna, Alias.Coluna)
+  | (?P<invalid>\S)                              # Qualquer outro caractere é inválido
+""", re.VERBOSE)
+
+SQL_KEYWORDS = {'SELECT', 'FROM', 'WHERE', 'INNER', 'JOIN', 'ON', 'AS', 'AND'}
+
+class _Token:
+    """
+    Token produzido pelo analisador léxico. Guarda as posições no texto original para recuperar trechos da consulta.
+    """
+    __slots__ = ('kind', 'text', 'start', 'end')
 
+    def __init__(self, kind, text, start, end):
+        self.kind = kind; self.text = text; self.start = start; self.end = end
 
-    left_operand_str = match.group(1).strip()
-    operator = match.group(2).strip()
-    right_operand_str = match.group(3).strip() if match.group(3) is not None else ""
+    def __repr__(self):
+        return f"_Token({self.kind}, {self.text!r})"
 
-    if operator not in ALLOWED_OPERATORS: raise ValueError(f"Operador '{operator}' não permitido: '{part}'. Permitidos: {', '.join(ALLOWED_OPERATORS)}")
+def _tokenize(sql_query):
+    """
+    Quebra a consulta em tokens em uma única passada linear. Palavras reservadas viram tokens 'keyword' com texto em maiúsculas.
+    """
+    tokens = []
+    pos = 0; length = len(sql_query); match_at = _TOKEN_REGEX.match
+    while pos < length:
+        m = match_at(sql_query, pos)
+        kind = m.lastgroup; text = m.group(kind); end = m.end()
+        if kind == 'invalid':
+            raise ValueError(f"Erro de sintaxe: Caractere inesperado '{text}' na posição {pos}: '{sql_query[max(0, pos - 20):pos + 20]}'")
+        if kind != 'ws':
+            if kind == 'ident' and text.upper() in SQL_KEYWORDS: kind = 'keyword'; text = text.upper()
+            tokens.append(_Token(kind, text, pos, end))
+        pos = end
+    tokens.append(_Token('eof', '', length, length))
+    return tokens
+
+# --- Analisador Sintático (descida recursiva) ---
+class _SQLParser:
+    """
+    Parser de descida recursiva para o SQL restrito do projeto.
+
+    Gramática:
+        consulta  := SELECT colunas FROM tabela juncao* [WHERE condicao] EOF
+        colunas   := '*' | IDENT (',' IDENT)*
+        tabela    := IDENT [[AS] IDENT]
+        juncao    := INNER JOIN tabela ON condicao
+        condicao  := termo (AND termo)*
+        termo     := '(' condicao ')' | IDENT OP (IDENT | NUMERO | STRING)
 
+    Cada predicado é devolvido como (operando_esq, operador, operando_dir, texto_original), onde os operandos são tokens.
+    """
+    def __init__(self, sql_query, tokens=None):
+        self.query = sql_query
+        self.tokens = tokens if tokens is not None else _tokenize(sql_query)
+        self.pos = 0
+
+    def _peek(self):
+        # Depois do fim, continua devolvendo o token 'eof' (o último da lista)
+        return self.tokens[min(self.pos, len(self.tokens) - 1)]
+
+    def _advance(self):
+        token = self._peek()
+        if token.kind != 'eof': self.pos += 1
+        return token
+
+    def _is_keyword(self, keyword):
+        token = self._peek()
+        return token.kind == 'keyword' and token.text == keyword
+
+    def _expect_keyword(self, keyword, context):
+        if not self._is_keyword(keyword):
+            raise ValueError(f"Erro de sintaxe: Esperado '{keyword}' {context}, encontrado '{self._describe(self._peek())}'.")
+        return self._advance()
+
+    @staticmethod
+    def _describe(token):
+        return token.text if token.kind != 'eof' else 'fim da consulta'
+
+    def _text_between(self, first_token, last_token):
+        return self.query[first_token.start:last_token.end]
+
+    def parse(self):
+        """
+        Consome todos os tokens e devolve a estrutura sintática da consulta (ainda sem validação de esquema).
+        """
+        if self._peek().kind == 'eof': raise ValueError("Consulta SQL não pode ser vazia.")
+        if not self._is_keyword('SELECT'): raise ValueError("Erro de sintaxe: Consulta deve começar com 'SELECT ... FROM ...'")
+        self._advance()
+        select_columns_str = self._parse_select_list()
+        self._expect_keyword('FROM', "após a lista de colunas do SELECT")
+        from_table, from_alias = self._parse_table_ref('FROM')
+
+        joins = []
+        while self._is_keyword('INNER'):
+            self._advance()
+            self._expect_keyword('JOIN', "após 'INNER'")
+            join_table, join_alias = self._parse_table_ref('INNER JOIN')
+            if not self._is_keyword('ON'): raise ValueError(f"Erro de sintaxe: INNER JOIN com tabela '{join_table}' requer uma condição ON não vazia.")
+            self._advance()
+            if self._peek().kind == 'eof' or self._is_keyword('INNER') or self._is_keyword('WHERE'):
+                raise ValueError(f"Erro de sintaxe: INNER JOIN com tabela '{join_table}' requer uma condição ON não vazia.")
+            condition_str, predicates = self._parse_condition_clause()
+            joins.append({'table': join_table, 'alias': join_alias, 'condition_str': condition_str, 'predicates': predicates})
+
+        where_condition_str = None; where_predicates = []
+        if self._is_keyword('WHERE'):
+            self._advance()
+            if self._peek().kind == 'eof': raise ValueError("Erro de sintaxe: Cláusula WHERE não pode ser vazia.")
+            where_condition_str, where_predicates = self._parse_condition_clause()
+
+        if self._peek().kind != 'eof':
+            token = self._peek()
+            raise ValueError(f"Erro de sintaxe: Parte não reconhecida da consulta: '{self.query[token.start:].strip()}'")
+
+        return {'select_columns_str': select_columns_str, 'from_table': from_table, 'from_alias': from_alias, 'joins': joins,
+                'where_condition_str': where_condition_str, 'where_predicates': where_predicates}
+
+    def _parse_select_list(self):
+        token = self._peek()
+        if token.kind == 'keyword' and token.text == 'FROM' or token.kind == 'eof':
+            raise ValueError("Erro de sintaxe: Cláusula SELECT não pode ser vazia.")
+        if token.kind == 'punct' and token.text == '*':
+            self._advance()
+            return ['*']
+        columns = []
+        while True:
+            token = self._advance()
+            if token.kind != 'ident': raise ValueError(f"Erro de sintaxe: Especifique colunas válidas ou '*' na cláusula SELECT. Encontrado: '{self._describe(token)}'")
+            columns.append(token.text)
+            if not (self._peek().kind == 'punct' and self._peek().text == ','): break
+            self._advance()
+        return columns
+
+    def _parse_table_ref(self, clause):
+        token = self._advance()
+        if token.kind != 'ident': raise ValueError(f"Erro de sintaxe: {clause} deve ser seguido do nome de uma tabela. Encontrado: '{self._describe(token)}'")
+        alias = None
+        if self._is_keyword('AS'):
+            self._advance()
+            alias_token = self._advance()
+            if alias_token.kind != 'ident': raise ValueError(f"Erro de sintaxe: 'AS' deve ser seguido de um alias para a tabela '{token.text}'. Encontrado: '{self._describe(alias_token)}'")
+            alias = alias_token.text
+        elif self._peek().kind == 'ident':
+            alias = self._advance().text
+        return token.text, alias
+
+    def _parse_condition_clause(self):
+        """
+        Lê uma condição completa (WHERE ou ON), devolvendo o texto original e a lista de predicados achatada.
+        """
+        first_token = self._peek()
+        predicates = []
+        self._parse_condition(predicates)
+        last_token = self.tokens[self.pos - 1]
+        return self._text_between(first_token, last_token), predicates
+
+    def _parse_condition(self, predicates):
+        """
+        Lê predicados ligados por AND, agrupados opcionalmente por parênteses, acrescentando-os a `predicates`.
+        Os parênteses são apenas contados (sem recursão), então o aninhamento não é limitado pela pilha do Python.
+        """
+        open_parens = 0
+        while True:
+            while self._peek().kind == 'punct' and self._peek().text == '(':
+                self._advance()
+                open_parens += 1
+            predicates.append(self._parse_predicate())
+            while open_parens and self._peek().kind == 'punct' and self._peek().text == ')':
+                self._advance()
+                open_parens -= 1
+            if self._is_keyword('AND'):
+                self._advance()
+                continue
+            if open_parens:
+                raise ValueError(f"Erro de sintaxe: Parêntese não fechado na condição. Encontrado: '{self._describe(self._advance())}'")
+            return
+
+    def _parse_predicate(self):
+        start = self._peek().start
+        left = self._expect_operand(('ident',), start)
+        operator = self._expect_operand(('op',), start)
+        right = self._expect_operand(('ident', 'number', 'string'), start)
+        part = self.query[left.start:right.end]
+        if operator.text not in ALLOWED_OPERATORS: raise ValueError(f"Operador '{operator.text}' não permitido: '{part}'. Permitidos: {', '.join(ALLOWED_OPERATORS)}")
+        return left, operator.text, right, part
+
+    def _expect_operand(self, kinds, start):
+        """
+        Consome o próximo token de um predicado, que deve ser de um dos tipos `kinds`.
+        """
+        token = self._peek()
+        if token.kind == 'eof':
+            part = self.query[start:].strip()
+            where = f" '{part}'" if part else ""
+            raise ValueError(f"Erro de sintaxe: Condição incompleta{where}, fim inesperado da consulta. Use Coluna OP Valor ou Alias1.Coluna1 OP Alias2.Coluna2.")
+        if token.kind not in kinds:
+            part = self.query[start:token.end]
+            raise ValueError(f"Erro ao processar parte da condição '{part}': Formato inválido ou operador não reconhecido na condição: '{part}'. Use Coluna OP Valor ou Alias1.Coluna1 OP Alias2.Coluna2.")
+        return self._advance()
+
+def _rewrite_predicate(predicate, scope):
+    """
+    Converte um predicado já analisado em um Predicado da representação intermediária, validando as colunas envolvidas.
+    """
+    left, operator, right, part = predicate
     try:
-        l_table_norm, l_col_norm, l_alias_norm = _validate_column_name(left_operand_str, involved_aliases_map)
-        rewritten_left = f"{l_alias_norm}.{l_col_norm}"
+        l_table_norm, l_col_norm, l_alias_norm = _validate_column_name(left.text, scope)
+        rewritten_left = Coluna(l_alias_norm, l_col_norm)
     except ValueError as e: raise ValueError(f"Erro no operando esquerdo da condição '{part}': {e}")
 
-    rewritten_right = ""
-    if is_col_op_col: # Se casou com Coluna OP Coluna
-         try:
-             r_table_norm, r_col_norm, r_alias_norm = _validate_column_name(right_operand_str, involved_aliases_map)
-             rewritten_right = f"{r_alias_norm}.{r_col_norm}"
-         except ValueError as e: raise ValueError(f"Erro no operando direito (coluna) da condição '{part}': {e}")
-    else: # Se casou com Coluna OP Valor (ou genérico)
-         # Revalida o lado direito como literal (segurança)
-         try:
-            # Tenta validar como coluna (caso a regex genérica tenha casado)
-             _validate_column_name(right_operand_str, involved_aliases_map)
-             # Se passou, é um erro - deveria ter casado com Col Op Col antes
-             raise ValueError(f"Ambiguidade inesperada no tipo do operando direito '{right_operand_str}' na condição '{part}'.")
-         except ValueError:
-             # Não é coluna, valida como número ou string
-             try:
-                 float(right_operand_str)
-                 rewritten_right = right_operand_str # Mantém número
-             except ValueError:
-                 if not ((right_operand_str.startswith("'") and right_operand_str.endswith("'")) or \
-                         (right_operand_str.startswith('"') and right_operand_str.endswith('"'))):
-                     raise ValueError(f"Valor '{right_operand_str}' na condição '{part}' não é um número, string entre aspas ou coluna válida.")
-                 rewritten_right = right_operand_str # Mantém string
-
-    return f"{rewritten_left} {operator} {rewritten_right}"
-
-
-def _process_conditions(condition_str, involved_aliases_map, table_alias_details):
-    """
-    Processa e reescreve todas as condições de uma cláusula WHERE ou ON, retornando-as no formato da álgebra relacional.
-    """
-    if not condition_str: return []
-    parts = re.split(r'\s+AND\s+', condition_str, flags=re.IGNORECASE)
+    if right.kind == 'ident': # Coluna OP Coluna
+        try:
+            r_table_norm, r_col_norm, r_alias_norm = _validate_column_name(right.text, scope)
+            rewritten_right = Coluna(r_alias_norm, r_col_norm)
+        except ValueError as e: raise ValueError(f"Erro no operando direito (coluna) da condição '{part}': {e}")
+    else: # Coluna OP Valor (número ou string, mantidos como escritos)
+        rewritten_right = right.text
+
+    return Predicado(rewritten_left, operator, rewritten_right)
+
+def _process_conditions(predicates, scope):
+    """
+    Converte todos os predicados de uma cláusula WHERE ou ON, retornando-os como Predicados da representação intermediária.
+    """
     rewritten_parts = []
-    for part in parts:
-        part = part.strip().strip('()')
-        if part:
-            try:
-                rewritten = _rewrite_condition_part(part, involved_aliases_map, table_alias_details)
-                rewritten_parts.append(rewritten)
-            except ValueError as e: raise ValueError(f"Erro ao processar parte da condição '{part}': {e}")
+    for predicate in predicates:
+        try: rewritten_parts.append(_rewrite_predicate(predicate, scope))
+        except ValueError as e: raise ValueError(f"Erro ao processar parte da condição '{predicate[3]}': {e}")
     return rewritten_parts
 
 # --- Função Principal de Parsing e Validação ---
-def parse_validate_sql(sql_query):
+def parse_validate_sql(sql_query, tokens=None):
     """
     Realiza o parsing e validação de uma consulta SQL restrita, retornando a estrutura parseada.
+    A consulta é lida por um analisador léxico e um parser de descida recursiva em uma única passada,
+    com custo linear no tamanho da consulta. `tokens` permite reaproveitar tokens já produzidos (ver ParameterizedQuery).
     """
-    query = sql_query.strip()
-    if not query: raise ValueError("Consulta SQL não pode ser vazia.")
-    select_match = re.match(r"SELECT\s+(.*?)\s+(FROM\s+.*)", query, re.IGNORECASE | re.DOTALL)
-    if not select_match: raise ValueError("Erro de sintaxe: Consulta deve começar com 'SELECT ... FROM ...'")
-    select_part = select_match.group(1).strip(); remaining_query = select_match.group(2).strip()
-    if not select_part: raise ValueError("Erro de sintaxe: Cláusula SELECT não pode ser vazia.")
-    select_columns_str = [col.strip() for col in select_part.split(',')]
-    if not select_columns_str or any(not col for col in select_columns_str): raise ValueError("Erro de sintaxe: Especifique colunas válidas ou '*' na cláusula SELECT.")
-
-    from_pattern_str = r"FROM\s+(?P<from_table>\S+)(?:\s+(?:AS\s+)?(?P<from_alias>\S+))?"
-    join_block_pattern_str = r"(?P<joins>(?:\s+INNER\s+JOIN\s+\S+(?:\s+(?:AS\s+)?\S+)?\s+ON\s+.*?)+)"
-    where_pattern_str = r"(?:\s+WHERE\s+(?P<where>.*))?"
-    full_pattern = re.compile(from_pattern_str + r"\s*(?:" + join_block_pattern_str + r")?" + r"\s*" + where_pattern_str + r"\s*$", re.IGNORECASE | re.DOTALL)
-    match = full_pattern.match(remaining_query)
-    if not match: raise ValueError(f"Erro de sintaxe: Não foi possível parsear a estrutura após SELECT. Query restante: '{remaining_query}'")
-    match_dict = match.groupdict()
-
-    parsed_data = {'select_columns_str': select_columns_str}; aliases = {}; table_alias_details = {}; used_aliases = set(); joins_info_list = []; where_condition_str = None
-
-    from_table_name = match_dict.get('from_table'); from_alias = match_dict.get('from_alias')
-    from_table_norm, from_alias_norm = _validate_and_get_table_alias(from_table_name, from_alias, used_aliases, table_alias_details)
+    syntax = _SQLParser(sql_query, tokens).parse()
+    catalog = get_schema_catalog()
+    select_columns_str = syntax['select_columns_str']
+
+    parsed_data = {'select_columns_str': select_columns_str}; aliases = {}; table_alias_details = {}; used_aliases = set(); joins_info_list = []
+
+    from_table_norm, from_alias_norm = _validate_and_get_table_alias(syntax['from_table'], syntax['from_alias'], used_aliases, table_alias_details, catalog)
     aliases[from_alias_norm] = from_table_norm
     parsed_data['from_table'] = {'name': from_table_norm, 'alias': from_alias_norm}
 
-    if 'joins' in match_dict and match_dict['joins']:
-        all_joins_str = match_dict['joins'].strip()
-        join_pattern = re.compile(r"INNER\s+JOIN\s+(?P<jt>\S+)(?:\s+(?:AS\s+)?(?P<ja>\S+))?\s+ON\s+(?P<jc>.+?)(?=\s+INNER\s+JOIN|\s*$)", re.IGNORECASE | re.DOTALL)
-        last_join_end = 0
-        for join_match in join_pattern.finditer(all_joins_str):
-            join_match_dict = join_match.groupdict()
-            join_table_name = join_match_dict.get('jt'); join_alias = join_match_dict.get('ja'); join_condition_str = join_match_dict.get('jc','').strip()
-            if not join_condition_str: raise ValueError(f"Erro de sintaxe: INNER JOIN com tabela '{join_table_name}' requer uma condição ON não vazia.")
-            join_table_norm, join_alias_norm = _validate_and_get_table_alias(join_table_name, join_alias, used_aliases, table_alias_details)
-            aliases[join_alias_norm] = join_table_norm
-            joins_info_list.append({'table_norm': join_table_norm, 'alias_norm': join_alias_norm, 'condition_str': join_condition_str})
-            last_join_end = join_match.end()
-        if last_join_end < len(all_joins_str):
-             remaining_part = all_joins_str[last_join_end:].strip()
-             if remaining_part: raise ValueError(f"Erro de sintaxe: Parte não reconhecida no final do bloco de JOINs: '{remaining_part}'")
-
-    if 'where' in match_dict and match_dict['where']: where_condition_str = match_dict['where'].strip()
-    parsed_data['joins'] = joins_info_list; parsed_data['where_condition_str'] = where_condition_str; parsed_data['aliases'] = aliases; parsed_data['table_alias_details'] = table_alias_details
+    for join in syntax['joins']:
+        join_table_norm, join_alias_norm = _validate_and_get_table_alias(join['table'], join['alias'], used_aliases, table_alias_details, catalog)
+        aliases[join_alias_norm] = join_table_norm
+        joins_info_list.append({'table_norm': join_table_norm, 'alias_norm': join_alias_norm, 'condition_str': join['condition_str'], 'predicates': join['predicates']})
+
+    parsed_data['joins'] = joins_info_list; parsed_data['where_condition_str'] = syntax['where_condition_str']; parsed_data['aliases'] = aliases; parsed_data['table_alias_details'] = table_alias_details
 
     all_involved_aliases_map = aliases.copy()
+    scope = catalog.scope(all_involved_aliases_map)
     validated_select_cols = []
     is_select_all = (len(select_columns_str) == 1 and select_columns_str[0] == '*')
     if not is_select_all:
         for col_str in select_columns_str:
             try:
-                table_norm, col_norm, alias_norm = _validate_column_name(col_str, all_involved_aliases_map)
+                table_norm, col_norm, alias_norm = _validate_column_name(col_str, scope)
                 validated_select_cols.append({'original': col_str, 'table': table_norm, 'column': col_norm, 'alias': alias_norm})
             except ValueError as e:
                 aliases_involved_str = ', '.join(all_involved_aliases_map.keys())
@@ -262,86 +434,229 @@ def parse_validate_sql(sql_query):
     else: validated_select_cols.append({'original': '*'})
     parsed_data['validated_select_cols'] = validated_select_cols
 
-    try: parsed_data['rewritten_where_conditions'] = _process_conditions(parsed_data['where_condition_str'], all_involved_aliases_map, table_alias_details) if parsed_data['where_condition_str'] else []
+    try: parsed_data['where_predicates'] = _process_conditions(syntax['where_predicates'], scope)
     except ValueError as e: raise ValueError(f"Erro na cláusula WHERE: {e}")
+    parsed_data['rewritten_where_conditions'] = [str(p) for p in parsed_data['where_predicates']]
 
     for join_info in parsed_data['joins']:
-         involved_in_on = all_involved_aliases_map
          try:
-             join_info['rewritten_conditions'] = _process_conditions(join_info['condition_str'], involved_in_on, table_alias_details)
-             if not join_info['rewritten_conditions']: raise ValueError(f"Condição ON resultou em predicados vazios após processamento.")
+             join_info['predicates'] = _process_conditions(join_info['predicates'], scope)
+             join_info['rewritten_conditions'] = [str(p) for p in join_info['predicates']]
          except ValueError as e:
-             original_table_name = next((v['original_table_name'] for k, v in table_alias_details.items() if k == join_info['table_norm']), '???') # Get original name for error
-             raise ValueError(f"Erro na condição ON para JOIN com tabela '{original_table_name}' (alias '{join_info['alias_norm']}'): {e} (Condição original: '{join_info['condition_str']}')")
+             raise ValueError(f"Erro na condição ON para JOIN com tabela '{join_info['table_norm']}' (alias '{join_info['alias_norm']}'): {e} (Condição original: '{join_info['condition_str']}')")
 
     return parsed_data
 
 # --- Função de Conversão para Álgebra Relacional ---
-def convert_to_relational_algebra(parsed_data):
+def build_relational_algebra_ir(parsed_data):
     """
-    Converte a estrutura parseada para uma expressão de álgebra relacional.
+    Converte a estrutura parseada para a representação intermediária da álgebra relacional (ver algebra_relacional.py).
     """
     details = parsed_data['table_alias_details']
-    from_table_info = parsed_data['from_table']
-    from_table_norm = from_table_info['name']
-    from_alias_norm = details[from_table_norm]['alias']
-    # Formato: nometabela[alias]
-    base_operation = f"{from_table_norm}[{from_alias_norm}]"
+    from_table_norm = parsed_data['from_table']['name']
+    base_operation = Tabela(from_table_norm, details[from_table_norm]['alias'])
 
     all_join_conditions = []
     for join_info in parsed_data['joins']:
         join_table_norm = join_info['table_norm']
-        join_alias_norm = details[join_table_norm]['alias']
-        base_operation = f"({base_operation} ⨝ {join_table_norm}[{join_alias_norm}])"
-        all_join_conditions.extend(join_info['rewritten_conditions'])
-
-    all_conditions = parsed_data['rewritten_where_conditions'] + all_join_conditions
-    condition_string = " ∧ ".join(all_conditions) if all_conditions else ""
+        base_operation = Produto(base_operation, Tabela(join_table_norm, details[join_table_norm]['alias']))
+        all_join_conditions.extend(join_info['predicates'])
 
-    selection_result = base_operation
-    if condition_string: selection_result = f"𝛔[{condition_string}]({base_operation})"
+    all_conditions = parsed_data['where_predicates'] + all_join_conditions
+    selection_result = Selecao(all_conditions, base_operation) if all_conditions else base_operation
 
     select_cols_info = parsed_data['validated_select_cols']
     projection_attributes = []
-    details_for_projection = parsed_data['table_alias_details']
 
     if select_cols_info[0]['original'] == '*':
-        involved_table_order = [parsed_data['from_table']['name']] + [j['table_norm'] for j in parsed_data['joins']]
+        catalog = get_schema_catalog()
+        involved_table_order = [from_table_norm] + [j['table_norm'] for j in parsed_data['joins']]
         processed_tables = set()
         for table_norm in involved_table_order:
              if table_norm not in processed_tables:
-                 alias_norm = details_for_projection[table_norm]['alias']
-                 for column_name_original_case in DATABASE_SCHEMA[table_norm]:
-                      col_norm = _normalize_name(column_name_original_case)
-                      projection_attributes.append(f"{alias_norm}.{col_norm}")
+                 alias_norm = details[table_norm]['alias']
+                 for col_norm in catalog.ordered_columns[table_norm]:
+                      projection_attributes.append(Coluna(alias_norm, col_norm))
                  processed_tables.add(table_norm)
     else:
         for col_info in select_cols_info:
-            alias_norm = col_info['alias']
-            col_norm = col_info['column']
-            projection_attributes.append(f"{alias_norm}.{col_norm}")
+            projection_attributes.append(Coluna(col_info['alias'], col_info['column']))
+
+    return Projecao(projection_attributes, selection_result)
+
+def convert_to_relational_algebra(parsed_data):
+    """
+    Converte a estrutura parseada para uma expressão de álgebra relacional (renderização textual da representação intermediária).
+    """
+    return str(build_relational_algebra_ir(parsed_data))
+
+# --- Cache de Traduções SQL -> Álgebra Relacional ---
+class TranslationCache:
+    """
+    Cache LRU de traduções, com tamanho máximo configurável. Guarda tanto as álgebras relacionais
+    quanto os erros de validação (ValueError), e é esvaziado quando o esquema do banco muda.
+    """
+    def __init__(self, maxsize=1024):
+        if maxsize < 1: raise ValueError(f"O tamanho máximo do cache deve ser positivo. Recebido: {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0; self.misses = 0; self.evictions = 0
+        self._entries = OrderedDict()
+        self._catalog = None
+
+    def _check_schema(self):
+        catalog = get_schema_catalog()
+        if catalog is not self._catalog:
+            self._entries.clear()
+            self._catalog = catalog
+
+    def lookup(self, key):
+        """
+        Retorna (True, resultado) se a chave estiver no cache, ou (False, None) caso contrário.
+        """
+        self._check_schema()
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, self._entries[key]
+        self.misses += 1
+        return False, None
+
+    def store(self, key, result):
+        self._check_schema()
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+_translation_cache = None
+
+def enable_translation_cache(maxsize=1024):
+    """
+    Ativa o cache de traduções usado por process_sql_query (desativado por padrão). Retorna o cache criado.
+    """
+    global _translation_cache
+    _translation_cache = TranslationCache(maxsize)
+    return _translation_cache
+
+def disable_translation_cache():
+    """
+    Desativa e descarta o cache de traduções.
+    """
+    global _translation_cache
+    _translation_cache = None
+
+def translation_cache_info():
+    """
+    Retorna os contadores do cache (hits, misses, evictions, size, maxsize), ou None se o cache estiver desativado.
+    """
+    return _translation_cache.info() if _translation_cache is not None else None
+
+def normalize_query_text(sql_query):
+    """
+    Normaliza a consulta para uso como chave: espaços colapsados e palavras reservadas/identificadores em minúsculas.
+    Literais (números e strings) são mantidos como escritos, pois aparecem na álgebra relacional.
+    """
+    try:
+        tokens = _tokenize(sql_query)
+    except ValueError:
+        return ' '.join(sql_query.split())
+    return ' '.join(t.text if t.kind in ('string', 'number') else t.text.lower() for t in tokens[:-1])
 
-    projection_string = ", ".join(projection_attributes)
-    final_algebra = f"𝝿[{projection_string}]({selection_result})"
-    return final_algebra
+# --- Parametrização de Literais (impressão digital da consulta) ---
+_PLACEHOLDER_REGEX = re.compile(r"\$(\d+)")
+
+class ParameterizedQuery:
+    """
+    Consulta com os literais extraídos: `fingerprint` identifica a forma da consulta (literais trocados por '?')
+    e `parameters` guarda os literais na ordem em que aparecem, como escritos no SQL.
+    Na álgebra relacional do modelo, o i-ésimo literal aparece como o marcador `$i`.
+    """
+    __slots__ = ('sql', 'fingerprint', 'parameters', '_tokens')
+
+    def __init__(self, sql, fingerprint, parameters, tokens):
+        self.sql = sql; self.fingerprint = fingerprint; self.parameters = parameters; self._tokens = tokens
+
+    def relational_algebra_ir_template(self):
+        """
+        Faz o parsing e a validação da forma da consulta e retorna a representação intermediária com marcadores `$i` nos literais.
+        """
+        return build_relational_algebra_ir(parse_validate_sql(self.sql, self._tokens))
+
+    def relational_algebra_template(self):
+        """
+        Faz o parsing e a validação da forma da consulta e retorna a álgebra relacional com marcadores `$i`.
+        """
+        return str(self.relational_algebra_ir_template())
+
+def parameterize_sql_query(sql_query):
+    """
+    Extrai os literais (números e strings) da consulta, gerando sua impressão digital e o vetor de parâmetros.
+    Consultas que diferem apenas nos literais têm a mesma impressão digital.
+    """
+    tokens = _tokenize(sql_query)
+    template_tokens = []; fingerprint_parts = []; parameters = []
+    for token in tokens[:-1]:
+        if token.kind in ('string', 'number'):
+            parameters.append(token.text)
+            token = _Token(token.kind, f"${len(parameters)}", token.start, token.end)
+            fingerprint_parts.append('?')
+        else:
+            fingerprint_parts.append(token.text.lower())
+        template_tokens.append(token)
+    template_tokens.append(tokens[-1])
+    return ParameterizedQuery(sql_query, ' '.join(fingerprint_parts), tuple(parameters), template_tokens)
+
+def bind_parameters(text, parameters):
+    """
+    Substitui os marcadores `$i` de um texto (álgebra relacional ou condição) pelos literais correspondentes.
+    """
+    if '$' not in text: return text
+    return _PLACEHOLDER_REGEX.sub(lambda m: parameters[int(m.group(1)) - 1], text)
 
 # --- Função Principal de Processamento ---
-def process_sql_query(sql_query):
+@medir_etapa(erro_no_retorno=True)
+def process_sql_query_ir(sql_query):
     """
-    Função principal para processar uma consulta SQL: faz o parsing, valida e converte para álgebra relacional.
+    Faz o parsing e a validação da consulta SQL e retorna a representação intermediária da álgebra relacional (Projecao),
+    que pode ser passada diretamente para `converter_algebra_em_arvore`. Em caso de erro, imprime e retorna a exceção.
+    Com o cache de traduções ativo, consultas repetidas (inclusive inválidas) são respondidas sem novo parsing.
     """
+    cache = _translation_cache
+    if cache is not None:
+        key = normalize_query_text(sql_query)
+        hit, cached = cache.lookup(key)
+        if hit:
+            if isinstance(cached, ValueError): print(f"Erro: {cached}")
+            return cached
     try:
         parsed_data = parse_validate_sql(sql_query)
-        relational_algebra = convert_to_relational_algebra(parsed_data)
-        return relational_algebra
+        result = build_relational_algebra_ir(parsed_data)
     except ValueError as e:
         print(f"Erro: {e}")
-        return e
+        result = e.with_traceback(None)
     except Exception as e:
         print(f"Erro inesperado no processamento: {e}")
         import traceback
         traceback.print_exc()
         return e
+    if cache is not None: cache.store(key, result)
+    return result
+
+def process_sql_query(sql_query):
+    """
+    Função principal para processar uma consulta SQL: faz o parsing, valida e converte para álgebra relacional.
+    Retorna a álgebra relacional como string, ou a exceção em caso de erro.
+    """
+    result = process_sql_query_ir(sql_query)
+    if isinstance(result, Exception): return result
+    return str(result)
 
 # --- Bloco Principal para Testes ---
 if __name__ == "__main__":
@@ -1,4 +1,6 @@
+from __future__ import annotations
 from typing import TypeAlias
+from algebra_relacional import IndiceAliases
 
 class NoArvore:
     """
@@ -8,21 +10,33 @@ class NoArvore:
         operacao (str): O operador ou conteúdo do nó (por exemplo, σ condição, π atributos, nome da tabela).
         filhos (list[NoArvore]): Lista de filhos do nó atual.
         id (str): Identificador único para uso no grafo visual.
+        mascara (int | None): Bitset dos aliases das tabelas da sub-árvore, calculado sob demanda pelo otimizador.
+        indice (IndiceAliases): Posições de bit dos aliases, compartilhadas por todos os nós da árvore (ver `adicionar_filho`).
     """
     _arvore: TypeAlias = dict[str, dict[str, str|list[str]]]
     
     id_counter: int = 0  # Contador estático para criar IDs únicos
  
-    def __init__(self, operacao: str) -> None:
+    def __init__(self, operacao: str, indice: IndiceAliases | None = None) -> None:
         self.operacao: str = operacao
         self.filhos: list["NoArvore"] = []
         self.id: str = f'node{NoArvore.id_counter}'
+        self.mascara: int | None = None
+        self.indice: IndiceAliases = indice if indice is not None else IndiceAliases()
         NoArvore.id_counter += 1
 
     def adicionar_filho(self, filho: "NoArvore") -> None:
         """
-        Adiciona um filho ao nó atual.
+        Adiciona um filho ao nó atual. A sub-árvore do filho passa a usar o índice de aliases do nó
+        (e os bitsets já calculados com outro índice são descartados).
         """
+        if filho.indice is not self.indice:
+            pilha = [filho]
+            while pilha:
+                no = pilha.pop()
+                no.indice = self.indice
+                no.mascara = None
+                pilha.extend(no.filhos)
         self.filhos.append(filho)
         
     def get_arvore(self) -> _arvore:
@@ -32,14 +46,15 @@ class NoArvore:
         """
         arvore = {}
 
-        def visitar(no: "NoArvore"):
+        # Percurso em pré-ordem com pilha explícita (sem recursão)
+        pilha: list["NoArvore"] = [self]
+        while pilha:
+            no = pilha.pop()
             if no.id not in arvore:
                 arvore[no.id] = {
                     "operacao": no.operacao,
                     "filhos": [filho.id for filho in no.filhos]
                 }
-                for filho in no.filhos:
-                    visitar(filho)
+                pilha.extend(reversed(no.filhos))
 
-        visitar(self)
         return arvore
\ No newline at end of file
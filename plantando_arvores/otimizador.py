@@ -1,8 +1,10 @@
 # otimizador.py
 from __future__ import annotations
-from typing import Set
+from typing import Callable, Set
 from .arvore import NoArvore       # já existe no seu projeto
+from algebra_relacional import NoAlgebra
 from .processamento_consultas import processar, desenhar_arvore
+from arvores_construcao_otimizacao import Arvore
 
 
 # --------------------------------------------------------------------------- #
@@ -24,30 +26,65 @@ def _aliases_in(cond: str) -> Set[str]:
         out.add(tok.split('.')[0])
     return out
 
-def _aliases_subtree(node: NoArvore) -> Set[str]:
-    """Coleciona aliases presentes em toda a sub-árvore."""
-    if node.operacao.endswith(']'):             # folha "tabela[alias]"
-        return {node.operacao.split('[')[-1][:-1]}
-    if node.operacao.startswith(('σ ', 'π ')):
-        return _aliases_subtree(node.filhos[0])
-    if node.operacao in ('X', '⨝'):
-        return _aliases_subtree(node.filhos[0]) | _aliases_subtree(node.filhos[1])
-    return set()
+def _pos_ordem(node: NoArvore) -> list[NoArvore]:
+    """
+    Lista os nós da sub-árvore em pós-ordem (filhos antes do pai), sem recursão.
+    A lista é montada antes das reescritas, então pode ser percorrida enquanto os nós são alterados.
+    """
+    ordem: list[NoArvore] = []
+    pilha = [node]
+    while pilha:
+        atual = pilha.pop()
+        ordem.append(atual)
+        pilha.extend(atual.filhos)
+    ordem.reverse()
+    return ordem
+
+def _aliases_subtree(node: NoArvore) -> int:
+    """
+    Coleciona aliases presentes em toda a sub-árvore, como um bitset no índice de aliases da árvore (`node.indice`).
+
+    O resultado é calculado uma única vez por nó, de baixo para cima (sem recursão), e guardado em
+    `node.mascara`. As reescritas dos passos abaixo nunca alteram o conjunto de tabelas sob um nó
+    (σ e π só mudam de posição, e um X vira ⨝ sobre os mesmos filhos), então o valor guardado continua válido.
+    """
+    if node.mascara is None:
+        for atual in _pos_ordem(node):
+            if atual.mascara is not None:
+                continue
+            if atual.operacao.endswith(']'):             # folha "tabela[alias]"
+                atual.mascara = atual.indice.mascara((atual.operacao.split('[')[-1][:-1],))
+            elif atual.operacao.startswith(('σ ', 'π ')):
+                atual.mascara = atual.filhos[0].mascara
+            elif atual.operacao in ('X', '⨝'):
+                atual.mascara = atual.filhos[0].mascara | atual.filhos[1].mascara
+            else:
+                atual.mascara = 0
+    return node.mascara
+
+def _reescrever(node: NoArvore, regra: Callable[[NoArvore], NoArvore]) -> NoArvore:
+    """
+    Aplica `regra` a cada nó da sub-árvore, de baixo para cima e sem recursão: cada nó é reescrito
+    depois dos filhos, e o retorno da regra substitui o nó na lista de filhos do pai.
+    """
+    substitutos: dict[int, NoArvore] = {}
+    for atual in _pos_ordem(node):
+        atual.filhos = [substitutos.pop(id(f), f) for f in atual.filhos]
+        substitutos[id(atual)] = regra(atual)
+    return substitutos[id(node)]
 
 # --------------------------------------------------------------------------- #
 # Passo 1 – empurra seleções
 # --------------------------------------------------------------------------- #
 def push_selecoes(node: NoArvore) -> NoArvore:
-    if not node.filhos:
-        return node
-
-    node.filhos = [push_selecoes(f) for f in node.filhos]
+    return _reescrever(node, _push_selecao)
 
-    if not node.operacao.startswith('σ '):
+def _push_selecao(node: NoArvore) -> NoArvore:
+    if not node.filhos or not node.operacao.startswith('σ '):
         return node
 
     cond = node.operacao[2:].strip()
-    cond_aliases = _aliases_in(cond)
+    cond_aliases = node.indice.mascara(_aliases_in(cond))
 
     # nó unário --------------------------------------------------------------
     if len(node.filhos) == 1:
@@ -65,16 +102,18 @@ def push_selecoes(node: NoArvore) -> NoArvore:
     aliases_right = _aliases_subtree(right)
 
     # condição cabe só do lado esquerdo?
-    if cond_aliases <= aliases_left:
+    if not cond_aliases & ~aliases_left:
         # cria novo σ como pai do ramo esquerdo
-        new_sigma = NoArvore(node.operacao)
+        new_sigma = NoArvore(node.operacao, node.indice)
         new_sigma.adicionar_filho(left)
+        new_sigma.mascara = aliases_left
         node.filhos[0] = push_selecoes(new_sigma)
         return node.filhos[0]             # sobe o σ
     # condição cabe só do lado direito?
-    if cond_aliases <= aliases_right:
-        new_sigma = NoArvore(node.operacao)
+    if not cond_aliases & ~aliases_right:
+        new_sigma = NoArvore(node.operacao, node.indice)
         new_sigma.adicionar_filho(right)
+        new_sigma.mascara = aliases_right
         node.filhos[1] = push_selecoes(new_sigma)
         return node.filhos[1]
     # condição usa os dois lados → deixa onde está
@@ -84,15 +123,14 @@ def push_selecoes(node: NoArvore) -> NoArvore:
 # Passo 2 – transforma “σ + X” em ⨝
 # --------------------------------------------------------------------------- #
 def produto_para_join(node: NoArvore) -> NoArvore:
-    if not node.filhos:
-        return node
-    node.filhos = [produto_para_join(f) for f in node.filhos]
+    return _reescrever(node, _produto_para_join)
 
+def _produto_para_join(node: NoArvore) -> NoArvore:
     if node.operacao.startswith('σ ') and len(node.filhos) == 1:
         child = node.filhos[0]
         if child.operacao == 'X':
             cond = node.operacao[2:].strip()
-            cond_aliases = _aliases_in(cond)
+            cond_aliases = node.indice.mascara(_aliases_in(cond))
             left_aliases  = _aliases_subtree(child.filhos[0])
             right_aliases = _aliases_subtree(child.filhos[1])
 
@@ -108,21 +146,29 @@ def produto_para_join(node: NoArvore) -> NoArvore:
 def push_projecoes(node: NoArvore, needed: Set[str] | None = None) -> NoArvore:
     if needed is None and node.operacao.startswith('π '):
         needed = {a.strip() for a in node.operacao[2:].split(',')}
-        node.filhos[0] = push_projecoes(node.filhos[0], needed)
+        _propagar_projecoes(node.filhos[0], needed)
         return node
 
-    if not node.filhos or needed is None:
-        return node
-
-    if node.operacao in ('X', '⨝'):
-        left_need  = {a for a in needed if a.split('.')[0] in _aliases_subtree(node.filhos[0])}
-        right_need = needed - left_need
-        node.filhos[0] = push_projecoes(node.filhos[0], left_need)
-        node.filhos[1] = push_projecoes(node.filhos[1], right_need)
-    else:
-        node.filhos[0] = push_projecoes(node.filhos[0], needed)
+    if needed is not None:
+        _propagar_projecoes(node, needed)
     return node
 
+def _propagar_projecoes(node: NoArvore, needed: Set[str]) -> None:
+    """Distribui, de cima para baixo e sem recursão, os atributos necessários entre os ramos."""
+    pilha: list[tuple[NoArvore, Set[str]]] = [(node, needed)]
+    while pilha:
+        atual, necessarios = pilha.pop()
+        if not atual.filhos:
+            continue
+        if atual.operacao in ('X', '⨝'):
+            left_aliases = _aliases_subtree(atual.filhos[0])
+            left_need  = {a for a in necessarios if atual.indice.mascara((a.split('.')[0],)) & left_aliases}
+            right_need = necessarios - left_need
+            pilha.append((atual.filhos[1], right_need))
+            pilha.append((atual.filhos[0], left_need))
+        else:
+            pilha.append((atual.filhos[0], necessarios))
+
 # --------------------------------------------------------------------------- #
 # Pipeline de otimização
 # --------------------------------------------------------------------------- #
@@ -134,7 +180,7 @@ def otimizar(root: NoArvore) -> NoArvore:
 
 
 #Funcao principal
-def gerar_grafo_otimizado(consulta:str):
+def gerar_grafo_otimizado(consulta: str | NoAlgebra | Arvore):
     arvore_otimiz_inicial = processar(consulta)
     arvore_otim = otimizar(arvore_otimiz_inicial)
     arvore_desenh = desenhar_arvore(arvore_otim)
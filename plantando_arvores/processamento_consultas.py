@@ -6,6 +6,8 @@ relacionais correspondente, visualizando-a com a biblioteca Graphviz.
 from .arvore import NoArvore
 from graphviz import Digraph
 from pathlib import Path
+from algebra_relacional import NoAlgebra, Tabela, Produto, Juncao, Selecao, Projecao
+from arvores_construcao_otimizacao import Arvore, No, Operacao
 
 NOME_IMAGEM: str = "arvore_consulta_processada"
 FORMATO_IMAGEM: str = "png"
@@ -83,61 +85,179 @@ def remover_parenteses_externos(s: str) -> str:
     return s
 
 
-def processar(s: str) -> NoArvore:
+def _anexar(no: NoArvore, pai: NoArvore | None, raiz: list[NoArvore]) -> None:
+    """
+    Liga um nó recém-criado ao pai (ou o registra como raiz, se não houver pai).
+    """
+    if pai is None:
+        raiz.append(no)
+    else:
+        pai.adicionar_filho(no)
+
+
+def processar_ir(operador: NoAlgebra) -> NoArvore:
+    """
+    Constrói a árvore de operações diretamente da representação intermediária produzida pelo parser,
+    sem reinterpretar a string da álgebra relacional. Gera os mesmos rótulos que `processar`.
+
+    A representação é percorrida com uma pilha explícita de (operador, pai), sem recursão.
+
+    Args:
+        operador (NoAlgebra): Nó da representação intermediária.
+
+    Returns:
+        NoArvore: Raiz da árvore de operações.
+    """
+    raiz: list[NoArvore] = []
+    pilha: list[tuple[NoAlgebra, NoArvore | None]] = [(operador, None)]
+    while pilha:
+        atual, pai = pilha.pop()
+
+        if isinstance(atual, Projecao):
+            no = NoArvore(f"π {', '.join(map(str, atual.colunas))}")
+            _anexar(no, pai, raiz)
+            pilha.append((atual.filho, no))
+
+        elif isinstance(atual, Selecao):
+            # Cadeia de σ, com a primeira condição no topo; o filho é ligado à última
+            for cond in atual.predicados:
+                no = NoArvore(f"σ {cond}")
+                _anexar(no, pai, raiz)
+                pai = no
+            pilha.append((atual.filho, pai))
+
+        elif isinstance(atual, (Produto, Juncao)):
+            if isinstance(atual, Juncao):
+                no = NoArvore(f"⨝ {' ∧ '.join(map(str, atual.predicados))}")
+            else:
+                no = NoArvore('⨝')
+            _anexar(no, pai, raiz)
+            # O lado esquerdo sai da pilha (e é ligado ao nó) antes do direito
+            pilha.append((atual.direita, no))
+            pilha.append((atual.esquerda, no))
+
+        elif isinstance(atual, Tabela):
+            _anexar(NoArvore(str(atual)), pai, raiz)
+
+        else:
+            raise ValueError(f"Operador desconhecido na representação intermediária: {atual!r}")
+
+    return raiz[0]
+
+
+def _rotulo(no: No) -> str:
+    """
+    Converte o conteúdo de um nó da árvore canônica (`arvores_construcao_otimizacao.No`) no rótulo usado por `NoArvore`.
+    """
+    if no.operacao is Operacao.PROJECT:
+        return f"π {', '.join(coluna.strip() for coluna in no.valor[2:-1].split(','))}"
+    if no.operacao is Operacao.SELECT:
+        return f"σ {' ∧ '.join(map(str, no.predicados))}"
+    if no.operacao is Operacao.JOIN:
+        return f"⨝ {' ∧ '.join(map(str, no.predicados))}"
+    if no.operacao is Operacao.PRODUCT:
+        return '⨝'
+    return no.valor
+
+
+def processar_arvore(arvore: Arvore) -> NoArvore:
+    """
+    Deriva a árvore de operações da árvore canônica da consulta (`arvores_construcao_otimizacao.Arvore`),
+    com a mesma estrutura e os rótulos de `processar`. Assim, as duas implementações de árvore partem da
+    mesma construção, feita uma única vez por consulta.
+
+    Args:
+        arvore (Arvore): A árvore canônica.
+
+    Returns:
+        NoArvore: Raiz da árvore de operações.
+    """
+    if arvore.raiz is None:
+        raise ValueError("A árvore está vazia.")
+
+    raiz: list[NoArvore] = []
+    pilha: list[tuple[No, NoArvore | None]] = [(arvore.raiz, None)]
+    while pilha:
+        no, pai = pilha.pop()
+        no_arvore = NoArvore(_rotulo(no))
+        _anexar(no_arvore, pai, raiz)
+        # O filho esquerdo sai da pilha (e é ligado ao nó) antes do direito
+        for filho in (no.filho_dir, no.filho_esq):
+            if filho is not None:
+                pilha.append((filho, no_arvore))
+
+    return raiz[0]
+
+
+def processar(s: str | NoAlgebra | Arvore) -> NoArvore:
     """
     Processa uma string de álgebra relacional, preservando a estrutura sintática original,
-    e quebra seleções compostas (com ∧) em nós separados.
+    e quebra seleções compostas (com ∧) em nós separados. Se receber a representação
+    intermediária do parser, delega para `processar_ir`; se receber a árvore canônica
+    da consulta, delega para `processar_arvore`.
+
+    As subexpressões pendentes ficam em uma pilha explícita de (expressão, pai), sem recursão.
     
     Args:
-        s (str): Expressão de álgebra relacional.
+        s (str | NoAlgebra | Arvore): Expressão de álgebra relacional.
 
     Returns:
         NoArvore: Raiz da árvore de operações.
     """
-    s = remover_parenteses_externos(''.join(s.strip().splitlines()))
-
-    # Projeção ou Seleção (forma: operador[param](argumento))
-    if s.startswith("𝝿[") or s.startswith("𝛔["):
-        operador = "π" if s.startswith("𝝿[") else "σ"
-        idx = s.index("](")
-        parametro = s[2:idx]
-        conteudo, _ = extrair_conteudo_parenteses(s, idx + 1)
-        no_sub = processar(conteudo)
-
-        # Se for seleção, divide ∧ em múltiplos nós
-        if operador == "σ":
-            condicoes = quebrar_condicoes(parametro)
-            for cond in reversed(condicoes):
-                no = NoArvore(f"σ {cond.strip()}")
-                no.adicionar_filho(no_sub)
-                no_sub = no
-            return no_sub
-
-        else:  # Projeção
-            no = NoArvore(f"{operador} {parametro}")
-            no.adicionar_filho(no_sub)
-            return no
-
-    # Operadores binários: ⨝ ou X (Junção natural ou produto cartesiano)
-    nivel = 0
-    for i in range(len(s)):
-        if s[i] == '(':
-            nivel += 1
-        elif s[i] == ')':
-            nivel -= 1
-        elif nivel == 0 and (s[i] == '⨝' or s[i] == 'X'):
-            esquerda = s[:i]
-            direita = s[i+1:]
-            if s[i] == '⨝':
-                no = NoArvore(f'⨝')
-            else:
-                no = NoArvore(f'X')
-            no.adicionar_filho(processar(esquerda.strip()))
-            no.adicionar_filho(processar(direita.strip()))
-            return no
+    if isinstance(s, NoAlgebra):
+        return processar_ir(s)
+    if isinstance(s, Arvore):
+        return processar_arvore(s)
+
+    raiz: list[NoArvore] = []
+    pilha: list[tuple[str, NoArvore | None]] = [(s, None)]
+    while pilha:
+        s, pai = pilha.pop()
+        s = remover_parenteses_externos(''.join(s.strip().splitlines()))
+
+        # Projeção ou Seleção (forma: operador[param](argumento))
+        if s.startswith("𝝿[") or s.startswith("𝛔["):
+            operador = "π" if s.startswith("𝝿[") else "σ"
+            idx = s.index("](")
+            parametro = s[2:idx]
+            conteudo, _ = extrair_conteudo_parenteses(s, idx + 1)
+
+            # Se for seleção, divide ∧ em múltiplos nós
+            if operador == "σ":
+                for cond in quebrar_condicoes(parametro):
+                    no = NoArvore(f"σ {cond.strip()}")
+                    _anexar(no, pai, raiz)
+                    pai = no
+            else:  # Projeção
+                no = NoArvore(f"{operador} {parametro}")
+                _anexar(no, pai, raiz)
+            pilha.append((conteudo, no))
+            continue
+
+        # Operadores binários: ⨝ ou X (Junção natural ou produto cartesiano)
+        nivel = 0
+        for i in range(len(s)):
+            if s[i] == '(':
+                nivel += 1
+            elif s[i] == ')':
+                nivel -= 1
+            elif nivel == 0 and (s[i] == '⨝' or s[i] == 'X'):
+                esquerda = s[:i]
+                direita = s[i+1:]
+                if s[i] == '⨝':
+                    no = NoArvore(f'⨝')
+                else:
+                    no = NoArvore(f'X')
+                _anexar(no, pai, raiz)
+                # O lado esquerdo sai da pilha (e é ligado ao nó) antes do direito
+                pilha.append((direita.strip(), no))
+                pilha.append((esquerda.strip(), no))
+                break
+        else:
+            # Caso base: apenas uma tabela ou subexpressão entre colchetes
+            _anexar(NoArvore(s), pai, raiz)
 
-    # Caso base: apenas uma tabela ou subexpressão entre colchetes
-    return NoArvore(s)
+    return raiz[0]
 
 
 def desenhar_arvore(no: NoArvore) -> Digraph:
@@ -155,18 +275,22 @@ def desenhar_arvore(no: NoArvore) -> Digraph:
     dot.attr('graph',fontname='Cambria Math')
     dot.attr('node',fontname='Cambria Math')
 
-    def adicionar_nos(n: NoArvore) -> None:
+    # Pilha de tarefas: desenhar um nó ou ligá-lo ao pai depois de desenhada a sua sub-árvore
+    pilha: list[tuple[NoArvore, NoArvore | None]] = [(no, None)]
+    while pilha:
+        n, pai = pilha.pop()
+        if pai is not None:
+            dot.edge(pai.id, n.id)
+            continue
         dot.node(n.id, n.operacao, shape="box")
-        for filho in n.filhos:
-            adicionar_nos(filho)
-            dot.edge(n.id, filho.id)
-
-    adicionar_nos(no)
+        for filho in reversed(n.filhos):
+            pilha.append((filho, n))
+            pilha.append((filho, None))
     return dot
 
 
 def gerar_imagem_arvore_processada(
-    algebra_relacional: str = "𝝿[E.LNAME](𝛔[(P.PNAME='AQUARIUS')∧(P.PNUMBER=W.PNO)∧(W.ESSN=E.SSN)]((EMPLOYEE[E]⨝WORKS_ON[W])⨝PROJECT[P]))"
+    algebra_relacional: str | NoAlgebra | Arvore = "𝝿[E.LNAME](𝛔[(P.PNAME='AQUARIUS')∧(P.PNUMBER=W.PNO)∧(W.ESSN=E.SSN)]((EMPLOYEE[E]⨝WORKS_ON[W])⨝PROJECT[P]))"
 ) -> None:
     """
     Processa uma expressão de álgebra relacional e gera sua árvore visual.
@@ -174,7 +298,7 @@ def gerar_imagem_arvore_processada(
     A saída é salva como imagem PNG com o nome `arvore_consulta_processada.png`.
 
     Args:
-        algebra_relacional (str): A string da álgebra relacional a ser processada.
+        algebra_relacional (str | NoAlgebra | Arvore): A álgebra relacional a ser processada (string ou representação intermediária) ou a árvore canônica já construída.
     """
     arvore: NoArvore = processar(algebra_relacional)
     grafico: Digraph = desenhar_arvore(arvore)
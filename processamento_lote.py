@@ -0,0 +1,127 @@
+"""
+Processamento em lote de cargas de consultas SQL.
+
+Executa o mesmo pipeline da interface (`process_sql_query_ir` -> `converter_algebra_em_arvore` -> `reordenar_juncoes`
+-> `otimizar_selects` -> `otimizar_projecoes` -> `planejar_acesso`) sobre grandes volumes de consultas, como logs com centenas de milhares de comandos,
+distribuindo blocos de consultas entre os processos de um pool. Nenhuma imagem é gerada.
+
+Os resultados são devolvidos como um gerador, na mesma ordem da entrada, e apenas um número limitado de blocos
+fica em processamento ao mesmo tempo, de forma que o consumo de memória não depende do tamanho da carga.
+
+Exemplo:
+    with open("consultas.log", encoding="utf-8") as f:
+        for resultado in process_sql_batch(f, workers=8):
+            if resultado["erro"]:
+                print(resultado["sql"], resultado["erro"])
+"""
+
+from __future__ import annotations
+import io
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import redirect_stdout
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional
+
+from parser import process_sql_query_ir
+from arvores_construcao_otimizacao import (
+    converter_algebra_em_arvore,
+    reordenar_juncoes,
+    otimizar_selects,
+    otimizar_projecoes,
+    planejar_acesso,
+    processar_consulta_com_modelo,
+)
+
+def _processar_consulta(consulta_sql: str, usar_modelos: bool) -> dict[str, Any]:
+    """
+    Executa o pipeline completo para uma consulta, sem gerar imagens.
+
+    Args:
+        consulta_sql (str): A consulta SQL.
+        usar_modelos (bool): Se True, reaproveita os planos de consultas com a mesma forma (`processar_consulta_com_modelo`).
+
+    Returns:
+        dict[str, Any]: Dicionário com as chaves `sql`, `algebra`, `arvore`, `arvore_otimizada` e `erro`.
+    """
+    resultado = {"sql": consulta_sql, "algebra": None, "arvore": None, "arvore_otimizada": None, "erro": None}
+    try:
+        if usar_modelos:
+            resultado["algebra"], resultado["arvore"], resultado["arvore_otimizada"] = processar_consulta_com_modelo(consulta_sql)
+            return resultado
+
+        # process_sql_query_ir imprime os erros; em lote eles são devolvidos no resultado
+        with redirect_stdout(io.StringIO()):
+            consulta = process_sql_query_ir(consulta_sql)
+        if isinstance(consulta, Exception):
+            resultado["erro"] = str(consulta)
+            return resultado
+
+        resultado["algebra"] = str(consulta)
+        resultado["arvore"] = converter_algebra_em_arvore(consulta)
+        resultado["arvore_otimizada"] = planejar_acesso(otimizar_projecoes(otimizar_selects(reordenar_juncoes(resultado["arvore"]))))
+    except Exception as e:
+        resultado["erro"] = str(e)
+    return resultado
+
+def _processar_bloco(consultas: list[str], usar_modelos: bool) -> list[dict[str, Any]]:
+    """
+    Processa um bloco de consultas dentro de um processo do pool.
+    """
+    return [_processar_consulta(consulta, usar_modelos) for consulta in consultas]
+
+def _dividir_em_blocos(consultas: Iterable[str], tamanho_bloco: int) -> Iterator[list[str]]:
+    """
+    Lê a entrada de forma preguiçosa, em blocos de até `tamanho_bloco` consultas não vazias.
+    """
+    iterador = (consulta.strip() for consulta in consultas)
+    iterador = (consulta for consulta in iterador if consulta)
+    while True:
+        bloco = list(islice(iterador, tamanho_bloco))
+        if not bloco:
+            return
+        yield bloco
+
+def process_sql_batch(
+    consultas: Iterable[str],
+    workers: Optional[int] = None,
+    tamanho_bloco: int = 256,
+    blocos_em_voo: Optional[int] = None,
+    usar_modelos: bool = False,
+) -> Iterator[dict[str, Any]]:
+    """
+    Processa uma carga de consultas SQL em paralelo, devolvendo os resultados na ordem da entrada.
+
+    Args:
+        consultas (Iterable[str]): As consultas (por exemplo, as linhas de um arquivo de log). Linhas vazias são ignoradas.
+        workers (Optional[int]): Número de processos. Padrão é o número de CPUs; com 1, tudo roda no processo atual.
+        tamanho_bloco (int): Número de consultas enviadas a um processo de cada vez.
+        blocos_em_voo (Optional[int]): Máximo de blocos submetidos e ainda não consumidos. Padrão é 2 * workers.
+        usar_modelos (bool): Se True, reaproveita o plano otimizado de consultas com a mesma forma.
+
+    Yields:
+        dict[str, Any]: Um resultado por consulta, com as chaves `sql`, `algebra`, `arvore`, `arvore_otimizada` e `erro`.
+    """
+    if tamanho_bloco < 1:
+        raise ValueError(f"O tamanho do bloco deve ser positivo. Recebido: {tamanho_bloco}")
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for bloco in _dividir_em_blocos(consultas, tamanho_bloco):
+            yield from _processar_bloco(bloco, usar_modelos)
+        return
+
+    blocos_em_voo = blocos_em_voo or 2 * workers
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pendentes: deque[Future] = deque()
+    try:
+        for bloco in _dividir_em_blocos(consultas, tamanho_bloco):
+            pendentes.append(pool.submit(_processar_bloco, bloco, usar_modelos))
+            # Limita a memória: só submete um novo bloco depois de entregar o mais antigo
+            if len(pendentes) >= blocos_em_voo:
+                yield from pendentes.popleft().result()
+        while pendentes:
+            yield from pendentes.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
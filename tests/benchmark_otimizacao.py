@@ -0,0 +1,259 @@
+"""
+Benchmark das árvores não otimizadas e otimizadas nas configurações de dados.
+
+Para cada configuração de dados (1 a 4, com que o banco `db_vendas.db` é populado; os dados atuais são substituídos),
+executa cada consulta válida de `docs/exemplos_consultas.txt` com a árvore canônica (não otimizada) e com a árvore
+otimizada pelo mesmo pipeline da interface (`reordenar_juncoes` -> `otimizar_selects` -> `otimizar_projecoes` ->
+`planejar_acesso`), medindo:
+- a latência: o menor tempo entre `REPETICOES` execuções, sem instrumentação;
+- as linhas produzidas por operador e o pico de memória: uma execução a mais, instrumentada (`instrumentacao.py`).
+
+As árvores canônicas das junções são produtos cartesianos seguidos de seleções, que nas configurações de dados
+passam de 10^9 combinações de linhas. Por isso, as árvores em que a soma das cardinalidades estimadas dos nós passa
+de `LIMITE_LINHAS_ESTIMADAS` não são executadas: ficam no resultado como omitidas, com a estimativa.
+
+Os resultados são gravados em JSON (`--salvar`) e comparados com a linha de base gravada antes: uma latência ou um
+pico de memória maior que o da linha de base por mais de `LIMIAR_REGRESSAO` (e, nas latências, por mais de
+`TOLERANCIA_TEMPO`, para não acusar o ruído das consultas de poucos milissegundos) é uma regressão, assim como um
+número diferente de linhas no resultado. Com regressões, o script termina com o código 1.
+
+Uso (a partir da raiz do projeto):
+    python -m tests.benchmark_otimizacao 1 2 3 4 --salvar           # grava a linha de base
+    python -m tests.benchmark_otimizacao 1 2 3 4                    # compara com a linha de base
+    python -m tests.benchmark_otimizacao --banco outro.db --limiar 0.1 --limite-linhas 1e8
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterable, Optional, Union
+
+import numpy as np
+
+from parser import process_sql_query_ir
+from arvores_construcao_otimizacao import (
+    Arvore,
+    converter_algebra_em_arvore,
+    estimar_cardinalidade,
+    otimizar_projecoes,
+    otimizar_selects,
+    percorrer_pre_ordem,
+    planejar_acesso,
+    reordenar_juncoes,
+)
+from estatisticas import CAMINHO_BANCO, EstatisticasBanco
+from execucao_consultas import executar
+from execucao_vetorizada import consultas_de_exemplo, executar_lotes
+from instrumentacao import executar_instrumentado
+
+REPETICOES = 3
+LIMIAR_REGRESSAO = 0.25  # aumento relativo máximo aceitável da latência e do pico de memória
+TOLERANCIA_TEMPO = 0.005  # aumento absoluto da latência (em segundos) abaixo do qual não há regressão
+LIMITE_LINHAS_ESTIMADAS = 10_000_000  # linhas estimadas (somadas em todos os nós) acima das quais a árvore não é executada
+CAMINHO_BASE = Path(__file__).parent / "linha_de_base_otimizacao.json"
+PLANOS = ("nao_otimizada", "otimizada")
+
+def arvores_da_consulta(sql: str, estatisticas: EstatisticasBanco) -> dict[str, Arvore]:
+    """
+    A árvore canônica da consulta e a árvore otimizada, pelos nomes de `PLANOS`.
+    """
+    arvore = converter_algebra_em_arvore(process_sql_query_ir(sql))
+    otimizada = otimizar_projecoes(otimizar_selects(reordenar_juncoes(arvore, estatisticas), estatisticas))
+    return {"nao_otimizada": arvore, "otimizada": planejar_acesso(otimizada, estatisticas)}
+
+def linhas_estimadas(arvore: Arvore, estatisticas: EstatisticasBanco) -> float:
+    """
+    Soma das cardinalidades estimadas de todos os nós da árvore: uma estimativa das linhas que a execução processa.
+    """
+    return sum(estimar_cardinalidade(no, estatisticas) for no in percorrer_pre_ordem(arvore.raiz))
+
+def medir_plano(
+    arvore: Arvore, caminho: Union[str, Path], estatisticas: EstatisticasBanco, repeticoes: int, vetorizada: bool
+) -> dict[str, Any]:
+    """
+    Mede a latência de uma árvore e, em uma execução instrumentada, as linhas por operador e o pico de memória.
+    """
+    if vetorizada:
+        contar = lambda: sum(map(len, executar_lotes(arvore, caminho)))
+    else:
+        contar = lambda: sum(1 for _ in executar(arvore, caminho))
+    melhor, linhas = float("inf"), 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        linhas = contar()
+        melhor = min(melhor, time.perf_counter() - inicio)
+
+    medicoes = executar_instrumentado(arvore, caminho, vetorizada=vetorizada, memoria=True).para_dict(estatisticas)
+    operadores = [
+        {"no": no["no"], "execucoes": no["execucoes"], "linhas": no["linhas_saida"], "estimadas": round(no["cardinalidade_estimada"], 1)}
+        for no in medicoes["nos"] if no["executado"]
+    ]
+    return {
+        "linhas": linhas,
+        "tempo": melhor,
+        "memoria_pico": medicoes["memoria_pico"],
+        "linhas_processadas": sum(operador["linhas"] for operador in operadores),
+        "operadores": operadores,
+    }
+
+def medir_configuracao(
+    configuracao: Optional[int],
+    consultas: Iterable[str],
+    caminho: Union[str, Path] = CAMINHO_BANCO,
+    repeticoes: int = REPETICOES,
+    vetorizada: bool = False,
+    limite_linhas: float = LIMITE_LINHAS_ESTIMADAS,
+) -> list[dict[str, Any]]:
+    """
+    Mede as duas árvores de cada consulta no banco como ele está (populado com a configuração `configuracao`).
+
+    Returns:
+        list[dict[str, Any]]: Um resultado por consulta e plano, com as chaves `configuracao`, `sql`, `plano`,
+        `linhas_estimadas` e `omitida` e, nas árvores executadas, as de `medir_plano`.
+    """
+    estatisticas = EstatisticasBanco(caminho)
+    resultados = []
+    for sql in consultas:
+        for plano, arvore in arvores_da_consulta(sql, estatisticas).items():
+            estimadas = linhas_estimadas(arvore, estatisticas)
+            resultado = {"configuracao": configuracao, "sql": sql, "plano": plano, "linhas_estimadas": estimadas, "omitida": estimadas > limite_linhas}
+            if not resultado["omitida"]:
+                resultado.update(medir_plano(arvore, caminho, estatisticas, repeticoes, vetorizada))
+            resultados.append(resultado)
+    return resultados
+
+def ambiente() -> dict[str, str]:
+    """
+    Versões do Python, do SQLite e do NumPy e a plataforma, gravadas com os resultados: medições feitas em ambientes
+    diferentes não são comparáveis.
+    """
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+    }
+
+def comparar_com_base(
+    resultados: list[dict[str, Any]],
+    base: list[dict[str, Any]],
+    limiar: float = LIMIAR_REGRESSAO,
+    tolerancia_tempo: float = TOLERANCIA_TEMPO,
+) -> list[str]:
+    """
+    Compara os resultados com os da linha de base (da mesma configuração, consulta e plano).
+
+    Returns:
+        list[str]: A descrição de cada regressão encontrada (vazia se não houver nenhuma).
+    """
+    anteriores = {(resultado["configuracao"], resultado["sql"], resultado["plano"]): resultado for resultado in base}
+    regressoes = []
+    for resultado in resultados:
+        anterior = anteriores.get((resultado["configuracao"], resultado["sql"], resultado["plano"]))
+        descricao = f"configuração {resultado['configuracao']}, {resultado['plano']}: {resultado['sql']}"
+        if anterior is None or anterior["omitida"]:
+            continue
+        if resultado["omitida"]:
+            regressoes.append(f"{descricao}: omitida ({resultado['linhas_estimadas']:.3g} linhas estimadas), mas medida na linha de base")
+            continue
+        if resultado["linhas"] != anterior["linhas"]:
+            regressoes.append(f"{descricao}: {resultado['linhas']} linhas no resultado (antes, {anterior['linhas']})")
+        tempo, tempo_base = resultado["tempo"], anterior["tempo"]
+        if tempo > tempo_base * (1 + limiar) and tempo - tempo_base > tolerancia_tempo:
+            regressoes.append(f"{descricao}: latência de {tempo * 1e3:.1f} ms (antes, {tempo_base * 1e3:.1f} ms; +{tempo / tempo_base - 1:.0%})")
+        memoria, memoria_base = resultado["memoria_pico"], anterior["memoria_pico"]
+        if memoria_base and memoria > memoria_base * (1 + limiar):
+            regressoes.append(f"{descricao}: pico de memória de {memoria / 1024:.0f} KiB (antes, {memoria_base / 1024:.0f} KiB; +{memoria / memoria_base - 1:.0%})")
+    return regressoes
+
+def imprimir_resultados(resultados: list[dict[str, Any]]) -> None:
+    """
+    Uma linha por consulta, com a latência, as linhas processadas e o pico de memória das duas árvores.
+    """
+    print(f"{'config':>6} {'linhas':>9} | {'não otimizada (ms / linhas proc. / KiB)':>41} | {'otimizada (ms / linhas proc. / KiB)':>37} | {'ganho':>7}  consulta")
+    por_consulta: dict[tuple, dict[str, dict[str, Any]]] = {}
+    for resultado in resultados:
+        por_consulta.setdefault((resultado["configuracao"], resultado["sql"]), {})[resultado["plano"]] = resultado
+    for (configuracao, sql), planos in por_consulta.items():
+        colunas = []
+        for plano in PLANOS:
+            dados = planos[plano]
+            if dados["omitida"]:
+                colunas.append(f"omitida ({dados['linhas_estimadas']:.2g} linhas est.)")
+            else:
+                colunas.append(f"{dados['tempo'] * 1e3:>11.1f} {dados['linhas_processadas']:>13} {dados['memoria_pico'] / 1024:>9.0f}")
+        nao_otimizada, otimizada = planos["nao_otimizada"], planos["otimizada"]
+        if nao_otimizada["omitida"] or otimizada["omitida"]:
+            ganho = "-"
+        else:
+            ganho = f"{nao_otimizada['tempo'] / max(otimizada['tempo'], 1e-9):.1f}x"
+        linhas = "-" if otimizada["omitida"] else otimizada["linhas"]
+        print(f"{configuracao or 'atual':>6} {linhas:>9} | {colunas[0]:>41} | {colunas[1]:>37} | {ganho:>7}  {sql}")
+
+def executar_benchmark(
+    configuracoes: list[int],
+    caminho_base: Path = CAMINHO_BASE,
+    salvar: bool = False,
+    limiar: float = LIMIAR_REGRESSAO,
+    repeticoes: int = REPETICOES,
+    vetorizada: bool = False,
+    caminho_banco: Union[str, Path] = CAMINHO_BANCO,
+    limite_linhas: float = LIMITE_LINHAS_ESTIMADAS,
+) -> bool:
+    """
+    Executa o benchmark nas configurações (ou no banco como ele está, sem configurações), imprime os resultados e os
+    compara com a linha de base. Retorna True se não houver regressões.
+    """
+    consultas = consultas_de_exemplo()
+    resultados = []
+    if not configuracoes:
+        resultados += medir_configuracao(None, consultas, caminho_banco, repeticoes, vetorizada, limite_linhas)
+    else:
+        from banco_de_dados.definicao_banco.definicao_banco import popular_db
+
+        for configuracao in configuracoes:
+            popular_db(configuracao, ver_progresso=False)
+            resultados += medir_configuracao(configuracao, consultas, CAMINHO_BANCO, repeticoes, vetorizada, limite_linhas)
+    imprimir_resultados(resultados)
+
+    dados = {
+        "ambiente": ambiente(),
+        "motor": "vetorizada" if vetorizada else "linhas",
+        "repeticoes": repeticoes,
+        "limite_linhas": limite_linhas,
+        "resultados": resultados,
+    }
+    regressoes = []
+    if caminho_base.is_file():
+        base = json.loads(caminho_base.read_text(encoding="utf-8"))
+        if base["ambiente"] != dados["ambiente"] or base["motor"] != dados["motor"]:
+            print(f"\nAviso: a linha de base foi medida em outro ambiente ou motor ({base['ambiente']}, {base['motor']}).")
+        regressoes = comparar_com_base(resultados, base["resultados"], limiar)
+        print(f"\n{len(regressoes)} regressões acima de {limiar:.0%} em relação a {caminho_base}")
+        for regressao in regressoes:
+            print(f"  {regressao}")
+    if salvar:
+        caminho_base.write_text(json.dumps(dados, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nLinha de base salva em {caminho_base}")
+    return not regressoes
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Compara as árvores não otimizadas e otimizadas nas consultas de exemplo.")
+    argumentos.add_argument("configuracoes", nargs="*", type=int, help="configurações de dados (1 a 4) com que o banco é populado")
+    argumentos.add_argument("--base", type=Path, default=CAMINHO_BASE, help="arquivo JSON da linha de base")
+    argumentos.add_argument("--salvar", action="store_true", help="grava os resultados como a nova linha de base")
+    argumentos.add_argument("--limiar", type=float, default=LIMIAR_REGRESSAO, help="aumento relativo que conta como regressão")
+    argumentos.add_argument("--repeticoes", type=int, default=REPETICOES, help="execuções de cada árvore (vale a menor latência)")
+    argumentos.add_argument("--vetorizada", action="store_true", help="usa a execução vetorizada")
+    argumentos.add_argument("--limite-linhas", type=float, default=LIMITE_LINHAS_ESTIMADAS, help="linhas estimadas acima das quais a árvore não é executada")
+    argumentos.add_argument("--banco", default=CAMINHO_BANCO, help="banco medido quando nenhuma configuração é informada")
+    argumentos = argumentos.parse_args()
+
+    sem_regressoes = executar_benchmark(
+        argumentos.configuracoes, argumentos.base, argumentos.salvar, argumentos.limiar,
+        argumentos.repeticoes, argumentos.vetorizada, argumentos.banco, argumentos.limite_linhas,
+    )
+    sys.exit(0 if sem_regressoes else 1)
@@ -0,0 +1,86 @@
+"""
+Benchmark de escalabilidade do parser SQL.
+
+Gera consultas com um número crescente de predicados (WHERE e ON, ligados por AND) sobre uma junção das tabelas
+do esquema e mede o tempo de `parse_validate_sql` e de `process_sql_query`. Com o analisador léxico e o parser de
+descida recursiva, o custo por predicado deve permanecer aproximadamente constante até 10 mil predicados.
+
+Uso (a partir da raiz do projeto):
+    python -m tests.benchmark_parser
+"""
+import time
+from parser import parse_validate_sql, process_sql_query
+
+TAMANHOS = [100, 500, 1000, 2000, 5000, 10000]
+REPETICOES = 3
+TOLERANCIA_LINEAR = 2.0  # razão máxima aceitável entre o maior e o menor custo por predicado
+
+# Junção com todas as tabelas do esquema, para que cada predicado seja validado contra vários aliases
+JUNCOES = [
+    ("Pedido", "p", "c.idCliente = p.Cliente_idCliente"),
+    ("Status", "s", "p.Status_idStatus = s.idStatus"),
+    ("Pedido_has_Produto", "i", "p.idPedido = i.Pedido_idPedido"),
+    ("Produto", "pr", "i.Produto_idProduto = pr.idProduto"),
+    ("Categoria", "cat", "pr.Categoria_idCategoria = cat.idCategoria"),
+    ("TipoCliente", "tc", "c.TipoCliente_idTipoCliente = tc.idTipoCliente"),
+    ("Endereco", "e", "c.idCliente = e.Cliente_idCliente"),
+    ("TipoEndereco", "te", "e.TipoEndereco_idTipoEndereco = te.idTipoEndereco"),
+    ("Telefone", "t", "c.idCliente = t.Cliente_idCliente"),
+]
+
+PREDICADOS = [
+    "c.idCliente > {n}",
+    "p.ValorTotalPedido >= {n}.5",
+    "pr.Nome <> 'produto {n}'",
+    "i.Quantidade < {n}",
+    "e.UF = 'SP'",
+    "ValorTotalPedido <= {n}",  # coluna não qualificada: exige busca em todos os aliases
+]
+
+def gerar_consulta(num_predicados: int) -> str:
+    """
+    Monta uma consulta com `num_predicados` predicados, distribuídos entre as condições ON e a cláusula WHERE.
+    """
+    partes = ["SELECT c.Nome, p.idPedido, pr.Nome FROM Cliente c"]
+    restantes = num_predicados
+    for tabela, alias, condicao in JUNCOES:
+        partes.append(f"INNER JOIN {tabela} {alias} ON {condicao}")
+        restantes -= 1
+    where = [PREDICADOS[i % len(PREDICADOS)].format(n=i) for i in range(max(restantes, 1))]
+    partes.append("WHERE " + " AND ".join(where))
+    return " ".join(partes)
+
+def medir(funcao, consulta: str) -> float:
+    """
+    Retorna o menor tempo (em segundos) entre `REPETICOES` execuções de `funcao(consulta)`.
+    """
+    melhor = float("inf")
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        resultado = funcao(consulta)
+        melhor = min(melhor, time.perf_counter() - inicio)
+        if isinstance(resultado, Exception):
+            raise resultado
+    return melhor
+
+def executar_benchmark() -> bool:
+    """
+    Executa o benchmark e imprime uma tabela com os tempos. Retorna True se o custo por predicado escalou linearmente.
+    """
+    print(f"{'predicados':>10} | {'parse (ms)':>10} | {'total (ms)':>10} | {'µs/predicado':>12}")
+    custos = []
+    for tamanho in TAMANHOS:
+        consulta = gerar_consulta(tamanho)
+        tempo_parse = medir(parse_validate_sql, consulta)
+        tempo_total = medir(process_sql_query, consulta)
+        custo = tempo_total / tamanho * 1e6
+        custos.append(custo)
+        print(f"{tamanho:>10} | {tempo_parse * 1e3:>10.2f} | {tempo_total * 1e3:>10.2f} | {custo:>12.2f}")
+
+    razao = max(custos) / min(custos)
+    linear = razao <= TOLERANCIA_LINEAR
+    print(f"\nRazão entre maior e menor custo por predicado: {razao:.2f} ({'linear' if linear else 'NÃO linear'})")
+    return linear
+
+if __name__ == "__main__":
+    executar_benchmark()
@@ -0,0 +1,51 @@
+import copy
+import tempfile
+import unittest
+from pathlib import Path
+from benchmark_otimizacao import PLANOS, comparar_com_base, medir_configuracao
+from test_execucao_consultas import criar_banco_de_teste
+
+CONSULTAS = [
+    "SELECT Nome FROM Cliente WHERE idCliente < 5",
+    "SELECT c.Nome, p.idPedido FROM Cliente AS c INNER JOIN Pedido AS p ON c.idCliente = p.Cliente_idCliente WHERE p.ValorTotalPedido > 100.0",
+]
+
+class TestBenchmarkOtimizacao(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pasta = tempfile.TemporaryDirectory()
+        cls.caminho = Path(cls.pasta.name) / "vendas.db"
+        criar_banco_de_teste(cls.caminho)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pasta.cleanup()
+
+    def test_medicao_e_regressoes(self):
+        resultados = medir_configuracao(1, CONSULTAS, self.caminho, repeticoes=1, limite_linhas=1000)
+        self.assertEqual([(r["sql"], r["plano"]) for r in resultados], [(sql, plano) for sql in CONSULTAS for plano in PLANOS])
+        # O produto cartesiano da árvore canônica da junção passa do limite de linhas estimadas
+        self.assertEqual([r["omitida"] for r in resultados], [False, False, True, False])
+        selecao, otimizada = resultados[0], resultados[3]
+        self.assertEqual(selecao["linhas"], 4)
+        self.assertGreater(selecao["memoria_pico"], 0)
+        self.assertEqual(otimizada["linhas_processadas"], sum(operador["linhas"] for operador in otimizada["operadores"]))
+        self.assertEqual(otimizada["operadores"][0]["linhas"], otimizada["linhas"])
+        self.assertEqual(comparar_com_base(resultados, resultados), [])
+
+        atuais = copy.deepcopy(resultados)
+        atuais[0]["tempo"] = selecao["tempo"] * 2 + 0.01
+        atuais[3]["linhas"] += 1
+        atuais[1]["omitida"] = True
+        # Aumentos abaixo do limiar, ou de poucos milissegundos, não são regressões
+        atuais[3]["tempo"] = otimizada["tempo"] * 1.2
+        atuais[3]["memoria_pico"] = otimizada["memoria_pico"] * 1.2
+        regressoes = comparar_com_base(atuais, resultados, limiar=0.25)
+        self.assertEqual(len(regressoes), 3)
+        self.assertIn("latência", regressoes[0])
+        self.assertIn("omitida", regressoes[1])
+        self.assertIn("linhas no resultado", regressoes[2])
+        self.assertEqual(len(comparar_com_base(atuais, resultados, limiar=0.1)), 4)
+
+if __name__ == "__main__":
+    unittest.main()
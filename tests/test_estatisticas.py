@@ -0,0 +1,136 @@
+import json
+import random
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+import estatisticas
+from estatisticas import CHAVE_PRIMARIA, LINHAS_PADRAO, EstatisticasBanco, estimar_seletividade, indices_dos_scripts
+from arvores_construcao_otimizacao import analisar_condicao, converter_algebra_em_arvore, estimar_cardinalidade
+
+TABELAS_SQL = Path(__file__).parent.parent / "banco_de_dados" / "definicao_banco" / "criacao" / "tabelas.sql"
+
+class TestEstatisticas(unittest.TestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.caminho = Path(pasta.name) / "vendas.db"
+        aleatorio = random.Random(1)
+        with sqlite3.connect(self.caminho) as conexao:
+            conexao.executescript(TABELAS_SQL.read_text(encoding="utf-8"))
+            conexao.execute("PRAGMA foreign_keys = OFF")
+            conexao.executemany(
+                "INSERT INTO Produto (idProduto, Nome, Descricao, Preco, QuantEstoque, Categoria_idCategoria) VALUES (?, ?, ?, ?, ?, ?)",
+                [(i, f"produto {i}", None if i % 4 else "promoção", i % 100, 0, i % 10) for i in range(1, 1001)],
+            )
+            conexao.executemany(
+                "INSERT INTO Pedido_has_Produto VALUES (?, ?, ?, ?, ?)",
+                [(i, aleatorio.randint(1, 5000), aleatorio.randint(1, 1000), aleatorio.randint(1, 10), 1.0) for i in range(1, 20001)],
+            )
+        conexao.close()
+
+    def test_coleta_e_arquivo(self):
+        estatisticas = EstatisticasBanco(self.caminho, tamanho_amostra=2000).coletar()
+        produto = estatisticas.tabela("produto")
+        self.assertEqual(produto.linhas, 1000)
+        self.assertEqual(produto.colunas["idproduto"].distintos, 1000)
+        self.assertEqual(produto.colunas["preco"].distintos, 100)
+        self.assertAlmostEqual(produto.colunas["descricao"].fracao_nulos, 0.75)
+        self.assertEqual((produto.colunas["preco"].minimo, produto.colunas["preco"].maximo), (0, 99))
+
+        # Tabela maior que a amostra: as colunas são estimadas a partir de uma amostra
+        itens = estatisticas.tabela("pedido_has_produto")
+        self.assertEqual(itens.linhas, 20000)
+        self.assertGreater(itens.colunas["idpedidoproduto"].distintos, 15000)
+        self.assertLess(abs(itens.colunas["produto_idproduto"].distintos - 1000), 100)
+
+        dados = json.loads(estatisticas.caminho_arquivo.read_text(encoding="utf-8"))
+        self.assertEqual(dados["tabelas"]["produto"]["linhas"], 1000)
+        recarregadas = EstatisticasBanco(self.caminho)
+        self.assertEqual(recarregadas.tabelas["produto"].para_dict(), produto.para_dict())
+
+    def test_coleta_incremental(self):
+        estatisticas = EstatisticasBanco(self.caminho).coletar()
+        self.assertEqual(estatisticas.linhas("categoria"), 0)
+        # Sem alterações no banco, nada é coletado de novo (o arquivo de estatísticas não é regravado)
+        gravado = estatisticas.caminho_arquivo.stat().st_mtime_ns
+        EstatisticasBanco(self.caminho).coletar()
+        self.assertEqual(estatisticas.caminho_arquivo.stat().st_mtime_ns, gravado)
+
+        # Um UPDATE não muda o número de linhas nem os rowids, mas muda a assinatura do banco
+        with sqlite3.connect(self.caminho) as conexao:
+            conexao.execute("INSERT INTO Categoria VALUES (1, 'nova')")
+            conexao.execute("UPDATE Produto SET Preco = -1")
+        conexao.close()
+        estatisticas = EstatisticasBanco(self.caminho)
+        self.assertEqual(estatisticas.linhas("categoria"), 1)
+        self.assertEqual(estatisticas.coluna("produto", "preco").minimo, -1)
+
+    def test_valores_padrao(self):
+        # Sem banco: a chave primária INTEGER (lida dos scripts de criação) é única, qualquer que seja o nome
+        estatisticas = EstatisticasBanco(linhas={"pedido_has_produto": 500, "categoria": 0})
+        self.assertEqual(estatisticas.distintos("pedido_has_produto", "idpedidoproduto"), 500)
+        self.assertEqual(estatisticas.distintos("pedido_has_produto", "produto_idproduto"), 50)
+        self.assertEqual(estatisticas.linhas("produto"), LINHAS_PADRAO)
+        # Tabela vazia: 0 linhas, mas os distintos continuam utilizáveis como divisor
+        self.assertEqual(estatisticas.linhas("categoria"), 0)
+        self.assertEqual(estatisticas.distintos("categoria", "idcategoria"), 1)
+        self.assertEqual(estatisticas.distintos("categoria", "descricao"), 1)
+
+    def test_amostra_com_lacunas(self):
+        with sqlite3.connect(self.caminho) as conexao:
+            conexao.execute("DELETE FROM Pedido_has_Produto WHERE idPedidoProduto % 3 <> 0")
+        conexao.close()
+        conexao = sqlite3.connect(self.caminho)
+        self.addCleanup(conexao.close)
+        colunas = ["idPedidoProduto", "Quantidade"]
+        # Um terço dos rowids existe: o sorteio é completado em rodadas até o tamanho pedido, sem repetições
+        amostra = estatisticas._amostrar(conexao, "pedido_has_produto", colunas, 6666, 2000, random.Random(0))
+        self.assertEqual(len(amostra), 2000)
+        self.assertEqual(len({linha[0] for linha in amostra}), 2000)
+        self.assertTrue(all(linha[0] % 3 == 0 for linha in amostra))
+
+        # Faixa de rowids esparsa demais: os rowids existentes são listados
+        conexao.execute("UPDATE Pedido_has_Produto SET idPedidoProduto = 1000000000 WHERE idPedidoProduto = 3")
+        amostra = estatisticas._amostrar(conexao, "pedido_has_produto", colunas, 6666, 2000, random.Random(0))
+        self.assertEqual(len({linha[0] for linha in amostra}), 2000)
+
+    def test_seletividade_e_cardinalidade(self):
+        estatisticas = EstatisticasBanco(self.caminho)
+        tabelas = {"p": "produto", "i": "pedido_has_produto"}
+        esperadas = {
+            "p.preco < 25": 0.25,
+            "p.preco >= 90": 0.1,
+            "p.preco = 7": 0.01,
+            "p.preco <> 7": 0.99,
+            "p.descricao = 'promoção'": 0.25,
+            "i.produto_idproduto = p.idproduto": 0.001,
+        }
+        for condicao, esperada in esperadas.items():
+            with self.subTest(condicao=condicao):
+                seletividade = estimar_seletividade(analisar_condicao(condicao)[0], tabelas, estatisticas)
+                self.assertAlmostEqual(seletividade, esperada, delta=0.02)
+
+        arvore = converter_algebra_em_arvore(
+            "𝝿[p.nome](𝛔[p.preco < 25 ∧ i.produto_idproduto = p.idproduto]((pedido_has_produto[i] ⨝ produto[p])))"
+        )
+        self.assertAlmostEqual(estimar_cardinalidade(arvore.raiz, estatisticas), 20000 * 0.25, delta=20000 * 0.02)
+        self.assertEqual(estimar_cardinalidade(arvore.raiz.filho_esq.filho_esq.filho_esq, estatisticas), 20000 * 1000)
+
+    def test_indices(self):
+        with sqlite3.connect(self.caminho) as conexao:
+            conexao.execute("CREATE INDEX idx_Itens_Produto_Quantidade ON Pedido_has_Produto (Produto_idProduto, Quantidade)")
+        conexao.close()
+        estatisticas = EstatisticasBanco(self.caminho)
+        self.assertEqual(estatisticas.indice("produto", "idproduto"), CHAVE_PRIMARIA)
+        self.assertEqual(estatisticas.indice("pedido_has_produto", "produto_idproduto"), "idx_Itens_Produto_Quantidade")
+        # Só a primeira coluna de um índice composto permite buscas
+        self.assertIsNone(estatisticas.indice("pedido_has_produto", "quantidade"))
+        self.assertEqual(estatisticas.indice("telefone", "numero"), "sqlite_autoindex_Telefone_1")
+
+        # Sem banco, os índices são os dos scripts de criação
+        self.assertEqual(EstatisticasBanco().indices(), indices_dos_scripts())
+        self.assertEqual(EstatisticasBanco().indice("pedido", "cliente_idcliente"), "idx_Pedido_Cliente")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import copy
+import inspect
+import random
+import sqlite3
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+from parser import process_sql_query_ir
+from algebra_relacional import Coluna
+from arvores_construcao_otimizacao import MetodoAcesso, No, converter_algebra_em_arvore, otimizar_selects, otimizar_projecoes, planejar_acesso, reordenar_juncoes
+from estatisticas import EstatisticasBanco
+from execucao_consultas import (
+    Delegacao,
+    construir_plano_execucao,
+    conectar_banco,
+    decompilar,
+    delegar_ao_sqlite,
+    executar,
+    OperadorConsultaSQL,
+    OperadorBuscaIndice,
+    OperadorJuncaoHash,
+    OperadorLacoIndice,
+    OperadorVarredura,
+    predicados_residuais,
+)
+from test_query_processor_suite import VALID_QUERIES
+
+TABELAS_SQL = Path(__file__).parent.parent / "banco_de_dados" / "definicao_banco" / "criacao" / "tabelas.sql"
+INDICES_SQL = TABELAS_SQL.with_name("indexes.sql")
+
+def criar_banco_de_teste(caminho, clientes=60, pedidos=80, itens=150, semente=1):
+    """
+    Cria um banco pequeno com o esquema de `tabelas.sql`, os índices de `indexes.sql` e dados aleatórios (reprodutíveis).
+    """
+    aleatorio = random.Random(semente)
+    data = lambda: f"2023-{aleatorio.randint(1, 12):02d}-{aleatorio.randint(1, 28):02d}"
+    with sqlite3.connect(caminho) as conexao:
+        conexao.executescript(TABELAS_SQL.read_text(encoding="utf-8"))
+        conexao.executescript(INDICES_SQL.read_text(encoding="utf-8"))
+        conexao.executemany("INSERT INTO Categoria VALUES (?, ?)", [(i, f"categoria {i}") for i in range(1, 6)])
+        conexao.executemany(
+            "INSERT INTO Produto VALUES (?, ?, ?, ?, ?, ?)",
+            [(i, f"produto {i}", None if i % 3 else f"categoria {i % 5 + 1}", round(aleatorio.uniform(5, 200), 2), aleatorio.randint(0, 30), aleatorio.randint(1, 5)) for i in range(1, 41)],
+        )
+        conexao.executemany("INSERT INTO TipoCliente VALUES (?, ?)", [(1, "comum"), (2, "premium"), (3, "empresa")])
+        conexao.executemany(
+            "INSERT INTO Cliente VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(i, f"cliente {i}", "teste@mail.com" if i == 7 else f"c{i}@mail.com", None, None, aleatorio.randint(1, 3), data()) for i in range(1, clientes + 1)],
+        )
+        conexao.executemany("INSERT INTO Status VALUES (?, ?)", [(1, "aberto"), (2, "pago"), (3, "enviado")])
+        conexao.executemany(
+            "INSERT INTO Pedido VALUES (?, ?, ?, ?, ?)",
+            [(i, aleatorio.randint(1, 3), data(), round(aleatorio.uniform(10, 500), 2), aleatorio.randint(1, clientes)) for i in range(1, pedidos + 1)],
+        )
+        conexao.executemany(
+            "INSERT INTO Pedido_has_Produto VALUES (?, ?, ?, ?, ?)",
+            [(i, aleatorio.randint(1, pedidos), aleatorio.randint(1, 40), aleatorio.randint(1, 4), 10.0) for i in range(1, itens + 1)],
+        )
+    conexao.close()
+
+class TestExecucaoConsultas(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pasta = tempfile.TemporaryDirectory()
+        cls.caminho = Path(cls.pasta.name) / "vendas.db"
+        criar_banco_de_teste(cls.caminho)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pasta.cleanup()
+
+    def _esperado(self, sql):
+        with sqlite3.connect(self.caminho) as conexao:
+            return Counter(conexao.execute(sql).fetchall())
+
+    def test_resultados_iguais_ao_sqlite(self):
+        estatisticas = EstatisticasBanco(self.caminho)
+        for sql in VALID_QUERIES:
+            with self.subTest(sql=sql):
+                arvore = converter_algebra_em_arvore(process_sql_query_ir(sql))
+                otimizada = otimizar_projecoes(otimizar_selects(reordenar_juncoes(arvore, estatisticas), estatisticas))
+                esperado = self._esperado(sql)
+                self.assertTrue(esperado)
+                self.assertEqual(Counter(executar(arvore, self.caminho)), esperado)
+                self.assertEqual(Counter(executar(otimizada, self.caminho)), esperado)
+
+    def test_juncao_hash_e_esquema(self):
+        sql = "SELECT c.Nome, p.idPedido FROM Cliente AS c INNER JOIN Pedido AS p ON c.idCliente = p.Cliente_idCliente WHERE p.ValorTotalPedido > 100.0"
+        otimizada = otimizar_selects(converter_algebra_em_arvore(process_sql_query_ir(sql)))
+        conexao = conectar_banco(self.caminho)
+        self.addCleanup(conexao.close)
+        plano = construir_plano_execucao(otimizada, conexao)
+        self.assertEqual(plano.esquema, ("c.nome", "p.idpedido"))
+        self.assertIsInstance(plano.entrada, OperadorJuncaoHash)
+
+    def test_predicados_residuais_por_valor(self):
+        juncao = No("⨝[c.idcliente=p.cliente_idcliente∧p.idpedido>c.idcliente]", No("cliente[c]"), No("pedido[p]"))
+        chaves = juncao.chaves_equijuncao()
+        residuais = [str(predicado) for predicado in predicados_residuais(juncao, chaves)]
+        self.assertEqual(residuais, ["p.idpedido > c.idcliente"])
+        # Chaves formadas por outros objetos Coluna (em qualquer ordem) cobrem os mesmos predicados
+        copia = tuple((Coluna(esq.alias, esq.nome), Coluna(dir.alias, dir.nome)) for dir, esq in chaves)
+        self.assertEqual([str(predicado) for predicado in predicados_residuais(copy.deepcopy(juncao), copia)], residuais)
+
+    def test_planos_com_indices(self):
+        estatisticas = EstatisticasBanco(self.caminho)
+        consultas = VALID_QUERIES + [
+            "SELECT c.Nome, p.idPedido FROM Cliente AS c INNER JOIN Pedido AS p ON c.idCliente = p.Cliente_idCliente WHERE c.idCliente = 7",
+            "SELECT p.idPedido, c.Nome FROM Pedido AS p INNER JOIN Cliente AS c ON p.Cliente_idCliente = c.idCliente WHERE p.idPedido <= 3",
+            "SELECT Nome FROM Cliente WHERE idCliente >= 55",
+        ]
+        for sql in consultas:
+            with self.subTest(sql=sql):
+                arvore = converter_algebra_em_arvore(process_sql_query_ir(sql))
+                otimizada = otimizar_projecoes(otimizar_selects(reordenar_juncoes(arvore, estatisticas), estatisticas))
+                self.assertEqual(Counter(executar(planejar_acesso(otimizada, estatisticas), self.caminho)), self._esperado(sql))
+
+        conexao = conectar_banco(self.caminho)
+        self.addCleanup(conexao.close)
+        arvore = planejar_acesso(otimizar_projecoes(otimizar_selects(converter_algebra_em_arvore(process_sql_query_ir(consultas[-3])))), estatisticas)
+        plano = construir_plano_execucao(arvore, conexao)
+        self.assertIsInstance(plano.entrada, OperadorLacoIndice)
+        self.assertIsInstance(plano.entrada.busca, OperadorBuscaIndice)
+        self.assertIn('WHERE "Cliente_idCliente" = ?', plano.entrada.busca.sql)
+        varredura = plano.entrada.esquerda.entrada.entrada
+        self.assertIsInstance(varredura, OperadorVarredura)
+        self.assertEqual((varredura.sql.split(" WHERE ")[1], varredura.parametros), ('"idCliente" = ?', (7,)))
+
+    def test_delegacao_ao_sqlite(self):
+        estatisticas = EstatisticasBanco(self.caminho)
+        for sql in VALID_QUERIES + ["SELECT Nome FROM Produto WHERE Descricao < 5"]:
+            arvore = converter_algebra_em_arvore(process_sql_query_ir(sql))
+            planejada = planejar_acesso(otimizar_projecoes(otimizar_selects(reordenar_juncoes(arvore, estatisticas), estatisticas)), estatisticas)
+            for modo in Delegacao:
+                with self.subTest(sql=sql, modo=modo):
+                    self.assertEqual(Counter(executar(delegar_ao_sqlite(arvore, modo), self.caminho)), self._esperado(sql))
+                    self.assertEqual(Counter(executar(delegar_ao_sqlite(planejada, modo), self.caminho)), self._esperado(sql))
+
+        conexao = conectar_banco(self.caminho)
+        self.addCleanup(conexao.close)
+        sql = "SELECT c.Nome, p.idPedido FROM Cliente AS c INNER JOIN Pedido AS p ON c.idCliente = p.Cliente_idCliente WHERE p.ValorTotalPedido > 100.0"
+        arvore = otimizar_projecoes(otimizar_selects(converter_algebra_em_arvore(process_sql_query_ir(sql))))
+        consulta = decompilar(arvore.raiz, conexao)
+        self.assertEqual(
+            consulta.sql,
+            'SELECT "c"."nome", "p"."idpedido" FROM cliente AS "c" JOIN pedido AS "p" ON "c"."idcliente" = "p"."cliente_idcliente" '
+            'WHERE "p"."valortotalpedido" > ?',
+        )
+        self.assertEqual((consulta.parametros, consulta.esquema), ((100.0,), ("c.nome", "p.idpedido")))
+
+        # Na delegação híbrida, a junção por hash fica com os operadores e os dois lados vão para o SQLite
+        hibrida = delegar_ao_sqlite(planejar_acesso(arvore, estatisticas))
+        delegados = [no for no in hibrida.nos() if no.acesso is not None and no.acesso.metodo is MetodoAcesso.SQLITE]
+        self.assertEqual([no.valor for no in delegados], ["𝝿[c.idcliente, c.nome]", "𝛔[p.valortotalpedido>100.0]"])
+        plano = construir_plano_execucao(hibrida, conexao)
+        self.assertIsInstance(plano.entrada, OperadorJuncaoHash)
+        self.assertIsInstance(plano.entrada.direita, OperadorConsultaSQL)
+        self.assertIsInstance(construir_plano_execucao(delegar_ao_sqlite(arvore, Delegacao.TOTAL), conexao), OperadorConsultaSQL)
+        self.assertIs(delegar_ao_sqlite(arvore, Delegacao.NENHUMA), arvore)
+
+    def test_resultado_sob_demanda(self):
+        sql = "SELECT * FROM Categoria C INNER JOIN Produto P ON C.idCategoria = P.Categoria_idCategoria"
+        linhas = executar(converter_algebra_em_arvore(process_sql_query_ir(sql)), self.caminho)
+        self.assertTrue(inspect.isgenerator(linhas))
+        self.assertEqual(len(next(linhas)), 8)
+        linhas.close()
+        with self.assertRaises(ValueError):
+            next(executar(converter_algebra_em_arvore(process_sql_query_ir(sql)), Path(self.pasta.name) / "inexistente.db"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import sqlite3
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+import numpy as np
+from parser import process_sql_query_ir
+from arvores_construcao_otimizacao import converter_algebra_em_arvore, otimizar_selects, otimizar_projecoes, reordenar_juncoes
+from estatisticas import EstatisticasBanco
+from execucao_consultas import Delegacao, conectar_banco, delegar_ao_sqlite, executar
+from algebra_relacional import Coluna
+from execucao_vetorizada import (
+    JuncaoOrdenadaColunar,
+    JuncaoParalelaColunar,
+    Lote,
+    OperadorColunar,
+    comparar_delegacao,
+    comparar_motores,
+    construir_plano_vetorizado,
+    consultas_de_exemplo,
+    executar_lotes,
+    executar_vetorizado,
+    particionar_radix,
+    vetor_coluna,
+)
+from test_execucao_consultas import criar_banco_de_teste
+from test_query_processor_suite import VALID_QUERIES
+
+class Fonte(OperadorColunar):
+    """
+    Operador que devolve colunas já prontas, em lotes de tamanho fixo.
+    """
+    def __init__(self, esquema, colunas, tamanho_lote=10_000):
+        self.esquema = esquema
+        self.colunas = [vetor_coluna(valores) for valores in colunas]
+        self.tamanho_lote = tamanho_lote
+
+    def __iter__(self):
+        for inicio in range(0, len(self.colunas[0]), self.tamanho_lote):
+            yield Lote(tuple(coluna[inicio:inicio + self.tamanho_lote] for coluna in self.colunas))
+
+class TestExecucaoVetorizada(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pasta = tempfile.TemporaryDirectory()
+        cls.caminho = Path(cls.pasta.name) / "vendas.db"
+        criar_banco_de_teste(cls.caminho)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pasta.cleanup()
+
+    def _arvore(self, sql):
+        return converter_algebra_em_arvore(process_sql_query_ir(sql))
+
+    def test_resultados_iguais_a_execucao_por_linhas(self):
+        estatisticas = EstatisticasBanco(self.caminho)
+        for sql in VALID_QUERIES:
+            with self.subTest(sql=sql):
+                arvore = self._arvore(sql)
+                otimizada = otimizar_projecoes(otimizar_selects(reordenar_juncoes(arvore, estatisticas), estatisticas))
+                esperado = Counter(executar(otimizada, self.caminho))
+                # Lotes pequenos, para que as junções e filtros atravessem vários lotes
+                self.assertEqual(Counter(executar_vetorizado(otimizada, self.caminho, tamanho_lote=7)), esperado)
+                self.assertEqual(Counter(executar_vetorizado(arvore, self.caminho, tamanho_lote=64)), esperado)
+
+    def test_nulos_e_textos(self):
+        consultas = [
+            "SELECT Nome FROM Produto WHERE Descricao = 'categoria 2'",
+            "SELECT Nome FROM Produto WHERE Descricao <> 'categoria 2'",
+            "SELECT Nome FROM Produto WHERE Descricao < 5",
+            "SELECT Nome FROM Cliente WHERE Email = 'teste@mail.com'",
+            "SELECT c.Nome, p.Nome FROM Cliente c INNER JOIN Produto p ON c.Nascimento = p.Descricao",
+            "SELECT p.Nome, c.idCategoria FROM Produto p INNER JOIN Categoria c ON p.Descricao = c.Descricao",
+        ]
+        for sql in consultas:
+            with self.subTest(sql=sql):
+                with sqlite3.connect(self.caminho) as conexao:
+                    esperado = Counter(conexao.execute(sql).fetchall())
+                obtido = Counter(executar_vetorizado(otimizar_selects(self._arvore(sql)), self.caminho, tamanho_lote=16))
+                self.assertEqual(obtido, esperado)
+
+    def test_lotes_e_colunas(self):
+        sql = "SELECT Ped.idPedido, Prod.Nome FROM Pedido Ped INNER JOIN Pedido_has_Produto Itens ON Ped.idPedido = Itens.Pedido_idPedido INNER JOIN Produto Prod ON Itens.Produto_idProduto = Prod.idProduto"
+        otimizada = otimizar_projecoes(otimizar_selects(self._arvore(sql)))
+        conexao = conectar_banco(self.caminho)
+        self.addCleanup(conexao.close)
+        plano = construir_plano_vetorizado(otimizada, conexao, tamanho_lote=32)
+        self.assertEqual(plano.esquema, ("ped.idpedido", "prod.nome"))
+        self.assertTrue(any(isinstance(operador, JuncaoOrdenadaColunar) for operador in vars(plano).values()))
+
+        lotes = list(executar_lotes(otimizada, self.caminho, tamanho_lote=32))
+        self.assertTrue(all(isinstance(lote, Lote) and len(lote) for lote in lotes))
+        self.assertEqual(lotes[0].colunas[0].dtype, np.int64)
+        self.assertEqual(sum(map(len, lotes)), 150)
+
+    def test_particionamento_radix(self):
+        valores = np.array([5.0, np.nan, 7.0, 5.0, -0.0 + 0.0, 12.5, 7.0])
+        posicoes, limites = particionar_radix(valores, 3)
+        self.assertEqual(len(limites), 9)
+        self.assertEqual(sorted(posicoes.tolist()), [0, 2, 3, 4, 5, 6])
+        particao = {}
+        for numero in range(8):
+            for posicao in posicoes[limites[numero]:limites[numero + 1]].tolist():
+                particao[posicao] = numero
+        self.assertEqual(particao[0], particao[3])
+        self.assertEqual(particao[2], particao[6])
+
+    def test_juncao_paralela(self):
+        aleatorio = np.random.default_rng(3)
+        chaves_esquerda = aleatorio.integers(0, 20_000, 60_000).tolist()
+        chaves_direita = [None if i % 11 == 0 else int(valor) for i, valor in enumerate(aleatorio.integers(0, 20_000, 30_000))]
+        chaves_texto = [None if chave is None else f"k{chave}" for chave in chaves_direita]
+        casos = {
+            "inteiras": (chaves_esquerda, [0 if chave is None else chave for chave in chaves_direita]),
+            "com nulos": (chaves_esquerda, chaves_direita),
+            "textos": ([f"k{chave}" for chave in chaves_esquerda], chaves_texto),
+        }
+        for caso, (esquerda, direita) in casos.items():
+            with self.subTest(caso=caso):
+                def lados():
+                    return (
+                        Fonte(("e.chave", "e.linha"), [esquerda, list(range(len(esquerda)))]),
+                        Fonte(("d.chave", "d.linha"), [direita, list(range(len(direita)))]),
+                    )
+                chaves = ((Coluna("e", "chave"), Coluna("d", "chave")),)
+                sequencial = [linha for lote in JuncaoOrdenadaColunar(*lados(), chaves) for linha in lote.linhas()]
+                paralela = JuncaoParalelaColunar(*lados(), chaves, processos=2)
+                self.assertEqual([linha for lote in paralela for linha in lote.linhas()], sequencial)
+                sem_ordem = JuncaoParalelaColunar(*lados(), chaves, processos=2, ordem_deterministica=False)
+                self.assertEqual(Counter(linha for lote in sem_ordem for linha in lote.linhas()), Counter(sequencial))
+
+        # Nas consultas, as junções pequenas são feitas no próprio processo, com o mesmo resultado
+        sql = VALID_QUERIES[12]
+        otimizada = otimizar_projecoes(otimizar_selects(self._arvore(sql)))
+        self.assertEqual(list(executar_vetorizado(otimizada, self.caminho, processos=2)), list(executar_vetorizado(otimizada, self.caminho)))
+
+    def test_comparacao_dos_motores(self):
+        consultas = consultas_de_exemplo()
+        self.assertIn("SELECT Nome FROM Produto WHERE Preco > 50.00", consultas)
+        self.assertNotIn("SELECT nome FROM Clientes", consultas)
+        resultados = comparar_motores(consultas[:4], self.caminho, repeticoes=1)
+        self.assertEqual([resultado["sql"] for resultado in resultados], consultas[:4])
+        self.assertTrue(all(resultado["tempo_vetorizado"] > 0 for resultado in resultados))
+
+    def test_delegacao_ao_sqlite(self):
+        estatisticas = EstatisticasBanco(self.caminho)
+        for sql in VALID_QUERIES:
+            arvore = otimizar_projecoes(otimizar_selects(reordenar_juncoes(self._arvore(sql), estatisticas), estatisticas))
+            esperado = Counter(executar(arvore, self.caminho))
+            for modo in Delegacao:
+                with self.subTest(sql=sql, modo=modo):
+                    self.assertEqual(Counter(executar_vetorizado(delegar_ao_sqlite(arvore, modo), self.caminho, tamanho_lote=7)), esperado)
+
+        resultados = comparar_delegacao(consultas_de_exemplo()[7:9], self.caminho, repeticoes=1)
+        self.assertEqual([resultado["fragmentos"] for resultado in resultados], [2, 2])
+        self.assertTrue(all(set(resultado["tempos_vetorizada"]) == set(Delegacao) for resultado in resultados))
+
+if __name__ == "__main__":
+    unittest.main()
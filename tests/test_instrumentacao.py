@@ -0,0 +1,108 @@
+import json
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+from parser import process_sql_query_ir
+from arvores_construcao_otimizacao import (
+    converter_algebra_em_arvore,
+    otimizar_projecoes,
+    otimizar_selects,
+    percorrer_pre_ordem,
+    planejar_acesso,
+    reordenar_juncoes,
+)
+from estatisticas import EstatisticasBanco
+from execucao_consultas import Delegacao, conectar_banco, construir_plano_execucao, delegar_ao_sqlite, executar
+from instrumentacao import OperadorMedido, executar_instrumentado
+from test_execucao_consultas import criar_banco_de_teste
+from test_query_processor_suite import VALID_QUERIES
+
+JUNCAO = (
+    "SELECT Ped.idPedido, Prod.Nome FROM Pedido Ped INNER JOIN Pedido_has_Produto Itens ON Ped.idPedido = Itens.Pedido_idPedido "
+    "INNER JOIN Produto Prod ON Itens.Produto_idProduto = Prod.idProduto WHERE Prod.idProduto = 3"
+)
+
+class TestInstrumentacao(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pasta = tempfile.TemporaryDirectory()
+        cls.caminho = Path(cls.pasta.name) / "vendas.db"
+        criar_banco_de_teste(cls.caminho)
+        cls.estatisticas = EstatisticasBanco(cls.caminho)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pasta.cleanup()
+
+    def _otimizada(self, sql):
+        arvore = converter_algebra_em_arvore(process_sql_query_ir(sql))
+        arvore = otimizar_projecoes(otimizar_selects(reordenar_juncoes(arvore, self.estatisticas), self.estatisticas))
+        return planejar_acesso(arvore, self.estatisticas)
+
+    def test_linhas_medidas(self):
+        for sql in VALID_QUERIES:
+            arvore = self._otimizada(sql)
+            esperado = len(list(executar(arvore, self.caminho)))
+            for vetorizada in (False, True):
+                with self.subTest(sql=sql, vetorizada=vetorizada):
+                    instrumentacao = executar_instrumentado(arvore, self.caminho, vetorizada=vetorizada)
+                    dados = instrumentacao.para_dict(self.estatisticas)
+                    self.assertEqual(dados["linhas"], esperado)
+                    raiz = dados["nos"][0]
+                    self.assertIsNone(raiz["pai"])
+                    self.assertEqual(raiz["linhas_saida"], esperado)
+                    for no in dados["nos"]:
+                        self.assertTrue(no["executado"])
+                        self.assertGreaterEqual(no["tempo"], no["tempo_proprio"])
+                        self.assertGreaterEqual(no["erro_estimativa"], 1)
+                        filhos = [filho for filho in dados["nos"] if filho["pai"] == no["id"]]
+                        if filhos:
+                            self.assertEqual(no["linhas_entrada"], sum(filho["linhas_saida"] for filho in filhos))
+
+    def test_juncao_com_indice_e_delegacao(self):
+        arvore = self._otimizada(JUNCAO)
+        dados = executar_instrumentado(arvore, self.caminho, memoria=True).para_dict(self.estatisticas)
+        self.assertEqual(dados["linhas"], 4)
+        self.assertGreater(dados["memoria_pico"], 0)
+        # O lado interno da junção com índice é percorrido uma vez para cada linha do lado externo
+        pedido = next(no for no in dados["nos"] if no["no"] == "pedido[ped]")
+        self.assertEqual((pedido["execucoes"], pedido["linhas_saida"]), (4, 4))
+        self.assertIsNone(pedido["lotes"])
+
+        vetorizada = executar_instrumentado(arvore, self.caminho, vetorizada=True).para_dict(self.estatisticas)
+        pedido = next(no for no in vetorizada["nos"] if no["no"] == "pedido[ped]")
+        self.assertEqual((pedido["execucoes"], pedido["linhas_saida"], pedido["lotes"]), (1, 80, 1))
+        self.assertIsNone(pedido["memoria_pico"])
+
+        # Dentro das subárvores delegadas ao SQLite, só a raiz do fragmento é medida
+        delegada = delegar_ao_sqlite(arvore, Delegacao.TOTAL)
+        instrumentacao = executar_instrumentado(delegada, self.caminho)
+        nos = instrumentacao.para_dict(self.estatisticas)["nos"]
+        self.assertEqual([no["executado"] for no in nos], [True] + [False] * (len(nos) - 1))
+        self.assertIsNone(nos[0]["linhas_entrada"])
+        self.assertIn("delegado ao SQLite", instrumentacao.relatorio(self.estatisticas))
+
+    def test_exportacao_e_sobreposicao(self):
+        arvore = self._otimizada(JUNCAO)
+        instrumentacao = executar_instrumentado(arvore, self.caminho)
+        caminho = Path(self.pasta.name) / "medicoes.json"
+        instrumentacao.salvar_json(caminho, self.estatisticas)
+        dados = json.loads(caminho.read_text(encoding="utf-8"))
+        self.assertEqual(dados["motor"], "linhas")
+        self.assertEqual([no["id"] for no in dados["nos"]], list(range(len(dados["nos"]))))
+
+        textos = instrumentacao.sobreposicao(self.estatisticas)
+        self.assertEqual(set(textos), {id(no) for no in percorrer_pre_ordem(arvore.raiz)})
+        self.assertTrue(textos[id(arvore.raiz)].startswith("linhas: 4 (est. 4)"))
+
+    def test_sem_instrumentacao(self):
+        arvore = self._otimizada(JUNCAO)
+        conexao = conectar_banco(self.caminho)
+        self.addCleanup(conexao.close)
+        plano = construir_plano_execucao(arvore, conexao)
+        self.assertNotIsInstance(plano, OperadorMedido)
+        self.assertEqual(Counter(plano), Counter(executar(arvore, self.caminho)))
+
+if __name__ == "__main__":
+    unittest.main()
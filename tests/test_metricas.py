@@ -0,0 +1,121 @@
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from parser import process_sql_query_ir
+from arvores_construcao_otimizacao import converter_algebra_em_arvore, otimizar_projecoes, otimizar_selects
+from metricas import (
+    ArquivoJsonLinhas,
+    ArquivoPrometheus,
+    HistogramaLatencia,
+    RegistroMetricas,
+    ativar_metricas,
+    desativar_metricas,
+    etapa,
+    exportar_metricas,
+    medir_etapa,
+    metricas_ativas,
+)
+
+SQL = "SELECT Nome FROM Produto WHERE Preco > 50.00"
+
+class TestMetricas(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(desativar_metricas)
+
+    def _pipeline(self, sql):
+        with redirect_stdout(io.StringIO()):
+            consulta = process_sql_query_ir(sql)
+        if not isinstance(consulta, Exception):
+            otimizar_projecoes(otimizar_selects(converter_algebra_em_arvore(consulta)))
+
+    def test_histograma(self):
+        histograma = HistogramaLatencia()
+        self.assertIsNone(histograma.quantil(0.5))
+        for i in range(1, 1001):
+            histograma.registrar(i / 1000)
+        self.assertEqual(histograma.total, 1000)
+        # Os intervalos crescem pela raiz de 2: cada quantil estimado erra no máximo por esse fator
+        for q in (0.5, 0.95, 0.99):
+            self.assertLess(abs(histograma.quantil(q) / q - 1), 0.42)
+        self.assertEqual(histograma.quantil(1), 1.0)
+        self.assertEqual(histograma.quantil(0), 0.001)
+        with self.assertRaises(ValueError):
+            histograma.quantil(1.5)
+
+    def test_etapas_do_pipeline(self):
+        self.assertFalse(metricas_ativas())
+        self._pipeline(SQL)
+        registro = ativar_metricas()
+        self.assertTrue(metricas_ativas())
+        for _ in range(3):
+            self._pipeline(SQL)
+        self._pipeline("SELECT nome FROM Clientes")
+        resumo = registro.resumo()
+        self.assertEqual(set(resumo), {"process_sql_query_ir", "converter_algebra_em_arvore", "otimizar_selects", "otimizar_projecoes"})
+        self.assertEqual((resumo["process_sql_query_ir"]["chamadas"], resumo["process_sql_query_ir"]["erros"]), (4, 1))
+        self.assertEqual((resumo["otimizar_selects"]["chamadas"], resumo["otimizar_selects"]["erros"]), (3, 0))
+        dados = resumo["otimizar_selects"]
+        self.assertTrue(dados["minimo"] <= dados["p50"] <= dados["p95"] <= dados["p99"] <= dados["maximo"])
+        self.assertIn("otimizar_projecoes", registro.relatorio())
+
+        # Desativada, a medição não registra mais nada
+        desativar_metricas()
+        self._pipeline(SQL)
+        self.assertEqual(registro.resumo()["otimizar_selects"]["chamadas"], 3)
+
+    def test_erros_levantados(self):
+        registro = ativar_metricas()
+
+        @medir_etapa("dividir")
+        def dividir(a, b):
+            return a / b
+
+        self.assertEqual(dividir(4, 2), 2)
+        with self.assertRaises(ZeroDivisionError):
+            dividir(1, 0)
+        with self.assertRaises(KeyError):
+            with etapa("bloco"):
+                {}["x"]
+        resumo = registro.resumo()
+        self.assertEqual((resumo["dividir"]["chamadas"], resumo["dividir"]["erros"]), (2, 1))
+        self.assertEqual((resumo["bloco"]["chamadas"], resumo["bloco"]["erros"]), (1, 1))
+
+    def test_destinos(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            prometheus = ArquivoPrometheus(Path(pasta) / "consultas.prom")
+            linhas_json = ArquivoJsonLinhas(Path(pasta) / "etapas.jsonl")
+            self.assertIs(ativar_metricas(linhas_json, prometheus), prometheus)
+            self._pipeline(SQL)
+            self._pipeline("SELECT nome FROM Clientes")
+            exportar_metricas()
+
+            texto = prometheus.caminho.read_text(encoding="utf-8")
+            self.assertIn("# TYPE consulta_etapa_duracao_segundos histogram", texto)
+            self.assertIn('consulta_etapa_duracao_segundos_bucket{etapa="otimizar_selects",le="+Inf"} 1', texto)
+            self.assertIn('consulta_etapa_duracao_segundos_count{etapa="process_sql_query_ir"} 2', texto)
+            self.assertIn('consulta_etapa_erros_total{etapa="process_sql_query_ir"} 1', texto)
+            contagens = [int(linha.split()[-1]) for linha in texto.splitlines() if linha.startswith('consulta_etapa_duracao_segundos_bucket{etapa="otimizar_selects"')]
+            self.assertEqual(contagens, sorted(contagens))
+
+            eventos = [json.loads(linha) for linha in linhas_json.caminho.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual([evento["etapa"] for evento in eventos][:2], ["process_sql_query_ir", "converter_algebra_em_arvore"])
+            self.assertEqual(eventos[-1], {**eventos[-1], "etapa": "process_sql_query_ir", "erro": "ValueError"})
+
+        # Sem nenhum registro entre os destinos, um é criado
+        class Lista(list):
+            def registrar(self, etapa, duracao, erro):
+                self.append(etapa)
+            def exportar(self):
+                pass
+
+        lista = Lista()
+        registro = ativar_metricas(lista)
+        self.assertIsInstance(registro, RegistroMetricas)
+        self._pipeline(SQL)
+        self.assertEqual(lista, list(registro.resumo()))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import parser
+from parser import process_sql_query, process_sql_query_ir, parse_validate_sql, get_schema_catalog
+from algebra_relacional import Coluna, Projecao, Selecao, Produto, Tabela
+
+class TestParser(unittest.TestCase):
+    def test_and_inside_string_literal(self):
+        ra = process_sql_query("SELECT Nome FROM Cliente WHERE Nome = 'Tom and Jerry' AND idCliente > 3")
+        self.assertEqual(ra, "𝝿[cliente.nome](𝛔[cliente.nome = 'Tom and Jerry' ∧ cliente.idcliente > 3](cliente[cliente]))")
+
+    def test_parenthesized_conditions_are_flattened(self):
+        parsed = parse_validate_sql("SELECT Nome FROM Produto WHERE (Preco > 1 AND (QuantEstoque < 5)) AND idProduto <> 2")
+        self.assertEqual(parsed['rewritten_where_conditions'], ["produto.preco > 1", "produto.quantestoque < 5", "produto.idproduto <> 2"])
+
+    def test_deeply_nested_parentheses(self):
+        sql = "SELECT c.Nome FROM Cliente c WHERE {}"
+        esperado = process_sql_query(sql.format("c.idCliente = 1"))
+        # Mais níveis que o limite de recursão do Python
+        self.assertEqual(process_sql_query(sql.format("(" * 1200 + "c.idCliente = 1" + ")" * 1200)), esperado)
+        self.assertIsInstance(process_sql_query(sql.format("(" * 1200 + "c.idCliente = 1" + ")" * 1199)), ValueError)
+
+    def test_condition_strings_are_preserved(self):
+        parsed = parse_validate_sql("SELECT c.Nome FROM Cliente c INNER JOIN Pedido p ON c.idCliente = p.Cliente_idCliente WHERE p.idPedido > 3")
+        self.assertEqual(parsed['joins'][0]['condition_str'], "c.idCliente = p.Cliente_idCliente")
+        self.assertEqual(parsed['where_condition_str'], "p.idPedido > 3")
+
+    def test_on_error_is_value_error(self):
+        result = process_sql_query("SELECT c.nome FROM Cliente c INNER JOIN Pedido p ON c.id = p.Cliente_idCliente")
+        self.assertIsInstance(result, ValueError)
+
+    def test_dangling_keyword_is_syntax_error(self):
+        self.assertIsInstance(process_sql_query("SELECT Nome FROM Produto WHERE"), ValueError)
+
+    def test_incomplete_condition_is_syntax_error(self):
+        consultas = [
+            "SELECT Nome FROM Cliente WHERE idCliente = 1 AND",
+            "SELECT Nome FROM Cliente WHERE idCliente",
+            "SELECT Nome FROM Cliente WHERE idCliente =",
+            "SELECT Nome FROM Cliente WHERE (",
+            "SELECT Nome FROM Cliente WHERE ()",
+            "SELECT Nome FROM Cliente WHERE (idCliente = 1",
+            "SELECT c.Nome FROM Cliente c INNER JOIN Pedido p ON c.idCliente",
+        ]
+        for sql in consultas:
+            with self.subTest(sql=sql):
+                with self.assertRaises(ValueError):
+                    parse_validate_sql(sql)
+                self.assertIsInstance(process_sql_query(sql), ValueError)
+        with self.assertRaisesRegex(ValueError, "fim inesperado da consulta"):
+            parse_validate_sql("SELECT Nome FROM Cliente WHERE idCliente = 1 AND")
+
+    def test_schema_catalog_follows_schema_changes(self):
+        catalog = get_schema_catalog()
+        self.assertIs(catalog, get_schema_catalog())
+        parser.DATABASE_SCHEMA['status'].append('Cor')
+        try:
+            self.assertIsNot(catalog, get_schema_catalog())
+            self.assertEqual(process_sql_query("SELECT Cor FROM Status"), "𝝿[status.cor](status[status])")
+        finally:
+            parser.DATABASE_SCHEMA['status'].remove('Cor')
+        self.assertIsInstance(process_sql_query("SELECT Cor FROM Status"), ValueError)
+
+    def test_schema_catalog_follows_rename(self):
+        columns = parser.DATABASE_SCHEMA['status']
+        catalog = get_schema_catalog()
+        columns[columns.index('Descricao')] = 'Rotulo'
+        try:
+            # Renomear mantém os tamanhos do esquema, mas muda o conteúdo: o catálogo é reconstruído sozinho
+            self.assertIsNot(catalog, get_schema_catalog())
+            self.assertEqual(process_sql_query("SELECT s.Rotulo FROM Status s"), "𝝿[s.rotulo](status[s])")
+            self.assertIsInstance(process_sql_query("SELECT s.Descricao FROM Status s"), ValueError)
+        finally:
+            columns[columns.index('Rotulo')] = 'Descricao'
+        self.assertIsInstance(process_sql_query("SELECT s.Rotulo FROM Status s"), ValueError)
+
+    def test_ir_predicates_and_rendering(self):
+        sql = "SELECT c.Nome FROM Cliente c INNER JOIN Pedido p ON c.idCliente = p.Cliente_idCliente WHERE c.Nome = 'Ana Maria'"
+        ir = process_sql_query_ir(sql)
+        self.assertIsInstance(ir, Projecao)
+        self.assertIsInstance(ir.filho, Selecao)
+        self.assertIsInstance(ir.filho.filho, Produto)
+        self.assertIsInstance(ir.filho.filho.direita, Tabela)
+        literal, juncao = ir.filho.predicados
+        self.assertEqual((literal.esquerda, literal.operador, literal.direita), (Coluna('c', 'nome'), '=', "'Ana Maria'"))
+        self.assertEqual(juncao.aliases(), {'c', 'p'})
+        self.assertEqual(str(ir), process_sql_query(sql))
+
+class TestTranslationCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = parser.enable_translation_cache(maxsize=2)
+
+    def tearDown(self):
+        parser.disable_translation_cache()
+
+    def test_hits_on_normalized_text(self):
+        first = process_sql_query("SELECT Nome FROM Cliente WHERE idCliente < 5")
+        second = process_sql_query("select   nome\n from CLIENTE where IDCLIENTE < 5")
+        self.assertEqual(first, second)
+        self.assertEqual(parser.translation_cache_info()['hits'], 1)
+        self.assertEqual(parser.translation_cache_info()['misses'], 1)
+
+    def test_string_literals_keep_their_case(self):
+        lower = process_sql_query("SELECT Nome FROM Cliente WHERE Nome = 'ana'")
+        upper = process_sql_query("SELECT Nome FROM Cliente WHERE Nome = 'ANA'")
+        self.assertNotEqual(lower, upper)
+        self.assertEqual(parser.translation_cache_info()['hits'], 0)
+
+    def test_lru_eviction(self):
+        process_sql_query("SELECT Nome FROM Cliente")
+        process_sql_query("SELECT Nome FROM Produto")
+        process_sql_query("SELECT Nome FROM Cliente")
+        process_sql_query("SELECT Descricao FROM Status")  # remove 'Produto', o menos usado recentemente
+        process_sql_query("SELECT Nome FROM Cliente")
+        info = parser.translation_cache_info()
+        self.assertEqual((info['hits'], info['misses'], info['evictions'], info['size']), (2, 3, 1, 2))
+
+    def test_errors_are_cached(self):
+        first = process_sql_query("SELECT nome FROM Clientes")
+        second = process_sql_query("SELECT nome FROM Clientes")
+        self.assertIsInstance(second, ValueError)
+        self.assertIs(first, second)
+
+    def test_schema_rename_invalidates(self):
+        columns = parser.DATABASE_SCHEMA['status']
+        process_sql_query("SELECT Descricao FROM Status")
+        columns[columns.index('Descricao')] = 'Rotulo'
+        try:
+            self.assertIsInstance(process_sql_query("SELECT Descricao FROM Status"), ValueError)
+        finally:
+            columns[columns.index('Rotulo')] = 'Descricao'
+        self.assertEqual(parser.translation_cache_info()['hits'], 0)
+
+    def test_schema_change_invalidates(self):
+        process_sql_query("SELECT Nome FROM Cliente")
+        parser.DATABASE_SCHEMA['status'].append('Cor')
+        try:
+            process_sql_query("SELECT Nome FROM Cliente")
+        finally:
+            parser.DATABASE_SCHEMA['status'].remove('Cor')
+        self.assertEqual(parser.translation_cache_info()['hits'], 0)
+
+if __name__ == "__main__":
+    unittest.main()
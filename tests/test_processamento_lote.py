@@ -0,0 +1,33 @@
+import unittest
+from processamento_lote import process_sql_batch
+from test_query_processor_suite import VALID_QUERIES, INVALID_QUERIES
+
+class TestProcessamentoLote(unittest.TestCase):
+    def setUp(self):
+        self.consultas = VALID_QUERIES + INVALID_QUERIES + VALID_QUERIES
+
+    def _verificar(self, resultados):
+        self.assertEqual([r["sql"] for r in resultados], self.consultas)
+        for resultado in resultados:
+            with self.subTest(sql=resultado["sql"]):
+                if resultado["sql"] in INVALID_QUERIES:
+                    self.assertTrue(resultado["erro"])
+                    self.assertIsNone(resultado["arvore_otimizada"])
+                else:
+                    self.assertIsNone(resultado["erro"])
+                    self.assertIsInstance(resultado["algebra"], str)
+                    self.assertEqual(resultado["arvore_otimizada"].raiz.get_operacao(), "PROJECT")
+
+    def test_em_processo(self):
+        self._verificar(list(process_sql_batch(self.consultas, workers=1, tamanho_bloco=4)))
+
+    def test_pool_preserva_ordem(self):
+        self._verificar(list(process_sql_batch(iter(self.consultas), workers=2, tamanho_bloco=3, blocos_em_voo=2)))
+
+    def test_modelos_de_plano(self):
+        resultados = list(process_sql_batch(self.consultas, workers=2, tamanho_bloco=5, usar_modelos=True))
+        esperados = list(process_sql_batch(self.consultas, workers=1))
+        self.assertEqual([r["algebra"] for r in resultados], [r["algebra"] for r in esperados])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,31 @@
+import pickle
+import sqlite3
+import sys
+import tempfile
 import unittest
-from parser import process_sql_query
+from pathlib import Path
+import arvores_construcao_otimizacao
+from parser import parameterize_sql_query, process_sql_query, process_sql_query_ir
 from arvores_construcao_otimizacao import (
     converter_algebra_em_arvore,
     otimizar_selects,
     otimizar_projecoes,
+    processar_consulta_com_modelo,
+    cache_modelos_plano,
     No,
-    Arvore
+    Arvore,
+    Operacao,
+    obter_tabelas_da_subarvore,
+    analisar_algebra,
+    obter_arvore,
+    reordenar_juncoes,
+    planejar_acesso,
+    MetodoAcesso,
 )
+from algebra_relacional import Coluna
+from estatisticas import EstatisticasBanco, obter_estatisticas
+from plantando_arvores.processamento_consultas import processar
+from plantando_arvores.otimizador import otimizar
 
 # Valid queries from docs/exemplos_consultas.txt
 VALID_QUERIES = [
@@ -88,6 +107,290 @@ class TestQueryProcessorSuite(unittest.TestCase):
         self.assertEqual(arvore.raiz.get_operacao(), "PROJECT")
         self.assertEqual(arvore.raiz.filho_esq.get_operacao(), "TABLE")
 
+    def test_tree_from_ir(self):
+        # A árvore montada da representação intermediária não perde seleções nem aninha as junções à direita
+        sql = VALID_QUERIES[13]
+        arvore = converter_algebra_em_arvore(process_sql_query_ir(sql))
+        valores = self._valores(arvore.raiz)
+        self.assertEqual(sum(v.startswith('𝛔') for v in valores), 4)
+        self.assertEqual(valores[5:], ['⨝', '⨝', 'pedido[ped]', 'pedido_has_produto[itens]', 'produto[prod]'])
+        simples = process_sql_query_ir(VALID_QUERIES[7])
+        self.assertEqual(self._valores(converter_algebra_em_arvore(simples).raiz), self._valores(converter_algebra_em_arvore(str(simples)).raiz))
+
+    def test_string_and_ir_trees_match(self):
+        for sql in VALID_QUERIES:
+            with self.subTest(sql=sql):
+                ir = process_sql_query_ir(sql)
+                self.assertEqual(self._valores(converter_algebra_em_arvore(str(ir)).raiz), self._valores(converter_algebra_em_arvore(ir).raiz))
+
+    def test_long_left_deep_join_chain(self):
+        algebra = "t0[t0]"
+        for i in range(1, 60):
+            algebra = f"({algebra} ⨝ t{i}[t{i}])"
+        algebra = f"𝝿[t0.a](𝛔[t0.a = t59.a]({algebra}))"
+        no = converter_algebra_em_arvore(algebra).raiz.filho_esq.filho_esq
+        for i in range(59, 0, -1):
+            self.assertEqual((no.valor, no.filho_dir.valor), ("⨝", f"t{i}[t{i}]"))
+            no = no.filho_esq
+        self.assertEqual(no.valor, "t0[t0]")
+
+    def test_typed_nodes(self):
+        selecao = No("𝛔[p.datapedido>c.dataregistro]")
+        self.assertIs(selecao.operacao, Operacao.SELECT)
+        predicado, = selecao.predicados
+        self.assertEqual((predicado.esquerda, predicado.operador, predicado.direita), (Coluna('p', 'datapedido'), '>', Coluna('c', 'dataregistro')))
+        self.assertEqual(selecao.tabelas, {'p', 'c'})
+        literal = No("𝛔[cliente.email='teste@mail.com']")
+        self.assertEqual(literal.colunas, {'cliente': {'email'}})
+        tabela = No("pedido_has_produto[itens]")
+        self.assertEqual((tabela.get_operacao(), tabela.alias), ("TABLE", 'itens'))
+        self.assertIs(No("⨝").operacao, Operacao.PRODUCT)
+        with self.assertRaises(AttributeError):
+            selecao.extra = 1
+        with self.assertRaises(AttributeError):
+            selecao.valor = "⨝"
+
+    def test_optimizers_share_unchanged_subtrees(self):
+        arvore = converter_algebra_em_arvore(process_sql_query(VALID_QUERIES[0]))
+        antes = [no.valor for no in arvore.nos()]
+        otimizada = otimizar_projecoes(otimizar_selects(arvore))
+        self.assertEqual([no.valor for no in arvore.nos()], antes)
+        originais = {id(no) for no in arvore.nos()}
+        compartilhados = [no for no in otimizada.nos() if id(no) in originais]
+        self.assertTrue(any(no.operacao is Operacao.TABLE for no in compartilhados))
+        self.assertEqual(otimizada.nivel(otimizada.raiz), 0)
+        filho = otimizada.raiz.filho_esq
+        self.assertIs(otimizada.pai(filho), otimizada.raiz)
+        self.assertEqual(otimizada.nivel(filho), 1)
+
+    def test_subtree_alias_masks(self):
+        arvore = otimizar_selects(converter_algebra_em_arvore(process_sql_query(VALID_QUERIES[13])))
+        for no in arvore.nos():
+            tabelas = {n.alias for n in Arvore(no).nos() if n.operacao is Operacao.TABLE}
+            self.assertEqual(obter_tabelas_da_subarvore(no), tabelas)
+        self.assertEqual(arvore.raiz.mascara_subarvore, arvore.indice_aliases.mascara({'ped', 'itens', 'prod'}))
+        self.assertTrue(all(no.indice_aliases is arvore.indice_aliases for no in arvore.nos()))
+
+    def test_alias_index_per_tree(self):
+        # Cada consulta tem o seu índice: os bits cabem nos aliases da própria consulta
+        primeira = converter_algebra_em_arvore(process_sql_query_ir(VALID_QUERIES[13]))
+        segunda = converter_algebra_em_arvore(process_sql_query_ir("SELECT c.Nome FROM Cliente c INNER JOIN Pedido p ON c.idCliente = p.Cliente_idCliente"))
+        self.assertIsNot(primeira.indice_aliases, segunda.indice_aliases)
+        self.assertEqual(len(primeira.indice_aliases), 3)
+        self.assertEqual(segunda.raiz.mascara_subarvore, 0b11)
+
+        # Combinar nós de árvores diferentes recria o lado direito com o índice do esquerdo
+        juncao = No("⨝", primeira.raiz, segunda.raiz)
+        self.assertIs(juncao.filho_dir.indice_aliases, primeira.indice_aliases)
+        self.assertEqual(obter_tabelas_da_subarvore(juncao), {'ped', 'itens', 'prod', 'c', 'p'})
+        self.assertEqual(obter_tabelas_da_subarvore(juncao.filho_dir), {'c', 'p'})
+        self.assertEqual(len(segunda.indice_aliases), 2)
+
+        copia = pickle.loads(pickle.dumps(primeira))
+        self.assertEqual(copia.raiz.mascara_subarvore, primeira.raiz.mascara_subarvore)
+        self.assertTrue(all(no.indice_aliases is copia.indice_aliases for no in copia.nos()))
+
+    def test_shared_canonical_tree(self):
+        for sql in VALID_QUERIES:
+            with self.subTest(sql=sql):
+                arvore = converter_algebra_em_arvore(process_sql_query_ir(sql))
+                self.assertIs(obter_arvore(arvore), arvore)
+                visao = processar(arvore).get_arvore()
+                self.assertEqual(len(visao), sum(1 for _ in arvore.nos()))
+                rotulos = [no["operacao"] for no in visao.values()]
+                self.assertEqual([r[0] for r in rotulos], [no.valor[0].replace("𝝿", "π").replace("𝛔", "σ") for no in arvore.nos()])
+
+    def test_debug_validation(self):
+        self.addCleanup(setattr, arvores_construcao_otimizacao, "VALIDAR_ARVORES", False)
+        arvores_construcao_otimizacao.VALIDAR_ARVORES = True
+        for sql in VALID_QUERIES:
+            with self.subTest(sql=sql):
+                otimizar_projecoes(otimizar_selects(converter_algebra_em_arvore(process_sql_query_ir(sql))))
+        tabela = No("cliente[c]")
+        with self.assertRaises(ValueError):
+            Arvore(No("⨝", tabela))
+        with self.assertRaises(ValueError):
+            Arvore(No("⨝", tabela, tabela))
+        with self.assertRaises(ValueError):
+            Arvore(No("𝝿[c.nome]"))
+
+    def test_deep_trees_without_recursion_limit(self):
+        # Cadeias de junções e de seleções muito mais profundas que o limite de recursão do Python
+        n = 3000
+        algebra = "(" * (n - 1) + "t0[t0]" + "".join(f" ⨝ t{i}[t{i}])" for i in range(1, n))
+        predicados = " ∧ ".join(f"t{i}.a = t{i - 1}.b" for i in range(1, 1500))
+        algebra = f"𝝿[t0.a](𝛔[{predicados}]({algebra}))"
+        ir = analisar_algebra(algebra)
+        self.assertEqual(str(ir), algebra.replace("∧", " ∧ ").replace("  ", " "))
+        otimizada = otimizar_projecoes(otimizar_selects(converter_algebra_em_arvore(ir)))
+        # As igualdades entre tabelas viram condições das junções
+        self.assertEqual(sum(len(no.chaves_equijuncao()) for no in otimizada.nos()), 1499)
+        self.assertGreater(otimizada.nivel(next(no for no in otimizada.nos() if no.valor == "t0[t0]")), sys.getrecursionlimit())
+        self.assertEqual(len(otimizar(processar(ir)).get_arvore()), len(processar(ir).get_arvore()))
+
+    def test_join_reordering(self):
+        # Sem estatísticas (valores padrão), a ordem original já é a mais barata e a árvore é mantida
+        arvore = converter_algebra_em_arvore(process_sql_query_ir(VALID_QUERIES[12]))
+        self.assertIs(reordenar_juncoes(arvore, EstatisticasBanco()).raiz, arvore.raiz)
+        arvore = converter_algebra_em_arvore(process_sql_query_ir(VALID_QUERIES[12] + " WHERE Prod.Preco = 5"))
+        estatisticas = EstatisticasBanco(
+            linhas={"pedido": 100000, "pedido_has_produto": 500000, "produto": 1000},
+            distintos={"pedido_has_produto": {"pedido_idpedido": 100000, "produto_idproduto": 1000}},
+        )
+        reordenada = reordenar_juncoes(arvore, estatisticas)
+        juncoes = [no for no in reordenada.nos() if no.operacao in (Operacao.JOIN, Operacao.PRODUCT)]
+        self.assertEqual(obter_tabelas_da_subarvore(juncoes[-1]), {"itens", "prod"})
+        predicados = lambda a: sorted(str(p) for no in a.nos() for p in no.predicados)
+        self.assertEqual(predicados(reordenada), predicados(arvore))
+        self.assertEqual(self._valores(reordenada.raiz)[0], self._valores(arvore.raiz)[0])
+        otimizar_projecoes(otimizar_selects(reordenada))
+
+    def test_join_reordering_greedy(self):
+        n = 16
+        algebra = "(" * (n - 1) + "t0[a0]" + "".join(f" ⨝ t{i}[a{i}])" for i in range(1, n))
+        predicados = " ∧ ".join(f"a{i}.x = a{i + 1}.y" for i in range(n - 1))
+        arvore = converter_algebra_em_arvore(f"𝝿[a0.x](𝛔[{predicados}]({algebra}))")
+        linhas = {f"t{i}": 10 ** 6 for i in range(n)}
+        linhas[f"t{n - 1}"] = 1
+        reordenada = reordenar_juncoes(arvore, EstatisticasBanco(linhas=linhas))
+        self.assertIsNot(reordenada.raiz, arvore.raiz)
+        juncoes = [no for no in reordenada.nos() if no.operacao is Operacao.PRODUCT]
+        self.assertEqual(len(juncoes), n - 1)
+        self.assertEqual(obter_tabelas_da_subarvore(juncoes[-1]), {f"a{n - 2}", f"a{n - 1}"})
+        self.assertEqual(sum(no.operacao is Operacao.SELECT for no in reordenada.nos()), n - 1)
+
+    def test_statistics_from_database(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = Path(pasta) / "estatisticas.db"
+            # Sem banco, são usados os valores padrão (e o arquivo não é criado)
+            self.assertGreater(obter_estatisticas(caminho).linhas("produto"), 0)
+            self.assertFalse(caminho.exists())
+            with sqlite3.connect(caminho) as conexao:
+                conexao.execute("CREATE TABLE Produto (idProduto INTEGER, Preco REAL)")
+                conexao.executemany("INSERT INTO Produto VALUES (?, ?)", [(1, 10.0), (2, 10.0), (3, 20.0)])
+            conexao.close()
+            estatisticas = obter_estatisticas(caminho)
+            self.assertEqual(estatisticas.linhas("produto"), 3)
+            self.assertEqual(estatisticas.distintos("produto", "preco"), 2)
+            self.assertIs(obter_estatisticas(caminho), estatisticas)
+
+    def test_selection_ordering(self):
+        sql = "SELECT Nome FROM Cliente WHERE Nome <> 'x' AND Email = 'a@b.com' AND idCliente = 5"
+        arvore = converter_algebra_em_arvore(process_sql_query_ir(sql))
+        estatisticas = EstatisticasBanco(linhas={"cliente": 5000}, distintos={"cliente": {"email": 5000, "nome": 4000}})
+        otimizada = otimizar_selects(arvore, estatisticas)
+        selecoes = [no for no in otimizada.nos() if no.operacao is Operacao.SELECT]
+        # A mais seletiva e barata fica mais perto da tabela (última na pré-ordem)
+        self.assertEqual([no.valor for no in selecoes], ["𝛔[cliente.nome<>'x']", "𝛔[cliente.email='a@b.com']", "𝛔[cliente.idcliente=5]"])
+        self.assertTrue(selecoes[-1].anotacoes.startswith("1ª"))
+        self.assertIn("0.0002", selecoes[-1].anotacoes)
+        self.assertIsNone(otimizada.raiz.anotacoes)
+        # As estimativas do modelo valem para os literais que geraram o plano: nos nós vinculados, são descartadas
+        _, _, instanciada = processar_consulta_com_modelo(sql)
+        self.assertTrue(all(no.anotacoes is None for no in instanciada.nos() if no.operacao is Operacao.SELECT))
+
+    def test_equijoin_conditions(self):
+        otimizada = otimizar_selects(converter_algebra_em_arvore(process_sql_query_ir(VALID_QUERIES[7])))
+        selecao = otimizada.raiz.filho_esq
+        self.assertEqual(selecao.valor, "𝛔[p.datapedido>c.dataregistro]")
+        juncao = selecao.filho_esq
+        self.assertIs(juncao.operacao, Operacao.JOIN)
+        self.assertEqual(juncao.valor, "⨝[p.cliente_idcliente=c.idcliente]")
+        self.assertEqual(juncao.chaves_equijuncao(), ((Coluna("p", "cliente_idcliente"), Coluna("c", "idcliente")),))
+        self.assertIn("equi-junção", juncao.anotacoes)
+        # Com o produto invertido, as chaves acompanham os lados
+        invertida = No(juncao.valor, juncao.filho_dir, juncao.filho_esq)
+        self.assertEqual(invertida.chaves_equijuncao(), ((Coluna("c", "idcliente"), Coluna("p", "cliente_idcliente")),))
+        self.assertEqual(No("⨝", juncao.filho_esq, juncao.filho_dir).chaves_equijuncao(), ())
+
+    def test_access_planning(self):
+        estatisticas = EstatisticasBanco(
+            linhas={"cliente": 50000, "pedido": 200000},
+            distintos={"pedido": {"cliente_idcliente": 50000, "valortotalpedido": 20000}},
+            indices={"cliente": {"idcliente": "PRIMARY KEY"}, "pedido": {"idpedido": "PRIMARY KEY", "cliente_idcliente": "idx_Pedido_Cliente"}},
+        )
+        sql = "SELECT c.Nome, p.idPedido FROM Cliente AS c INNER JOIN Pedido AS p ON c.idCliente = p.Cliente_idCliente WHERE c.idCliente = $1"
+        arvore = otimizar_projecoes(otimizar_selects(converter_algebra_em_arvore(process_sql_query_ir(sql.replace("$1", "10")))))
+        planejada = planejar_acesso(arvore, estatisticas)
+        self.assertEqual(self._valores(planejada.raiz), self._valores(arvore.raiz))
+        acessos = {no.valor: no.acesso for no in planejada.nos() if no.acesso is not None}
+        # Um único cliente, pela chave primária; os pedidos dele, pelo índice da chave estrangeira
+        self.assertIs(acessos["cliente[c]"].metodo, MetodoAcesso.INDICE)
+        self.assertEqual(str(acessos["cliente[c]"].predicado), "c.idcliente = 10")
+        juncao = acessos["⨝[c.idcliente=p.cliente_idcliente]"]
+        self.assertIs(juncao.metodo, MetodoAcesso.LACOS_INDICE)
+        self.assertEqual((juncao.indice, juncao.interno), ("idx_Pedido_Cliente", "dir"))
+        self.assertEqual(str(acessos["pedido[p]"]), "busca por índice idx_Pedido_Cliente (p.cliente_idcliente = c.idcliente) · custo ≈ 34")
+
+        # Sem seleção, as duas tabelas são lidas inteiras e juntadas por hash; seleções pouco seletivas não usam índices
+        sql_sem_filtro = "SELECT c.Nome, p.idPedido FROM Cliente AS c INNER JOIN Pedido AS p ON c.idCliente = p.Cliente_idCliente WHERE p.ValorTotalPedido > 100.0"
+        arvore = otimizar_projecoes(otimizar_selects(converter_algebra_em_arvore(process_sql_query_ir(sql_sem_filtro))))
+        metodos = {no.operacao: no.acesso.metodo for no in planejar_acesso(arvore, estatisticas).nos() if no.acesso is not None}
+        self.assertEqual(metodos, {Operacao.TABLE: MetodoAcesso.VARREDURA, Operacao.JOIN: MetodoAcesso.JUNCAO_HASH})
+        produto = planejar_acesso(converter_algebra_em_arvore(process_sql_query_ir(VALID_QUERIES[10])), estatisticas)
+        self.assertEqual([no.acesso.metodo for no in produto.nos() if no.operacao is Operacao.PRODUCT], [MetodoAcesso.LACOS])
+
+        # Nos modelos de plano, os literais também são vinculados nas buscas por índice
+        for literal in ("10", "7"):
+            _, _, instanciada = processar_consulta_com_modelo(sql.replace("$1", literal))
+            busca = next(no.acesso for no in instanciada.nos() if no.valor == "cliente[c]")
+            self.assertEqual(str(busca.predicado), f"c.idcliente = {literal}")
+
+    def test_plan_template_reuse(self):
+        sql = "SELECT Nome FROM Produto WHERE Preco > {} AND QuantEstoque >= {}"
+        hits_antes = cache_modelos_plano.hits
+        for preco, estoque in [("50.00", "10"), ("75.5", "3")]:
+            ra = process_sql_query(sql.format(preco, estoque))
+            algebra, arvore, arvore_otimizada = processar_consulta_com_modelo(sql.format(preco, estoque))
+            self.assertEqual(algebra, ra)
+            esperada = otimizar_projecoes(otimizar_selects(converter_algebra_em_arvore(ra)))
+            self.assertEqual(self._valores(arvore_otimizada.raiz), self._valores(esperada.raiz))
+        self.assertEqual(cache_modelos_plano.hits, hits_antes + 1)
+        with self.assertRaises(ValueError):
+            processar_consulta_com_modelo("SELECT nome FROM Clientes WHERE idCliente = 1")
+
+    def test_plan_template_literal_with_and_symbol(self):
+        sql = "SELECT c.Nome FROM Cliente c WHERE c.Email = '{}' AND c.idCliente > 3"
+        for email in ["a ∧ b", "x∧y ∧ z"]:
+            ra = process_sql_query(sql.format(email))
+            algebra, _, arvore_otimizada = processar_consulta_com_modelo(sql.format(email))
+            self.assertEqual(algebra, ra)
+            esperada = otimizar_projecoes(otimizar_selects(converter_algebra_em_arvore(ra)))
+            self.assertEqual(self._valores(arvore_otimizada.raiz), self._valores(esperada.raiz))
+            # O literal é vinculado ao predicado inteiro, sem ser dividido no `∧`
+            predicados = [p for no in arvore_otimizada.nos() for p in no.predicados if p.esquerda.nome == "email"]
+            self.assertEqual([p.direita for p in predicados], [f"'{email}'"])
+
+    def test_plan_template_buckets(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = Path(pasta) / "modelos.db"
+            with sqlite3.connect(caminho) as conexao:
+                conexao.execute("CREATE TABLE Produto (idProduto INTEGER PRIMARY KEY, Nome TEXT, Preco REAL)")
+                conexao.executemany("INSERT INTO Produto VALUES (?, ?, ?)", [(i, f"produto {i}", i % 100) for i in range(1, 1001)])
+            conexao.close()
+            estatisticas = EstatisticasBanco(caminho, indices={"produto": {"idproduto": "PRIMARY KEY", "preco": "idx_Produto_Preco"}})
+            sql = "SELECT Nome FROM Produto WHERE Preco >= {} AND Nome <> 'x'"
+
+            def acesso(literal):
+                _, _, instanciada = processar_consulta_com_modelo(sql.format(literal), estatisticas)
+                return next(no.acesso for no in instanciada.nos() if no.operacao is Operacao.TABLE)
+
+            # Mesma impressão digital, baldes diferentes: poucos produtos caros usam o índice, quase todos não
+            caros = acesso(98)
+            self.assertIs(caros.metodo, MetodoAcesso.INDICE)
+            self.assertEqual(str(caros.predicado), "produto.preco >= 98")
+            self.assertIs(acesso(2).metodo, MetodoAcesso.VARREDURA)
+            # No mesmo balde, o plano é reaproveitado e só o literal muda
+            self.assertEqual(str(acesso(97).predicado), "produto.preco >= 97")
+            _, modelo = cache_modelos_plano.lookup(parameterize_sql_query(sql.format(1)).fingerprint)
+            self.assertEqual(len(modelo.planos), 2)
+
+    @classmethod
+    def _valores(cls, no):
+        if no is None:
+            return []
+        return [cls._normalize(no.valor)] + cls._valores(no.filho_esq) + cls._valores(no.filho_dir)
+
     @staticmethod
     def _normalize(s):
         return ' '.join(str(s).replace("\n", " ").replace("\t", " ").split())